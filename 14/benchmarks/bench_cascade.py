@@ -0,0 +1,83 @@
+"""
+
+Stress benchmark of one carnivore feeding with Scavenging, on 8 players with 20 cooperating boards each, comparing
+the FeedingCascade with the recursive feed_creature it replaced.
+Run from 14/ with: python3 -m benchmarks.bench_cascade
+
+"""
+import timeit
+
+from evolution.dealer import Dealer, MAX_PLAYERS
+from evolution.player import Player
+from evolution.species import Species, SPECIES_MAX_POPULATION
+from evolution.trait import Trait
+
+BOARDS = 20
+REPEAT = 200
+
+
+def recursive_feed_creature(dealer, player, species_index, scavenge=False):
+    """ The previous, recursive implementation of Dealer.feed_creature """
+    species = player.species[species_index]
+    if not (species.is_hungry() and dealer.watering_hole):
+        return
+    feed_amount = min(1 + species.has_trait(Trait.FORAGING), dealer.watering_hole, species.population - species.food)
+    species.food += feed_amount
+    dealer.watering_hole -= feed_amount
+    for feeding in range(feed_amount):
+        if species.has_trait(Trait.COOPERATION):
+            right = player.get_neighbors(species)[1]
+            if right:
+                recursive_feed_creature(dealer, player, species_index + 1)
+    if scavenge:
+        idx = dealer.players.index(player)
+        for i in range(len(dealer.players)):
+            player = dealer.players[(idx + i) % len(dealer.players)]
+            for s in player.species:
+                if s.has_trait(Trait.SCAVENGER):
+                    recursive_feed_creature(dealer, player, player.species.index(s))
+
+
+def make_dealer():
+    """ Every board cooperates, every other board forages, and every fifth is a Scavenger
+    :return: a Dealer with enough food to fill every board
+    """
+    players = []
+    for player_id in range(1, MAX_PLAYERS + 1):
+        species = []
+        for i in range(BOARDS):
+            traits = [Trait.COOPERATION]
+            if i % 2:
+                traits.append(Trait.FORAGING)
+            if i % 5 == 0:
+                traits.append(Trait.SCAVENGER)
+            species.append(Species(population=SPECIES_MAX_POPULATION, traits=traits))
+        players.append(Player(player_id, species=species))
+    return Dealer(players, MAX_PLAYERS * BOARDS * SPECIES_MAX_POPULATION)
+
+
+def time_feeding(feed):
+    """
+    :param feed: a function of (Dealer, Player, Integer, Boolean) that feeds a creature
+    :return: Float milliseconds per cascade, and the resulting serialized Dealer
+    """
+    total = 0.0
+    for _ in range(REPEAT):
+        dealer = make_dealer()
+        player = dealer.players[0]
+        total += timeit.timeit(lambda: feed(dealer, player, 0, True), number=1)
+    return total / REPEAT * 1e3, dealer.serialize()
+
+
+def main():
+    before, expected = time_feeding(recursive_feed_creature)
+    after, actual = time_feeding(lambda dealer, *args: dealer.feed_creature(*args))
+    assert expected == actual, "The cascade fed differently from the recursive implementation"
+    print("%d players x %d cooperating boards" % (MAX_PLAYERS, BOARDS))
+    print("recursive feed_creature: %.3f ms/cascade" % before)
+    print("FeedingCascade:          %.3f ms/cascade" % after)
+    print("speedup: %.1fx" % (before / after))
+
+
+if __name__ == '__main__':
+    main()
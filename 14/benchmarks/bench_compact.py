@@ -0,0 +1,99 @@
+"""
+
+Bytes on the wire and encode/decode CPU for every message of seeded 8-player games, sent as newline-delimited JSON
+and as compact frames.
+Run from 14/ with: python3 -m benchmarks.bench_compact
+
+"""
+import json
+import time
+
+from evolution.compact import frame, unframe
+from evolution.dealer import Dealer
+from evolution.player import ExternalPlayer
+from evolution.simulate import shuffled_deck
+
+PLAYERS = 8
+GAMES = 10
+REPEATS = 5
+
+
+class RecordingPlayer(ExternalPlayer):
+    """ An ExternalPlayer that keeps every message that would cross the wire, in either direction """
+
+    def __init__(self, player_id, messages):
+        super().__init__(player_id)
+        self.messages = messages
+
+    def start(self, msg):
+        self.messages.append(msg)
+        super().start(msg)
+
+    def choose(self, before, after):
+        self.messages.append([before, after])
+        answer = super().choose(before, after)
+        self.messages.append(answer)
+        return answer
+
+    def feed_species(self, state):
+        self.messages.append(state)
+        answer = super().feed_species(state)
+        self.messages.append(answer)
+        return answer
+
+
+def record_games():
+    """
+    :return: a List of the messages of each of GAMES seeded games
+    """
+    games = []
+    for seed in range(GAMES):
+        messages = []
+        Dealer(deck=shuffled_deck(seed)).play_game([(RecordingPlayer(i, messages), "")
+                                                    for i in range(1, PLAYERS + 1)])
+        games.append(messages)
+    return games
+
+
+def json_encode(message):
+    return json.dumps(message).encode("utf-8") + b"\n"
+
+
+def json_decode(data):
+    return json.loads(data)
+
+
+def compact_decode(data):
+    return unframe(data)[0]
+
+
+def best_time(function, items):
+    """
+    :return: Float fewest seconds that calling the function on every item took, over REPEATS tries
+    """
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        for item in items:
+            function(item)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    games = record_games()
+    messages = [message for game in games for message in game]
+    print("%d %d-player games, %d messages" % (GAMES, PLAYERS, len(messages)))
+    for name, encode, decode in [("json", json_encode, json_decode), ("compact", frame, compact_decode)]:
+        encoded = [encode(message) for message in messages]
+        assert [decode(data) for data in encoded] == messages
+        size = sum(len(data) for data in encoded)
+        encoding = best_time(encode, messages)
+        decoding = best_time(decode, encoded)
+        print("%-8s %8.0f bytes/game  encode %6.2f us/msg  decode %6.2f us/msg" % (
+            name, size / GAMES, encoding / len(messages) * 1e6, decoding / len(messages) * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+
+Measures the cost of dealing one round of cards as the deck grows, comparing the Deck against list.pop(0).
+Run from 14/ with: python3 -m benchmarks.bench_deck
+
+"""
+import timeit
+
+from evolution.deck import Deck
+from evolution.traitcard import TraitCard
+from evolution.dealer import CARD_DRAW_COUNT, MAX_PLAYERS
+
+# Cards dealt in one round to a full table of players with a single board each
+CARDS_PER_ROUND = MAX_PLAYERS * (CARD_DRAW_COUNT + 1)
+# Copies of the full deck to build; the smallest still lasts for ROUNDS rounds
+DECK_COPIES = [60, 600, 6000]
+ROUNDS = 200
+
+
+def deal_from_list(cards):
+    for _ in range(MAX_PLAYERS):
+        [cards.pop(0) for _ in range(CARD_DRAW_COUNT + 1)]
+
+
+def deal_from_deck(deck):
+    for _ in range(MAX_PLAYERS):
+        deck.deal(CARD_DRAW_COUNT + 1)
+
+
+def time_per_round(make, deal):
+    """ Time dealing ROUNDS rounds from a fresh deck
+    :return: Float microseconds per round
+    """
+    deck = make()
+    return timeit.timeit(lambda: deal(deck), number=ROUNDS) / ROUNDS * 1e6
+
+
+def main():
+    print("%10s %16s %16s" % ("deck size", "list us/round", "Deck us/round"))
+    for copies in DECK_COPIES:
+        cards = TraitCard.new_deck() * copies
+        size = len(cards)
+        list_time = time_per_round(lambda: list(cards), deal_from_list)
+        deck_time = time_per_round(lambda: Deck(cards), deal_from_deck)
+        print("%10d %16.2f %16.2f" % (size, list_time, deck_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+
+Bytes and serialization time of the feeding states in seeded 8-player games, sent in full and as patches against the
+state sent to the same player before, as JSON and as compact frames. A silly player is only asked to feed when the
+choice isn't automatic, so a connection sees few states in one game; the "seat" rows keep each seat's connection
+open across every game, as a long-lived client's would be.
+Run from 14/ with: python3 -m benchmarks.bench_delta
+
+"""
+import json
+import time
+
+from evolution.compact import frame
+from evolution.dealer import Dealer
+from evolution.delta import StateSender, StateReceiver, FULL
+from evolution.player import ExternalPlayer
+from evolution.simulate import shuffled_deck
+
+PLAYERS = 8
+GAMES = 40
+REPEATS = 5
+
+
+class FeedingRecorder(ExternalPlayer):
+    """ An ExternalPlayer that keeps every feeding state it's sent """
+
+    def __init__(self, player_id):
+        super().__init__(player_id)
+        self.states = []
+
+    def feed_species(self, state):
+        self.states.append(state)
+        return super().feed_species(state)
+
+
+def record_connections():
+    """
+    :return: a List of the feeding states sent across each connection of GAMES seeded games, in the order sent
+    """
+    connections = []
+    for seed in range(GAMES):
+        players = [FeedingRecorder(i) for i in range(1, PLAYERS + 1)]
+        Dealer(deck=shuffled_deck(seed)).play_game([(player, "") for player in players])
+        connections.extend(player.states for player in players)
+    return connections
+
+
+def by_seat(connections):
+    """
+    :return: a List of the feeding states sent to each seat, game after game
+    """
+    return [[state for states in connections[seat::PLAYERS] for state in states] for seat in range(PLAYERS)]
+
+
+def send_full(states):
+    return [json.dumps([FULL, sequence, state]) for sequence, state in enumerate(states, 1)]
+
+
+def send_patches(states):
+    sender = StateSender()
+    return [json.dumps(sender.update(state)) for state in states]
+
+
+def best_time(function, connections):
+    """
+    :return: Float fewest seconds that calling the function on every connection took, over REPEATS tries
+    """
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        for states in connections:
+            function(states)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    games = record_connections()
+    count = sum(len(states) for states in games)
+    print("%d %d-player games, %d feeding states" % (GAMES, PLAYERS, count))
+    for label, connections in [("game", games), ("seat", by_seat(games))]:
+        for states in connections:
+            sender, receiver = StateSender(), StateReceiver()
+            for state in states:
+                assert receiver.receive(sender.update(state)) == state
+        for name, send in [("full", send_full), ("patches", send_patches)]:
+            messages = [json.loads(data) for states in connections for data in send(states)]
+            json_size = sum(len(json.dumps(message)) + 1 for message in messages)
+            compact_size = sum(len(frame(message)) for message in messages)
+            seconds = best_time(send, connections)
+            print("%-4s %-8s json %7.0f bytes/game  compact %6.0f bytes/game  %6.2f us/state" % (
+                label, name, json_size / GAMES, compact_size / GAMES, seconds / count * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+
+Cost of trying out a feeding on a copy of a mid-game 8-player Dealer: forking it copy-on-write against rebuilding it
+with serialize and deserialize.
+Run from 14/ with: python3 -m benchmarks.bench_fork
+
+"""
+import timeit
+from unittest import mock
+
+from evolution.dealer import Dealer
+from evolution.feeding_intent import FeedCarnivore, FeedVegetarian
+from evolution.player import ExternalPlayer
+from evolution.simulate import shuffled_deck
+
+PLAYERS = 8
+CALLS = 2000
+
+
+def feeding_state(seed=0):
+    """ Play a seeded game up to the first feeding phase that has any feeding to do
+    :return: a python-encoded JSON Dealer
+    """
+    states = []
+    feeding = Dealer.feeding
+
+    def record(dealer):
+        if not states and dealer.watering_hole:
+            states.append(dealer.serialize())
+        feeding(dealer)
+    with mock.patch.object(Dealer, "feeding", record):
+        Dealer(deck=shuffled_deck(seed)).play_game([(ExternalPlayer(i), "") for i in range(PLAYERS)])
+    return states[0]
+
+
+def first_feeding(dealer):
+    """ Find a feeding for the first player, preferring an attack since it changes the most
+    :param dealer: a Dealer
+    :return: a FeedingIntent
+    """
+    player = dealer.players[0]
+    others = dealer.players[1:]
+    for index, species in enumerate(player.species):
+        for defending, other in enumerate(others):
+            for defender in other.get_attackable_species(species):
+                return FeedCarnivore(index, defending, other.species.index(defender))
+    hungry = [index for index, species in enumerate(player.species) if species.is_hungry()]
+    return FeedVegetarian(hungry[0])
+
+
+def main():
+    dealer = Dealer.deserialize(feeding_state())
+    intent = first_feeding(dealer)
+
+    def with_fork():
+        dealer.fork().enact_feeding(0, intent)
+
+    def with_rebuild():
+        copy = Dealer.deserialize(dealer.serialize())
+        intent.enact(copy.players[0], copy.players[1:], copy)
+
+    fork_only = timeit.timeit(dealer.fork, number=CALLS) / CALLS * 1e6
+    fork = timeit.timeit(with_fork, number=CALLS) / CALLS * 1e6
+    rebuild = timeit.timeit(with_rebuild, number=CALLS) / CALLS * 1e6
+    print("trying %s on a copy of an %d-player dealer" % (type(intent).__name__, PLAYERS))
+    print("serialize + deserialize: %.1f us" % rebuild)
+    print("fork:                    %.1f us (%.1f us of it forking)" % (fork, fork_only))
+    print("speedup: %.1fx" % (rebuild / fork))
+
+
+if __name__ == '__main__':
+    main()
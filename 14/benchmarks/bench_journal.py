@@ -0,0 +1,84 @@
+"""
+
+Cost of journaling seeded games of silly players: game time with no journal, with a journal kept in memory, and with
+one written to a file, and the time to seek to events of a 3-player game with a snapshot every round
+against replaying from the start.
+Run from 14/ with: python3 -m benchmarks.bench_journal
+
+"""
+import gc
+import os
+import statistics
+import tempfile
+import time
+
+from evolution.dealer import Dealer
+from evolution.journal import STREAM_BUFFER_SIZE, Journal, Replayer
+from evolution.player import ExternalPlayer
+from evolution.simulate import shuffled_deck
+
+PLAYERS = 8
+GAMES = 100
+REPEATS = 9
+SEEK_PLAYERS = 3
+
+
+def play_game(seed, journal):
+    """
+    :return: Float seconds to play the seeded game
+    """
+    # Each game starts with no garbage left by the last, so the collections it makes are its own
+    gc.collect()
+    start = time.perf_counter()
+    Dealer(deck=shuffled_deck(seed), journal=journal).play_game([(ExternalPlayer(i), "") for i in range(PLAYERS)])
+    return time.perf_counter() - start
+
+
+def seek_all(events, snapshot_interval):
+    """
+    :return: (Float mean seconds to seek to each event, Integer number of events)
+    """
+    replayer = Replayer(events)
+    if snapshot_interval is None:
+        # As though only the BEGIN event were a snapshot
+        replayer.snapshots = replayer.snapshots[:1]
+    targets = range(replayer.snapshots[0], len(events))
+    start = time.perf_counter()
+    for target in targets:
+        replayer.seek(target)
+    return (time.perf_counter() - start) / len(targets), len(targets)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "journal")
+        with open(path, "wb", buffering=STREAM_BUFFER_SIZE) as stream:
+            modes = [("none", lambda seed: None), ("memory", lambda seed: Journal(seed=seed)),
+                     ("file", lambda seed: Journal(stream, seed))]
+            # Each game is played in every mode in turn, each mode going first in turn, so that the modes are compared
+            # game by game on a machine in the same state rather than in totals that drift with it
+            times = {name: [] for name, _ in modes}
+            for repeat in range(REPEATS):
+                for seed in range(GAMES):
+                    turn = (repeat + seed) % len(modes)
+                    for name, make_journal in modes[turn:] + modes[:turn]:
+                        times[name].append(play_game(seed, make_journal(seed)))
+        size = os.path.getsize(path) / (GAMES * REPEATS)
+    print("%d %d-player games, %d times each" % (GAMES, PLAYERS, REPEATS))
+    for name, seconds in times.items():
+        ratio = statistics.median(mine / none for mine, none in zip(seconds, times["none"]))
+        print("%-7s %7.2f ms/game median  %+5.1f%% median per game" % (name, statistics.median(seconds) * 1000,
+                                                                      (ratio - 1) * 100))
+    print("journal %7.0f bytes/game" % size)
+
+    journal = Journal(seed=1, snapshot_interval=1)
+    dealer = Dealer(deck=shuffled_deck(1), journal=journal)
+    dealer.play_game([(ExternalPlayer(i), "") for i in range(SEEK_PLAYERS)])
+    print("%d-player game: %d rounds, %d events" % (SEEK_PLAYERS, dealer.rounds, len(journal.events)))
+    for name, interval in [("every round", 1), ("from start", None)]:
+        seconds, count = seek_all(journal.events, interval)
+        print("seek, snapshot %-12s %6.2f ms/seek over %d seeks" % (name, seconds * 1000, count))
+
+
+if __name__ == '__main__':
+    main()
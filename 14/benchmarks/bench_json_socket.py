@@ -0,0 +1,79 @@
+"""
+
+Throughput of reading a stream of JSON messages off a loopback socketpair: the old one-byte-at-a-time reader that
+re-parsed the whole buffer after every byte, against JSONSocket's chunked, newline-framed reader.
+Run from 14/ with: python3 -m benchmarks.bench_json_socket
+
+"""
+import json
+import socket
+import threading
+import time
+
+from evolution.json_socket import JSONSocket
+from .bench_fork import feeding_state
+
+SMALL_MESSAGES = 20000
+LARGE_MESSAGES = 200
+OLD_LARGE_MESSAGES = 5
+
+
+def decode_byte_at_a_time(coder):
+    """ The reader JSONSocket used to have: recv(1) and json.loads of the whole buffer after every byte
+    :param coder: a JSONSocket
+    :return: a python-encoded JSON message
+    """
+    buffer = bytes()
+    while True:
+        data = coder.sock.recv(1)
+        if not data:
+            raise coder.ClosedSocketError
+        buffer += data
+        try:
+            return json.loads(buffer.decode(coder.ENCODING))
+        except ValueError:
+            pass
+
+
+def throughput(message, count, decode):
+    """ Send count copies of message from one end of a socketpair and read them at the other
+    :param message: a python-encoded JSON message
+    :param count: Integer number of copies to send
+    :param decode: a function of a JSONSocket returning the next message
+    :return: (Float messages per second, Float MB per second)
+    """
+    ours, theirs = socket.socketpair()
+    writer_end = JSONSocket(theirs)
+    reader = JSONSocket(ours)
+    size = len(json.dumps(message).encode(JSONSocket.ENCODING)) + 1
+
+    def write():
+        for _ in range(count):
+            writer_end.encode(message)
+    writer = threading.Thread(target=write)
+    start = time.perf_counter()
+    writer.start()
+    for _ in range(count):
+        decode(reader)
+    elapsed = time.perf_counter() - start
+    writer.join()
+    ours.close()
+    theirs.close()
+    return count / elapsed, count * size / elapsed / 1e6
+
+
+def main():
+    small = ["ok", 1, [2, 3]]
+    large = feeding_state()
+    for name, message, count, old_count in [("3-item response", small, SMALL_MESSAGES, SMALL_MESSAGES // 10),
+                                            ("8-player dealer", large, LARGE_MESSAGES, OLD_LARGE_MESSAGES)]:
+        size = len(json.dumps(message)) + 1
+        print("%s (%d bytes):" % (name, size))
+        for label, decode, messages in [("byte at a time", decode_byte_at_a_time, old_count),
+                                        ("chunked framing", JSONSocket.decode_without_timeout, count)]:
+            rate, mb = throughput(message, messages, decode)
+            print("  %-16s %10.0f messages/s %9.2f MB/s" % (label, rate, mb))
+
+
+if __name__ == '__main__':
+    main()
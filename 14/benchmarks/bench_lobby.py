@@ -0,0 +1,62 @@
+"""
+
+Load on a Lobby: 8-player tables of silly clients, all signing up at once, played with different numbers of tables
+allowed at once. Reports the tables that played at the same time, tables finished per second, and how long requests
+to players took to be answered. The clients are threads in this process, so they share its interpreter with the
+lobby; latencies include the time they spend waiting for it.
+Run from 14/ with: python3 -m benchmarks.bench_lobby
+
+"""
+import threading
+import time
+
+from evolution.dealer import MAX_PLAYERS
+from evolution.json_socket import JSONSocket
+from evolution.lobby import Lobby
+from evolution.player import ExternalPlayer
+from evolution.proxy_dealer import ProxyDealer
+
+TABLES = 16
+MAX_TABLES = [1, 4, 16]
+
+
+def play_client(port, handshake):
+    """ Sign up with the lobby and play until the table closes the connection
+    :param port: Integer port of the lobby
+    :param handshake: String to sign up with
+    """
+    coder = JSONSocket.from_host_and_port("localhost", port)
+    ProxyDealer(coder, ExternalPlayer(1), handshake).begin()
+
+
+def load(max_tables):
+    """ Play TABLES full tables through a lobby that allows max_tables at once
+    :return: (python-encoded JSON dictionary of Lobby.stats, Float seconds taken)
+    """
+    # Every table is full, so they're all seated as soon as their players have signed up
+    lobby = Lobby("localhost", 0, max_tables=max_tables, seating_window=60000)
+    port = lobby.sock.getsockname()[1]
+    clients = [threading.Thread(target=play_client, args=(port, str(i)), daemon=True)
+               for i in range(TABLES * MAX_PLAYERS)]
+    start = time.perf_counter()
+    for client in clients:
+        client.start()
+    lobby.serve(TABLES)
+    elapsed = time.perf_counter() - start
+    lobby.sock.close()
+    for client in clients:
+        client.join()
+    return lobby.stats(), elapsed
+
+
+def main():
+    print("%d tables of %d players" % (TABLES, MAX_PLAYERS))
+    for max_tables in MAX_TABLES:
+        stats, elapsed = load(max_tables)
+        print("max_tables %2d: %2d at once, %5.1f tables/s, %6d messages, latency p50 %.2f ms p99 %.2f ms" % (
+            max_tables, stats["peak_tables"], stats["tables"] / elapsed, stats["messages"],
+            stats["latency_p50_ms"], stats["latency_p99_ms"]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+
+Games per second of the lockstep NumPy engine against Dealer with ExternalPlayers, for a batch of seeded games,
+after checking that every game ends in exactly the same state both ways.
+Run from 14/ with: python3 -m benchmarks.bench_lockstep
+
+"""
+import time
+
+from evolution.dealer import Dealer
+from evolution.lockstep import LockstepGames
+from evolution.player import ExternalPlayer
+from evolution.simulate import shuffled_deck
+
+PLAYER_COUNTS = [3, 5, 8]
+# Games played by Dealer, which are also checked against the lockstep engine
+DEALER_GAMES = 200
+LOCKSTEP_GAMES = [200, 1000, 5000]
+
+
+def play_dealers(games, player_count):
+    """ Play seeded games one at a time with Dealer
+    :param games: Natural number of games, seeded 0 onwards
+    :param player_count: Integer number of players
+    :return: (List of Dealer after each game, Float seconds taken, not counting shuffling the decks)
+    """
+    decks = [shuffled_deck(seed) for seed in range(games)]
+    start = time.perf_counter()
+    dealers = []
+    for deck in decks:
+        dealer = Dealer(deck=deck)
+        dealer.play_game([(ExternalPlayer(i), "") for i in range(player_count)])
+        dealers.append(dealer)
+    return dealers, time.perf_counter() - start
+
+
+def play_lockstep(games, player_count):
+    """ Play seeded games all at once with LockstepGames
+    :param games: Natural number of games, seeded 0 onwards
+    :param player_count: Integer number of players
+    :return: (LockstepGames, Float seconds taken, shuffling the decks included)
+    """
+    start = time.perf_counter()
+    batch = LockstepGames.seeded(list(range(games)), player_count)
+    batch.play()
+    return batch, time.perf_counter() - start
+
+
+def mismatches(dealers, batch):
+    """
+    :param dealers: a List of Dealer after playing games seeded 0 onwards
+    :param batch: a LockstepGames that played at least as many games, seeded 0 onwards
+    :return: Integer number of games whose final state, scores or rounds differ
+    """
+    return sum(dealer.serialize() != batch.dealer(game).serialize() or
+               dealer.get_scores() != batch.scores(game) or
+               dealer.rounds != batch.rounds[game]
+               for game, dealer in enumerate(dealers))
+
+
+def main():
+    for player_count in PLAYER_COUNTS:
+        dealers, dealer_time = play_dealers(DEALER_GAMES, player_count)
+        dealer_rate = DEALER_GAMES / dealer_time
+        print("%d players, Dealer: %.0f games/sec" % (player_count, dealer_rate))
+        for games in LOCKSTEP_GAMES:
+            batch, lockstep_time = play_lockstep(games, player_count)
+            rate = games / lockstep_time
+            print("  lockstep, %5d games: %6.0f games/sec, %5.1fx" % (games, rate, rate / dealer_rate))
+        print("  %d of %d games differ from Dealer" % (mismatches(dealers, batch), DEALER_GAMES))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+
+Rollouts per second the MCTS player manages from a mid-game 8-player feeding, with one process and with more.
+Run from 14/ with: python3 -m benchmarks.bench_mcts
+
+"""
+import multiprocessing
+
+from benchmarks.bench_fork import feeding_state
+from evolution.dealer import Dealer
+from evolution.mcts import MCTSPlayer
+
+BUDGET = 1.0
+SEARCHES = 3
+
+
+def rollouts_per_second(state, processes):
+    """ Run a few searches from the state
+    :param state: a State with others
+    :param processes: Integer number of processes to search in
+    :return: Float rollouts per second
+    """
+    player = MCTSPlayer(1, time_budget=BUDGET, processes=processes, seed=0)
+    try:
+        # The first search warms up the processes the pool started with
+        player.feed_species(state)
+        player.rollouts, player.search_time = 0, 0.0
+        for _ in range(SEARCHES):
+            player.feed_species(state)
+        return player.rollouts_per_second()
+    finally:
+        player.close()
+
+
+def main():
+    dealer = Dealer.deserialize(feeding_state())
+    state = dealer.players[0].produce_state(dealer.watering_hole, dealer.players[1:])
+    cores = multiprocessing.cpu_count()
+    counts = sorted({1, 2, cores // 2, cores} - {0})
+    single = None
+    for processes in counts:
+        rate = rollouts_per_second(state, processes)
+        single = single or rate
+        print("%2d processes: %8.0f rollouts/sec (%.1fx)" % (processes, rate, rate / single))
+    print("%d cores" % cores)
+
+
+if __name__ == '__main__':
+    main()
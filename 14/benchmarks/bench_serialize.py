@@ -0,0 +1,120 @@
+"""
+
+Compares serialization with and without the versioned cache on Species and Player: how often full 8-player games
+reuse a serialized player, the cost of produce_state on a table that hasn't changed, and the time for whole games.
+Run from 14/ with: python3 -m benchmarks.bench_serialize
+
+"""
+import time
+import timeit
+from contextlib import ExitStack
+from unittest import mock
+
+from evolution.dealer import Dealer
+from evolution.player import Player, ExternalPlayer
+from evolution.simulate import shuffled_deck
+from evolution.species import Species, FOOD_NAME, BODY_NAME, POPULATION_NAME, TRAITS_NAME, FAT_FOOD_NAME
+from evolution.trait import Trait
+
+PLAYERS = 8
+GAMES = 20
+REPEAT = 5
+CALLS = 10000
+
+
+def uncached_species_serialize(species):
+    """ Species.serialize as it was before the cache """
+    data = [
+        [FOOD_NAME, species.food],
+        [BODY_NAME, species.body],
+        [POPULATION_NAME, species.population],
+        [TRAITS_NAME, [trait.value for trait in species.traits]],
+    ]
+    if species.has_trait(Trait.FAT_TISSUE) and species.fat_food:
+        data.append([FAT_FOOD_NAME, species.fat_food])
+    return data
+
+
+def uncached_serialize_species(player):
+    """ Player.serialize_species as it was before the cache """
+    return [s.serialize() for s in player.species]
+
+
+def uncached_serialize_cards(player):
+    """ The serialization of a hand as it was before the cache """
+    return [card.serialize() for card in player.cards]
+
+
+class HitCounter:
+    """ Counts how often Player._cached reuses a serialized form """
+
+    def __init__(self):
+        self.hits = 0
+        self.calls = 0
+
+    def wrap(self, cached):
+        """
+        :param cached: the Player._cached function
+        :return: a replacement for Player._cached which counts calls and hits
+        """
+        def counted(player, name, key, produce):
+            self.calls += 1
+            entry = player._serialized.get(name)
+            self.hits += entry is not None and entry[0] == key
+            return cached(player, name, key, produce)
+        return counted
+
+
+def play_games():
+    """ Play GAMES seeded games
+    :return: Float seconds taken
+    """
+    start = time.perf_counter()
+    for seed in range(GAMES):
+        dealer = Dealer(deck=shuffled_deck(seed))
+        dealer.play_game([(ExternalPlayer(i), "") for i in range(PLAYERS)])
+    return time.perf_counter() - start
+
+
+def uncached():
+    """
+    :return: a context manager in which Species and Player serialize as they did before the cache
+    """
+    stack = ExitStack()
+    stack.enter_context(mock.patch.object(Species, "serialize", uncached_species_serialize))
+    stack.enter_context(mock.patch.object(Player, "serialize_species", uncached_serialize_species))
+    stack.enter_context(mock.patch.object(Player, "serialize_cards", uncached_serialize_cards))
+    return stack
+
+
+def time_produce_state():
+    """ Time Player.produce_state for an 8-player table where nothing has changed since the last turn
+    :return: Float microseconds per call
+    """
+    dealer = Dealer(deck=shuffled_deck(0))
+    dealer.play_game([(ExternalPlayer(i), "") for i in range(PLAYERS)])
+    players = [Player.deserialize(player.serialize()) for player in dealer.players]
+    for player in players:
+        player.species.extend(Species(food=1, body=2, population=3) for _ in range(3 - len(player.species)))
+    return timeit.timeit(lambda: players[0].produce_state(0, players[1:]), number=CALLS) / CALLS * 1e6
+
+
+def main():
+    counter = HitCounter()
+    with mock.patch.object(Player, "_cached", counter.wrap(Player._cached)):
+        play_games()
+    after = min(play_games() for _ in range(REPEAT))
+    after_state = time_produce_state()
+    with uncached():
+        before = min(play_games() for _ in range(REPEAT))
+        before_state = time_produce_state()
+    print("%d %d-player games: %d of %d serialized players reused (%.0f%%)" %
+          (GAMES, PLAYERS, counter.hits, counter.calls, 100.0 * counter.hits / counter.calls))
+    print("produce_state, unchanged table, without cache: %.1f us/call" % before_state)
+    print("produce_state, unchanged table, with cache:    %.1f us/call" % after_state)
+    print("games without cache: %.1f ms" % (before * 1e3))
+    print("games with cache:    %.1f ms" % (after * 1e3))
+
+
+if __name__ == '__main__':
+    main()
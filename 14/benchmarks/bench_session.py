@@ -0,0 +1,86 @@
+"""
+
+Setup time per game when the same 8 players play game after game through a Lobby: as new client processes for each
+game, as new connections from clients in this process for each game, and as sessions kept open across every game.
+Setup time is the wall time per game less the time the game itself took to play, so it covers starting clients,
+connecting, handshakes and seating. players.py also sleeps a second or more before connecting, which isn't counted.
+Run from 14/ with: python3 -m benchmarks.bench_session
+
+"""
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from evolution.dealer import MAX_PLAYERS
+from evolution.json_socket import JSONSocket
+from evolution.lobby import Lobby
+from evolution.player import ExternalPlayer
+from evolution.proxy_dealer import ProxyDealer
+
+GAMES = 10
+CLIENT = "import sys; from evolution.json_socket import JSONSocket; from evolution.proxy_dealer import ProxyDealer; " \
+         "ProxyDealer(JSONSocket.from_host_and_port('localhost', int(sys.argv[1])), handshake=sys.argv[2]).begin()"
+
+
+def play_client(port, handshake, keep_session):
+    coder = JSONSocket.from_host_and_port("localhost", port)
+    ProxyDealer(coder, ExternalPlayer(1), handshake, keep_session=keep_session).begin()
+
+
+def new_processes(port):
+    for _ in range(GAMES):
+        clients = [subprocess.Popen([sys.executable, "-c", CLIENT, str(port), str(i)],
+                                    cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+                   for i in range(MAX_PLAYERS)]
+        for client in clients:
+            client.wait()
+
+
+def new_connections(port):
+    for _ in range(GAMES):
+        clients = [threading.Thread(target=play_client, args=(port, str(i), False)) for i in range(MAX_PLAYERS)]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+
+
+def sessions(port):
+    clients = [threading.Thread(target=play_client, args=(port, str(i), True)) for i in range(MAX_PLAYERS)]
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+
+
+def measure(drive):
+    """ Play GAMES full tables one after another, with clients started by the given function
+    :return: (Float seconds per game, Float seconds of setup per game)
+    """
+    # Every table is full, so it's seated as soon as its players have signed up
+    lobby = Lobby("localhost", 0, max_tables=1, seating_window=60000)
+    port = lobby.sock.getsockname()[1]
+    driver = threading.Thread(target=drive, args=(port,), daemon=True)
+    start = time.perf_counter()
+    driver.start()
+    tables = lobby.serve(GAMES)
+    elapsed = time.perf_counter() - start
+    lobby.sock.close()
+    driver.join()
+    assert all(table.error is None and len(table.players) == MAX_PLAYERS for table in tables)
+    playing = sum(table.wall_time for table in tables)
+    return elapsed / GAMES, (elapsed - playing) / GAMES
+
+
+def main():
+    print("%d games of %d players" % (GAMES, MAX_PLAYERS))
+    for name, drive in [("new processes", new_processes), ("new connections", new_connections),
+                        ("sessions", sessions)]:
+        per_game, setup = measure(drive)
+        print("%-16s %7.1f ms/game  setup %7.1f ms/game" % (name, per_game * 1000, setup * 1000))
+
+
+if __name__ == '__main__':
+    main()
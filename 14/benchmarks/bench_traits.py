@@ -0,0 +1,57 @@
+"""
+
+Micro-benchmark of Species.is_attackable, comparing the bitmask-backed has_trait against scanning the trait list.
+Run from 14/ with: python3 -m benchmarks.bench_traits
+
+"""
+import timeit
+from unittest import mock
+
+from evolution.species import Species
+from evolution.trait import Trait
+
+CALLS = 100000
+
+
+def list_has_trait(species, trait):
+    """ The previous implementation of Species.has_trait, which compares against every Trait in the list """
+    return trait in species.traits
+
+
+def situations():
+    """ A handful of attacker/defender/neighbor combinations which exercise every rule in is_attackable
+    :return: a List of (defender, attacker, left, right)
+    """
+    attacker = Species(body=2, population=3, traits=[Trait.CARNIVORE, Trait.PACK_HUNTING, Trait.CLIMBING])
+    return [
+        (Species(body=1, traits=[Trait.HARD_SHELL, Trait.HERDING, Trait.SYMBIOSIS]), attacker,
+         Species(traits=[Trait.FORAGING]), Species(body=3, traits=[Trait.FAT_TISSUE, Trait.LONG_NECK])),
+        (Species(population=2, traits=[Trait.BURROWING, Trait.CLIMBING]), attacker,
+         Species(traits=[Trait.WARNING_CALL]), None),
+        (Species(population=4, traits=[Trait.HORNS, Trait.COOPERATION, Trait.SCAVENGER]), attacker, None, None),
+    ]
+
+
+def time_is_attackable():
+    """
+    :return: Float microseconds per call
+    """
+    cases = situations()
+
+    def run():
+        for defender, attacker, left, right in cases:
+            defender.is_attackable(attacker, left=left, right=right)
+    return timeit.timeit(run, number=CALLS // len(cases)) / CALLS * 1e6
+
+
+def main():
+    after = time_is_attackable()
+    with mock.patch.object(Species, "has_trait", list_has_trait):
+        before = time_is_attackable()
+    print("is_attackable with trait list: %.3f us/call" % before)
+    print("is_attackable with trait mask: %.3f us/call" % after)
+    print("speedup: %.1fx" % (before / after))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,346 @@
+"""
+
+A suite of benchmarks of the rules engine, the protocol and whole games, run against fixed fixture states so that runs
+can be compared with each other. Micro-benchmarks time single rules, meso-benchmarks time the phases of a round, and
+macro-benchmarks time whole games and round trips over a loopback connection. Results are printed as JSON; with
+--compare, each benchmark's median is compared with a stored baseline's and the run fails if any has slowed down by
+more than the threshold.
+Run from 14/ with: python3 -m benchmarks.suite [-o results.json] [--compare baseline.json] [--level micro]
+Fixtures are made from seeded games with: python3 -m benchmarks.suite --make-fixtures
+
+"""
+import argparse
+import functools
+import json
+import os
+import platform
+import socket
+import statistics
+import sys
+import threading
+import time
+from unittest import mock
+
+from evolution.action4 import Action4
+from evolution.dealer import Dealer
+from evolution.json_socket import JSONSocket
+from evolution.player import ExternalPlayer, InternalPlayer
+from evolution.simulate import shuffled_deck
+from evolution.trait import Trait
+from evolution.traitcard import TraitCard
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+# Player counts of the fixture states, each the step four of a seeded game with the most species and traits on the
+# table once its actions are applied, and the seed of each game: different seeds deal different hands, and these were
+# picked for a later round with a carnivore among many traited species, so that attacks and feeding have work to do
+FIXTURE_PLAYERS = [3, 5, 8]
+FIXTURE_SEEDS = {3: 68, 5: 33, 8: 10}
+# Seed of the whole games played by the macro-benchmarks
+GAME_SEED = 0
+LEVELS = ["micro", "meso", "macro"]
+# Each benchmark is run for at least this many samples and this many seconds, after one sample to warm up
+MIN_SAMPLES = 5
+MIN_SECONDS = 0.2
+MAX_SAMPLES = 1000
+# Slowdown of a median against the baseline's beyond which a benchmark has regressed
+DEFAULT_THRESHOLD = 0.2
+# Times the cheapest benchmarks repeat their operations in a sample, so that a sample is long enough to time
+MICRO_REPEATS = 50
+ROUND_TRIPS = 50
+# Dealers fed from in each sample of dealer.feed_creature, which can only feed each hungry species of a Dealer once
+FEEDING_DEALERS = 10
+
+
+def make_fixture(player_count, seed=None):
+    """ Play a seeded game of silly players and keep its richest step four
+    :param player_count: Integer number of players
+    :param seed: Integer seed of the game's deck, or None for the player count's seed in FIXTURE_SEEDS
+    :return: a python-encoded JSON Object of the "dealer" as it was before the step four with a carnivore and the most
+    species and traits on the table once its actions were applied, the latest such if several tie, and the "actions"
+    each player had chosen for it
+    """
+    if seed is None:
+        seed = FIXTURE_SEEDS[player_count]
+    fixtures = []
+    step_four = Dealer.step_four
+
+    def record(dealer, actions):
+        fixture = {"dealer": dealer.serialize(), "actions": [action.serialize() for action in actions]}
+        applied = Dealer.deserialize(fixture["dealer"])
+        applied.apply_actions([Action4.deserialize(action) for action in fixture["actions"]])
+        species = [each for player in applied.players for each in player.species]
+        richness = (any(each.has_trait(Trait.CARNIVORE) for each in species),
+                    len(species) + sum(len(each.traits) for each in species), len(fixtures))
+        fixtures.append((richness, fixture))
+        step_four(dealer, actions)
+    with mock.patch.object(Dealer, "step_four", record):
+        Dealer(deck=shuffled_deck(seed)).play_game([(ExternalPlayer(i), "") for i in range(player_count)])
+    return max(fixtures, key=lambda richness_fixture: richness_fixture[0])[1]
+
+
+def fixture_path(player_count):
+    return os.path.join(FIXTURES, "step-four-%d.json" % player_count)
+
+
+@functools.lru_cache(maxsize=None)
+def read_fixture(player_count):
+    """
+    :param player_count: one of FIXTURE_PLAYERS
+    :return: the python-encoded JSON fixture, read once and shared, so it must not be modified
+    """
+    with open(fixture_path(player_count)) as stream:
+        return json.load(stream)
+
+
+def load_fixture(player_count):
+    """
+    :param player_count: one of FIXTURE_PLAYERS
+    :return: (Dealer built with Dealer.deserialize from the fixture, whose players are InternalPlayers with silly
+    agents, List of the Action4 each player chose)
+    """
+    fixture = read_fixture(player_count)
+    dealer = Dealer.deserialize(fixture["dealer"])
+    seated = []
+    for player in dealer.players:
+        internal = InternalPlayer(player.player_id, ExternalPlayer(player.player_id))
+        internal.species, internal.bag, internal.cards = player.species, player.bag, player.cards
+        seated.append(internal)
+    dealer.players = seated
+    return dealer, [Action4.deserialize(action) for action in fixture["actions"]]
+
+
+def before_feeding(player_count):
+    """
+    :return: the Dealer of a fixture with its actions applied and autofed, ready for feeding
+    """
+    dealer, actions = load_fixture(player_count)
+    dealer.apply_actions(actions)
+    dealer.autofeed()
+    return dealer
+
+
+class Benchmark:
+    """ A piece of code to time, with the state it runs on made afresh, untimed, before each sample """
+
+    def __init__(self, level, name, prepare, run, operations=1):
+        """
+        :param level: one of LEVELS
+        :param name: String name of the benchmark
+        :param prepare: function of no arguments returning the state for a sample
+        :param run: function of the state, timed
+        :param operations: Integer number of operations a run carries out, or a function of the state giving it, so
+        that times are reported per operation
+        """
+        self.level = level
+        self.name = name
+        self.prepare = prepare
+        self.run = run
+        self.operations = operations
+
+    def measure(self):
+        """ Time samples until there are enough
+        :return: a python-encoded JSON Object of the median, minimum and spread of the microseconds an operation took
+        """
+        times = []
+        total = 0.0
+        state = self.prepare()
+        self.run(state)
+        while len(times) < MAX_SAMPLES and (len(times) < MIN_SAMPLES or total < MIN_SECONDS):
+            state = self.prepare()
+            operations = self.operations(state) if callable(self.operations) else self.operations
+            start = time.perf_counter()
+            self.run(state)
+            elapsed = time.perf_counter() - start
+            total += elapsed
+            times.append(elapsed / operations * 1e6)
+        quartiles = statistics.quantiles(times, n=4)
+        return {"level": self.level, "median_us": statistics.median(times), "min_us": min(times),
+                "iqr_us": quartiles[2] - quartiles[0], "samples": len(times)}
+
+
+def attacks(dealer):
+    """
+    :return: a List of (attacking Species, defending Player, defending Species, its left neighbor or None, its right
+    neighbor or None) for every carnivore against every species of the other players
+    """
+    return [(attacker, defender, species[index], species[index - 1] if index else None,
+             species[index + 1] if index + 1 < len(species) else None)
+            for player in dealer.players for attacker in player.species if attacker.has_trait(Trait.CARNIVORE)
+            for defender in dealer.players if defender is not player for species in [defender.species]
+            for index in range(len(species))]
+
+
+def micro_benchmarks():
+    feeding = before_feeding(8)
+
+    def is_attackable(pairs):
+        for _ in range(MICRO_REPEATS):
+            for attacker, _, defending, left, right in pairs:
+                defending.is_attackable(attacker, left, right)
+
+    def get_attackable_species(pairs):
+        for _ in range(MICRO_REPEATS):
+            for attacker, defender in pairs:
+                defender.get_attackable_species(attacker)
+
+    def hungry(dealer):
+        dealer.watering_hole = 1000
+        return [(player, index) for player in dealer.players
+                for index, species in enumerate(player.species) if species.is_hungry()]
+
+    def feed_creature(states):
+        for dealer, creatures in states:
+            for player, index in creatures:
+                dealer.feed_creature(player, index)
+
+    def verify(state):
+        dealer, actions = state
+        for _ in range(MICRO_REPEATS):
+            for action, player in zip(actions, dealer.players):
+                action.verify(player)
+
+    cards = [card.serialize() for player in feeding.players for card in player.cards] + feeding.deck.serialize()
+
+    def deserialize_cards(cards):
+        for _ in range(MICRO_REPEATS):
+            for card in cards:
+                TraitCard.deserialize(card)
+
+    pairs = attacks(feeding)
+    player_pairs = list({(id(attacker), id(defender)): (attacker, defender)
+                         for attacker, defender, _, _, _ in pairs}.values())
+    return [
+        Benchmark("micro", "species.is_attackable", lambda: pairs, is_attackable,
+                  MICRO_REPEATS * len(pairs)),
+        Benchmark("micro", "player.get_attackable_species", lambda: player_pairs, get_attackable_species,
+                  MICRO_REPEATS * len(player_pairs)),
+        Benchmark("micro", "dealer.feed_creature",
+                  lambda: [(dealer, hungry(dealer)) for dealer in [before_feeding(8) for _ in range(FEEDING_DEALERS)]],
+                  feed_creature, lambda states: sum(len(creatures) for _, creatures in states)),
+        Benchmark("micro", "action4.verify", lambda: load_fixture(8), verify, MICRO_REPEATS * 8),
+        Benchmark("micro", "traitcard.deserialize", lambda: cards, deserialize_cards, MICRO_REPEATS * len(cards)),
+    ]
+
+
+def meso_benchmarks():
+    return [Benchmark("meso", "dealer.step_four-%d" % count, lambda count=count: load_fixture(count),
+                      lambda state: state[0].step_four(state[1]))
+            for count in FIXTURE_PLAYERS] + \
+           [Benchmark("meso", "dealer.feeding-%d" % count, lambda count=count: before_feeding(count), Dealer.feeding)
+            for count in FIXTURE_PLAYERS]
+
+
+def round_trips(message):
+    """
+    :return: a function of a pair of connected JSONSockets that sends the message ROUND_TRIPS times across the first
+    and waits for it to be echoed back each time
+    """
+    def run(coders):
+        ours, _ = coders
+        for _ in range(ROUND_TRIPS):
+            ours.send_and_get_response(message)
+    return run
+
+
+def echo(coder):
+    """ Send back every message that arrives, until the connection closes """
+    try:
+        while True:
+            coder.encode(coder.decode_without_timeout())
+    except (JSONSocket.ClosedSocketError, OSError):
+        pass
+
+
+def macro_benchmarks(connections):
+    """
+    :param connections: a List that the loopback connections opened are appended to, to be closed after the run
+    """
+    def play(count):
+        Dealer(deck=shuffled_deck(GAME_SEED)).play_game([(ExternalPlayer(i), "") for i in range(count)])
+
+    dealer = before_feeding(8)
+    state = dealer.players[0].produce_state(dealer.watering_hole, dealer.players[1:])
+    listener = socket.create_server(("localhost", 0))
+    client = JSONSocket.from_host_and_port("localhost", listener.getsockname()[1])
+    server = JSONSocket(listener.accept()[0])
+    listener.close()
+    connections.extend([client, server])
+    threading.Thread(target=echo, args=(server,), daemon=True).start()
+    return [Benchmark("macro", "play_game-%d" % count, lambda count=count: count, play)
+            for count in FIXTURE_PLAYERS] + \
+           [Benchmark("macro", "json_socket.round_trip-small", lambda: (client, server), round_trips([1, [], [], []]),
+                      ROUND_TRIPS),
+            Benchmark("macro", "json_socket.round_trip-state-8", lambda: (client, server), round_trips(state),
+                      ROUND_TRIPS)]
+
+
+def run_suite(levels=LEVELS, pattern=None):
+    """ Run the benchmarks at some levels
+    :param levels: a List of LEVELS to run
+    :param pattern: a String that the names of the benchmarks to run contain, or None to run them all
+    :return: a python-encoded JSON Object of where the benchmarks ran and their results by name
+    """
+    connections = []
+    benchmarks = (micro_benchmarks() if "micro" in levels else []) + (meso_benchmarks() if "meso" in levels else [])
+    if "macro" in levels:
+        benchmarks += macro_benchmarks(connections)
+    try:
+        results = {benchmark.name: benchmark.measure() for benchmark in benchmarks
+                   if pattern is None or pattern in benchmark.name}
+    finally:
+        for connection in connections:
+            connection.shutdown()
+    return {"python": platform.python_version(), "machine": platform.machine(), "benchmarks": results}
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """ Compare the medians of a run with a baseline's
+    :param results: a python-encoded JSON Object as run_suite gives
+    :param baseline: a python-encoded JSON Object as run_suite gives
+    :param threshold: Float slowdown beyond which a benchmark has regressed, e.g. 0.2 for 20%
+    :return: a python-encoded JSON Object of the ratio of each benchmark's median to the baseline's, and the names of
+    the benchmarks that regressed and improved by more than the threshold
+    """
+    ratios = {name: result["median_us"] / baseline["benchmarks"][name]["median_us"]
+              for name, result in results["benchmarks"].items() if name in baseline["benchmarks"]}
+    return {"ratios": ratios,
+            "regressed": sorted(name for name, ratio in ratios.items() if ratio > 1 + threshold),
+            "improved": sorted(name for name, ratio in ratios.items() if ratio < 1 / (1 + threshold)),
+            "missing": sorted(set(baseline["benchmarks"]) - set(results["benchmarks"]))}
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Benchmark the rules engine, protocol and whole games")
+    parser.add_argument("-o", "--output", help="write the results to this file as well as stdout")
+    parser.add_argument("--compare", help="a baseline results file; exits with 1 if any benchmark regressed")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="slowdown that counts as a regression (default: %(default)s)")
+    parser.add_argument("--level", choices=LEVELS, action="append", help="run only this level; may be repeated")
+    parser.add_argument("-k", dest="pattern", help="run only benchmarks whose names contain this")
+    parser.add_argument("--make-fixtures", action="store_true", help="remake the fixture states and exit")
+    args = parser.parse_args(argv)
+
+    if args.make_fixtures:
+        os.makedirs(FIXTURES, exist_ok=True)
+        for count in FIXTURE_PLAYERS:
+            with open(fixture_path(count), "w") as stream:
+                json.dump(make_fixture(count), stream)
+                stream.write("\n")
+        return 0
+    results = run_suite(args.level or LEVELS, args.pattern)
+    if args.compare:
+        with open(args.compare) as stream:
+            results["comparison"] = compare(results, json.load(stream), args.threshold)
+        for name in results["comparison"]["regressed"]:
+            sys.stderr.write("regressed: %s is %.2fx the baseline\n" % (name, results["comparison"]["ratios"][name]))
+    # Written once the comparison is in, so that the file holds what stdout does; it can still be used as a baseline,
+    # as compare reads only the benchmarks
+    if args.output:
+        with open(args.output, "w") as stream:
+            json.dump(results, stream, indent=2)
+    sys.stdout.write(json.dumps(results, indent=2) + "\n")
+    return 1 if args.compare and results["comparison"]["regressed"] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -124,8 +124,9 @@ class NewBoardAction(Action):
                      len(json) <= MAX_NEW_BOARD_LENGTH]) and
             all([is_natural(i) for i in range(len(json))])):
             raise ValueError("This NewBoardAction is invalid")
-        b = json.pop(0)
-        o = json
+        # Without changing the message, which the Dealer's journal keeps
+        b = json[0]
+        o = json[1:]
         return cls(b, o)
 
     def cards(self):
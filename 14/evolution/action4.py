@@ -1,9 +1,20 @@
+from enum import Enum
+
 from .action import *
 from .validate import *
 
 NUMBER_OF_FIELDS = 5
 
 
+class Rejection(Enum):
+    """ The reason an Action4 can't be applied to a Player """
+    MALFORMED = "malformed"
+    DUPLICATE_CARD = "duplicate-card"
+    CARD_OUT_OF_RANGE = "card-out-of-range"
+    BOARD_OUT_OF_RANGE = "board-out-of-range"
+    TRAIT_OUT_OF_RANGE = "trait-out-of-range"
+
+
 class Action4:
     def __init__(self, food_index, grow_populations, grow_bodys, boards_with_traits, trait_replacements):
         """
@@ -57,14 +68,42 @@ class Action4:
         :param player: a Player to verify against
         :return: True if this Action4 can be applied; else, False.
         """
-        cards = self.card_indices()
-        try:
-            return all([not(any(cards.count(x) > 1 for x in cards)),
-                   (max(cards) <= len(player.cards)),
-                    self.boards_in_bounds(player),
-                    self.verify_trait_replacements(player)])
-        except:
-            return False
+        return self.check(player) is None
+
+    def check(self, player):
+        """ Find the first reason, if any, that this Action4 can't be applied to the given Player.
+        Every card, board and trait index is checked once against bounds computed up front.
+        :param player: a Player to verify against
+        :return: a Rejection, or None if this Action4 can be applied
+        """
+        card_count = len(player.cards)
+        # Cards used so far, as a bitset indexed by card
+        used = 0
+        for card in self.card_indices():
+            if not is_natural(card):
+                return Rejection.MALFORMED
+            if card >= card_count:
+                return Rejection.CARD_OUT_OF_RANGE
+            if used >> card & 1:
+                return Rejection.DUPLICATE_CARD
+            used |= 1 << card
+
+        species_count = len(player.species)
+        board_count = species_count + len(self.boards_with_traits)
+        for action in self.all_actions():
+            board = action.board_used()
+            if board is not None and not 0 <= board < board_count:
+                return Rejection.BOARD_OUT_OF_RANGE
+
+        for replacement in self.trait_replacements:
+            board = replacement.board_used()
+            if board < species_count:
+                trait_count = player.species[board].trait_count()
+            else:
+                trait_count = self.boards_with_traits[board - species_count].trait_count()
+            if not 0 <= replacement.idx_replace < trait_count:
+                return Rejection.TRAIT_OUT_OF_RANGE
+        return None
 
     def enact(self, player):
         """ Carry out the actions on the given player and remove the TraitCard matching the food_index
@@ -101,26 +140,12 @@ class Action4:
         items = [item for l in lists for item in l]
         return items
 
-    def boards_in_bounds(self, player):
-        """ Given a player, check whether the Actions in this Action4 all only use boards it will have.
-        :param player: a Player object with cards in its hand
-        :return: Boolean indicating whether the boards are all in bounds
-        """
-        indices = [p.board_used() for p in self.all_actions()]
-        indices = [i for i in indices if i is not None]
-        for indice in indices:
-            if indice not in range(len(player.cards) + len(self.boards_with_traits)):
-                return False
-        return True
-
-    def verify_trait_replacements(self, player):
-        """ Verify that all trait-replacements are legal
-        :param player: a Player object to verify the trait replacements
-        :return: a Boolean indicating whether the replacement is legal
-        """
-        species = [s for s in player.species]
-        species.extend(self.boards_with_traits)
-        for t in self.trait_replacements:
-            if t.idx_replace not in range(species[t.board_used()].trait_count()):
-                return False
-        return True
+
+def verify_many(action4s, players):
+    """ Check a whole round's worth of Action4s at once.
+    :param action4s: a List of Action4, or None where a player didn't produce a well-formed Action4
+    :param players: the List of Players the Action4s are for, in the same order
+    :return: a List of Rejection, with None for each Action4 that can be applied
+    """
+    return [Rejection.MALFORMED if actions is None else actions.check(player)
+            for actions, player in zip(action4s, players)]
@@ -0,0 +1,92 @@
+"""
+
+Keeps track of which species each hungry carnivore can legally attack during the feeding phase.
+
+"""
+
+
+class AttackIndex:
+    """
+    Maps each carnivore that has been asked about to the species it can attack on each player. Targets are found the
+    first time they're needed and then kept up to date as the board changes, so repeated feeding turns only pay for
+    the species that actually changed.
+
+    Whoever mutates species while an AttackIndex is in use must report it through species_changed, species_removed
+    and player_removed.
+    """
+
+    def __init__(self):
+        # Maps an attacking Species to a Dictionary of Player -> Set of Species on that Player it can attack
+        self.targets = {}
+
+    def reset(self):
+        """ Forget everything that's known. Necessary whenever species have changed without being reported.
+        """
+        self.targets = {}
+
+    def attackable_species(self, player, attacker):
+        """ Returns all species owned by the given player that are attackable by the given species.
+        :param player: the Player whose species are attacked
+        :param attacker: the attacking Species
+        :return: a List of Species, in the order of the player's boards
+        """
+        by_player = self.targets.get(attacker)
+        if by_player is None:
+            by_player = self.targets[attacker] = {}
+        found = by_player.get(player)
+        if found is None:
+            found = by_player[player] = set(player.get_attackable_species(attacker))
+        if not found:
+            return []
+        return [species for species in player.species if species in found]
+
+    def species_changed(self, player, species):
+        """ Update the index after any attribute of the given species has changed.
+        :param player: the Player on which the species is located
+        :param species: the Species that changed
+        """
+        self.targets.pop(species, None)
+        if not self.targets:
+            return
+        position = player.species.index(species)
+        self._recheck(player, range(position - 1, position + 2))
+
+    def species_removed(self, player, species, position):
+        """ Update the index after a species has been removed from a player.
+        :param player: the Player from which the species was removed
+        :param species: the Species that was removed
+        :param position: the Integer index the species was at before it was removed
+        """
+        self.targets.pop(species, None)
+        for by_player in self.targets.values():
+            found = by_player.get(player)
+            if found:
+                found.discard(species)
+        # The species on either side of the gap now have new neighbors.
+        self._recheck(player, range(position - 1, position + 1))
+
+    def player_removed(self, player):
+        """ Update the index after a player has left the game.
+        :param player: the Player that was removed
+        """
+        for species in player.species:
+            self.targets.pop(species, None)
+        for by_player in self.targets.values():
+            by_player.pop(player, None)
+
+    def _recheck(self, player, positions):
+        """ Re-evaluate whether each known attacker can attack the species at the given positions on the player.
+        :param player: a Player
+        :param positions: an iterable of Integer positions; those off the ends of the player's boards are ignored
+        """
+        positions = [p for p in positions if 0 <= p < len(player.species)]
+        for attacker, by_player in self.targets.items():
+            found = by_player.get(player)
+            if found is None:
+                continue
+            for position in positions:
+                defender = player.species[position]
+                if player.is_species_attackable(position, attacker):
+                    found.add(defender)
+                else:
+                    found.discard(defender)
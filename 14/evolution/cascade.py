@@ -0,0 +1,76 @@
+"""
+
+Works out the order in which food flows through Cooperation chains and to Scavengers when a species is fed.
+
+"""
+from .trait import Trait
+
+
+class FeedingCascade:
+    """
+    Precomputed feeding topology for a list of players: which species pass food to their right-hand neighbor
+    (Cooperation), and which species eat whenever a carnivore does (Scavenger), in seat order.
+
+    The topology only depends on traits and on which species are where, so it is computed once and reused until the
+    players or their versions change, which any change to a player's species list counts, in place or not. Traits
+    aren't counted by their player's version, so whoever owns a FeedingCascade must reset it when traits change.
+    """
+
+    def __init__(self):
+        # A List of (Player, Integer version) for the players the topology was computed for, or None if it needs to be
+        # computed
+        self._players = None
+        # Maps a Player to its Integer seat
+        self._seats = {}
+        # Maps a Player to a List of Boolean: does the species at each index feed its right-hand neighbor?
+        self._cooperates = {}
+        # A List, by seat, of Lists of (Player, Integer index) of the Scavengers on that player
+        self._scavengers = []
+
+    def reset(self):
+        """ Forget the precomputed topology; it is recomputed the next time it is needed.
+        """
+        self._players = None
+
+    def _plan(self, players):
+        """ Compute the topology for the given players, unless it's already known
+        :param players: the List of Players in the game, in seat order
+        """
+        versions = [(player, player.version) for player in players]
+        if self._players == versions:
+            return
+        self._players = versions
+        self._seats = {player: seat for seat, player in enumerate(players)}
+        self._cooperates = {}
+        self._scavengers = []
+        for player in players:
+            species = player.species
+            last = len(species) - 1
+            self._cooperates[player] = [s.has_trait(Trait.COOPERATION) and i < last for i, s in enumerate(species)]
+            self._scavengers.append([(player, i) for i, s in enumerate(species) if s.has_trait(Trait.SCAVENGER)])
+
+    def cooperates(self, players, player, species_index):
+        """
+        :param players: the List of Players in the game, in seat order
+        :param player: a Player
+        :param species_index: Integer index of a Species on the player
+        :return: Boolean indicating whether that species passes food to the species on its right
+        """
+        self._plan(players)
+        cooperates = self._cooperates.get(player)
+        if cooperates is None:
+            # Not one of our players; nothing to precompute for it
+            return (player.species[species_index].has_trait(Trait.COOPERATION) and
+                    species_index < len(player.species) - 1)
+        return cooperates[species_index]
+
+    def scavengers_from(self, players, player):
+        """ All Scavengers in the game, in the order they eat after a carnivore on the given player does.
+        :param players: the List of Players in the game, in seat order
+        :param player: a Player in the game
+        :return: a List of (Player, Integer index of a Species on that Player)
+        """
+        self._plan(players)
+        start = self._seats[player]
+        order = self._scavengers[start:] + self._scavengers[:start]
+        return [scavenger for scavengers in order for scavenger in scavengers]
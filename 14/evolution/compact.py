@@ -0,0 +1,231 @@
+"""
+
+A compact binary encoding of the messages in the remote protocol, for clients that opt in at the handshake.
+Every message is sent as a frame: its length as 4 big-endian bytes, then the encoded value. Values are tagged:
+Species are positional rather than lists of named fields, traits are one-byte ids rather than strings, and small
+integers and short lists fit their tag byte. Decoding a frame gives back exactly the JSON value that was encoded.
+
+"""
+import struct
+
+from .species import FOOD_NAME, BODY_NAME, POPULATION_NAME, TRAITS_NAME, FAT_FOOD_NAME
+from .trait import traits
+
+# Ends the handshake string of a client that wants compact frames once the Server has answered "ok"
+OPT_IN = "+compact"
+LENGTH = struct.Struct(">I")
+# Frames longer than this are refused rather than waited for
+MAX_FRAME_BYTES = 1 << 24
+
+NULL = 0x00
+FALSE = 0x01
+TRUE = 0x02
+# Followed by a varint of the value, or of its negation
+INTEGER = 0x03
+NEGATIVE_INTEGER = 0x04
+# Followed by a varint length and that many UTF-8 bytes
+STRING = 0x05
+# Followed by a varint count and that many values
+LIST = 0x06
+# Followed by a byte, the trait's index in trait.traits
+TRAIT = 0x07
+# Followed by varints of food, body and population, a varint count of traits and a byte for each
+SPECIES = 0x08
+# As SPECIES, followed by a varint of fat food
+FAT_SPECIES = 0x09
+# Tags from SMALL_INTEGER are integers from 0 below SMALL_LIMIT; tags from SHORT_LIST are lists of that many values
+SMALL_INTEGER = 0x40
+SHORT_LIST = 0x80
+SMALL_LIMIT = 0x40
+
+TRAIT_IDS = {name: index for index, name in enumerate(traits)}
+
+
+def frame(value):
+    """ Encode a message as a frame
+    :param value: a python-encoded JSON value of null, booleans, integers, strings and lists
+    :return: bytes
+    Note: This will raise a ValueError for values that can't be encoded, such as floats
+    """
+    payload = bytearray()
+    _write(value, payload)
+    return LENGTH.pack(len(payload)) + payload
+
+
+def unframe(buffer):
+    """ Decode the frame at the start of a buffer
+    :param buffer: a bytearray
+    :return: (python-encoded JSON value, Integer number of bytes the frame took up), or None if the buffer doesn't yet
+    hold a whole frame
+    Note: This will raise a ValueError if the frame is malformed
+    """
+    if len(buffer) < LENGTH.size:
+        return None
+    length, = LENGTH.unpack_from(buffer)
+    if length > MAX_FRAME_BYTES:
+        raise ValueError("Frame is too long")
+    end = LENGTH.size + length
+    if len(buffer) < end:
+        return None
+    payload = bytes(buffer[LENGTH.size:end])
+    try:
+        value, position = _read(payload, 0)
+    except IndexError:
+        raise ValueError("Frame ends partway through a value")
+    if position != len(payload):
+        raise ValueError("Frame has data after its value")
+    return value, end
+
+
+def _is_natural(value):
+    return type(value) is int and value >= 0
+
+
+def _as_species(value):
+    """
+    :param value: a List
+    :return: (food, body, population, List of trait ids, fat food or None) if the list is a Species serialized as
+    Species.serialize writes it, otherwise None
+    """
+    if len(value) not in (4, 5) or type(value[0]) is not list or value[0][:1] != [FOOD_NAME]:
+        return None
+    if not all(type(field) is list and len(field) == 2 for field in value):
+        return None
+    names = [field[0] for field in value]
+    if names[:4] != [FOOD_NAME, BODY_NAME, POPULATION_NAME, TRAITS_NAME] or names[4:] not in ([], [FAT_FOOD_NAME]):
+        return None
+    numbers = [field[1] for field in value if field[0] != TRAITS_NAME]
+    trait_names = value[3][1]
+    if not all(_is_natural(number) for number in numbers) or type(trait_names) is not list or \
+            not all(type(name) is str and name in TRAIT_IDS for name in trait_names):
+        return None
+    food, body, population = numbers[:3]
+    return food, body, population, [TRAIT_IDS[name] for name in trait_names], numbers[3] if numbers[3:] else None
+
+
+def _write_varint(number, out):
+    while number >= 0x80:
+        out.append(number & 0x7f | 0x80)
+        number >>= 7
+    out.append(number)
+
+
+def _write(value, out):
+    """ Append the encoding of a value
+    :param value: a python-encoded JSON value
+    :param out: a bytearray
+    """
+    if value is None:
+        out.append(NULL)
+    elif value is False:
+        out.append(FALSE)
+    elif value is True:
+        out.append(TRUE)
+    elif type(value) is int:
+        if 0 <= value < SMALL_LIMIT:
+            out.append(SMALL_INTEGER + value)
+        else:
+            out.append(INTEGER if value >= 0 else NEGATIVE_INTEGER)
+            _write_varint(abs(value), out)
+    elif type(value) is str:
+        if value in TRAIT_IDS:
+            out.append(TRAIT)
+            out.append(TRAIT_IDS[value])
+        else:
+            encoded = value.encode("utf-8")
+            out.append(STRING)
+            _write_varint(len(encoded), out)
+            out += encoded
+    elif type(value) is list:
+        species = _as_species(value)
+        if species:
+            food, body, population, trait_ids, fat_food = species
+            out.append(SPECIES if fat_food is None else FAT_SPECIES)
+            for number in (food, body, population, len(trait_ids)):
+                _write_varint(number, out)
+            out += bytes(trait_ids)
+            if fat_food is not None:
+                _write_varint(fat_food, out)
+            return
+        if len(value) < SMALL_LIMIT:
+            out.append(SHORT_LIST + len(value))
+        else:
+            out.append(LIST)
+            _write_varint(len(value), out)
+        for item in value:
+            _write(item, out)
+    else:
+        raise ValueError("Can't encode " + repr(value))
+
+
+def _read_varint(data, position):
+    number, shift = 0, 0
+    while True:
+        byte = data[position]
+        position += 1
+        number |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return number, position
+        shift += 7
+
+
+def _read_trait(data, position):
+    index = data[position]
+    if index >= len(traits):
+        raise ValueError("Unknown trait id")
+    return traits[index], position + 1
+
+
+def _read(data, position):
+    """ Decode the value at the given position
+    :param data: bytes
+    :param position: Integer index of the value's tag
+    :return: (python-encoded JSON value, Integer index just past the value)
+    Note: This will raise an IndexError if the data ends partway through the value, and a ValueError if it's malformed
+    """
+    tag = data[position]
+    position += 1
+    if tag >= SHORT_LIST + SMALL_LIMIT:
+        raise ValueError("Unknown tag")
+    if tag >= SHORT_LIST or tag == LIST:
+        count = tag - SHORT_LIST
+        if tag == LIST:
+            count, position = _read_varint(data, position)
+        items = []
+        for _ in range(count):
+            item, position = _read(data, position)
+            items.append(item)
+        return items, position
+    if tag >= SMALL_INTEGER:
+        return tag - SMALL_INTEGER, position
+    if tag in (NULL, FALSE, TRUE):
+        return (None, False, True)[tag], position
+    if tag in (INTEGER, NEGATIVE_INTEGER):
+        number, position = _read_varint(data, position)
+        return (number if tag == INTEGER else -number), position
+    if tag == STRING:
+        length, position = _read_varint(data, position)
+        if position + length > len(data):
+            raise IndexError()
+        try:
+            return data[position:position + length].decode("utf-8"), position + length
+        except UnicodeDecodeError:
+            raise ValueError("String isn't UTF-8")
+    if tag == TRAIT:
+        return _read_trait(data, position)
+    if tag in (SPECIES, FAT_SPECIES):
+        numbers = []
+        for _ in range(4):
+            number, position = _read_varint(data, position)
+            numbers.append(number)
+        food, body, population, count = numbers
+        trait_names = []
+        for _ in range(count):
+            name, position = _read_trait(data, position)
+            trait_names.append(name)
+        species = [[FOOD_NAME, food], [BODY_NAME, body], [POPULATION_NAME, population], [TRAITS_NAME, trait_names]]
+        if tag == FAT_SPECIES:
+            fat_food, position = _read_varint(data, position)
+            species.append([FAT_FOOD_NAME, fat_food])
+        return species, position
+    raise ValueError("Unknown tag")
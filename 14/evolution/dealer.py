@@ -1,65 +1,180 @@
 from .trait import Trait
+from .action4 import verify_many
 from .player import Player, InternalPlayer
-from .traitcard import TraitCard
+from .deck import Deck
+from .attack_index import AttackIndex
+from .cascade import FeedingCascade
+from .seat_ring import SeatRing
 from .species import Species
-from .debug import debug
+from .debug import TRACER, DEBUG, VERBOSE
+from .timeout import Deadline
+from .feeding_intent import FeedCarnivore
+from .metrics import (DEAL, CHOOSE, APPLY_ACTIONS, AUTOFEED, FEEDING, GAMES, ROUNDS, FEED_TURNS, ATTACKS, KILLS,
+                      EJECTIONS, INVALID_RESPONSES, CARDS_DEALT, rejected)
 
 DEAD_CREATURE_REPLACEMENT_CARDS = 2
 CARD_DRAW_COUNT = 3
 MAX_PLAYERS = 8
 MIN_PLAYERS = 3
+# Milliseconds that every player has, together, to answer a request to choose its actions
+CHOOSE_MILLISECONDS = 5000
 
 class Dealer:
     """
     Represents a Dealer in the game of Evolution.
     """
-    def __init__(self, players=None, watering_hole=0, deck=None):
+    def __init__(self, players=None, watering_hole=0, deck=None, journal=None, metrics=None):
         """ Initialize a new Dealer
         :param players: A list of Player
         :param watering_hole: Integer
-        :param deck: List of Trait_Card
+        :param deck: a Deck, a List of TraitCard, or None
+        :param journal: a journal.Journal to record the game in as it's played, or None
+        :param metrics: a metrics.Metrics to record phase times, counts and response times in, or None
         :return:
         """
         self.players = players or []
         self.watering_hole = watering_hole
-        self.deck = deck or []
+        self.deck = deck if isinstance(deck, Deck) else Deck(deck)
         self.starting_player = 0
+        self.rounds = 0
+        # Only consulted, and only kept up to date, during the feeding phase
+        self.attack_index = AttackIndex()
+        # Reset whenever species, traits or players change, so that it's current whenever creatures are fed
+        self.cascade = FeedingCascade()
+        # Players this Dealer shares with a fork, which must be copied before they're changed
+        self._shared_players = set()
+        self.journal = journal
+        self.metrics = metrics
 
     def serialize(self):
         """ Produce a serialized representation of a Dealer according to the specification
         :return: An array of [LOP+, Natural, LOC]
         """
-        return [[p.serialize() for p in self.players], self.watering_hole, [c.serialize() for c in self.deck]]
+        return [[p.serialize() for p in self.players], self.watering_hole, self.deck.serialize()]
 
     @classmethod
     def deserialize(cls, data):
 
         players = [Player.deserialize(p) for p in data[0]]
         wh = data[1]
-        cards = [TraitCard.deserialize(i) for i in data[2]]
+        cards = Deck.deserialize(data[2])
         return cls(players, wh, cards)
 
+    def fork(self):
+        """ Make a copy-on-write clone of this Dealer, for trying out moves without affecting it.
+        Players, Species and the Deck are shared until enact_feeding or enact_actions is about to change them, and
+        only what is changed is copied, so forking costs little more than copying the list of players.
+        Neither this Dealer nor its fork may be changed other than through those methods while both are in use.
+        :return: a Dealer
+        """
+        clone = Dealer(list(self.players), self.watering_hole, self.deck.fork())
+        clone.starting_player = self.starting_player
+        clone.rounds = self.rounds
+        clone._shared_players = set(self.players)
+        self._shared_players.update(clone._shared_players)
+        return clone
+
+    def own_player(self, player_index):
+        """ Make sure the player at the given index belongs to this Dealer alone, forking it if it's shared
+        :param player_index: Integer index of a Player
+        :return: the Player now at that index
+        """
+        player = self.players[player_index]
+        if player in self._shared_players:
+            self._shared_players.discard(player)
+            player = player.fork()
+            self.players[player_index] = player
+        return player
+
+    def enact_feeding(self, player_index, intent):
+        """ Carry out a feeding for the given player, first copying whatever it may change that's shared with a fork.
+        :param player_index: Integer index of the feeding Player
+        :param intent: a valid FeedingIntent whose player indices count from the player after the feeding one, as
+        they do once FeedingIntent.unrotate has been applied during the feeding phase
+        """
+        seats = {player: seat for seat, player in enumerate(self.players)}
+        others = self.players[player_index + 1:] + self.players[:player_index]
+        for player, species_index in intent.touches(self.players[player_index], others):
+            self.own_player(seats[player]).own_species(species_index)
+        player = self.players[player_index]
+        others = self.players[player_index + 1:] + self.players[:player_index]
+        self.attack_index.reset()
+        intent.enact(player, others, self)
+
+    def enact_actions(self, player_index, actions):
+        """ Carry out an Action4 for the given player, first copying whatever it may change that's shared with a fork.
+        :param player_index: Integer index of the Player
+        :param actions: an Action4 that can be applied to the Player
+        :return: the TraitCard to be placed in the watering hole
+        """
+        player = self.own_player(player_index)
+        for action in actions.all_actions():
+            board = action.board_used()
+            if board is not None and board < len(player.species):
+                player.own_species(board)
+        self.cascade.reset()
+        return actions.enact(player)
+
     def play_game(self, external_players):
-        """ Runs the game from the top level
+        """ Runs the game from the top level. The players still in the game when it ends are told it's over.
         :param external_players: a List of (ExternalPlayer object, String) representing a player & its handshake, where
         an ExternalPlayer object is described in EXTERNAL_PLAYER_SPEC.md
         """
         if not self.deck:
-            self.deck = TraitCard.new_deck()
+            self.deck = Deck.new()
+        journal = self.journal
         for i, (player, string) in enumerate(external_players, start=1):
-            self.players.append(InternalPlayer(i, player, handshake=string))
+            agent = player if self.metrics is None else self.metrics.agent(player, i)
+            agent = agent if journal is None else journal.agent(agent, i)
+            self.players.append(InternalPlayer(i, agent, handshake=string))
+        if journal is not None:
+            journal.begin(self)
+        self.play_rounds()
+        self.end_game()
 
+    def play_rounds(self):
+        """ Play rounds until the game is over
+        """
         while not self.game_over():
-            self.step_one()
-            actions = self.step_two_and_three()
+            if self.journal is not None:
+                self.journal.start_round(self)
+            self.timed(DEAL, self.step_one)
+            actions = self.timed(CHOOSE, self.step_two_and_three)
             self.step_four(actions)
+            self.rounds += 1
+            if self.metrics is not None:
+                self.metrics.count(ROUNDS)
+
+    def end_game(self):
+        """ Tell the players still in the game that it's over
+        """
+        scores = self.get_scores()
+        if self.journal is not None:
+            self.journal.record(self.journal.GAME_OVER, [list(score) for score in scores])
+            self.journal.flush()
+        if self.metrics is not None:
+            self.metrics.count(GAMES)
+        for player in self.players:
+            player.game_over(scores)
+
+    def timed(self, phase, step, *args):
+        """ Carry out a step of the game, timing it if this Dealer keeps metrics
+        :param phase: String name of the phase's timer, one of metrics.PHASES
+        :param step: a function carrying out the step
+        :param args: the arguments to call it with
+        :return: what the function returns
+        """
+        if self.metrics is None:
+            return step(*args)
+        return self.metrics.timed(phase, step, *args)
 
     def game_over(self):
         """ Should the game stop?
         :return: Boolean
         """
         cards_needed = sum([CARD_DRAW_COUNT + max(1, len(player.species)) for player in self.players])
-        debug("Cards needed: " + str(cards_needed) + "Available: " + str(len(self.deck)), verbose=True)
+        if TRACER.level >= VERBOSE:
+            TRACER.emit(VERBOSE, "cards-needed", needed=cards_needed, available=len(self.deck))
 
         return (not self.players) or \
             cards_needed > len(self.deck)
@@ -68,37 +183,79 @@ class Dealer:
         """
         Carries out Step 1 of the Evolution game
         """
+        TRACER.phase = "deal"
         for player in self.players:
             species_count = len(player.species)
             board = Species() if not species_count else None
-            cards = [self.deck.pop(0) for _ in range(CARD_DRAW_COUNT + max(1, species_count))]
+            cards = self.deck.deal(CARD_DRAW_COUNT + max(1, species_count))
+            if self.metrics is not None:
+                self.metrics.count(CARDS_DEALT, len(cards))
             player.start(board, cards, self.watering_hole)
+        if self.journal is not None:
+            self.journal.record(self.journal.DEAL)
 
     def step_two_and_three(self):
         """ Carries out steps 2 and 3 of the evolution game, and returns the actions.
         :return: an List of Action4
         """
+        TRACER.phase = "choose"
         # Local copy so we can modify self.players while iterating
         players = [p for p in self.players]
-        requests = [p.request_actions(self.players) for p in self.players]
-        for r, p in zip(requests, players):
-            if not r:
+        requests = self.choose_all()
+        accepted = []
+        for r, p, rejection in zip(requests, players, verify_many(requests, players)):
+            if rejection:
+                if TRACER.level >= DEBUG:
+                    TRACER.emit(DEBUG, "actions-rejected", player_id=p.player_id, reason=rejection.value)
                 self.players.remove(p)
-        return [r for r in requests if r]
+                if self.metrics is not None:
+                    self.metrics.count(rejected(rejection))
+                    self.metrics.count(INVALID_RESPONSES)
+                    self.metrics.count(EJECTIONS)
+            else:
+                accepted.append(r)
+        if self.journal is not None:
+            self.journal.record(self.journal.CHOOSE, [p.player_id for p in players if p not in self.players])
+        return accepted
+
+    def choose_all(self):
+        """ Ask every player to choose its actions. The choices are simultaneous, so every player that can be asked
+        without waiting for its answer is asked first, and then the answers are collected in seat order under one
+        deadline. Round latency is that of the slowest player, rather than the sum of them all.
+        :return: a List with an Action4 for each player in seat order, or None where a player's response was
+        malformed, failed or didn't arrive in time
+        """
+        deadline = Deadline(CHOOSE_MILLISECONDS)
+        sent = []
+        for p in self.players:
+            try:
+                sent.append(p.send_choose(self.players))
+            except ValueError:
+                sent.append(None)
+        requests = []
+        for p, was_sent in zip(self.players, sent):
+            if was_sent is None:
+                requests.append(None)
+            elif was_sent:
+                requests.append(p.receive_actions(deadline))
+            else:
+                requests.append(p.choose_actions(self.players))
+        return requests
 
     def step_four(self, actions):
         """ Carries out Step4 of the feeding process
         :param actions: An Action4 to carry out
         """
-        self.apply_actions(actions)
-        self.autofeed()
-        self.feeding()
+        self.timed(APPLY_ACTIONS, self.apply_actions, actions)
+        self.timed(AUTOFEED, self.autofeed)
+        self.timed(FEEDING, self.feeding)
 
     def apply_actions(self, action4s):
         """ Apply Action4s to their players and update the watering hole
         :param action4s: a List of Action4s, of length equal to the list of Players in this Dealer.
         :return: a List of TraitCard to be placed in the watering hole
         """
+        TRACER.phase = "apply"
         watering_hole_cards = []
         action_players = zip(action4s, self.players)
         for actions, player in action_players:
@@ -106,96 +263,159 @@ class Dealer:
             watering_hole_cards.append(food_card.food_value)
         for card in watering_hole_cards:
             self.watering_hole = max(0, self.watering_hole + card)
-        debug("Watering hole is "+ str(self.watering_hole), verbose=True)
+        if self.journal is not None:
+            self.journal.record(self.journal.APPLY_ACTIONS, self.watering_hole)
+        if TRACER.level >= VERBOSE:
+            TRACER.emit(VERBOSE, "watering-hole", value=self.watering_hole)
 
     def autofeed(self):
         """ Carries out adding population for Fertile, feeding for long_neck, and transferring fat tissue
         """
+        TRACER.phase = "autofeed"
+        self.cascade.reset()
         for player in self.players:
             for species in player.species:
                 species.population += species.has_trait(Trait.FERTILE)
         for player in self.players:
-            for species in player.species:
+            for idx, species in enumerate(player.species):
                 if species.has_trait(Trait.LONG_NECK):
-                    self.feed_creature(player, player.species.index(species))
+                    self.feed_creature(player, idx)
         for player in self.players:
             for species in player.species:
                 if species.has_trait(Trait.FAT_TISSUE) and species.population > species.food and species.fat_food:
                     difference = min(species.fat_food, species.population - species.food)
                     species.fat_food -= difference
                     species.food += difference
+        if self.journal is not None:
+            self.journal.record(self.journal.AUTOFEED)
 
     def feeding(self):
         """ Carry out a round of feeding.
         """
-        current_player_idx = self.starting_player
-        players = [p for p in self.players]
-        before = players[:current_player_idx+1]
-        ordered_players = players[current_player_idx:] + players[:current_player_idx]
+        TRACER.phase = "feeding"
+        ring = SeatRing(self.players, first=self.starting_player)
+        self.attack_index.reset()
+        self.cascade.reset()
 
-        while (ordered_players and self.watering_hole):
-            self.feed_one(ordered_players)
+        while (ring and self.watering_hole):
+            self.feed_one(ring)
 
-        if ordered_players:
-            debug("We ran out of food", verbose=True)
-        else:
-            debug("We ran out of players", verbose=True)
+        TRACER.player_id = None
+        if TRACER.level >= VERBOSE:
+            TRACER.emit(VERBOSE, "feeding-over", reason="food" if ring else "players")
 
         if self.players:
-            # the extra complexity here is necessary in the case we remove players: don't want to lose our spot.
-            self.starting_player = (len([player for player in before if player in self.players])-1 + 1) % len(self.players)
-            debug(str(self.starting_player) + "is the new starting player", verbose=True)
+            # Count the players up to and including this round's starting seat who are still in the game, so that
+            # removing players doesn't lose our spot.
+            self.starting_player = ring.in_game_through(self.starting_player) % len(self.players)
+            if TRACER.level >= VERBOSE:
+                TRACER.emit(VERBOSE, "starting-player", index=self.starting_player)
+        self.attack_index.reset()
+        TRACER.phase = "starve"
         for player in self.players:
+            TRACER.player_id = player.player_id
             player.starve_creatures(self.kill_creature)
             player.move_tokens_to_bag()
+        TRACER.player_id = None
+        if self.journal is not None:
+            self.journal.record(self.journal.STARVE)
 
-    def feed_one(self, players_feeding):
-        """ Perform one round of feeding, and mutates the given Players appropriately, including removing
-        :param players_feeding: List of Players, with first to feed at the front
+    def feed_one(self, ring):
+        """ Perform one turn of feeding, and mutates the given Players appropriately, including removing
+        :param ring: a SeatRing of the Players still feeding, whose current seat is the one to feed
         """
-        first_player = players_feeding[0]
-        rest_players = players_feeding[1:]
-        intent = first_player.feed_next(self.watering_hole, rest_players, index=self.players.index(first_player))
+        seat = ring.current
+        first_player = ring.current_player()
+        rest_players = ring.following(seat)
+        TRACER.player_id = first_player.player_id
+        intent = first_player.feed_next(self.watering_hole, rest_players, index=ring.rank(seat),
+                                        attack_index=self.attack_index)
+        if self.metrics is not None:
+            self.metrics.count(FEED_TURNS)
 
         if not intent:
-            debug("Removed player " + str(self.players.index(first_player)))
+            if TRACER.level >= DEBUG:
+                TRACER.emit(DEBUG, "player-removed", index=ring.rank(seat))
             self.players.remove(first_player)
-            players_feeding.pop(0)
+            self.attack_index.player_removed(first_player)
+            ring.eject(seat)
+            if self.metrics is not None:
+                self.metrics.count(EJECTIONS)
+            if self.journal is not None:
+                self.journal.record(self.journal.FEED_ONE, first_player.player_id, True)
             return
         else:
+            if self.metrics is not None and isinstance(intent, FeedCarnivore):
+                self.metrics.count(ATTACKS)
             intent.enact(first_player, rest_players, self)
 
             if intent.should_end_feeding():
-                players_feeding.pop(0)
+                ring.leave(seat)
             else:
-                players_feeding.append(players_feeding.pop(0))
+                ring.advance()
+            if self.journal is not None:
+                self.journal.record(self.journal.FEED_ONE, first_player.player_id, False)
 
     def feed_creature(self, player, species_index, scavenge=False):
-        """ Feed the creature from the watering hole if possible.
+        """ Feed the creature from the watering hole if possible, then pass food along its Cooperation chain and,
+        if it fed, to the Scavengers in seat order starting with the given player.
         It is safe to call this method on a full creature.
         :param player: Player on which the species is located
         :param species_index: Integer index of that species on the given Player
         :param scavenge: Boolean indicating whether creatures with scavenger should be fed.
         """
+        fed = self._feed_one_creature(player, species_index)
+        if not fed:
+            return
+        # A stack of [Player, Integer index, Integer count]: feed that species count more times. A species is fed
+        # once for every token its left-hand neighbor receives, and the whole Cooperation chain to its right is fed
+        # before it's fed again, which is the order the rules describe. Scavengers eat once the chain is done.
+        # A species that is full stays full, so anything that would only feed a full species is never pushed.
+        pending = []
+        if scavenge:
+            pending.extend([p, i, 1] for p, i in reversed(self.cascade.scavengers_from(self.players, player)))
+        self._pass_right(pending, player, species_index, fed)
+        while pending and self.watering_hole:
+            task = pending[-1]
+            player, species_index = task[0], task[1]
+            task[2] -= 1
+            if not task[2]:
+                pending.pop()
+            fed = self._feed_one_creature(player, species_index)
+            if fed:
+                self._pass_right(pending, player, species_index, fed)
+            elif task[2]:
+                # It's full, so the rest of its feedings would do nothing either
+                pending.pop()
+
+    def _pass_right(self, pending, player, species_index, tokens):
+        """ If the species passes food to its right-hand neighbor, add feeding that neighbor to a cascade.
+        :param pending: the stack of [Player, Integer index, Integer count] being worked through by feed_creature
+        :param player: Player on which the species is located
+        :param species_index: Integer index of the species that was just fed
+        :param tokens: Integer number of tokens it was just fed
+        """
+        if self.cascade.cooperates(self.players, player, species_index) and \
+                player.species[species_index + 1].is_hungry():
+            pending.append([player, species_index + 1, tokens])
+
+    def _feed_one_creature(self, player, species_index):
+        """ Move as much food as the species can eat in one feeding from the watering hole onto it.
+        :param player: Player on which the species is located
+        :param species_index: Integer index of that species on the given Player
+        :return: the Integer number of tokens fed, which is 0 if the species is full or the watering hole empty
+        """
         species = player.species[species_index]
         if not (species.is_hungry() and self.watering_hole):
-            return
+            return 0
         feed_amount = min(1 + species.has_trait(Trait.FORAGING), self.watering_hole, species.population - species.food)
-        for feeding in range(feed_amount):
-            species.food += 1
-            self.watering_hole -= 1
-        for feeding in range(feed_amount):
-            if species.has_trait(Trait.COOPERATION):
-                right = player.get_neighbors(species)[1]
-                if right:
-                    self.feed_creature(player, species_index+1)
-        if scavenge:
-            idx = self.players.index(player)
-            for i in range(len(self.players)):
-                player = self.players[(idx+i) % len(self.players)]
-                for s in player.species:
-                    if s.has_trait(Trait.SCAVENGER):
-                        self.feed_creature(player, player.species.index(s))
+        if TRACER.level >= VERBOSE:
+            TRACER.emit(VERBOSE, "feed", player_id=player.player_id, species=species_index,
+                        old=species.food, new=species.food + feed_amount)
+        species.food += feed_amount
+        self.watering_hole -= feed_amount
+        self.attack_index.species_changed(player, species)
+        return feed_amount
 
     def fat_feed(self, player, species_index, tokens):
         """ Transfer fat food from the watering hole onto a player.
@@ -205,22 +425,33 @@ class Dealer:
         :param tokens: Integer number of tokens to transfer from the watering hole
         """
         species = player.species[species_index]
+        if TRACER.level >= VERBOSE:
+            TRACER.emit(VERBOSE, "store-fat", player_id=player.player_id, species=species_index,
+                        old=species.fat_food, new=species.fat_food + tokens)
         species.fat_food += tokens
         self.watering_hole -= tokens
 
+    def species_changed(self, player, species_index):
+        """ Record that the population or body of a species has been changed directly, outside of this Dealer.
+        :param player: Player on which the species is located
+        :param species_index: Integer index of that species on the given Player
+        """
+        self.attack_index.species_changed(player, player.species[species_index])
+
     def kill_creature(self, player, species_index):
         """ Remove the specified creature from the given player, and move two cards into the player's hand from the deck
         :param player: a Player on which the creature is located
         :param species_index: Integer representing the index of the Species in player's list of Species
         """
-        player.species.pop(species_index)
-        to_add = []
-        for i in range(DEAD_CREATURE_REPLACEMENT_CARDS):
-            if self.deck:
-                to_add.append(self.deck.pop(0))
-        to_add.reverse()
-        for card in to_add:
-            player.cards.insert(0, card)
+        species = player.species.pop(species_index)
+        if TRACER.level >= VERBOSE:
+            TRACER.emit(VERBOSE, "extinction", player_id=player.player_id, species=species_index)
+        self.attack_index.species_removed(player, species, species_index)
+        cards = self.deck.deal(DEAD_CREATURE_REPLACEMENT_CARDS)
+        player.cards[0:0] = cards
+        if self.metrics is not None:
+            self.metrics.count(KILLS)
+            self.metrics.count(CARDS_DEALT, len(cards))
 
     def get_scores(self):
         """ Get all the scores for this game, in sorted order.
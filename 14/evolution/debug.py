@@ -1,26 +1,187 @@
+import json
+import sys
+import threading
 import traceback
 
+# What player.py and feeding_intent.py get from "from .debug import *": the Tracer, its levels and sinks, and the debug
+# helpers, but not this module's imports
+__all__ = ["OFF", "DEBUG", "VERBOSE", "TraceEvent", "print_sink", "JSONLinesSink", "Tracer", "TRACER", "configure",
+           "debug", "debug_traceback"]
 
-#Integer between 0 (None) and 2 (All). 1 will print only those with the circumstance flag
-DEBUG = False
-VERBOSE = False
+# Trace levels. Nothing at a level above the Tracer's level is produced; OFF produces nothing at all.
+OFF = 0
+DEBUG = 1
+VERBOSE = 2
+# The default of configure's player_ids, which leaves the filter as it is, since None means every player
+UNCHANGED = object()
 
-def debug(string, player_id=None, verbose=False):
-    """ Prints an object to the command line if debugging is enabled.
-    Use instead of print because this may be expanded in the future to use debugging facilities properly.
-    :param str: String
-    :player_id: Player's id, if debug is called from a player
+
+class TraceEvent:
+    """ A single structured trace record """
+
+    def __init__(self, level, name, phase=None, player_id=None, fields=None):
+        """
+        :param level: the Integer level the event was produced at
+        :param name: a String naming what happened, e.g. "feed" or "message"
+        :param phase: a String naming the phase of the game the event happened in, or None
+        :param player_id: the id of the Player the event concerns, or None
+        :param fields: a Dictionary of String to JSON-compatible values describing the event
+        """
+        self.level = level
+        self.name = name
+        self.phase = phase
+        self.player_id = player_id
+        self.fields = fields or {}
+
+    def serialize(self):
+        """
+        :return: a python-encoded JSON Object representing this event
+        """
+        data = {"event": self.name}
+        if self.phase is not None:
+            data["phase"] = self.phase
+        if self.player_id is not None:
+            data["player"] = self.player_id
+        data.update(self.fields)
+        return data
+
+    def __str__(self):
+        if self.name == "message":
+            return str(self.fields["message"])
+        return " ".join([self.name] + [str(k) + "=" + str(v) for k, v in self.serialize().items() if k != "event"])
+
+
+def print_sink(event):
+    """ The default sink: prints each event to stdout as a line of text, as debug() always has.
+    :param event: a TraceEvent
+    """
+    print(event)
+
+
+class JSONLinesSink:
+    """ A sink that writes each event to a stream as one line of JSON """
+
+    def __init__(self, stream=None):
+        """
+        :param stream: a writable text stream; stderr if None
+        """
+        self.stream = stream or sys.stderr
+
+    def __call__(self, event):
+        self.stream.write(json.dumps(event.serialize(), default=str) + "\n")
+
+
+class TraceContext(threading.local):
+    """ The phase of the game and the player that events are attributed to. Each thread has its own, so that games
+    played at once on different threads, as a Lobby's tables are, each keep theirs.
+    """
+    phase = None
+    player_id = None
+
+
+class Tracer:
+    """
+    Decides which trace events are produced and hands them to a sink.
+
+    Hot paths should check the level before building anything, so that tracing costs a single comparison when off:
+
+        if TRACER.level >= VERBOSE:
+            TRACER.emit(VERBOSE, "feed", species=idx, old=before, new=after)
+    """
+
+    def __init__(self, level=OFF, sink=print_sink, player_ids=None):
+        """
+        :param level: the highest Integer level of event to produce
+        :param sink: a function taking a TraceEvent
+        :param player_ids: a collection of player ids to restrict events to, or None for every player
+        """
+        self.level = level
+        self.sink = sink
+        self.player_ids = player_ids
+        # Context that the Dealer keeps current so that events can be attributed without passing it around
+        self.context = TraceContext()
+
+    @property
+    def phase(self):
+        """ The String phase of the game the current thread is in, or None """
+        return self.context.phase
+
+    @phase.setter
+    def phase(self, phase):
+        self.context.phase = phase
+
+    @property
+    def player_id(self):
+        """ The id of the Player the current thread is dealing with, or None """
+        return self.context.player_id
+
+    @player_id.setter
+    def player_id(self, player_id):
+        self.context.player_id = player_id
+
+    def configure(self, level=None, sink=None, player_ids=UNCHANGED):
+        """ Change how this Tracer behaves. Arguments that aren't passed are unchanged.
+        :param level: the highest Integer level of event to produce
+        :param sink: a function taking a TraceEvent
+        :param player_ids: a collection of player ids to restrict events to, or None for every player
+        """
+        if level is not None:
+            self.level = level
+        if sink is not None:
+            self.sink = sink
+        if player_ids is not UNCHANGED:
+            self.player_ids = player_ids
+
+    def enabled(self, level, player_id=None):
+        """ Would an event at the given level about the given player be produced?
+        :param level: Integer trace level
+        :param player_id: the id of a Player, or None for the current one
+        :return: Boolean
+        """
+        if level > self.level:
+            return False
+        if player_id is None:
+            player_id = self.player_id
+        return self.player_ids is None or player_id is None or player_id in self.player_ids
+
+    def emit(self, level, name, player_id=None, **fields):
+        """ Produce an event if it passes the level and player filters
+        :param level: Integer trace level
+        :param name: a String naming the event
+        :param player_id: the id of the Player the event concerns, or None for the current one
+        :param fields: values describing the event
+        """
+        if player_id is None:
+            player_id = self.player_id
+        if self.enabled(level, player_id):
+            self.sink(TraceEvent(level, name, self.phase, player_id, fields))
+
+
+TRACER = Tracer()
+
+
+def configure(level=None, sink=None, player_ids=UNCHANGED):
+    """ Configure the global Tracer; see Tracer.configure
+    """
+    TRACER.configure(level, sink, player_ids)
+
+
+def debug(message, player_id=None, verbose=False):
+    """ Emits a message if tracing is enabled at the matching level.
+    Use instead of print so that output can be filtered and redirected.
+    :param message: the message to emit, or a function producing it, which is only called if the message is emitted
+    :param player_id: Player's id, if debug is called from a player
+    :param verbose: Boolean indicating whether this is only wanted at the VERBOSE level
     """
-    if verbose:
-        if not VERBOSE:
-            return
-    if DEBUG:
-        if not player_id:
-            print(string)
+    level = VERBOSE if verbose else DEBUG
+    if level > TRACER.level:
+        return
+    if TRACER.enabled(level, player_id):
+        TRACER.emit(level, "message", player_id=player_id, message=message() if callable(message) else message)
 
 
 def debug_traceback(tb):
-    """ Given a python Traceback, print it it to the command line if debugging is enabled
+    """ Given a python Traceback, emit it if tracing is enabled
     :param tb: Traceback
     """
-    debug(traceback.format_tb(tb))
+    debug(lambda: traceback.format_tb(tb))
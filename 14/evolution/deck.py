@@ -0,0 +1,143 @@
+"""
+
+Represents the Deck of Trait Cards held by the Dealer.
+
+"""
+from array import array
+
+from .traitcard import TraitCard
+from .validate import *
+
+# Every distinct card in the game, in the order of a new (sorted) deck. A card's code is its index in this list, and
+# these instances are shared by every Deck: TraitCards are never mutated, so one object per kind is enough.
+CARDS = TraitCard.new_deck()
+# Cached serialized form of each card, indexed by code
+SERIALIZED_CARDS = [card.serialize() for card in CARDS]
+# Maps (food value, trait string) to a card's code
+CODES = {(card.food_value, card.trait.value): code for code, card in enumerate(CARDS)}
+# Array typecode wide enough to hold every code
+CODE_TYPE = 'B'
+
+
+class Deck:
+    """
+    An ordered stack of TraitCards, stored as a compact array of card codes with a cursor marking the top.
+    Drawing moves the cursor rather than shifting the remaining cards.
+    """
+    def __init__(self, cards=None):
+        """ Create a Deck
+        :param cards: an iterable of TraitCard, top of the deck first, or None for an empty deck
+        """
+        self.codes = array(CODE_TYPE, [Deck.encode(card) for card in (cards or [])])
+        self.cursor = 0
+
+    @classmethod
+    def new(cls):
+        """ Generate a new unshuffled Deck according to the rules of Evolution
+        :return: a Deck
+        """
+        return cls.from_codes(range(len(CARDS)))
+
+    @classmethod
+    def from_codes(cls, codes):
+        """ Create a Deck directly from card codes
+        :param codes: an iterable of Integer card codes, top of the deck first
+        :return: a Deck
+        """
+        deck = cls()
+        deck.codes = array(CODE_TYPE, codes)
+        return deck
+
+    @staticmethod
+    def encode(card):
+        """ Get the code of the given card
+        :param card: a TraitCard
+        :return: Integer
+        """
+        return CODES[(card.food_value, card.trait.value)]
+
+    @staticmethod
+    def decode(code):
+        """ Get the shared TraitCard for the given code
+        :param code: Integer
+        :return: TraitCard
+        """
+        return CARDS[code]
+
+    def fork(self):
+        """ Make a copy of this Deck that can be dealt from independently. The codes are never changed in place, so
+        they're shared rather than copied.
+        :return: a Deck
+        """
+        clone = Deck()
+        clone.codes = self.codes
+        clone.cursor = self.cursor
+        return clone
+
+    def __len__(self):
+        return len(self.codes) - self.cursor
+
+    def __iter__(self):
+        for i in range(self.cursor, len(self.codes)):
+            yield CARDS[self.codes[i]]
+
+    def __eq__(self, other):
+        """
+        :param other: a Deck, or a List of TraitCard, top of the deck first
+        :return: True if both hold the same cards in the same order, or NotImplemented for anything else
+        """
+        if isinstance(other, Deck):
+            return self.codes[self.cursor:] == other.codes[other.cursor:]
+        if isinstance(other, list):
+            return list(self) == other
+        return NotImplemented
+
+    # A Deck changes as it's drawn from, so it can't be hashed
+    __hash__ = None
+
+    def draw(self):
+        """ Remove and return the top card of this Deck
+        :return: TraitCard
+        Note: This method raises an IndexError if the deck is empty
+        """
+        if self.cursor >= len(self.codes):
+            raise IndexError("draw from an empty Deck")
+        card = CARDS[self.codes[self.cursor]]
+        self.cursor += 1
+        return card
+
+    def deal(self, count):
+        """ Remove and return up to count cards from the top of this Deck
+        :param count: Natural number of cards to deal
+        :return: a List of TraitCard, in the order they were drawn. It is shorter than count if the deck runs out.
+        """
+        start = self.cursor
+        self.cursor = min(start + count, len(self.codes))
+        return [CARDS[code] for code in self.codes[start:self.cursor]]
+
+    def serialize(self):
+        """ Produce a serialized representation of the remaining cards
+        :return: a List of [Integer, String], as TraitCard.serialize produces
+        """
+        return [list(SERIALIZED_CARDS[code]) for code in self.codes[self.cursor:]]
+
+    @classmethod
+    def deserialize(cls, data):
+        """ Create a Deck from a serialized list of cards
+        :param data: a List of serialized TraitCards
+        :return: a Deck
+        This method will raise a ValueError given an invalid card.
+        """
+        if not is_list(data):
+            raise ValueError()
+        codes = []
+        for card in data:
+            try:
+                food_value, name = card
+                code = CODES.get((food_value, name)) if type(food_value) is int else None
+            except (TypeError, ValueError):
+                code = None
+            if code is None:
+                raise ValueError("This is not a valid Trait Card")
+            codes.append(code)
+        return cls.from_codes(codes)
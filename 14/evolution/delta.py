@@ -0,0 +1,132 @@
+"""
+
+Feeding states sent as patches, for clients that opt in at the handshake. Each connection keeps a record of the last
+State sent across it. A State is sent in full the first time, and afterwards as a patch against the one before:
+the bag, cards and watering hole, and only those species of this player and the others that have changed, been added
+or been removed. Every message carries a sequence number; a client whose last State doesn't have the sequence number
+before a patch's answers with RESYNC instead of a feeding, and is sent the State in full.
+
+"""
+from .validate import is_list, is_natural
+
+# Ends the handshake string of a client that wants feeding states as patches
+OPT_IN = "+delta"
+# [FULL, sequence number, State]
+FULL = "state"
+# [PATCH, sequence number, bag, species patch, cards, watering hole, others patch]
+PATCH = "delta"
+# Sent by a client in place of a feeding when it can't apply a patch
+RESYNC = "resync"
+
+
+def diff_list(old, new):
+    """ Describe how a list has changed. Entries are compared by identity first, since serialized Species and
+    Players are cached and an unchanged one is the very same list.
+    :param old: a List
+    :param new: a List
+    :return: [Integer length of new, List of [Integer index, value] for each entry of new that isn't the same in old]
+    """
+    changed = [[index, value] for index, value in enumerate(new)
+               if index >= len(old) or (old[index] is not value and old[index] != value)]
+    return [len(new), changed]
+
+
+def patch_list(old, patch):
+    """ Apply a list patch from diff_list
+    :param old: a List
+    :param patch: [Integer length, List of [Integer index, value]]
+    :return: a new List
+    Note: This will raise a ValueError if the patch is malformed or doesn't fit the list
+    """
+    if not (is_list(patch) and len(patch) == 2 and is_natural(patch[0]) and is_list(patch[1])):
+        raise ValueError("Malformed list patch")
+    length, changed = patch
+    new = old[:length]
+    new.extend([None] * (length - len(new)))
+    for entry in changed:
+        if not (is_list(entry) and len(entry) == 2 and is_natural(entry[0]) and entry[0] < length):
+            raise ValueError("Malformed list patch entry")
+        new[entry[0]] = entry[1]
+    if any(value is None for value in new[len(old):]):
+        raise ValueError("List patch leaves a gap")
+    return new
+
+
+class StateSender:
+    """ The dealer's end of a connection in delta mode: the last State sent, and its sequence number """
+
+    def __init__(self):
+        self.sequence = 0
+        self.sent = None
+
+    def full(self, state):
+        """ Send a State in full, as the record to patch against from now on
+        :param state: a python-encoded JSON State with others
+        :return: the message to send
+        """
+        self.sequence += 1
+        self.sent = state
+        return [FULL, self.sequence, state]
+
+    def update(self, state):
+        """ Send a State as a patch against the last one, or in full if none has been sent yet
+        :param state: a python-encoded JSON State with others
+        :return: the message to send
+        """
+        if self.sent is None:
+            return self.full(state)
+        bag, species, cards, watering_hole, others = state
+        old_others = self.sent[4]
+        others_patch = [len(others), [[index, diff_list(old_others[index] if index < len(old_others) else [], other)]
+                                      for index, other in enumerate(others)
+                                      if index >= len(old_others) or old_others[index] is not other]]
+        message = [PATCH, self.sequence + 1, bag, diff_list(self.sent[1], species), cards, watering_hole,
+                   others_patch]
+        self.sequence += 1
+        self.sent = state
+        return message
+
+
+class StateReceiver:
+    """ The player's end of a connection in delta mode: its copy of the last State, and that State's sequence number """
+
+    def __init__(self):
+        self.sequence = None
+        self.state = None
+
+    def receive(self, message):
+        """ Bring the copy of the State up to date with a message from the dealer
+        :param message: a FULL or PATCH message
+        :return: the python-encoded JSON State, or None if a patch doesn't follow on from the copy, in which case the
+        dealer must be asked to RESYNC
+        Note: This will raise a ValueError if the message is malformed
+        """
+        if not (is_list(message) and len(message) >= 3 and is_natural(message[1])):
+            raise ValueError("Malformed state message")
+        kind, sequence = message[0], message[1]
+        if kind == FULL and len(message) == 3:
+            state = message[2]
+            if not (is_list(state) and len(state) == 5 and is_list(state[1]) and is_list(state[4])):
+                raise ValueError("Malformed State")
+            self.sequence, self.state = sequence, message[2]
+            return self.state
+        if kind != PATCH or len(message) != 7:
+            raise ValueError("Malformed state message")
+        if self.state is None or sequence != self.sequence + 1:
+            return None
+        _, _, bag, species_patch, cards, watering_hole, others_patch = message
+        if not (is_list(others_patch) and len(others_patch) == 2 and is_natural(others_patch[0]) and
+                is_list(others_patch[1])):
+            raise ValueError("Malformed others patch")
+        count, changed = others_patch
+        others = self.state[4][:count]
+        others.extend([None] * (count - len(others)))
+        for entry in changed:
+            if not (is_list(entry) and len(entry) == 2 and is_natural(entry[0]) and entry[0] < count):
+                raise ValueError("Malformed others patch entry")
+            others[entry[0]] = patch_list(others[entry[0]] or [], entry[1])
+        if any(other is None for other in others):
+            raise ValueError("Others patch leaves a gap")
+        self.state = [bag, patch_list(self.state[1], species_patch), cards, watering_hole, others]
+        self.sequence = sequence
+        return self.state
@@ -0,0 +1,195 @@
+"""
+
+Live metrics for a long-running server, served over HTTP in the Prometheus text format. An Exporter is handed each
+connection a server accepts and the Metrics of each game it plays; game threads and the event loop only ever count
+into their own sockets and Metrics, and a scrape sums them up on the Exporter's own thread. Only monotonic counters are
+exported, never rates: a scrape changes nothing, so any number of scrapers may read the same Exporter, and Prometheus
+finds e.g. messages per second with rate(evolution_messages_sent_total[1m]).
+
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .metrics import Metrics, PHASES, LATENCY_BUCKETS, RESPONSE_SECONDS
+from .debug import debug
+
+# The path metrics are served on; anything else is answered with 404
+METRICS_PATH = "/metrics"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+PREFIX = "evolution_"
+# The JSONSocket counters that are summed across connections
+TRAFFIC = ["messages_received", "messages_sent", "bytes_received", "bytes_sent", "timeouts"]
+
+
+def sample(name, value, labels=""):
+    """
+    :param name: String name of the metric, without PREFIX
+    :param value: a Number
+    :param labels: a String of the labels inside braces, or ""
+    :return: a String line of the Prometheus text format
+    """
+    return "%s%s%s %s\n" % (PREFIX, name, labels, repr(float(value)) if isinstance(value, float) else value)
+
+
+def header(name, kind, help_text):
+    """
+    :param name: String name of the metric, without PREFIX
+    :param kind: String type of the metric, e.g. "counter"
+    :param help_text: String describing the metric
+    :return: the String HELP and TYPE lines that come before a metric's samples
+    """
+    return "# HELP %s%s %s\n# TYPE %s%s %s\n" % (PREFIX, name, help_text, PREFIX, name, kind)
+
+
+class Exporter:
+    """
+    Server-wide metrics: the connections that are open, the games in progress, the messages and bytes sent and
+    received, failed handshakes, decode timeouts, and the time Dealers spend in each phase. Servers tell it about
+    connections and failed handshakes as they happen, and tables about their games as they start and end; these take
+    a lock that only a scrape also takes, and only while it copies what it needs. Each game's Metrics has a lock of its
+    own, which its Dealer holds only while it records a number, and a scrape only while it copies that game.
+    """
+
+    def __init__(self, host="localhost", port=0):
+        """
+        :param host: a String representing the hostname to serve on, which should stay local
+        :param port: an Integer port number to serve on, or 0 for any free port
+        """
+        self.host = host
+        self.port = port
+        self.lock = threading.Lock()
+        # JSONSockets that may still be open, and the sum of the TRAFFIC counters of those that have closed
+        self.sockets = []
+        self.closed = dict.fromkeys(TRAFFIC, 0)
+        self.handshake_failures = 0
+        # Metrics of the games in progress, and of every game that has finished, merged
+        self.playing = []
+        self.finished = Metrics()
+        self.server = None
+
+    def opened(self, jsock):
+        """ Count a connection a server has accepted, for as long as it stays open
+        :param jsock: a JSONSocket
+        """
+        with self.lock:
+            self.retire()
+            self.sockets.append(jsock)
+
+    def handshake_failed(self):
+        with self.lock:
+            self.handshake_failures += 1
+
+    def game_started(self):
+        """
+        :return: a Metrics for a Dealer to record a game into, which scrapes read while the game is in progress
+        """
+        metrics = Metrics(threading.Lock())
+        with self.lock:
+            self.playing.append(metrics)
+        return metrics
+
+    def game_finished(self, metrics):
+        """
+        :param metrics: a Metrics from game_started, whose game is over
+        """
+        with self.lock:
+            self.playing.remove(metrics)
+            self.finished.merge(metrics)
+
+    def retire(self):
+        """ Add the counters of closed connections to the totals, and stop keeping them. The lock must be held. """
+        still_open = []
+        for jsock in self.sockets:
+            if jsock.sock.fileno() < 0:
+                for name in TRAFFIC:
+                    self.closed[name] += getattr(jsock, name)
+            else:
+                still_open.append(jsock)
+        self.sockets = still_open
+
+    def render(self):
+        """
+        :return: a String of every metric in the Prometheus text format
+        """
+        with self.lock:
+            self.retire()
+            sockets = list(self.sockets)
+            traffic = dict(self.closed)
+            handshake_failures = self.handshake_failures
+            playing = list(self.playing)
+            metrics = Metrics()
+            metrics.merge(self.finished)
+            for jsock in sockets:
+                for name in TRAFFIC:
+                    traffic[name] += getattr(jsock, name)
+        # Games in progress are copied under their own locks rather than the Exporter's, one game at a time
+        for live in playing:
+            metrics.merge(live)
+
+        lines = [header("connections", "gauge", "Connections to clients that are open, including any in a handshake"),
+                 sample("connections", len(sockets)),
+                 header("games", "gauge", "Games in progress"),
+                 sample("games", len(playing))]
+        for name, counter, help_text in [("messages_received", "messages_received", "Messages received from clients"),
+                                         ("messages_sent", "messages_sent", "Messages sent to clients"),
+                                         ("bytes_received", "bytes_received", "Bytes received from clients"),
+                                         ("bytes_sent", "bytes_sent", "Bytes sent to clients"),
+                                         ("decode_timeouts", "timeouts", "Times a client took too long to answer")]:
+            lines += [header(name + "_total", "counter", help_text), sample(name + "_total", traffic[counter])]
+        lines += [header("handshake_failures_total", "counter", "Clients that didn't finish their handshake"),
+                  sample("handshake_failures_total", handshake_failures)]
+
+        lines.append(header("phase_seconds", "summary", "Seconds Dealers spent in each phase of a round"))
+        for phase in PHASES:
+            seconds, times = metrics.timers.get(phase, (0.0, 0))
+            labels = '{phase="%s"}' % phase
+            lines += [sample("phase_seconds_sum", float(seconds), labels), sample("phase_seconds_count", times, labels)]
+
+        responses = metrics.responses()
+        lines.append(header(RESPONSE_SECONDS, "histogram", "Seconds players took to answer the Dealer"))
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS + (float("inf"),), responses.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(sample(RESPONSE_SECONDS + "_bucket", cumulative, '{le="%s"}' % le))
+        lines += [sample(RESPONSE_SECONDS + "_sum", float(responses.total)),
+                  sample(RESPONSE_SECONDS + "_count", cumulative)]
+
+        for name, count in sorted(metrics.counters.items()):
+            lines += [header("dealer_%s_total" % name, "counter", "Dealer counter " + name),
+                      sample("dealer_%s_total" % name, count)]
+        return "".join(lines)
+
+    def start(self):
+        """ Serve metrics over HTTP on a daemon thread of their own, until close is called
+        :return: this Exporter, whose port is the one it's serving on
+        """
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != METRICS_PATH:
+                    self.send_error(404)
+                    return
+                body = exporter.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                debug(lambda: "Exporter: " + format % args, verbose=True)
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, name="exporter", daemon=True).start()
+        return self
+
+    def close(self):
+        """ Stop serving metrics """
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
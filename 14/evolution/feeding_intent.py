@@ -35,8 +35,7 @@ class FeedingIntent:
                 return StoreFat(*data)
             if len(data) == 3:
                 return FeedCarnivore(*data)
-        debug("Given an invalid feeding intent:")
-        debug(data)
+        debug(lambda: "Given an invalid feeding intent: " + repr(data))
         raise ValueError("This is not a valid Feeding Intent")
 
     def enact(self, player, others, dealer):
@@ -48,6 +47,14 @@ class FeedingIntent:
         """
         pass
 
+    def touches(self, player, others):
+        """ Find every species that enacting this feeding might change, so that a forked Dealer knows what to copy
+        :param player: Player that is feeding
+        :param others: List of the other Players
+        :return: a List of (Player, Integer index of a Species on that Player)
+        """
+        return []
+
     def should_end_feeding(self):
         """ Check whether this feeding intent indicates the player is done feeding
         :return: a Boolean indicating whether feeding should be ended for this Player
@@ -105,6 +112,9 @@ class FeedSpecies(FeedingIntent):
     def is_valid(self, player, others, wh):
         return self.species_index in range(len(player.species))
 
+    def touches(self, player, others):
+        return [(player, index) for index in player.cooperation_chain(self.species_index)]
+
     def unrotate(self, by, modulo):
         pass
 
@@ -157,17 +167,33 @@ class FeedCarnivore(FeedSpecies):
         defender = others[self.defending_player_index].species[self.defender_index]
         attacker = player.species[self.species_index]
         has_horns = defender.has_trait(Trait.HORNS)
+        if TRACER.level >= VERBOSE:
+            TRACER.emit(VERBOSE, "attack", species=self.species_index, defending_player=self.defending_player_index,
+                        defender=self.defender_index, horns=has_horns)
 
         defender.population -= 1
         attacker.population -= has_horns
         if defender.population == 0:
             dealer.kill_creature(others[self.defending_player_index], self.defender_index)
+        else:
+            dealer.species_changed(others[self.defending_player_index], self.defender_index)
         if attacker.population == 0:
             dealer.kill_creature(player, self.species_index)
 
         else:
+            dealer.species_changed(player, self.species_index)
             dealer.feed_creature(player, self.species_index, scavenge=True)
 
+    def touches(self, player, others):
+        touched = super(FeedCarnivore, self).touches(player, others)
+        touched.append((others[self.defending_player_index], self.defender_index))
+        # Every Scavenger eats after a successful attack, and may pass food on through Cooperation
+        for owner in [player] + list(others):
+            for index, species in enumerate(owner.species):
+                if species.has_trait(Trait.SCAVENGER):
+                    touched.extend((owner, fed) for fed in owner.cooperation_chain(index))
+        return touched
+
     def is_valid(self, player, others, wh):
         return super(FeedCarnivore, self).is_valid(player, others, wh) \
             and self.defending_player_index in range(len(others)) \
@@ -0,0 +1,473 @@
+"""
+
+An append-only journal of a game, written by the Dealer as it plays, and a Replayer that rebuilds the Dealer as it was
+after any event in one. A journal holds the seed and initial deck, every message sent to and received from each
+player, and every change the Dealer makes to the game. Every snapshot_interval rounds, a round begins with a snapshot
+of the Dealer, so that seeking replays from the last snapshot rather than from the start of the game. The first round
+has none: the game begins with players that have nothing yet, so the BEGIN event serves as its snapshot.
+
+What players answer can't be worked out again, so it's recorded as it was received. What they're sent can: a message
+is made from the Dealer as it was when it was sent, which replaying the journal rebuilds exactly, so a SEND event only
+records who was sent a message and Replayer.sent makes the message again. Keeping the messages as well would more than
+double the cost of journaling a game, most of it in holding and pickling the states sent for feeding.
+
+A journal is written to a binary stream as pickled Lists of events, each after a header of its length and CRC-32. The
+Dealer flushes its journal at the end of the game, and at the start of a round once a batch of events has built up, so
+a game is usually written as one batch; Journal.load reads them back with an unpickler that refuses anything but plain
+data. Once events are written they're dropped from memory. Writing a batch doesn't flush the stream, so that games
+journaled to one file share its buffer; whoever owns the stream decides when it reaches the disk. A file's default
+buffer holds only a couple of games, so a journal file should be opened with a buffer of STREAM_BUFFER_SIZE.
+
+Events are Lists of JSON values. The names of events are attributes of Journal:
+    [BEGIN, seed or None, List of deck codes, List of [player id, handshake, Boolean for choosing by send_choose],
+        watering hole]
+    [ROUND, Integer rounds played, snapshot or None], where a snapshot is
+        [Integer starting player, Integer watering hole, List of deck codes,
+         List of [player id, List of serialized Species, Integer bag, List of card codes] for each player]
+    [SEND, player id], as a message was sent to the player's agent, and [RECEIVE, player id, message], as the agent's
+        answer came back
+    [ERROR, player id, String], in place of a RECEIVE when the agent raised
+    [DEAL], [CHOOSE, List of the ids of players whose actions were rejected], [APPLY_ACTIONS, watering hole],
+    [AUTOFEED], [FEED_ONE, player id, Boolean indicating whether the player was removed], [STARVE]
+    [GAME_OVER, List of [score, player id, handshake]]
+
+"""
+import io
+import pickle
+import struct
+import zlib
+
+from .dealer import Dealer
+from .deck import Deck
+from .player import InternalPlayer
+from .species import Species
+
+# Rounds between snapshots
+DEFAULT_SNAPSHOT_INTERVAL = 4
+# Events a Journal with a stream holds before it writes them at the start of a round; the rest are written when the
+# game ends. An 8-player game of silly players records about 80.
+DEFAULT_BATCH_EVENTS = 1000
+# Bytes of buffer to open a journal file with: the journals of about 30 8-player games of silly players, where the
+# default buffer of a file, often 4096 bytes, makes a write to the disk every other game
+STREAM_BUFFER_SIZE = 1 << 16
+# Understood by Python 3.4 and later
+PICKLE_PROTOCOL = 4
+# Before each batch: its length in bytes and the CRC-32 of those bytes
+HEADER = struct.Struct(">II")
+
+
+class Journal:
+    """
+    The events of one game, in the order they happened. Events are kept in memory as they're recorded; a Journal with a
+    stream writes them to it when it's flushed and then drops them, while one without keeps them all. Answers are kept
+    as the objects that were received, which are never changed once they've crossed, so recording one costs an append
+    rather than a copy. The names of events are attributes of the Journal, so that the Dealer can record them without
+    importing this module.
+    """
+    BEGIN = "begin"
+    ROUND = "round"
+    SEND = "send"
+    RECEIVE = "receive"
+    ERROR = "error"
+    DEAL = "deal"
+    CHOOSE = "choose"
+    APPLY_ACTIONS = "apply-actions"
+    AUTOFEED = "autofeed"
+    FEED_ONE = "feed-one"
+    STARVE = "starve"
+    GAME_OVER = "game-over"
+
+    def __init__(self, stream=None, seed=None, snapshot_interval=DEFAULT_SNAPSHOT_INTERVAL,
+                 batch_events=DEFAULT_BATCH_EVENTS):
+        """
+        :param stream: a writable binary stream that events are written to, or None to keep them only in memory
+        :param seed: the Integer the deck was shuffled with, if it was, to record with the game
+        :param snapshot_interval: Natural number of rounds between snapshots of the Dealer
+        :param batch_events: Natural number of events to hold before writing them at the start of a round
+        """
+        self.stream = stream
+        self.seed = seed
+        self.snapshot_interval = snapshot_interval
+        self.batch_events = batch_events
+        # The events not yet written to the stream, which are all of them if there's no stream
+        self.events = []
+        # Number of events written to the stream so far, and so the number of the first event in events
+        self.written = 0
+        # Maps each player id to the SEND event recorded for it each time it's sent a message
+        self.sends = {}
+
+    def record(self, *event):
+        """ Append an event
+        :param event: the fields of the event, its name first
+        """
+        self.events.append([*event])
+
+    def sent(self, player_id, message):
+        """ Record that a message was sent to a player's agent
+        :param player_id: Integer id of the player
+        :param message: the message, which replaying the journal makes again, so it isn't kept
+        """
+        # Events are never changed once recorded, so each player's SEND event is made once and recorded as often as
+        # the player is sent a message; this halves the Lists a game allocates and holds in its journal
+        try:
+            event = self.sends[player_id]
+        except KeyError:
+            event = self.sends[player_id] = [Journal.SEND, player_id]
+        self.events.append(event)
+
+    def flush(self):
+        """ Write the events recorded since the last flush to the stream, if there is one, and stop keeping them """
+        if self.stream is None or not self.events:
+            return
+        buffer = io.BytesIO()
+        pickler = pickle.Pickler(buffer, PICKLE_PROTOCOL)
+        # Without a memo, which events don't need as they're plain data with no cycles, pickling takes a third less time
+        pickler.fast = True
+        pickler.dump(self.events)
+        batch = buffer.getvalue()
+        self.stream.write(HEADER.pack(len(batch), zlib.crc32(batch)) + batch)
+        self.written += len(self.events)
+        self.events = []
+
+    def agent(self, agent, player_id):
+        """
+        :param agent: an ExternalPlayer, or anything that follows its interface
+        :param player_id: Integer id of the player the agent acts for
+        :return: a JournaledAgent that records the messages crossing to and from the agent in this Journal
+        """
+        return JournaledAgent(agent, player_id, self)
+
+    def begin(self, dealer):
+        """ Record the start of a game
+        :param dealer: a Dealer whose players have just been seated, with agents from this Journal, and have no species,
+        food or cards yet
+        """
+        self.record(Journal.BEGIN, self.seed, dealer.deck.codes[dealer.deck.cursor:].tolist(),
+                    [[player.player_id, player.handshake, hasattr(player.player_agent, "send_choose")]
+                     for player in dealer.players], dealer.watering_hole)
+
+    def start_round(self, dealer):
+        """ Record the start of a round, with a snapshot of the Dealer if one is due, and flush the Journal if it holds
+        a batch's worth of events
+        :param dealer: a Dealer between rounds
+        """
+        self.record(Journal.ROUND, dealer.rounds, snapshot(dealer) if self.snapshot_due(dealer.rounds) else None)
+        if len(self.events) >= self.batch_events:
+            self.flush()
+
+    def snapshot_due(self, rounds):
+        """
+        :param rounds: Integer number of rounds played so far
+        :return: Boolean indicating whether the next round should start with a snapshot
+        """
+        return rounds > 0 and rounds % self.snapshot_interval == 0
+
+    @staticmethod
+    def load(stream):
+        """ Read the events of a journal
+        :param stream: a readable binary stream, as a Journal wrote to
+        :return: a List of events
+        Note: This will raise a ValueError if the stream holds anything but batches of events, or a batch that doesn't
+        match its CRC-32. A batch cut short by the end of the stream, as a journal whose writer was killed partway
+        through a flush may end with, is ignored.
+        """
+        data = stream.read()
+        events = []
+        offset = 0
+        while offset < len(data):
+            if len(data) - offset < HEADER.size:
+                break
+            length, crc = HEADER.unpack_from(data, offset)
+            start = offset + HEADER.size
+            if len(data) - start < length:
+                break
+            payload = data[start:start + length]
+            if zlib.crc32(payload) != crc:
+                raise ValueError("Corrupt journal batch at byte " + str(offset))
+            try:
+                batch = PlainUnpickler(io.BytesIO(payload)).load()
+            except (EOFError, pickle.UnpicklingError) as e:
+                raise ValueError("Corrupt journal batch at byte " + str(offset)) from e
+            offset = start + length
+            if not (type(batch) is list and all(type(event) is list and event and type(event[0]) is str
+                                                for event in batch)):
+                raise ValueError("Malformed journal batch")
+            events.extend(batch)
+        return events
+
+
+class PlainUnpickler(pickle.Unpickler):
+    """ Unpickles lists, strings, numbers, booleans and None, and refuses anything that would need a class """
+
+    def find_class(self, module, name):
+        raise ValueError("A journal holds only plain data, not " + module + "." + name)
+
+
+def snapshot(dealer):
+    """
+    :param dealer: a Dealer between rounds
+    :return: a snapshot of it. Species are serialized as players' species are for messages, so that the cached forms
+    are shared rather than made again; cards are kept as deck codes.
+    """
+    return [dealer.starting_player, dealer.watering_hole, dealer.deck.codes[dealer.deck.cursor:].tolist(),
+            [[player.player_id, player.serialize_species(), player.bag, [Deck.encode(card) for card in player.cards]]
+             for player in dealer.players]]
+
+
+class JournaledAgent:
+    """
+    Stands in for a player's agent, passing every message on to it and recording what was sent and what came back.
+    It has send_choose, receive_choice, game_over and jsock only if the agent does, so that the Dealer, and whatever
+    looks at the Dealer's players after the game, treats it as it would the agent.
+    """
+
+    def __init__(self, agent, player_id, journal):
+        """
+        :param agent: an ExternalPlayer, or anything that follows its interface
+        :param player_id: Integer id of the player the agent acts for
+        :param journal: the Journal to record messages in
+        """
+        self.agent = agent
+        self.player_id = player_id
+        self.journal = journal
+        if hasattr(agent, "send_choose"):
+            self.send_choose = self._send_choose
+            self.receive_choice = self._receive_choice
+        if hasattr(agent, "game_over"):
+            self.game_over = agent.game_over
+        if hasattr(agent, "jsock"):
+            # A ProxyPlayer's connection, which is kept open after the game if its client asked to stay
+            self.jsock = agent.jsock
+
+    def _failed(self, e):
+        """ Record an exception the agent raised, in place of its answer """
+        self.journal.record(Journal.ERROR, self.player_id, repr(e))
+
+    # Each message is passed on and recorded inline rather than through a shared helper, as this is done for every
+    # message of every journaled game
+
+    def start(self, msg):
+        self.journal.sent(self.player_id, msg)
+        try:
+            self.agent.start(msg)
+        except Exception as e:
+            self._failed(e)
+            raise
+
+    def choose(self, before, after):
+        self.journal.sent(self.player_id, [before, after])
+        try:
+            answer = self.agent.choose(before, after)
+        except Exception as e:
+            self._failed(e)
+            raise
+        self.journal.record(Journal.RECEIVE, self.player_id, answer)
+        return answer
+
+    def _send_choose(self, before, after):
+        self.journal.sent(self.player_id, [before, after])
+        try:
+            self.agent.send_choose(before, after)
+        except Exception as e:
+            self._failed(e)
+            raise
+
+    def _receive_choice(self, deadline=None):
+        try:
+            answer = self.agent.receive_choice(deadline)
+        except Exception as e:
+            self._failed(e)
+            raise
+        self.journal.record(Journal.RECEIVE, self.player_id, answer)
+        return answer
+
+    def feed_species(self, state):
+        self.journal.sent(self.player_id, state)
+        try:
+            answer = self.agent.feed_species(state)
+        except Exception as e:
+            self._failed(e)
+            raise
+        self.journal.record(Journal.RECEIVE, self.player_id, answer)
+        return answer
+
+
+class ReplayedError(ValueError):
+    """ An error an agent raised in the original game, raised again at the same point of its replay """
+
+    def __repr__(self):
+        # As the original was recorded, so that the replay records the same
+        return self.args[0]
+
+
+class ReplayJournal(Journal):
+    """
+    The Journal a replayed Dealer records in. Each event must match the one the original Dealer recorded at the same
+    position, and the replay stops once the event it's seeking has been recorded.
+    """
+
+    class SeekReached(Exception):
+        """ Raised through the Dealer once the event being sought has been recorded """
+
+    def __init__(self, events, position, target):
+        """
+        :param events: the List of events of the original game
+        :param position: Integer index of the next event the replay will record
+        :param target: Integer index of the event to stop after
+        """
+        super().__init__()
+        self.original = events
+        self.position = position
+        self.target = target
+        # The last message sent to an agent in the replay
+        self.message = None
+
+    def record(self, *event):
+        """ Check an event against the original
+        Note: This will raise a ValueError if the replay has diverged from the original
+        """
+        expected = self.expected()
+        if expected is None or list(event) != expected:
+            raise ValueError("Replay diverged from the journal at event " + str(self.position))
+        self.position += 1
+        if self.position > self.target:
+            raise ReplayJournal.SeekReached()
+
+    def sent(self, player_id, message):
+        """ Keep the message, so that seeking to a SEND event gives what was sent there, and check the event """
+        self.message = message
+        self.record(Journal.SEND, player_id)
+
+    def expected(self):
+        """
+        :return: the original event the replay is to record next, or None if there are no more
+        """
+        return self.original[self.position] if self.position < len(self.original) else None
+
+    def flush(self):
+        pass
+
+    def snapshot_due(self, rounds):
+        # Whether there's a snapshot here was decided by the original, and record checks that it's reproduced
+        expected = self.expected()
+        return expected is not None and expected[0] == Journal.ROUND and expected[2] is not None
+
+
+class ScriptedAgent:
+    """ Answers for a player in a replay as it answered in the original game, reading the answers from the journal """
+
+    def __init__(self, player_id, journal, fan_out):
+        """
+        :param player_id: Integer id of the player
+        :param journal: the ReplayJournal of the replay
+        :param fan_out: Boolean indicating whether the original agent was asked to choose by send_choose
+        """
+        self.player_id = player_id
+        self.journal = journal
+        if fan_out:
+            self.send_choose = self._send_choose
+            self.receive_choice = self._answer
+
+    def _raise_if_failed(self):
+        """ Raise the error the original agent raised at this point, if it did """
+        expected = self.journal.expected()
+        if expected is not None and expected[0] == Journal.ERROR and expected[1] == self.player_id:
+            raise ReplayedError(expected[2])
+
+    def _answer(self, *args):
+        """
+        :return: the answer the original agent gave at this point
+        Note: This will raise a ReplayedError if it raised instead, and a ValueError if the journal has no answer here
+        """
+        self._raise_if_failed()
+        expected = self.journal.expected()
+        if expected is None or expected[0] != Journal.RECEIVE or expected[1] != self.player_id:
+            raise ValueError("Replay diverged from the journal at event " + str(self.journal.position))
+        return expected[2]
+
+    def start(self, msg):
+        self._raise_if_failed()
+
+    def _send_choose(self, before, after):
+        self._raise_if_failed()
+
+    def choose(self, before, after):
+        return self._answer()
+
+    def feed_species(self, state):
+        return self._answer()
+
+
+class Replayer:
+    """ Rebuilds the Dealer of a journaled game as it was just after any of its events """
+
+    def __init__(self, events):
+        """
+        :param events: a List of the events of a game, starting with its BEGIN event
+        Note: This will raise a ValueError if there's no BEGIN event
+        """
+        if not events or events[0][0] != Journal.BEGIN:
+            raise ValueError("A journal starts with a begin event")
+        self.events = events
+        _, self.seed, self.initial_deck, players, watering_hole = events[0]
+        # Maps each player id to (String handshake, Boolean asked to choose by send_choose)
+        self.players = {player_id: (handshake, fan_out) for player_id, handshake, fan_out in players}
+        # The BEGIN event as a snapshot of the Dealer before its first round
+        self.first = [0, watering_hole, self.initial_deck, [[player_id, [], 0, []] for player_id, _, _ in players]]
+        # Indices of the events that hold a snapshot, in order: the BEGIN event, and ROUND events with one
+        self.snapshots = [0] + [index for index, event in enumerate(events)
+                                if event[0] == Journal.ROUND and event[2] is not None]
+
+    def seek(self, event_number):
+        """ Replay the game up to and including an event
+        :param event_number: Integer index of an event, at least that of the first snapshot
+        :return: a Dealer as it was just after that event, with a ReplayJournal as its journal. Seeking past the last
+        event gives the Dealer as the game ended.
+        Note: This will raise a ValueError if the replay diverges from the journal, as it will if the Dealer's rules
+        have changed since the game was played
+        """
+        starts = [index for index in self.snapshots if index <= event_number]
+        if not starts:
+            raise ValueError("There's no snapshot before event " + str(event_number))
+        start = starts[-1]
+        if start == 0:
+            # Replaying starts with the event after BEGIN, which the replay doesn't record again
+            rounds, (starting_player, watering_hole, codes, players) = 0, self.first
+            journal = ReplayJournal(self.events, 1, event_number)
+        else:
+            rounds, (starting_player, watering_hole, codes, players) = self.events[start][1], self.events[start][2]
+            journal = ReplayJournal(self.events, start, event_number)
+        dealer = Dealer(watering_hole=watering_hole, deck=Deck.from_codes(codes), journal=journal)
+        dealer.starting_player = starting_player
+        dealer.rounds = rounds
+        for player_id, species, bag, cards in players:
+            handshake, fan_out = self.players[player_id]
+            agent = JournaledAgent(ScriptedAgent(player_id, journal, fan_out), player_id, journal)
+            player = InternalPlayer(player_id, agent, handshake)
+            player.species = [Species.deserialize(data) for data in species]
+            player.bag = bag
+            player.cards = [Deck.decode(code) for code in cards]
+            dealer.players.append(player)
+        if event_number < journal.position:
+            # Seeking to the BEGIN event
+            return dealer
+        try:
+            dealer.play_rounds()
+            dealer.end_game()
+        except ReplayJournal.SeekReached:
+            pass
+        except ReplayedError:
+            # Unless this error ended the original game too
+            if journal.expected() is not None:
+                raise
+        return dealer
+
+    def sent(self, event_number):
+        """ Make again the message a player was sent at a SEND event, by replaying the game up to it
+        :param event_number: Integer index of a SEND event
+        :return: the message, as the player's agent was sent it
+        Note: This will raise a ValueError if the event isn't a SEND event, or if the replay diverges from the journal
+        """
+        if self.events[event_number][0] != Journal.SEND:
+            raise ValueError("Event " + str(event_number) + " isn't a send event")
+        return self.seek(event_number).journal.message
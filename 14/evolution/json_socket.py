@@ -9,15 +9,26 @@ import json
 import socket
 from .timeout import *
 from .debug import debug
+from . import compact
 
 
 class JSONSocket:
     """ Handles parsing of JSON objects from a concatenated JSON stream
     and writing JSON objects to the stream.
+
+    Bytes are read from the socket in large chunks into a buffer. Messages are split off the buffer at the newline
+    that encode writes after each one, and a peer that doesn't write newlines is read with JSONDecoder.raw_decode.
+    Whatever follows a message stays in the buffer for the next one. Once both ends have agreed to at the handshake,
+    messages are sent and received as compact frames instead.
     """
 
     ENCODING = "utf-8"
-    BYTE_SIZE = 1
+    # Milliseconds the other end has to send a message
+    RESPONSE_MILLISECONDS = 5000
+    # Bytes asked of the socket at once
+    CHUNK_SIZE = 65536
+    DELIMITER = b"\n"
+    WHITESPACE = b" \t\r\n"
 
     class IncompleteBufferException(ValueError):
         """ Raised when the buffer doesn't contain a full valid JSON bytestring """
@@ -29,8 +40,29 @@ class JSONSocket:
         """ Initializes the decoder.
         :param sock : A socket.socket object that is initialized and connected.
         """
-        self.buffer = bytes()
+        self.buffer = bytearray()
+        # How far into the buffer we know there's no newline
+        self.scanned = 0
+        self.decoder = json.JSONDecoder()
+        # Whether messages are sent and received as compact frames rather than JSON
+        self.compact = False
+        # Whether the other end asked for feeding states as patches; ProxyPlayers made from this socket send them so
+        self.delta = False
+        # Whether the other end asked to stay connected between games, and so is sent session.GAME_OVER after each
+        self.session = False
+        # Messages and bytes this socket has received and sent, and how many times decode timed out waiting for a
+        # message. An Exporter sums these across a server's connections.
+        self.messages_received = 0
+        self.messages_sent = 0
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self.timeouts = 0
         self.sock = sock
+        if sock.family in (socket.AF_INET, socket.AF_INET6):
+            # Messages are small and often sent back to back without a reply between them, as a start message and the
+            # choose request after it are. With Nagle's algorithm the second waits for the first to be acknowledged,
+            # and once a connection has been open a while the other end delays its acknowledgements by up to 40ms.
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
 
     @classmethod
     def from_host_and_port(cls, host, port):
@@ -49,71 +81,139 @@ class JSONSocket:
             exit(1)
         return cls(sock)
 
-    @timeout(5)
-    def decode(self):
+    def decode(self, deadline=None):
         """ Retrieve a single JSON message from the socket if one can be retrieved
-        This will not accept messages that take more than 3 seconds to arrive.
+        This will not accept messages that take more than RESPONSE_MILLISECONDS to arrive, unless given a deadline.
+        :param deadline: a Deadline the message must arrive by, or None to wait RESPONSE_MILLISECONDS from now
         :return: a single python-encoded JSON message
         Note: This method may throw a TimedOutError or a ClosedSocketError
         """
-        return self.decode_without_timeout()
+        if deadline is None:
+            deadline = Deadline(self.RESPONSE_MILLISECONDS)
+        while True:
+            try:
+                decoded = self.parse_buffer()
+                self.messages_received += 1
+                return decoded
+            except self.IncompleteBufferException:
+                pass
+            try:
+                deadline.wait_readable(self.sock)
+            except TimedOutError:
+                self.timeouts += 1
+                raise
+            data = self.sock.recv(self.CHUNK_SIZE)
+            if not data:
+                raise self.ClosedSocketError
+            self.bytes_received += len(data)
+            self.buffer += data
 
     def decode_without_timeout(self):
         """ A method that produces a message from the player as JSON
-        INVARIANT: There will be a maximum of one message waiting
         :return: a python-encoded JSON message.
         Note: this message may run forever if the socket gets disconnected.
         """
-        while True:
-            # read byte-sized chunks
-            data = self.sock.recv(self.BYTE_SIZE)
+        return self.decode(Deadline())
 
-            if data:
-                self.buffer += data
-            else:
-                raise self.ClosedSocketError
+    def parse_buffer(self):
+        """ Take the first message out of the buffer, leaving whatever follows it
+        :return: JSON object
+        Note: raises an IncompleteBufferException if the buffer doesn't start with a whole message
+        """
+        if self.compact:
+            return self.parse_frame()
+        buffer = self.buffer
+        leading = len(buffer) - len(buffer.lstrip(self.WHITESPACE))
+        if leading:
+            del buffer[:leading]
+            self.scanned = max(0, self.scanned - leading)
+        if not buffer:
+            raise self.IncompleteBufferException()
+        end = buffer.find(self.DELIMITER, self.scanned)
+        if end < 0:
+            self.scanned = len(buffer)
+        else:
+            self.scanned = end + 1
             try:
-                parsed = self.parse_buffer()
-                return parsed
-            except self.IncompleteBufferException:
+                decoded = json.loads(buffer[:end])
+                del buffer[:end + 1]
+                self.scanned = 0
+                debug(decoded, verbose=True)
+                return decoded
+            except (UnicodeDecodeError, json.JSONDecodeError):
+                # More than one message before the newline, or one spread over several lines
                 pass
-
-    def parse_buffer(self):
-        """ Parses the current buffer, if a valid JSON object is decoded
-        it is returned, otherwise returns None
-        :return: JSON object or None
+        decoded, used = self.raw_decode()
+        del buffer[:used]
+        self.scanned = 0
+        debug(decoded, verbose=True)
+        return decoded
+
+    def parse_frame(self):
+        """ Take the first compact frame out of the buffer, leaving whatever follows it
+        :return: JSON object
+        Note: raises an IncompleteBufferException if the buffer doesn't start with a whole frame, and a ValueError if
+        the frame is malformed
+        """
+        unframed = compact.unframe(self.buffer)
+        if unframed is None:
+            raise self.IncompleteBufferException()
+        decoded, used = unframed
+        del self.buffer[:used]
+        debug(decoded, verbose=True)
+        return decoded
+
+    def raw_decode(self):
+        """ Decode the message at the start of the buffer, however it's delimited
+        :return: (JSON object, Integer number of bytes it took up)
+        Note: raises an IncompleteBufferException if the buffer doesn't start with a whole message
         """
         try:
-            decoded = json.loads(self.buffer.decode(self.ENCODING))
-            self.buffer = bytes()
-            debug(decoded, verbose=True)
-            return decoded
-        except (UnicodeDecodeError, json.JSONDecodeError):
+            text = self.buffer.decode(self.ENCODING)
+        except UnicodeDecodeError as e:
+            # The buffer may end partway through a character
+            text = self.buffer[:e.start].decode(self.ENCODING)
+        try:
+            decoded, end = self.decoder.raw_decode(text)
+        except json.JSONDecodeError:
             raise self.IncompleteBufferException()
+        return decoded, len(text[:end].encode(self.ENCODING))
 
     def encode(self, data):
         """ Encodes and sends the given object to the stream.
         :param data: JSON data to encode and send to the stream
         """
-        encoded_data = json.dumps(data).encode(self.ENCODING)
-        self.sock.sendall(encoded_data + b'\n')
-
-    def send_and_get_response(self, data):
+        if self.compact:
+            encoded_data = compact.frame(data)
+        else:
+            encoded_data = json.dumps(data).encode(self.ENCODING) + b'\n'
+        self.sock.sendall(encoded_data)
+        self.messages_sent += 1
+        self.bytes_sent += len(encoded_data)
+
+    def send_and_get_response(self, data, deadline=None):
         """ Encodes and sends the given object. Then, waits for a response to arrive.
         :param data: JSON data to encode and send.
+        :param deadline: a Deadline the response must arrive by, or None to wait RESPONSE_MILLISECONDS from now
         :return: JSON object
         This method may raise a ValueError if the other end doesn't send exactly one message within the allotted time.
         """
         self.encode(data)
+        return self.get_response(deadline)
+
+    def get_response(self, deadline=None):
+        """ Wait for the response to a message that has already been sent.
+        :param deadline: a Deadline the response must arrive by, or None to wait RESPONSE_MILLISECONDS from now
+        :return: JSON object
+        This method may raise a ValueError if the other end doesn't send exactly one message within the allotted time.
+        """
         try:
-            result = self.decode()
+            result = self.decode(deadline)
         except TimedOutError:
-            debug("Decode timed out")
-            debug(self.buffer)
+            debug(lambda: "Decode timed out with " + repr(self.buffer) + " in the buffer")
             raise ValueError("No response arrived")
-        # Ensure there's exactly one thing returned
-        anything = self.sock.recv(self.BYTE_SIZE)
-        if (anything and anything != b'\n' and anything != b' ' and anything != b'\t'):
+        # Ensure there's exactly one thing returned: only whitespace may follow it, and nothing may follow a frame
+        if self.buffer if self.compact else self.buffer.strip(self.WHITESPACE):
             debug("Extra non-whitespace data was sent")
             raise ValueError("Invalid response from Player")
         return result
@@ -0,0 +1,266 @@
+"""
+
+A long-running server that hosts many games at once on one port. Clients sign up in a lobby and wait in a
+matchmaking queue until there are enough of them to seat a table; each table's game is then played on a bounded pool
+of worker threads, while the event loop carries on accepting clients and seating tables. Clients that asked to keep
+their session go back to the queue when their game is over, to be seated at another table over the same connection.
+
+"""
+import asyncio
+import itertools
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .dealer import Dealer, MAX_PLAYERS, MIN_PLAYERS
+from .metrics import Histogram, Metrics
+from .proxy_player import ProxyPlayer
+from .server import AsyncServer, HANDSHAKE_MILLISECONDS
+from .session import staying
+from .debug import debug
+
+# Tables that may be playing at once, and so worker threads
+DEFAULT_MAX_TABLES = 16
+# Milliseconds the player at the front of the queue waits for a full table before a smaller one is seated
+SEATING_WINDOW_MILLISECONDS = 2000
+# Connections the listener socket holds until they're accepted. A Server only ever expects MAX_PLAYERS, but a lobby's
+# clients may all turn up at once, and connections beyond the backlog stall for seconds in the kernel.
+LISTEN_BACKLOG = 1024
+
+
+class Table:
+    """
+    A game between players seated together from the queue. A Table is WAITING until its game starts, PLAYING while
+    the game runs on a worker thread, and FINISHED once the game is over and its players' connections are closed.
+    """
+    WAITING = "waiting"
+    PLAYING = "playing"
+    FINISHED = "finished"
+
+    def __init__(self, table_id, players, exporter=None):
+        """
+        :param table_id: Integer identifying the table
+        :param players: a List of (JSONSocket, String) representing the socket for a player and their handshake
+        :param exporter: an Exporter that the game's metrics are recorded for while it's in progress, or None
+        """
+        self.table_id = table_id
+        self.players = players
+        self.exporter = exporter
+        # The Metrics the game is recorded in, including how long each request to a player took to be answered
+        self.metrics = None
+        self.state = Table.WAITING
+        # List of (Integer, Integer, String) of score, player id and handshake, once the game is over
+        self.scores = None
+        # repr of the exception that ended the game early, if one did
+        self.error = None
+        # (JSONSocket, String) of each player that's staying connected for another game, once the game is over
+        self.staying = []
+        self.wall_time = None
+
+    def play(self):
+        """ Play the game to the end and close the connections of the players that aren't staying for another game.
+        This blocks, so it's run on a worker thread.
+        :return: this Table
+        """
+        self.state = Table.PLAYING
+        start = time.perf_counter()
+        self.metrics = self.exporter.game_started() if self.exporter is not None else Metrics()
+        dealer = Dealer(metrics=self.metrics)
+        try:
+            dealer.play_game([(ProxyPlayer(sock), info) for sock, info in self.players])
+            self.scores = dealer.get_scores()
+            self.staying = staying(dealer.players)
+        except Exception as e:
+            # A connection failing in a way the Dealer doesn't expect ends this table, not the lobby
+            self.error = repr(e)
+            debug("Lobby: table " + str(self.table_id) + " ended early with " + self.error)
+        finally:
+            for sock, _ in self.players:
+                if not any(sock is kept for kept, _ in self.staying):
+                    sock.shutdown()
+            if self.exporter is not None:
+                self.exporter.game_finished(self.metrics)
+            self.wall_time = time.perf_counter() - start
+            self.state = Table.FINISHED
+        return self
+
+    def serialize(self):
+        """
+        :return: a python-encoded JSON dictionary describing the table
+        """
+        return {"table": self.table_id, "state": self.state, "players": len(self.players),
+                "scores": [list(score) for score in self.scores] if self.scores is not None else None,
+                "staying": len(self.staying), "error": self.error, "wall_time": self.wall_time}
+
+
+class Lobby(AsyncServer):
+    """
+    A server that keeps accepting clients for as long as it runs. Clients that finish their handshake join the back
+    of the queue. A table is seated from the front of the queue as soon as the maximum number of players are waiting,
+    or once the minimum are and the player at the front has waited SEATING_WINDOW_MILLISECONDS, as long as fewer than
+    max_tables tables are playing. Handshakes and seating happen on an event loop; games are played on a pool of
+    max_tables worker threads. A player that's still connected after its game, because it asked to keep its session,
+    rejoins the back of the queue. The event loop watches the connections of players in the queue, and one that
+    closes, or sends anything before it's seated, is dropped.
+    """
+    def __init__(self, host, port, max_tables=DEFAULT_MAX_TABLES, seating_window=SEATING_WINDOW_MILLISECONDS,
+                 handshake_timeout=HANDSHAKE_MILLISECONDS, on_table=None, exporter=None):
+        """ Create a Lobby
+        :param host: a String representing a hostname for a socket
+        :param port: an Integer representing a port number.
+        :param max_tables: Integer number of tables that may be playing at once
+        :param seating_window: Number of milliseconds the front of the queue waits for a full table
+        :param handshake_timeout: Number of milliseconds a client has to send its handshake after connecting
+        :param on_table: a function called with each Table once it has finished, or None
+        :param exporter: an Exporter to count the lobby's connections, failed handshakes and games in, or None
+        Note: If the port is already in use, this function will exit(1)
+        """
+        super().__init__(host, port, handshake_timeout=handshake_timeout, exporter=exporter)
+        self.sock.listen(LISTEN_BACKLOG)
+        self.max_tables = max_tables
+        self.seating_window = seating_window
+        self.on_table = on_table
+        # (JSONSocket, String, Float time.monotonic() the player joined) for each player waiting to be seated
+        self.queue = deque()
+        # Tables that are playing, by id
+        self.tables = {}
+        self.tables_finished = 0
+        self.peak_tables = 0
+        # How long requests to players took to be answered, across every finished table
+        self.responses = Histogram()
+        self.table_ids = itertools.count(1)
+        self.loop = None
+        self.stopping = None
+
+    def serve(self, tables=None):
+        """ Run the lobby until stop is called, or until the given number of tables have finished. Finished tables are
+        handed to on_table, and only kept to be returned when a number of them was given.
+        :param tables: Integer number of tables to finish before stopping, or None to run until stopped
+        :return: the List of finished Tables if a number was given, or else an empty List
+        """
+        return asyncio.run(self.run(tables))
+
+    def stop(self):
+        """ Stop the lobby from any thread. Tables that are playing are finished first; players still in the queue
+        are disconnected.
+        """
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.stopping.set)
+
+    def seat_tables(self, now):
+        """ Seat as many tables from the front of the queue as may be seated
+        :param now: Float time.monotonic() value
+        :return: a List of the Tables seated
+        """
+        seated = []
+        while len(self.tables) < self.max_tables and (len(self.queue) >= MAX_PLAYERS or (
+                len(self.queue) >= MIN_PLAYERS and now - self.queue[0][2] >= self.seating_window / 1000)):
+            players = [self.queue.popleft()[:2] for _ in range(min(len(self.queue), MAX_PLAYERS))]
+            table = Table(next(self.table_ids), players, self.exporter)
+            self.tables[table.table_id] = table
+            self.peak_tables = max(self.peak_tables, len(self.tables))
+            seated.append(table)
+        return seated
+
+    def until_seating(self, now):
+        """
+        :param now: Float time.monotonic() value
+        :return: Float seconds until the front of the queue's window closes, or None if that won't seat a table
+        """
+        if len(self.queue) < MIN_PLAYERS or len(self.tables) >= self.max_tables:
+            return None
+        return max(0.0, self.queue[0][2] + self.seating_window / 1000 - now)
+
+    async def run(self, tables=None):
+        """ Accept clients, seat tables and play them until stopped
+        :param tables: Integer number of tables to finish before stopping, or None to run until stopped
+        :return: the List of finished Tables if a number was given, or else an empty List
+        """
+        self.loop = loop = asyncio.get_running_loop()
+        self.stopping = asyncio.Event()
+        changed = asyncio.Event()
+        handshakes = set()
+        games = set()
+        kept = []
+        pool = ThreadPoolExecutor(self.max_tables, thread_name_prefix="table")
+
+        def joined(player, info):
+            self.queue.append((player, info, time.monotonic()))
+            loop.add_reader(player.sock, left, player)
+            changed.set()
+            return True
+
+        def left(player):
+            loop.remove_reader(player.sock)
+            for entry in self.queue:
+                if entry[0] is player:
+                    self.queue.remove(entry)
+                    break
+            player.shutdown()
+            changed.set()
+
+        def finished(table):
+            del self.tables[table.table_id]
+            self.tables_finished += 1
+            if tables is not None:
+                kept.append(table)
+            self.responses.merge(table.metrics.responses())
+            for player, info in table.staying:
+                joined(player, info)
+            if self.on_table is not None:
+                try:
+                    self.on_table(table)
+                except Exception as e:
+                    # The callback is the caller's; it failing mustn't keep the lobby from seating or stopping
+                    debug("Lobby: on_table failed for table " + str(table.table_id) + " with " + repr(e))
+            changed.set()
+            if tables is not None and self.tables_finished >= tables:
+                self.stopping.set()
+
+        async def matchmake():
+            while True:
+                changed.clear()
+                for table in self.seat_tables(time.monotonic()):
+                    for player, _ in table.players:
+                        loop.remove_reader(player.sock)
+                    game = loop.run_in_executor(pool, table.play)
+                    games.add(game)
+                    game.add_done_callback(games.discard)
+                    game.add_done_callback(lambda _, table=table: finished(table))
+                try:
+                    await asyncio.wait_for(changed.wait(), self.until_seating(time.monotonic()))
+                except asyncio.TimeoutError:
+                    pass
+
+        self.sock.setblocking(False)
+        acceptor = loop.create_task(self.accept(joined, handshakes))
+        matchmaker = loop.create_task(matchmake())
+        try:
+            await self.stopping.wait()
+        finally:
+            acceptor.cancel()
+            matchmaker.cancel()
+            for handshake in handshakes:
+                handshake.cancel()
+            await asyncio.gather(acceptor, matchmaker, *handshakes, return_exceptions=True)
+            # Games can't be interrupted, so they're left to finish
+            await asyncio.gather(*games, return_exceptions=True)
+            pool.shutdown()
+            while self.queue:
+                player = self.queue.popleft()[0]
+                loop.remove_reader(player.sock)
+                player.shutdown()
+            self.sock.setblocking(True)
+            self.loop = None
+        return kept
+
+    def stats(self):
+        """
+        :return: a python-encoded JSON dictionary of the tables finished, the most that played at once, the requests
+        to players answered, and how long they took to be answered, in milliseconds, interpolated within the
+        metrics.LATENCY_BUCKETS bucket holding the percentile, or None if it's beyond the last
+        """
+        responses = self.responses.serialize()
+        return {"tables": self.tables_finished, "peak_tables": self.peak_tables, "messages": responses["count"],
+                "latency_p50_ms": responses["p50"] * 1000 if responses["p50"] is not None else None,
+                "latency_p99_ms": responses["p99"] * 1000 if responses["p99"] is not None else None}
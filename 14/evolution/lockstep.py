@@ -0,0 +1,1090 @@
+"""
+
+Plays thousands of games of Evolution at once, in lockstep, with the state of every game held in NumPy arrays.
+Every phase of a round is carried out for all the games together, and a feeding turn is taken in every game that's
+still feeding before the next turn is taken in any of them. Played with SillyPolicy, every game ends exactly as the
+same game played by a Dealer with ExternalPlayers does.
+
+"""
+import random
+import time
+from collections import Counter
+
+import numpy as np
+
+from .action4 import Rejection
+from .dealer import Dealer, CARD_DRAW_COUNT, DEAD_CREATURE_REPLACEMENT_CARDS, MIN_PLAYERS, MAX_PLAYERS
+from .deck import CARDS, Deck
+from .player import Player
+from .simulate import BatchSummary, GameResult
+from .species import Species, SPECIES_MAX_POPULATION, MAX_TRAITS
+from .trait import Trait, HARD_SHELL_THRESHOLD
+
+# The fields of a species board, indexing the last axis of LockstepGames.boards. TRAITS is the mask of all of the
+# species's Traits; the FIRST_TRAIT fields after it hold the bit of each Trait in order, or 0.
+POPULATION, FOOD, BODY, FAT_FOOD, TRAITS, FIRST_TRAIT = range(6)
+FIELDS = FIRST_TRAIT + MAX_TRAITS
+
+# The food value and Trait bit of each card, indexed by card code
+CARD_FOOD = np.array([card.food_value for card in CARDS], dtype=np.int64)
+CARD_TRAIT = np.array([card.trait.bit for card in CARDS], dtype=np.int64)
+# Number of Traits in each Trait mask
+TRAIT_COUNT = np.array([bin(mask).count("1") for mask in range(1 << len(Trait))], dtype=np.int64)
+
+# The kinds of feeding, as FeedingIntents: FEED_NONE is FeedNone, and CANNOT_FEED is CannotFeed, which only the
+# dealer decides on. NO_FEEDING means the player came up with nothing at all, which stops a Dealer's game with an
+# error, so the game is marked as failed.
+NO_FEEDING, FEED_NONE, STORE_FAT, FEED_VEGETARIAN, FEED_CARNIVORE, CANNOT_FEED = range(-1, 5)
+
+# Rejections of a player's choices, by the code LockstepGames._check_choices gives them
+REJECTIONS = [None, Rejection.MALFORMED, Rejection.DUPLICATE_CARD, Rejection.CARD_OUT_OF_RANGE,
+              Rejection.BOARD_OUT_OF_RANGE, Rejection.TRAIT_OUT_OF_RANGE]
+MALFORMED, DUPLICATE_CARD, CARD_OUT_OF_RANGE, BOARD_OUT_OF_RANGE, TRAIT_OUT_OF_RANGE = range(1, 6)
+
+# Wider than any population, food or body, so that species_key can pack the three into one Integer
+KEY_SPAN = 1 << 10
+
+
+def has(traits, trait):
+    """
+    :param traits: Integer array of Trait masks
+    :param trait: a Trait
+    :return: Boolean array: does each mask include the Trait?
+    """
+    return (traits & trait.bit) != 0
+
+
+def species_key(boards):
+    """ Pack the population, food and body of species into an Integer that orders them the way
+    Player.species_ordering_key does, largest first
+    :param boards: Integer array [..., FIELDS] of species boards
+    :return: Integer array [...]
+    """
+    return (boards[..., POPULATION] * KEY_SPAN + boards[..., FOOD]) * KEY_SPAN + boards[..., BODY]
+
+
+def attackable(attackers, defenders, defender_counts):
+    """ Which species can attack which, by the rules of Species.is_attackable
+    :param attackers: Integer array [n, A, FIELDS] of attacking species boards
+    :param defenders: Integer array [n, R, S, FIELDS] of the boards of R players
+    :param defender_counts: Integer array [n, R] of how many boards each of those players has
+    :return: Boolean array [n, A, R, S]: can attacker a attack defender s on player r?
+    """
+    width = defenders.shape[2]
+    slots = np.arange(width)
+    present = slots < defender_counts[..., None]
+    has_right = slots + 1 < defender_counts[..., None]
+    traits = defenders[..., TRAITS]
+    population, food, body = defenders[..., POPULATION], defenders[..., FOOD], defenders[..., BODY]
+    left = np.zeros_like(traits)
+    left[..., 1:] = traits[..., :-1]
+    right = np.zeros_like(traits)
+    right[..., :-1] = traits[..., 1:]
+    right_body = np.zeros_like(body)
+    right_body[..., :-1] = body[..., 1:]
+    right = np.where(has_right, right, 0)
+    # Whatever the attacker, these species can't be attacked
+    safe = (~present | (population == 0) |
+            (has(traits, Trait.BURROWING) & (food == population)) |
+            (has(traits, Trait.SYMBIOSIS) & has_right & (right_body > body)))
+    warned = has(left | right, Trait.WARNING_CALL)
+
+    attacker = attackers[:, :, None, None, :]
+    attacker_traits = attacker[..., TRAITS]
+    attacker_population = attacker[..., POPULATION]
+    attacking_body = attacker[..., BODY] + np.where(has(attacker_traits, Trait.PACK_HUNTING), attacker_population, 0)
+    traits, population, body = traits[:, None], population[:, None], body[:, None]
+    fails = (safe[:, None] |
+             ~has(attacker_traits, Trait.CARNIVORE) |
+             (warned[:, None] & ~has(attacker_traits, Trait.AMBUSH)) |
+             (has(traits, Trait.CLIMBING) & ~has(attacker_traits, Trait.CLIMBING)) |
+             (has(traits, Trait.HARD_SHELL) & (attacking_body - body < HARD_SHELL_THRESHOLD)) |
+             (has(traits, Trait.HERDING) & (attacker_population <= population)))
+    return ~fails
+
+
+def first(mask):
+    """
+    :param mask: Boolean array [n, k]
+    :return: Integer array [n] of the first True column in each row, or 0 for rows with none
+    """
+    return mask.argmax(axis=1)
+
+
+class Choices:
+    """
+    The cards a batch of players play in a round, as an Action4 with at most one of each kind of action would have
+    them. Every attribute is an Integer array with one entry per player; a card or board is -1 where it's not used.
+    """
+
+    def __init__(self, count):
+        """
+        :param count: Integer number of players
+        """
+        unused = np.full(count, -1, dtype=np.int64)
+        # Position in the hand of the card placed in the watering hole
+        self.food = unused.copy()
+        # Positions of the card paid for a new board and of the card whose Trait goes on it
+        self.board = unused.copy()
+        self.board_trait = unused.copy()
+        # Card paid to grow a board's population, and that board; likewise for body
+        self.population = unused.copy()
+        self.population_board = unused.copy()
+        self.body = unused.copy()
+        self.body_board = unused.copy()
+        # Card whose Trait replaces the Trait at replace_trait on replace_board
+        self.replace = unused.copy()
+        self.replace_board = unused.copy()
+        self.replace_trait = unused.copy()
+
+    def cards(self):
+        """
+        :return: the card arrays, in the order Action4.card_indices lists cards
+        """
+        return [self.population, self.body, self.board, self.board_trait, self.replace, self.food]
+
+
+class Feedings:
+    """
+    One feeding per player for a batch of players, as FeedingIntents would describe them. Every attribute is an
+    Integer array with one entry per player.
+    """
+
+    def __init__(self, count):
+        """
+        :param count: Integer number of players
+        """
+        # One of NO_FEEDING, FEED_NONE, STORE_FAT, FEED_VEGETARIAN, FEED_CARNIVORE or CANNOT_FEED
+        self.kind = np.full(count, NO_FEEDING, dtype=np.int64)
+        # Index of the species fed, among the feeding player's boards
+        self.species = np.zeros(count, dtype=np.int64)
+        # Tokens to store as fat
+        self.tokens = np.zeros(count, dtype=np.int64)
+        # Index of the attacked player, in FeedingTurn.rest, and of the attacked species on it
+        self.defending = np.zeros(count, dtype=np.int64)
+        self.defender = np.zeros(count, dtype=np.int64)
+
+    def set(self, rows, kind, species=0, tokens=0, defending=0, defender=0):
+        """ Fill in the feedings for some of the players
+        :param rows: Boolean or Integer array selecting players
+        :param kind: the kind of feeding
+        :param species: Integer, or Integer array with an entry for every player
+        :param tokens: Integer, or Integer array with an entry for every player
+        :param defending: Integer, or Integer array with an entry for every player
+        :param defender: Integer, or Integer array with an entry for every player
+        """
+        for name, value in [("kind", kind), ("species", species), ("tokens", tokens), ("defending", defending),
+                            ("defender", defender)]:
+            getattr(self, name)[rows] = value[rows] if np.ndim(value) else value
+
+
+class FeedingTurn:
+    """
+    What the players taking a feeding turn can see, one player per game: their own boards, and the boards of the
+    players still feeding after them in turn order. Boards are cut down to the widest board in the batch.
+    """
+
+    def __init__(self, games, seats, boards, counts, rest, others, other_counts, watering_hole):
+        """
+        :param games: Integer array [n] of game indices
+        :param seats: Integer array [n] of the seat of the feeding player in each game
+        :param boards: Integer array [n, S, FIELDS] of the feeding player's boards
+        :param counts: Integer array [n] of how many boards the feeding player has
+        :param rest: Integer array [n, P - 1] of the seats of the players still feeding, in turn order after the
+        feeding player, padded with -1
+        :param others: Integer array [n, P - 1, S, FIELDS] of those players' boards
+        :param other_counts: Integer array [n, P - 1] of how many boards each of those players has, 0 for padding
+        :param watering_hole: Integer array [n] of food tokens in each watering hole
+        """
+        self.games = games
+        self.seats = seats
+        self.boards = boards
+        self.counts = counts
+        self.rest = rest
+        self.others = others
+        self.other_counts = other_counts
+        self.watering_hole = watering_hole
+        self._attackable = None
+
+    def select(self, rows):
+        """
+        :param rows: Boolean or Integer array selecting some of the players
+        :return: a FeedingTurn for just those players
+        """
+        turn = FeedingTurn(self.games[rows], self.seats[rows], self.boards[rows], self.counts[rows], self.rest[rows],
+                           self.others[rows], self.other_counts[rows], self.watering_hole[rows])
+        if self._attackable is not None:
+            turn._attackable = self._attackable[rows]
+        return turn
+
+    def present(self):
+        """
+        :return: Boolean array [n, S]: is there a board at each position of the feeding player?
+        """
+        return np.arange(self.boards.shape[1]) < self.counts[:, None]
+
+    def attackable(self):
+        """
+        :return: Boolean array [n, S, P - 1, S]: can the feeding player's species a attack species s of the player
+        at rest[r]?
+        """
+        if self._attackable is None:
+            self._attackable = attackable(self.boards, self.others, self.other_counts)
+        return self._attackable
+
+    def attackable_own(self):
+        """
+        :return: Boolean array [n, S, S]: can the feeding player's species a attack its own species s?
+        """
+        return attackable(self.boards, self.boards[:, None], self.counts[:, None])[:, :, 0]
+
+
+class BatchPolicy:
+    """
+    Plays for every player in a batch of games at once. Subclasses decide which cards each player plays and how
+    it feeds; LockstepGames checks their decisions the way a Dealer checks its players'.
+    """
+
+    def choose(self, engine, games, seats):
+        """ Choose the cards the given players play this round
+        :param engine: the LockstepGames being played, which must not be changed
+        :param games: Integer array of game indices
+        :param seats: Integer array of the seats of the choosing players in those games
+        :return: a Choices with one entry per player
+        """
+        raise NotImplementedError()
+
+    def feed(self, engine, turn):
+        """ Choose a feeding for each player taking a turn, where the dealer can't choose one for it
+        :param engine: the LockstepGames being played, which must not be changed
+        :param turn: a FeedingTurn
+        :return: a Feedings with one entry per player. As with FeedingIntents from an ExternalPlayer, the
+        defending player is an index into turn.rest counted from the player after the first one in the game.
+        """
+        raise NotImplementedError()
+
+
+class SillyPolicy(BatchPolicy):
+    """
+    The silly strategy of ExternalPlayer, for every player at once.
+    """
+
+    def choose(self, engine, games, seats):
+        """ Place the lowest card in the watering hole, then spend the others in order on a new board, its
+        population, its body, and its Trait. See ExternalPlayer.choose.
+        """
+        hands = engine.hand[games, seats]
+        sizes = engine.hand_size[games, seats]
+        # Card codes are in the order of a sorted deck, so sorting a hand's codes sorts its cards
+        order = np.argsort(np.where(hands >= 0, hands, len(CARDS)), axis=1, kind="stable")
+        order = np.pad(order, ((0, 0), (0, 6)), constant_values=-1)
+        rows = np.arange(len(games))
+
+        def card(position):
+            return np.where(sizes > position, order[rows, position], -1)
+
+        choices = Choices(len(games))
+        new_board = engine.species_count[games, seats]
+        choices.food = card(0)
+        with_board = sizes >= 3
+        choices.board = np.where(with_board, card(1), -1)
+        choices.board_trait = np.where(with_board, card(2), -1)
+        spent = np.where(with_board, 3, 1)
+        choices.population = card(spent)
+        choices.body = card(spent + 1)
+        choices.replace = card(spent + 2)
+        choices.population_board = np.where(choices.population >= 0, new_board, -1)
+        choices.body_board = np.where(choices.body >= 0, new_board, -1)
+        choices.replace_board = np.where(choices.replace >= 0, new_board, -1)
+        choices.replace_trait = np.where(choices.replace >= 0, 0, -1)
+        return choices
+
+    def feed(self, engine, turn):
+        """ Store fat on the species that needs it most, else feed the largest vegetarian, else attack with the
+        largest carnivore the largest species it can, else don't feed if a carnivore could attack its own side.
+        See ExternalPlayer.next_species_to_feed.
+        """
+        count = len(turn.games)
+        feedings = Feedings(count)
+        boards = turn.boards
+        traits = boards[..., TRAITS]
+        present = turn.present()
+        key = species_key(boards)
+        hungry = present & (boards[..., FOOD] < boards[..., POPULATION])
+        carnivores = hungry & has(traits, Trait.CARNIVORE)
+        rows = np.arange(count)
+
+        need = boards[..., BODY] - boards[..., FAT_FOOD]
+        fat = present & has(traits, Trait.FAT_TISSUE) & (need > 0)
+        eater = np.where(fat, need * KEY_SPAN ** 3 + key, -1).argmax(axis=1)
+        undecided = ~fat.any(axis=1)
+        feedings.set(~undecided, STORE_FAT, eater, np.minimum(need[rows, eater], turn.watering_hole))
+
+        vegetarians = hungry & ~carnivores
+        eater = np.where(vegetarians, key, -1).argmax(axis=1)
+        decide = undecided & vegetarians.any(axis=1)
+        feedings.set(decide, FEED_VEGETARIAN, eater)
+        undecided &= ~decide
+
+        if (undecided & carnivores.any(axis=1)).any():
+            targets = turn.attackable()
+            able = carnivores & targets.any(axis=(2, 3))
+            eater = np.where(able, key, -1).argmax(axis=1)
+            decide = undecided & able.any(axis=1)
+            # The largest target, taking the first player's on a tie, and the leftmost of that player's
+            other_key = np.where(targets[rows, eater], species_key(turn.others), -1)
+            target = other_key.reshape(count, -1).argmax(axis=1)
+            width = boards.shape[1]
+            feedings.set(decide, FEED_CARNIVORE, eater, defending=target // width, defender=target % width)
+            undecided &= ~decide
+            own = (carnivores[:, :, None] & turn.attackable_own()).any(axis=(1, 2))
+            feedings.set(undecided & own, FEED_NONE)
+        return feedings
+
+
+class LockstepGames:
+    """
+    A batch of games with the same number of players, all played at once by one BatchPolicy. Games are indexed by
+    their position in the batch, and players by their seat, which is one less than their player id.
+
+    Every species board is a row of FIELDS Integers in boards, left-aligned, with zeros past the end of each player's
+    boards. Hands are left-aligned card codes padded with -1, and each game's deck is an array of codes with a
+    cursor. Players that are ejected have their boards and hand cleared.
+    """
+
+    def __init__(self, decks, player_count, policy=None):
+        """
+        :param decks: a List of decks, one per game, each a Deck or a List of TraitCard with the same number of cards
+        :param player_count: Integer number of players in every game
+        :param policy: a BatchPolicy, or None for SillyPolicy
+        """
+        self.policy = policy or SillyPolicy()
+        self.game_count = len(decks)
+        self.player_count = player_count
+        self.deck = np.array([list(deck.codes[deck.cursor:]) if isinstance(deck, Deck) else
+                              [Deck.encode(card) for card in deck] for deck in decks], dtype=np.int64)
+        self.deck = self.deck.reshape(self.game_count, -1)
+        self.cursor = np.zeros(self.game_count, dtype=np.int64)
+        shape = (self.game_count, player_count)
+        self.boards = np.zeros(shape + (1, FIELDS), dtype=np.int64)
+        self.species_count = np.zeros(shape, dtype=np.int64)
+        self.bag = np.zeros(shape, dtype=np.int64)
+        self.hand = np.full(shape + (CARD_DRAW_COUNT + 1,), -1, dtype=np.int64)
+        self.hand_size = np.zeros(shape, dtype=np.int64)
+        self.in_game = np.ones(shape, dtype=bool)
+        self.watering_hole = np.zeros(self.game_count, dtype=np.int64)
+        # Like Dealer.starting_player: an index into each game's players still in the game
+        self.starting_player = np.zeros(self.game_count, dtype=np.int64)
+        self.rounds = np.zeros(self.game_count, dtype=np.int64)
+        self.over = np.zeros(self.game_count, dtype=bool)
+        # Games a Dealer would have stopped with an error, such as when a player has no feeding to give
+        self.failed = np.zeros(self.game_count, dtype=bool)
+        # Counts of each Rejection of a player's choices, across all games
+        self.rejections = Counter()
+        # During the feeding phase: which players are still feeding, and whose turn it is
+        self.in_ring = np.zeros(shape, dtype=bool)
+        self.current = np.zeros(self.game_count, dtype=np.int64)
+
+    @classmethod
+    def seeded(cls, seeds, player_count, policy=None):
+        """ Create a batch of games whose decks are shuffled as simulate.shuffled_deck shuffles them
+        :param seeds: a List of Integer seeds, one per game
+        :param player_count: Integer number of players in every game
+        :param policy: a BatchPolicy, or None for SillyPolicy
+        :return: a LockstepGames
+        """
+        decks = []
+        for seed in seeds:
+            # A new deck is in code order, so shuffling the codes shuffles it the same way
+            codes = list(range(len(CARDS)))
+            random.Random(seed).shuffle(codes)
+            decks.append(Deck.from_codes(codes))
+        return cls(decks, player_count, policy)
+
+    @classmethod
+    def from_dealers(cls, dealers, policy=None):
+        """ Create a batch of games carrying on from where Dealers are, between rounds
+        :param dealers: a List of Dealer with the same number of players, their decks the same length
+        :param policy: a BatchPolicy, or None for SillyPolicy
+        :return: a LockstepGames
+        """
+        batch = cls([dealer.deck for dealer in dealers], len(dealers[0].players), policy)
+        batch._reserve_boards(max(len(player.species) for dealer in dealers for player in dealer.players))
+        batch._reserve_hand(max(len(player.cards) for dealer in dealers for player in dealer.players))
+        for game, dealer in enumerate(dealers):
+            batch.watering_hole[game] = dealer.watering_hole
+            batch.starting_player[game] = dealer.starting_player
+            batch.rounds[game] = dealer.rounds
+            for seat, player in enumerate(dealer.players):
+                batch.bag[game, seat] = player.bag
+                batch.species_count[game, seat] = len(player.species)
+                for slot, species in enumerate(player.species):
+                    bits = [trait.bit for trait in species.traits]
+                    batch.boards[game, seat, slot] = ([species.population, species.food, species.body,
+                                                       species.fat_food, species.trait_mask] + bits +
+                                                      [0] * (MAX_TRAITS - len(bits)))
+                batch.hand_size[game, seat] = len(player.cards)
+                batch.hand[game, seat, :len(player.cards)] = [Deck.encode(card) for card in player.cards]
+        return batch
+
+    def active(self):
+        """
+        :return: Integer array of the games that are neither over nor failed
+        """
+        return np.flatnonzero(~self.over & ~self.failed)
+
+    def play(self):
+        """ Play every game to the end
+        """
+        while self.play_round():
+            pass
+
+    def play_round(self):
+        """ Play a round of every game that isn't over, as Dealer.play_game does
+        :return: Boolean indicating whether any game played a round
+        """
+        games = self.active()
+        games = games[~self._game_over(games)]
+        if not len(games):
+            return False
+        self._step_one(games)
+        self._choose(games)
+        self._autofeed(games[~self.failed[games]])
+        self._feeding(games[~self.failed[games]])
+        games = games[~self.failed[games]]
+        self._starve(games)
+        self.rounds[games] += 1
+        return True
+
+    # Dealing and choosing
+
+    def _game_over(self, games):
+        """ Mark the games that should stop, as Dealer.game_over decides
+        :param games: Integer array of game indices
+        :return: Boolean array: is each game over?
+        """
+        needed = (self.in_game[games] * (CARD_DRAW_COUNT + np.maximum(1, self.species_count[games]))).sum(axis=1)
+        over = ~self.in_game[games].any(axis=1) | (needed > self.deck.shape[1] - self.cursor[games])
+        self.over[games[over]] = True
+        return over
+
+    def _step_one(self, games):
+        """ Deal each player its cards, and a board if it has none
+        :param games: Integer array of game indices
+        """
+        for seat in range(self.player_count):
+            dealt = games[self.in_game[games, seat]]
+            seats = np.full(len(dealt), seat)
+            counts = self.species_count[dealt, seat]
+            cards = self._deal(dealt, CARD_DRAW_COUNT + np.maximum(1, counts))
+            self._add_cards(dealt, seats, cards)
+            bare = dealt[counts == 0]
+            self.boards[bare, seat, 0] = 0
+            self.boards[bare, seat, 0, POPULATION] = 1
+            self.species_count[bare, seat] = 1
+
+    def _choose(self, games):
+        """ Have every player choose its cards, eject those whose choices can't be carried out, carry out the rest,
+        and add the food cards to the watering hole in seat order
+        :param games: Integer array of game indices
+        """
+        rows, seats = np.nonzero(self.in_game[games])
+        rows = games[rows]
+        choices = self.policy.choose(self, rows, seats)
+        rejections = self._check_choices(rows, seats, choices)
+        for code in np.flatnonzero(np.bincount(rejections, minlength=len(REJECTIONS))[1:]) + 1:
+            self.rejections[REJECTIONS[code]] += int((rejections == code).sum())
+        rejected = rejections != 0
+        self._eject(rows[rejected], seats[rejected])
+        accepted = ~rejected
+        food = self._enact_choices(rows[accepted], seats[accepted], choices, accepted)
+        rows, seats = rows[accepted], seats[accepted]
+        for seat in range(self.player_count):
+            at_seat = seats == seat
+            games = rows[at_seat]
+            self.watering_hole[games] = np.maximum(0, self.watering_hole[games] + food[at_seat])
+
+    def _check_choices(self, games, seats, choices):
+        """ Find the first reason, if any, that each player's choices can't be carried out, as Action4.check does
+        :param games: Integer array of game indices
+        :param seats: Integer array of seats
+        :param choices: a Choices with an entry per player
+        :return: Integer array of codes into REJECTIONS, 0 where the choices can be carried out
+        """
+        count = len(games)
+        rows = np.arange(count)
+        rejections = np.where(choices.food < 0, MALFORMED, 0)
+        sizes = self.hand_size[games, seats]
+        used = np.zeros((count, self.hand.shape[2] + 1), dtype=bool)
+        for cards in choices.cards():
+            played = (rejections == 0) & (cards >= 0)
+            out_of_range = played & (cards >= sizes)
+            rejections[out_of_range] = CARD_OUT_OF_RANGE
+            played &= ~out_of_range
+            position = np.where(played, cards, used.shape[1] - 1)
+            rejections[played & used[rows, position]] = DUPLICATE_CARD
+            used[rows[played], cards[played]] = True
+
+        species = self.species_count[games, seats]
+        board_count = species + (choices.board >= 0)
+        for boards in [choices.population_board, choices.body_board, choices.replace_board]:
+            out_of_range = (rejections == 0) & (boards >= 0) & (boards >= board_count)
+            rejections[out_of_range] = BOARD_OUT_OF_RANGE
+
+        replaced = (rejections == 0) & (choices.replace >= 0)
+        board = np.clip(choices.replace_board, 0, self.boards.shape[2] - 1)
+        trait_count = np.where(board < species, TRAIT_COUNT[self.boards[games, seats, board, TRAITS]], 1)
+        out_of_range = replaced & ((choices.replace_trait < 0) | (choices.replace_trait >= trait_count))
+        rejections[out_of_range] = TRAIT_OUT_OF_RANGE
+        return rejections
+
+    def _enact_choices(self, games, seats, choices, selected):
+        """ Carry out players' choices, as Action4.enact does
+        :param games: Integer array of game indices
+        :param seats: Integer array of seats
+        :param choices: a Choices
+        :param selected: Boolean array choosing the entries of choices that belong to these players
+        :return: Integer array of the food value of each player's food card
+        """
+        hands = self.hand[games, seats]
+        rows = np.arange(len(games))
+
+        def code(cards):
+            return hands[rows, np.maximum(cards[selected], 0)]
+        board = choices.board[selected]
+        new = board >= 0
+        self._reserve_boards(int(self.species_count[games, seats].max(initial=0)) + 1)
+        slot = self.species_count[games[new], seats[new]]
+        trait = CARD_TRAIT[code(choices.board_trait)[new]]
+        self.boards[games[new], seats[new], slot] = 0
+        self.boards[games[new], seats[new], slot, POPULATION] = 1
+        self.boards[games[new], seats[new], slot, TRAITS] = trait
+        self.boards[games[new], seats[new], slot, FIRST_TRAIT] = trait
+        self.species_count[games[new], seats[new]] += 1
+
+        grown = choices.body[selected] >= 0
+        slot = choices.body_board[selected][grown]
+        self.boards[games[grown], seats[grown], slot, BODY] += 1
+
+        grown = choices.population[selected] >= 0
+        slot = choices.population_board[selected][grown]
+        species = self.boards[games[grown], seats[grown], slot]
+        population = np.minimum(species[:, POPULATION] + 1, SPECIES_MAX_POPULATION)
+        self.boards[games[grown], seats[grown], slot, POPULATION] = population
+        self.boards[games[grown], seats[grown], slot, FOOD] = np.minimum(species[:, FOOD], population)
+
+        replaced = choices.replace[selected] >= 0
+        self._replace_trait(games[replaced], seats[replaced], choices.replace_board[selected][replaced],
+                            choices.replace_trait[selected][replaced], CARD_TRAIT[code(choices.replace)[replaced]])
+
+        food = CARD_FOOD[code(choices.food)]
+        used = np.zeros(hands.shape, dtype=bool)
+        for cards in choices.cards():
+            cards = cards[selected]
+            played = cards >= 0
+            used[rows[played], cards[played]] = True
+        self._remove_cards(games, seats, used)
+        return food
+
+    def _replace_trait(self, games, seats, slots, positions, traits):
+        """ Replace a Trait on each of the given species, as Species.replace_trait_at_index does. A species left with
+        a Trait twice makes a Dealer stop with an error, so its game is marked failed.
+        :param games: Integer array of game indices
+        :param seats: Integer array of seats
+        :param slots: Integer array of species positions
+        :param positions: Integer array of the positions of the Traits to replace
+        :param traits: Integer array of the bits of the new Traits
+        """
+        self.boards[games, seats, slots, FIRST_TRAIT + positions] = traits
+        ordered = self.boards[games, seats, slots, FIRST_TRAIT:]
+        mask = np.bitwise_or.reduce(ordered, axis=1)
+        self.boards[games, seats, slots, TRAITS] = mask
+        self.failed[games[TRAIT_COUNT[mask] != (ordered != 0).sum(axis=1)]] = True
+        lean = ~has(mask, Trait.FAT_TISSUE)
+        self.boards[games[lean], seats[lean], slots[lean], FAT_FOOD] = 0
+
+    # Feeding
+
+    def _autofeed(self, games):
+        """ Grow Fertile species, feed Long Neck species, and move fat food onto hungry Fat Tissue species
+        :param games: Integer array of game indices
+        """
+        boards = self.boards[games]
+        fertile = has(boards[..., TRAITS], Trait.FERTILE)
+        population = np.minimum(boards[..., POPULATION] + fertile, SPECIES_MAX_POPULATION)
+        boards[..., POPULATION] = population
+        boards[..., FOOD] = np.minimum(boards[..., FOOD], population)
+        self.boards[games] = boards
+
+        long_neck = has(self.boards[games, ..., TRAITS], Trait.LONG_NECK)
+        for seat in range(self.player_count):
+            for slot in range(self.boards.shape[2]):
+                fed = games[long_neck[:, seat, slot]]
+                if len(fed):
+                    self._feed_creature(fed, np.full(len(fed), seat), np.full(len(fed), slot))
+
+        boards = self.boards[games]
+        hunger = boards[..., POPULATION] - boards[..., FOOD]
+        moved = np.where(has(boards[..., TRAITS], Trait.FAT_TISSUE) & (hunger > 0),
+                         np.minimum(boards[..., FAT_FOOD], np.maximum(hunger, 0)), 0)
+        boards[..., FAT_FOOD] -= moved
+        boards[..., FOOD] += moved
+        self.boards[games] = boards
+
+    def _feeding(self, games):
+        """ Take feeding turns in every game until each has run out of food or of players still feeding, then
+        move on the starting player, as Dealer.feeding does
+        :param games: Integer array of game indices
+        """
+        self.in_ring[games] = self.in_game[games]
+        start = self._seat_of_rank(games, self.starting_player[games])
+        self.current[games] = start
+        feeding = games[self.in_ring[games].any(axis=1) & (self.watering_hole[games] > 0)]
+        while len(feeding):
+            self._feed_turn(feeding)
+            feeding = feeding[~self.failed[feeding] & self.in_ring[feeding].any(axis=1) &
+                              (self.watering_hole[feeding] > 0)]
+        self.in_ring[games] = False
+
+        played = ~self.failed[games]
+        games, start = games[played], start[played]
+        in_game = self.in_game[games]
+        players = in_game.sum(axis=1)
+        # Count the players at the starting seat or before it who are still in the game
+        through = (in_game & (np.arange(self.player_count) <= start[:, None])).sum(axis=1)
+        games, through, players = games[players > 0], through[players > 0], players[players > 0]
+        self.starting_player[games] = through % players
+
+    def _seat_of_rank(self, games, ranks):
+        """ Find the seats of players by their position among the players still in the game. A position past the
+        last player makes a Dealer stop with an error, so its game is marked failed.
+        :param games: Integer array of game indices
+        :param ranks: Integer array of positions
+        :return: Integer array of seats
+        """
+        in_game = self.in_game[games]
+        at_rank = in_game & (np.cumsum(in_game, axis=1) == ranks[:, None] + 1)
+        self.failed[games[~at_rank.any(axis=1)]] = True
+        return first(at_rank)
+
+    def _next_in_ring(self, games, seats):
+        """
+        :param games: Integer array of game indices
+        :param seats: Integer array of seats
+        :return: Integer array of the next seat after each one, in turn order, that's still feeding; the seat
+        itself if it's the only one
+        """
+        later = (seats[:, None] + np.arange(1, self.player_count + 1)) % self.player_count
+        return later[np.arange(len(games)), first(self.in_ring[games[:, None], later])]
+
+    def _turn(self, games):
+        """ Gather what the players whose turn it is can see
+        :param games: Integer array of game indices
+        :return: a FeedingTurn
+        """
+        count = len(games)
+        seats = self.current[games]
+        width = max(1, int(self.species_count[games].max(initial=0)))
+        later = (seats[:, None] + np.arange(1, self.player_count)) % self.player_count
+        feeding = self.in_ring[games[:, None], later]
+        order = np.argsort(~feeding, axis=1, kind="stable")
+        rest = np.where(np.take_along_axis(feeding, order, axis=1), np.take_along_axis(later, order, axis=1), -1)
+        known = rest >= 0
+        column = games[:, None]
+        others = np.where(known[..., None, None], self.boards[column, np.maximum(rest, 0), :width], 0)
+        other_counts = np.where(known, self.species_count[column, np.maximum(rest, 0)], 0)
+        return FeedingTurn(games, seats, self.boards[games, seats, :width], self.species_count[games, seats],
+                           rest, others, other_counts, self.watering_hole[games])
+
+    def _automatic_feedings(self, turn):
+        """ Decide on a feeding for each player wherever there's only one possibility, as
+        Player.automatically_choose_species_to_feed does
+        :param turn: a FeedingTurn
+        :return: (a Feedings, Boolean array of the players the policy must be asked instead)
+        """
+        count = len(turn.games)
+        feedings = Feedings(count)
+        boards = turn.boards
+        traits = boards[..., TRAITS]
+        present = turn.present()
+        hungry = present & (boards[..., FOOD] < boards[..., POPULATION])
+        carnivores = hungry & has(traits, Trait.CARNIVORE)
+        fat = (present & has(traits, Trait.FAT_TISSUE) & (boards[..., FAT_FOOD] < boards[..., BODY])).any(axis=1)
+        vegetarians = (hungry & ~carnivores).sum(axis=1)
+        targeting = carnivores.sum(axis=1) * (turn.rest >= 0).sum(axis=1)
+        eater = first(carnivores)
+        ask = targeting > 0
+        alone = (targeting == 1) & (vegetarians == 0) & ~fat
+        if alone.any():
+            targets = turn.attackable()[np.arange(count), eater, 0]
+            alone &= targets.sum(axis=1) == 1
+            feedings.set(alone, FEED_CARNIVORE, eater, defender=first(targets))
+            ask &= ~alone
+        undecided = (targeting == 0)
+        cannot = undecided & ~fat & (vegetarians == 0)
+        feedings.set(cannot, CANNOT_FEED)
+        undecided &= ~cannot
+        vegetarian = undecided & ~fat & (vegetarians == 1)
+        feedings.set(vegetarian, FEED_VEGETARIAN, first(hungry & ~carnivores))
+        return feedings, ask | (undecided & ~vegetarian)
+
+    def _feed_turn(self, games):
+        """ Take one feeding turn in each of the given games, as Dealer.feed_one does
+        :param games: Integer array of game indices
+        """
+        turn = self._turn(games)
+        feedings, ask = self._automatic_feedings(turn)
+        if ask.any():
+            asked = turn.select(ask)
+            answers = self.policy.feed(self, asked)
+            rest = (asked.rest >= 0).sum(axis=1)
+            ranks = (self.in_game[asked.games] & (np.arange(self.player_count) < asked.seats[:, None])).sum(axis=1)
+            attacks = answers.kind == FEED_CARNIVORE
+            # A Dealer can't unrotate an attack when no one else is feeding
+            self.failed[asked.games[attacks & (rest == 0)]] = True
+            valid = ~attacks | (answers.defending >= 0)
+            answers.defending = np.where(attacks & (rest > 0),
+                                         (answers.defending + ranks + 1) % np.maximum(rest, 1), answers.defending)
+            for name in ["kind", "species", "tokens", "defending", "defender"]:
+                getattr(feedings, name)[ask] = getattr(answers, name)
+            self.failed[asked.games[answers.kind == NO_FEEDING]] = True
+            invalid = np.zeros(len(games), dtype=bool)
+            invalid[ask] = ~valid | ~self._valid_feedings(asked, answers)
+        else:
+            invalid = np.zeros(len(games), dtype=bool)
+
+        playing = ~self.failed[games]
+        seats = turn.seats
+        self._eject(games[invalid & playing], seats[invalid & playing])
+        self._enact_feedings(turn, feedings, playing & ~invalid)
+        leaving = playing & (invalid | (feedings.kind == FEED_NONE) | (feedings.kind == CANNOT_FEED))
+        self.in_ring[games[leaving], seats[leaving]] = False
+        self.current[games[playing]] = self._next_in_ring(games[playing], seats[playing])
+
+    def _valid_feedings(self, turn, feedings):
+        """ Check feedings as FeedingIntent.is_valid does, once they've been unrotated
+        :param turn: a FeedingTurn
+        :param feedings: a Feedings for the players of the turn
+        :return: Boolean array: is each feeding valid?
+        """
+        kind = feedings.kind
+        rows = np.arange(len(turn.games))
+        species = feedings.species
+        in_range = (species >= 0) & (species < turn.counts)
+        board = turn.boards[rows, np.clip(species, 0, turn.boards.shape[1] - 1)]
+        tokens = feedings.tokens
+        fat = (in_range & (tokens >= 1) & (turn.watering_hole >= tokens) & has(board[:, TRAITS], Trait.FAT_TISSUE) &
+               (board[:, FAT_FOOD] + tokens <= board[:, BODY]))
+        defending = np.clip(feedings.defending, 0, turn.rest.shape[1] - 1)
+        attack = (in_range & (feedings.defending < (turn.rest >= 0).sum(axis=1)) & (feedings.defender >= 0) &
+                  (feedings.defender < turn.other_counts[rows, defending]))
+        return ((kind == FEED_NONE) | (kind == NO_FEEDING) | ((kind == STORE_FAT) & fat) |
+                ((kind == FEED_VEGETARIAN) & in_range) | ((kind == FEED_CARNIVORE) & attack))
+
+    def _enact_feedings(self, turn, feedings, selected):
+        """ Carry out feedings, as the FeedingIntents' enact methods do
+        :param turn: a FeedingTurn
+        :param feedings: a Feedings for the players of the turn
+        :param selected: Boolean array of the feedings to carry out
+        """
+        games, seats, kind, species = turn.games, turn.seats, feedings.kind, feedings.species
+
+        store = selected & (kind == STORE_FAT)
+        self.boards[games[store], seats[store], species[store], FAT_FOOD] += feedings.tokens[store]
+        self.watering_hole[games[store]] -= feedings.tokens[store]
+
+        attack = selected & (kind == FEED_CARNIVORE)
+        rows = np.flatnonzero(attack)
+        defending = turn.rest[rows, feedings.defending[rows]]
+        defender = feedings.defender[rows]
+        attacker = species[rows]
+        attacked, attacking = games[rows], seats[rows]
+        horns = has(self.boards[attacked, defending, defender, TRAITS], Trait.HORNS)
+        self._shrink(attacked, defending, defender, 1)
+        self._shrink(attacked, attacking, attacker, horns)
+        dead = self.boards[attacked, defending, defender, POPULATION] == 0
+        self._kill(attacked[dead], defending[dead], defender[dead])
+        dead = self.boards[attacked, attacking, attacker, POPULATION] == 0
+        self._kill(attacked[dead], attacking[dead], attacker[dead])
+        attack[rows[dead]] = False
+
+        fed = attack | (selected & (kind == FEED_VEGETARIAN))
+        if fed.any():
+            self._feed_creature(games[fed], seats[fed], species[fed], scavenge=attack[fed])
+
+    def _shrink(self, games, seats, slots, by):
+        """ Lower the population of species, and their food with it
+        :param games: Integer array of game indices
+        :param seats: Integer array of seats
+        :param slots: Integer array of species positions
+        :param by: Integer or Integer array
+        """
+        species = self.boards[games, seats, slots]
+        population = species[:, POPULATION] - by
+        self.boards[games, seats, slots, POPULATION] = population
+        self.boards[games, seats, slots, FOOD] = np.minimum(species[:, FOOD], population)
+
+    def _feed_one_creature(self, games, seats, slots):
+        """ Move as much food as each species can eat in one feeding from its watering hole onto it. Each game may
+        appear only once.
+        :param games: Integer array of game indices
+        :param seats: Integer array of seats
+        :param slots: Integer array of species positions
+        :return: Integer array of the tokens fed to each species
+        """
+        species = self.boards[games, seats, slots]
+        population, food = species[:, POPULATION], species[:, FOOD]
+        watering_hole = self.watering_hole[games]
+        amount = np.minimum(np.minimum(1 + has(species[:, TRAITS], Trait.FORAGING), watering_hole), population - food)
+        amount = np.where((food < population) & (watering_hole > 0), amount, 0)
+        self.boards[games, seats, slots, FOOD] = food + amount
+        self.watering_hole[games] = watering_hole - amount
+        return amount
+
+    def _feed_creature(self, games, seats, slots, scavenge=None):
+        """ Feed species, pass food along their Cooperation chains and, for those given as scavenging, to the
+        Scavengers in seat order, as Dealer.feed_creature does. Each game may appear only once.
+        :param games: Integer array of game indices
+        :param seats: Integer array of seats
+        :param slots: Integer array of species positions
+        :param scavenge: Boolean array: should the Scavengers eat if the species does? None for never.
+        """
+        fed = self._feed_one_creature(games, seats, slots)
+        going = fed > 0
+        games, seats, slots, fed = games[going], seats[going], slots[going], fed[going]
+        if not len(games):
+            return
+        count = len(games)
+        width = self.boards.shape[2]
+        # Each game's stack of (seat, species position, count): the same as Dealer.feed_creature's pending
+        stack = np.zeros((count, (self.player_count + 1) * width + 1, 3), dtype=np.int64)
+        depth = np.zeros(count, dtype=np.int64)
+        rows = np.arange(count)
+        if scavenge is not None and scavenge[going].any():
+            order = (seats[:, None] + np.arange(self.player_count)) % self.player_count
+            column = games[:, None]
+            scavengers = (has(self.boards[column, order, :, TRAITS], Trait.SCAVENGER) &
+                          self.in_game[column, order][..., None] &
+                          (np.arange(width) < self.species_count[column, order][..., None]) &
+                          scavenge[going][:, None, None])
+            row, turn, slot = np.nonzero(scavengers)
+            total = scavengers.sum(axis=(1, 2))
+            before = np.cumsum(total) - total
+            # The first Scavenger goes on top of the stack
+            place = total[row] - 1 - (np.arange(len(row)) - before[row])
+            stack[row, place] = np.stack([order[row, turn], slot, np.ones(len(row), dtype=np.int64)], axis=1)
+            depth = total
+        self._pass_right(stack, depth, rows, games, seats, slots, fed)
+        while True:
+            live = np.flatnonzero((depth > 0) & (self.watering_hole[games] > 0))
+            if not len(live):
+                return
+            top = depth[live] - 1
+            task = stack[live, top]
+            remaining = task[:, 2] - 1
+            stack[live, top, 2] = remaining
+            fed = self._feed_one_creature(games[live], task[:, 0], task[:, 1])
+            # Done with it once it's been fed enough, or once it's full
+            depth[live] -= (remaining == 0) | (fed == 0)
+            self._pass_right(stack, depth, live, games[live], task[:, 0], task[:, 1], fed)
+
+    def _pass_right(self, stack, depth, rows, games, seats, slots, tokens):
+        """ Push feeding each species's right-hand neighbor onto a stack, where it passes food on through
+        Cooperation and was just fed, as Dealer._pass_right does
+        :param stack: Integer array of stacks being worked through by _feed_creature
+        :param depth: Integer array of the depth of each stack
+        :param rows: Integer array of the stacks to push onto
+        :param games: Integer array of game indices
+        :param seats: Integer array of seats
+        :param slots: Integer array of the species positions that were just fed
+        :param tokens: Integer array of the tokens each was just fed
+        """
+        right = slots + 1
+        neighbor = self.boards[games, seats, np.minimum(right, self.boards.shape[2] - 1)]
+        passes = ((tokens > 0) & has(self.boards[games, seats, slots, TRAITS], Trait.COOPERATION) &
+                  (right < self.species_count[games, seats]) & (neighbor[:, FOOD] < neighbor[:, POPULATION]))
+        rows = rows[passes]
+        stack[rows, depth[rows]] = np.stack([seats[passes], right[passes], tokens[passes]], axis=1)
+        depth[rows] += 1
+
+    # Starving, killing and scoring
+
+    def _starve(self, games):
+        """ Shrink every species to the food it has, kill those left with none, and move food to the bags, as
+        Player.starve_creatures and Player.move_tokens_to_bag do
+        :param games: Integer array of game indices
+        """
+        boards = self.boards[games]
+        boards[..., POPULATION] = np.minimum(boards[..., POPULATION], boards[..., FOOD])
+        self.boards[games] = boards
+        width = np.arange(self.boards.shape[2])
+        for seat in range(self.player_count):
+            while True:
+                dead = ((self.boards[games, seat, :, POPULATION] <= 0) &
+                        (width < self.species_count[games, seat][:, None]))
+                dying = dead.any(axis=1)
+                if not dying.any():
+                    break
+                self._kill(games[dying], np.full(dying.sum(), seat), first(dead[dying]))
+        self.bag[games] += self.boards[games, :, :, FOOD].sum(axis=2)
+        self.boards[games, :, :, FOOD] = 0
+
+    def _kill(self, games, seats, slots):
+        """ Remove species and deal their players replacement cards, as Dealer.kill_creature does. Each game may
+        appear only once.
+        :param games: Integer array of game indices
+        :param seats: Integer array of seats
+        :param slots: Integer array of species positions
+        """
+        if not len(games):
+            return
+        boards = self.boards[games, seats]
+        width = boards.shape[1]
+        source = np.arange(width) + (np.arange(width) >= slots[:, None])
+        boards = np.take_along_axis(boards, np.minimum(source, width - 1)[..., None], axis=1)
+        boards[source >= width] = 0
+        self.boards[games, seats] = boards
+        self.species_count[games, seats] -= 1
+        cards = self._deal(games, np.full(len(games), DEAD_CREATURE_REPLACEMENT_CARDS))
+        self._add_cards(games, seats, cards, in_front=True)
+
+    def _eject(self, games, seats):
+        """ Take players out of the game
+        :param games: Integer array of game indices
+        :param seats: Integer array of seats
+        """
+        self.in_game[games, seats] = False
+        self.in_ring[games, seats] = False
+        self.boards[games, seats] = 0
+        self.species_count[games, seats] = 0
+        self.hand[games, seats] = -1
+        self.hand_size[games, seats] = 0
+
+    def scores(self, game, handshake=""):
+        """ Get the scores for a game, as Dealer.get_scores does
+        :param game: Integer game index
+        :param handshake: the String every player gave as its handshake
+        :return: a List of (Integer score, Integer player id, String handshake), highest first
+        """
+        boards = self.boards[game]
+        scores = self.bag[game] + boards[..., POPULATION].sum(axis=1) + TRAIT_COUNT[boards[..., TRAITS]].sum(axis=1)
+        results = [(int(scores[seat]), seat + 1, handshake) for seat in np.flatnonzero(self.in_game[game])]
+        results.sort(reverse=True)
+        return results
+
+    def dealer(self, game):
+        """ Make a Dealer with the state of a game
+        :param game: Integer game index
+        :return: a Dealer, with a Player for each player still in the game
+        """
+        by_bit = {trait.bit: trait for trait in Trait}
+        players = []
+        for seat in np.flatnonzero(self.in_game[game]):
+            species = [Species(food=int(board[FOOD]), body=int(board[BODY]), population=int(board[POPULATION]),
+                               traits=[by_bit[int(bit)] for bit in board[FIRST_TRAIT:] if bit],
+                               fat_food=int(board[FAT_FOOD]))
+                       for board in self.boards[game, seat, :self.species_count[game, seat]]]
+            cards = [CARDS[code] for code in self.hand[game, seat, :self.hand_size[game, seat]]]
+            players.append(Player(int(seat) + 1, species, int(self.bag[game, seat]), cards))
+        dealer = Dealer(players, int(self.watering_hole[game]),
+                        Deck.from_codes(int(code) for code in self.deck[game, self.cursor[game]:]))
+        dealer.starting_player = int(self.starting_player[game])
+        dealer.rounds = int(self.rounds[game])
+        return dealer
+
+    # Dealing cards and making room
+
+    def _deal(self, games, counts):
+        """ Take cards off the top of each game's deck. Each game may appear only once.
+        :param games: Integer array of game indices
+        :param counts: Integer array of the number of cards to deal in each game
+        :return: Integer array [n, max(counts)] of card codes in the order they were drawn, padded with -1 where
+        a game dealt fewer, as when its deck runs out
+        """
+        size = self.deck.shape[1]
+        top = self.cursor[games]
+        end = np.minimum(top + counts, size)
+        positions = top[:, None] + np.arange(int(counts.max(initial=0)))
+        dealt = positions < end[:, None]
+        self.cursor[games] = end
+        return np.where(dealt, self.deck[games[:, None], np.minimum(positions, size - 1)], -1)
+
+    def _add_cards(self, games, seats, cards, in_front=False):
+        """ Add cards to players' hands
+        :param games: Integer array of game indices
+        :param seats: Integer array of seats
+        :param cards: Integer array [n, k] of card codes, padded with -1 at the end
+        :param in_front: Boolean: put the cards before the cards already in the hand, rather than after them
+        """
+        added = (cards >= 0).sum(axis=1)
+        sizes = self.hand_size[games, seats]
+        self._reserve_hand(int((sizes + added).max(initial=0)))
+        rows, columns = np.nonzero(cards >= 0)
+        if in_front:
+            hands = self.hand[games, seats]
+            shifted = np.arange(hands.shape[1]) - added[:, None]
+            hands = np.where(shifted >= 0, np.take_along_axis(hands, np.maximum(shifted, 0), axis=1), -1)
+            hands[rows, columns] = cards[rows, columns]
+            self.hand[games, seats] = hands
+        else:
+            self.hand[games[rows], seats[rows], sizes[rows] + columns] = cards[rows, columns]
+        self.hand_size[games, seats] = sizes + added
+
+    def _remove_cards(self, games, seats, used):
+        """ Remove cards from players' hands, keeping the rest in order
+        :param games: Integer array of game indices
+        :param seats: Integer array of seats
+        :param used: Boolean array [n, H] of the positions of the cards to remove
+        """
+        hands = self.hand[games, seats]
+        kept = (hands >= 0) & ~used
+        order = np.argsort(~kept, axis=1, kind="stable")
+        self.hand[games, seats] = np.where(np.take_along_axis(kept, order, axis=1),
+                                           np.take_along_axis(hands, order, axis=1), -1)
+        self.hand_size[games, seats] = kept.sum(axis=1)
+
+    def _reserve_hand(self, size):
+        """ Make sure every hand has room for the given number of cards
+        :param size: Integer
+        """
+        if size > self.hand.shape[2]:
+            extra = max(size, 2 * self.hand.shape[2]) - self.hand.shape[2]
+            self.hand = np.pad(self.hand, ((0, 0), (0, 0), (0, extra)), constant_values=-1)
+
+    def _reserve_boards(self, size):
+        """ Make sure every player has room for the given number of boards
+        :param size: Integer
+        """
+        if size > self.boards.shape[2]:
+            extra = max(size, 2 * self.boards.shape[2]) - self.boards.shape[2]
+            self.boards = np.pad(self.boards, ((0, 0), (0, 0), (0, extra), (0, 0)))
+
+
+def simulate_lockstep(games, player_count, first_seed=0, handshake="hi", policy=None, on_result=None):
+    """ Play a batch of seeded games in lockstep and aggregate the results, as simulate.simulate does
+    :param games: Natural number of games to play
+    :param player_count: an Integer between MIN_PLAYERS and MAX_PLAYERS
+    :param first_seed: the Integer seed of the first game; game i is seeded with first_seed + i
+    :param handshake: the String handshake given for every player
+    :param policy: a BatchPolicy, or None for SillyPolicy
+    :param on_result: optionally, a function called with each GameResult once every game is over
+    :return: a BatchSummary. The wall time of each game is its share of the whole batch's.
+    Note: raises a RuntimeError if any game fails, as Dealer.play_game would raise for that game
+    """
+    if not MIN_PLAYERS <= player_count <= MAX_PLAYERS:
+        raise ValueError("A game needs between " + str(MIN_PLAYERS) + " and " + str(MAX_PLAYERS) + " players")
+    seeds = list(range(first_seed, first_seed + games))
+    start = time.perf_counter()
+    batch = LockstepGames.seeded(seeds, player_count, policy)
+    batch.play()
+    elapsed = time.perf_counter() - start
+    if batch.failed.any():
+        raise RuntimeError("games with seeds " + str([seeds[i] for i in np.flatnonzero(batch.failed)]) + " failed")
+    summary = BatchSummary()
+    for game, seed in enumerate(seeds):
+        result = GameResult(seed, batch.scores(game, handshake), int(batch.rounds[game]), elapsed / games)
+        summary.add(result)
+        if on_result:
+            on_result(result)
+    summary.wall_time = elapsed
+    return summary
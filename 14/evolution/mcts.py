@@ -0,0 +1,285 @@
+"""
+
+A player that chooses its feedings by flat Monte Carlo search over the rest of the feeding phase. Only the searching
+player's next feeding is searched: it's chosen by UCB1, as a multi-armed bandit, and the rest of the feeding phase is
+played out by a rollout policy. No tree is grown below that first feeding, as the other players' feedings and the
+searching player's later ones are left to the rollouts.
+
+"""
+import math
+import multiprocessing
+import random
+import time
+
+from .dealer import Dealer
+from .debug import TRACER, DEBUG
+from .feeding_intent import FeedNone, StoreFat, FeedVegetarian, FeedCarnivore
+from .player import ExternalPlayer
+from .trait import Trait
+
+# Seconds a search may take. The dealer waits 5 seconds for a response, which has to cover the search, handing
+# work to the pool and collecting it, and the trip over the network.
+DEFAULT_TIME_BUDGET = 2.0
+# Seconds past the budget to wait for the pool before giving up on it and answering with the silly strategy
+POOL_GRACE = 1.0
+# UCB1 exploration constant; rewards are between 0 and 1
+EXPLORATION = math.sqrt(2)
+# Chance that a player in a rollout makes a random feeding rather than the silly one
+RANDOM_MOVE_CHANCE = 0.25
+
+
+def legal_feedings(player, others, watering_hole):
+    """ Every feeding the player may make, other than not feeding at all
+    :param player: a Player
+    :param others: a List of the other Players, in turn order after the player
+    :param watering_hole: Integer number of food tokens in the watering hole
+    :return: a List of FeedingIntent, whose player indices count from the player after this one
+    """
+    if not watering_hole:
+        return []
+    feedings = []
+    for index, species in enumerate(player.species):
+        if species.has_trait(Trait.FAT_TISSUE) and species.fat_food < species.body:
+            feedings.append(StoreFat(index, min(species.body - species.fat_food, watering_hole)))
+        if not species.is_hungry():
+            continue
+        if not species.has_trait(Trait.CARNIVORE):
+            feedings.append(FeedVegetarian(index))
+            continue
+        for defending_index, defending in enumerate(others):
+            for defender in defending.get_attackable_species(species):
+                feedings.append(FeedCarnivore(index, defending_index, defending.species.index(defender)))
+    return feedings
+
+
+def rollout_feeding(player, others, watering_hole, rng):
+    """ The rollout policy: usually the silly strategy, sometimes a random legal feeding
+    :param player: an ExternalPlayer
+    :param others: a List of the other Players, in turn order after the player
+    :param watering_hole: Integer number of food tokens in the watering hole
+    :param rng: a random.Random
+    :return: a FeedingIntent, or None if the player can't feed
+    """
+    if rng.random() < RANDOM_MOVE_CHANCE:
+        feedings = legal_feedings(player, others, watering_hole)
+        return rng.choice(feedings) if feedings else None
+    return player.next_species_to_feed(others, watering_hole)
+
+
+def projected_score(player):
+    """ The score the player will have once the feeding phase ends: fed food goes to the bag, and hungry species
+    starve down to the food they have.
+    :param player: a Player
+    :return: Integer
+    """
+    score = player.bag
+    for species in player.species:
+        if species.food:
+            score += 2 * species.food + species.trait_count()
+    return score
+
+
+class RootBandit:
+    """
+    Statistics for the feedings available to the searching player, which is the first player of the root Dealer.
+    Each feeding is chosen by UCB1, and everything after it is played out by rollout_feeding. Bandits from several
+    processes are combined by adding up their statistics.
+    """
+
+    def __init__(self, root, moves, seed=None):
+        """
+        :param root: a Dealer whose first player is about to feed; it is forked, never changed
+        :param moves: the List of FeedingIntent the first player can choose between
+        :param seed: an Integer seed for the rollouts, or None
+        """
+        self.root = root
+        self.moves = moves
+        self.visits = [0] * len(moves)
+        self.rewards = [0.0] * len(moves)
+        self.rng = random.Random(seed)
+
+    def select(self):
+        """ Choose which move to try next by UCB1, trying each move once first
+        :return: Integer index of a move
+        """
+        total = sum(self.visits)
+        best, best_value = 0, -1.0
+        for index, (visits, reward) in enumerate(zip(self.visits, self.rewards)):
+            if not visits:
+                return index
+            value = reward / visits + EXPLORATION * math.sqrt(math.log(total) / visits)
+            if value > best_value:
+                best, best_value = index, value
+        return best
+
+    def rollout(self, move):
+        """ Play out the rest of the feeding phase after the given move on a fork of the root
+        :param move: a FeedingIntent for the first player
+        :return: Float reward for the first player, between 0 and 1
+        """
+        dealer = self.root.fork()
+        players = dealer.players
+        count = len(players)
+        done = [False] * count
+        if move.should_end_feeding():
+            done[0] = True
+        else:
+            dealer.enact_feeding(0, move)
+        seat = 1 % count
+        while dealer.watering_hole and not all(done):
+            if not done[seat]:
+                player = players[seat]
+                intent = rollout_feeding(player, players[seat + 1:] + players[:seat], dealer.watering_hole, self.rng)
+                if intent is None or intent.should_end_feeding():
+                    done[seat] = True
+                else:
+                    dealer.enact_feeding(seat, intent)
+            seat = (seat + 1) % count
+        scores = [projected_score(player) for player in players]
+        best_other = max(scores[1:]) if count > 1 else 0
+        return scores[0] / (scores[0] + best_other) if scores[0] + best_other else 0.5
+
+    def search(self, deadline):
+        """ Run rollouts until the deadline
+        :param deadline: Float time.perf_counter() value to stop at
+        :return: Integer number of rollouts run
+        """
+        rollouts = 0
+        while not rollouts or time.perf_counter() < deadline:
+            index = self.select()
+            self.rewards[index] += self.rollout(self.moves[index])
+            self.visits[index] += 1
+            rollouts += 1
+        return rollouts
+
+
+def root_from_state(state):
+    """ Build the Dealer a search starts from
+    :param state: a State with others, as sent to feed_species
+    :return: (Dealer whose first player is the searching player, List of FeedingIntent it can choose between)
+    """
+    me = ExternalPlayer(0)
+    watering_hole, others = me.rehydrate_from_state_with_others(state)
+    players = [me]
+    for index, other in enumerate(others, start=1):
+        player = ExternalPlayer(index)
+        player.species = other.species
+        players.append(player)
+    moves = [FeedNone()] + legal_feedings(me, players[1:], watering_hole)
+    return Dealer(players, watering_hole), moves
+
+
+def _search_job(job):
+    """ Worker entry point: search from a state until a deadline
+    :param job: a Tuple of (State, Float seconds to search for, Integer seed)
+    :return: (List of Integer visits, List of Float rewards, Integer rollouts), one entry per move
+    """
+    state, budget, seed = job
+    deadline = time.perf_counter() + budget
+    root, moves = root_from_state(state)
+    bandit = RootBandit(root, moves, seed)
+    rollouts = bandit.search(deadline)
+    return bandit.visits, bandit.rewards, rollouts
+
+
+class MCTSPlayer(ExternalPlayer):
+    """
+    A player agent that chooses cards by the silly strategy and feedings by flat Monte Carlo search, with rollouts
+    spread across a pool of processes. It keeps count of how many rollouts it has run and how long it has spent.
+    The pool is started with the player, so that starting it never counts against the time to answer the dealer. A
+    search that gives up waiting for the pool leaves it be, and feedings are searched in this process until the next
+    round starts and the pool is replaced.
+    """
+
+    def __init__(self, player_id, time_budget=DEFAULT_TIME_BUDGET, processes=None, seed=None):
+        """
+        :param player_id: id of the player as a Natural number greater than 0
+        :param time_budget: Float seconds to spend on each feeding
+        :param processes: Integer number of processes to search in; None uses every core, and 1 searches in this
+        process without a pool
+        :param seed: an Integer seed for the rollouts, or None
+        """
+        super().__init__(player_id)
+        self.time_budget = time_budget
+        self.processes = processes or multiprocessing.cpu_count()
+        self.rng = random.Random(seed)
+        self.pool = None
+        # Whether a search gave up waiting for the pool, which may still be busy with its jobs
+        self.pool_late = False
+        self.rollouts = 0
+        self.search_time = 0.0
+        self.open_pool()
+
+    def start(self, msg):
+        """ Update internal state for the new round, and replace the pool if a search gave up on it
+        :param msg: a JSON message with a State without others, as described in the spec
+        """
+        super().start(msg)
+        self.open_pool()
+
+    def open_pool(self):
+        """ Start the process pool if this player searches across one and has none it can use
+        """
+        if self.processes > 1 and (self.pool is None or self.pool_late):
+            self.close()
+            self.pool = multiprocessing.Pool(self.processes)
+
+    def feed_species(self, state):
+        """ Choose a feeding by searching from the given state
+        :param state: a State
+        :return: A JSON representation of the chosen FeedingIntent
+        Note: Given an improper input, this function will raise a ValueError.
+        """
+        watering_hole, others = self.rehydrate_from_state_with_others(state)
+        moves = [FeedNone()] + legal_feedings(self, others, watering_hole)
+        if len(moves) == 1:
+            return moves[0].serialize()
+        start = time.perf_counter()
+        visits, rewards, rollouts = self.search(state, len(moves))
+        self.rollouts += rollouts
+        self.search_time += time.perf_counter() - start
+        if not rollouts:
+            return (self.next_species_to_feed(others, watering_hole) or FeedNone()).serialize()
+        chosen = max(range(len(moves)), key=lambda index: (visits[index], rewards[index]))
+        if TRACER.level >= DEBUG:
+            TRACER.emit(DEBUG, "search", player_id=self.player_id, moves=len(moves), rollouts=rollouts,
+                        rollouts_per_second=rollouts / (time.perf_counter() - start),
+                        chosen=moves[chosen].serialize())
+        return moves[chosen].serialize()
+
+    def search(self, state, move_count):
+        """ Search from the given state across the pool, or in this process if there's no pool it can use
+        :param state: a State with others
+        :param move_count: Integer number of moves available from the state
+        :return: (List of Integer visits, List of Float rewards, Integer rollouts), one entry per move. The rollouts
+        are 0 if the pool didn't answer in time.
+        """
+        jobs = [(state, self.time_budget, self.rng.getrandbits(32)) for _ in range(self.processes)]
+        if self.pool is None or self.pool_late:
+            return _search_job(jobs[0])
+        visits, rewards, rollouts = [0] * move_count, [0.0] * move_count, 0
+        try:
+            results = self.pool.map_async(_search_job, jobs).get(self.time_budget + POOL_GRACE)
+        except multiprocessing.TimeoutError:
+            # The pool is still busy with the late jobs; it's replaced when the next round starts
+            self.pool_late = True
+            return visits, rewards, 0
+        for job_visits, job_rewards, job_rollouts in results:
+            visits = [a + b for a, b in zip(visits, job_visits)]
+            rewards = [a + b for a, b in zip(rewards, job_rewards)]
+            rollouts += job_rollouts
+        return visits, rewards, rollouts
+
+    def rollouts_per_second(self):
+        """
+        :return: Float number of rollouts run per second of searching, over every search so far
+        """
+        return self.rollouts / self.search_time if self.search_time else 0.0
+
+    def close(self):
+        """ Shut down the process pool, if there is one
+        """
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+        self.pool_late = False
@@ -0,0 +1,283 @@
+"""
+
+A registry of metrics for games: the time spent in each phase, counts of what happened, and histograms of how long
+each player took to answer. A Dealer given a Metrics records into it as it plays; a Dealer without one checks once per
+phase and does nothing else. Registries from many games can be merged, and any registry can be exported as JSON.
+
+"""
+import bisect
+import contextlib
+import time
+from collections import Counter
+
+# Timers, one for each phase of a round
+DEAL = "deal"
+CHOOSE = "choose"
+APPLY_ACTIONS = "apply_actions"
+AUTOFEED = "autofeed"
+FEEDING = "feeding"
+PHASES = [DEAL, CHOOSE, APPLY_ACTIONS, AUTOFEED, FEEDING]
+
+# Counters
+GAMES = "games"
+ROUNDS = "rounds"
+FEED_TURNS = "feed_turns"
+ATTACKS = "attacks"
+KILLS = "kills"
+# Players removed from a game, each for a response that was malformed, failed, arrived late or broke the rules
+EJECTIONS = "ejections"
+# Players' choices of actions rejected for any reason, the sum of the rejected_ counters. A choice that failed or
+# arrived late is rejected as malformed, as the Dealer can't tell it from one that was; unlike EJECTIONS, this doesn't
+# count players removed while feeding.
+INVALID_RESPONSES = "invalid_responses"
+CARDS_DEALT = "cards_dealt"
+# Prefix of the counters of players' choices rejected before they were applied, one for each reason an Action4 is
+# rejected; rejected gives the name of each
+REJECTED = "rejected_"
+
+# Histograms, kept for each player
+RESPONSE_SECONDS = "response_seconds"
+# Upper bounds in seconds of the buckets that response times are counted in. A last bucket counts everything slower.
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def rejected(rejection):
+    """
+    :param rejection: an action4.Rejection
+    :return: the String name of the counter of choices rejected for that reason, e.g. rejected_duplicate_card
+    """
+    return REJECTED + rejection.value.replace("-", "_")
+
+
+class Histogram:
+    """ Counts of values in fixed buckets, with their sum """
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        """
+        :param bounds: a sorted Tuple of the Float upper bound of each bucket
+        """
+        self.bounds = bounds
+        # One count for each bound, of values at most that bound and above the one before, and one for the rest
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        """
+        :param value: a Number to count
+        """
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def merge(self, other):
+        """ Add another Histogram's counts to this one's
+        :param other: a Histogram with the same bounds
+        """
+        self.counts = [mine + theirs for mine, theirs in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+
+    def quantile(self, fraction):
+        """
+        :param fraction: Float between 0 and 1, e.g. 0.99 for the 99th percentile
+        :return: the quantile, interpolated linearly between the bounds of the bucket that holds it as though the
+        values in it were spread evenly, which is infinite if it's the last bucket, or None if nothing has been counted
+        """
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            if count and seen + count >= rank:
+                if bound == float("inf"):
+                    return bound
+                return lower + (bound - lower) * (rank - seen) / count
+            seen += count
+            lower = bound
+
+    def serialize(self):
+        """
+        :return: a python-encoded JSON Object of the count and sum, approximate quantiles, and the count in each
+        bucket by upper bound, with null for the last
+        """
+        p50, p99 = self.quantile(0.5), self.quantile(0.99)
+        return {"count": self.count, "sum": self.total,
+                "p50": p50 if p50 != float("inf") else None, "p99": p99 if p99 != float("inf") else None,
+                "buckets": [[bound, count] for bound, count in zip(list(self.bounds) + [None], self.counts)]}
+
+
+class Metrics:
+    """
+    Timers, counters and histograms by name. A Metrics is changed by one thread at a time, as a Dealer playing its
+    game does; to collect metrics from games played at once, give each game its own and merge them as they end.
+    To read a game's Metrics from another thread while the game is still recording into it, give it a lock: it holds
+    the lock while it records, and while it's merged into another Metrics.
+    """
+
+    def __init__(self, lock=None):
+        """
+        :param lock: a threading.Lock, or None for a Metrics only one thread uses
+        """
+        self.lock = lock if lock is not None else contextlib.nullcontext()
+        # Maps each timer's name to [Float seconds, Integer times timed]
+        self.timers = {}
+        self.counters = Counter()
+        # Maps each histogram's name to a Dictionary of a Histogram for each label
+        self.histograms = {}
+
+    def timed(self, name, step, *args):
+        """ Call a function and add the time it takes to a timer, on the monotonic performance counter
+        :param name: String name of the timer
+        :param step: a function
+        :param args: the arguments to call it with
+        :return: what the function returns
+        """
+        start = time.perf_counter()
+        try:
+            return step(*args)
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name, seconds):
+        """
+        :param name: String name of a timer
+        :param seconds: Float seconds to add to it
+        """
+        with self.lock:
+            timer = self.timers.get(name)
+            if timer is None:
+                self.timers[name] = [seconds, 1]
+            else:
+                timer[0] += seconds
+                timer[1] += 1
+
+    def count(self, name, amount=1):
+        """
+        :param name: String name of a counter
+        :param amount: Integer to add to it
+        """
+        with self.lock:
+            self.counters[name] += amount
+
+    def histogram(self, name, label):
+        """
+        :param name: String name of a histogram
+        :param label: the String label, e.g. a player id, of the histogram to get
+        :return: the Histogram, made if it doesn't exist yet
+        """
+        with self.lock:
+            labelled = self.histograms.setdefault(name, {})
+            if label not in labelled:
+                labelled[label] = Histogram()
+            return labelled[label]
+
+    def agent(self, agent, player_id):
+        """
+        :param agent: an ExternalPlayer, or anything that follows its interface
+        :param player_id: Integer id of the player the agent acts for
+        :return: a TimedAgent that counts how long the agent takes to answer in this Metrics
+        """
+        return TimedAgent(agent, self.histogram(RESPONSE_SECONDS, str(player_id)), self.lock)
+
+    def merge(self, other):
+        """ Add another Metrics to this one, holding the other's lock while it's read
+        :param other: a Metrics
+        """
+        with other.lock:
+            for name, (seconds, times) in other.timers.items():
+                timer = self.timers.setdefault(name, [0.0, 0])
+                timer[0] += seconds
+                timer[1] += times
+            self.counters.update(other.counters)
+            for name, labelled in other.histograms.items():
+                for label, histogram in labelled.items():
+                    self.histogram(name, label).merge(histogram)
+
+    def responses(self):
+        """
+        :return: a Histogram of every player's response times together
+        """
+        responses = Histogram()
+        with self.lock:
+            for histogram in self.histograms.get(RESPONSE_SECONDS, {}).values():
+                responses.merge(histogram)
+        return responses
+
+    def waiting(self):
+        """
+        :return: Float seconds spent waiting for players to answer, across every player
+        """
+        return sum(histogram.total for histogram in self.histograms.get(RESPONSE_SECONDS, {}).values())
+
+    def serialize(self):
+        """
+        :return: a python-encoded JSON Object of the seconds and times each timer was timed, every counter, every
+        histogram by label, and the seconds spent waiting for players
+        """
+        return {"timers": {name: {"seconds": seconds, "count": times} for name, (seconds, times) in
+                           sorted(self.timers.items())},
+                "counters": dict(sorted(self.counters.items())),
+                "histograms": {name: {label: histogram.serialize() for label, histogram in sorted(labelled.items())}
+                               for name, labelled in sorted(self.histograms.items())},
+                "waiting_seconds": self.waiting()}
+
+
+class TimedAgent:
+    """
+    Stands in for a player's agent, passing every message on to it and timing how long each request takes to be
+    answered. It has send_choose, receive_choice, game_over and jsock only if the agent does, so that the Dealer, and
+    whatever looks at the Dealer's players after the game, treats it as it would the agent.
+    """
+
+    def __init__(self, agent, histogram, lock=None):
+        """
+        :param agent: an ExternalPlayer, or anything that follows its interface
+        :param histogram: the Histogram to count response times in
+        :param lock: the lock of the Metrics the Histogram belongs to, or None if it has none
+        """
+        self.agent = agent
+        self.histogram = histogram
+        self.lock = lock if lock is not None else contextlib.nullcontext()
+        # time.perf_counter() value the last choose request was sent at
+        self.sent = None
+        if hasattr(agent, "send_choose"):
+            self.send_choose = self._send_choose
+            self.receive_choice = self._receive_choice
+        if hasattr(agent, "game_over"):
+            self.game_over = agent.game_over
+        if hasattr(agent, "jsock"):
+            # A ProxyPlayer's connection, which is kept open after the game if its client asked to stay
+            self.jsock = agent.jsock
+
+    def observe(self, seconds):
+        with self.lock:
+            self.histogram.observe(seconds)
+
+    def start(self, msg):
+        self.agent.start(msg)
+
+    def choose(self, before, after):
+        start = time.perf_counter()
+        try:
+            return self.agent.choose(before, after)
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def _send_choose(self, before, after):
+        self.sent = time.perf_counter()
+        self.agent.send_choose(before, after)
+
+    def _receive_choice(self, deadline=None):
+        try:
+            return self.agent.receive_choice(deadline)
+        finally:
+            self.observe(time.perf_counter() - self.sent)
+
+    def feed_species(self, state):
+        start = time.perf_counter()
+        try:
+            return self.agent.feed_species(state)
+        finally:
+            self.observe(time.perf_counter() - start)
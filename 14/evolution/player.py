@@ -6,6 +6,8 @@ from .species import Species
 from .feeding_intent import FeedNone, StoreFat, FeedVegetarian, FeedCarnivore, CannotFeed, FeedingIntent
 from .traitcard import TraitCard
 from .action4 import Action4
+from .attack_index import AttackIndex
+from .versioned import versioned_attribute, versioned_list_attribute
 from .action import *
 from .debug import *
 
@@ -15,6 +17,16 @@ CARDS_JSON_NAME = "cards"
 
 
 class Player:
+    """
+    A player's boards, bag and hand. Every change to a Player's id, bag, species or cards, including changes made to
+    the species or cards lists in place, increments its version. Serialized forms are reused until either the version
+    or the version of one of its species changes.
+    """
+    player_id = versioned_attribute("player_id")
+    species = versioned_list_attribute("species", "The List of this Player's Species, from left to right")
+    bag = versioned_attribute("bag")
+    cards = versioned_list_attribute("cards", "The List of TraitCards in this Player's hand")
+
     def __init__(self, player_id, species=None, bag=DEFAULT_BAG_VALUE, cards=None):
         """ Initialize a new Player
         :param player_id: id of the player as a Natural number greater than 0
@@ -22,24 +34,84 @@ class Player:
         :param bag: number of food tokens in the bag
         :param cards: a list of TraitCards that form the player's hand
         """
+        self.version = 0
+        # Maps the name of a serialized form to (the key it was made for, the form)
+        self._serialized = {}
+        # Species this Player shares with a fork, which must be copied before they're changed
+        self._shared_species = set()
         self.player_id = player_id
         self.species = species or []
         self.bag = bag
         self.cards = cards or []
 
+    def fork(self):
+        """ Make a copy-on-write clone of this Player. The clone has its own lists of species and cards, but shares
+        the Species themselves with this Player; call own_species before changing one.
+        :return: a Player of the same class
+        """
+        clone = self.__class__.__new__(self.__class__)
+        clone.__dict__.update(self.__dict__)
+        clone.species = self.species
+        clone.cards = self.cards
+        clone.version = self.version
+        clone._serialized = dict(self._serialized)
+        clone._shared_species = set(self.species)
+        self._shared_species.update(clone._shared_species)
+        return clone
+
+    def own_species(self, species_index):
+        """ Make sure the species at the given index belongs to this Player alone, copying it if it's shared
+        :param species_index: Integer index of a Species on this Player
+        :return: the Species now at that index
+        """
+        species = self.species[species_index]
+        if species in self._shared_species:
+            self._shared_species.discard(species)
+            species = species.fork()
+            self.species[species_index] = species
+        return species
+
+    def _cached(self, name, key, produce):
+        """ Get a serialized form of this Player, producing it only if the key has changed since it was last made
+        :param name: String naming the serialized form
+        :param key: any value that changes whenever the serialized form would
+        :param produce: function of no arguments producing the serialized form
+        :return: the serialized form. It is shared with other callers and must not be modified.
+        """
+        cached = self._serialized.get(name)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        data = produce()
+        self._serialized[name] = (key, data)
+        return data
+
+    def _species_key(self):
+        """
+        :return: a value that changes whenever this Player or any of its species changes
+        """
+        return self.version, [species.version for species in self.species]
+
     def serialize(self):
         """ Returns a serialized version of the Player
-        :return: serialized version of the Player
+        :return: serialized version of the Player. It is shared with other callers and must not be modified.
         """
-        serialized = [
-            ["id", self.player_id],
-            ["species", [species.serialize() for species in self.species]],
-            [BAG_JSON_NAME, self.bag],
-        ]
+        def produce():
+            serialized = [
+                ["id", self.player_id],
+                ["species", self.serialize_species()],
+                [BAG_JSON_NAME, self.bag],
+            ]
 
-        if self.cards:
-            serialized.append([CARDS_JSON_NAME, [card.serialize() for card in self.cards]])
-        return serialized
+            if self.cards:
+                serialized.append([CARDS_JSON_NAME, self.serialize_cards()])
+            return serialized
+        return self._cached("player", self._species_key(), produce)
+
+    def serialize_cards(self):
+        """ Serialize the cards in this Player's hand
+        :return: python-encoded JSON Array of TraitCards. It is shared with other callers and must not be modified.
+        """
+        return self._cached("cards", self.version, lambda: [card.serialize() for card in self.cards])
 
     def produce_state(self, watering_hole, others=None):
         """ Given a Watering Hole and a list of other players, serializes this Player to a State, as described in the spec
@@ -50,8 +122,8 @@ class Player:
         :return: a Python-encoded JSON Array that encodes the structure of a State
         """
         serialized = [self.bag,
-                      [species.serialize() for species in self.species],
-                      [card.serialize() for card in self.cards]]
+                      self.serialize_species(),
+                      self.serialize_cards()]
         if others is not None:
             serialized.append(watering_hole)
             serialized.append([p.serialize_species() for p in others])
@@ -129,9 +201,10 @@ class Player:
 
     def serialize_species(self):
         """ Serialize all species on this player
-        :return: python-encoded JSON Array representing a list of Species
+        :return: python-encoded JSON Array representing a list of Species. It is shared with other callers and
+        must not be modified.
         """
-        return [s.serialize() for s in self.species]
+        return self._cached("species", self._species_key(), lambda: [s.serialize() for s in self.species])
 
     @classmethod
     def deserialize_species(cls, data):
@@ -233,16 +306,33 @@ class Player:
 
         return left, right
 
+    def cooperation_chain(self, species_index):
+        """ The species fed when the species at the given index is: itself, and every species food passes on to
+        through Cooperation
+        :param species_index: Integer index of a Species on this Player
+        :return: a range of Integer indices
+        """
+        end = species_index
+        while end < len(self.species) - 1 and self.species[end].has_trait(Trait.COOPERATION):
+            end += 1
+        return range(species_index, end + 1)
+
+    def is_species_attackable(self, species_index, attacker):
+        """ Determines whether the species at the given index on this player is attackable by the given species.
+        :param species_index: Integer index of the defending Species
+        :param attacker: the attacking species
+        :return: Boolean
+        """
+        left = self.species[species_index - 1] if species_index > 0 else None
+        right = self.species[species_index + 1] if species_index < (len(self.species) - 1) else None
+        return self.species[species_index].is_attackable(attacker, left=left, right=right)
+
     def get_attackable_species(self, attacker):
         """ Returns all species owned by this player that are attackable by the given species.
         :param attacker: the attacking species
         :return: list of Species attackable by the attacker
         """
-        def is_attackable(species):
-            left, right = self.get_neighbors(species)
-            return species.is_attackable(attacker, left=left, right=right)
-
-        return [species for species in self.species if is_attackable(species)]
+        return [species for idx, species in enumerate(self.species) if self.is_species_attackable(idx, attacker)]
 
     def get_fat_or_hungry_species(self):
         """ Returns a dictionary of string->Array, where each array contains all species which, given the correct board
@@ -294,28 +384,76 @@ class InternalPlayer(Player):
         self.player_agent.start(self.produce_state(watering_hole))
 
     def request_actions(self, players):
-        """ Request an Action4 for this turn from the ExternalPlayer
+        """ Request an Action4 for this turn from the ExternalPlayer, and check that it can be carried out
+        :param players: A list of all player objects in this game.
+        :return: a new Action4, or None if the player's response was malformed or can't be carried out
+        """
+        actions = self.choose_actions(players)
+        if actions and actions.verify(self):
+            return actions
+        return None
+
+    def choose_actions(self, players):
+        """ Request an Action4 for this turn from the ExternalPlayer, without checking it against this Player
         :param players: A list of all player objects in this game.
-        :return: a new Action4
+        :return: a new Action4, or None if the player's response was malformed
+        """
+        try:
+            return Action4.deserialize(self.player_agent.choose(*self.choose_arguments(players)))
+        except ValueError:
+            return None
+
+    def choose_arguments(self, players):
+        """
+        :param players: A list of all player objects in this game.
+        :return: (List, List) of the species of the players before and after this one, as JSON
         """
         location = players.index(self)
         before = [player.serialize_species() for player in players[:location]]
         after = [player.serialize_species() for player in players[location+1:]]
+        return before, after
+
+    def send_choose(self, players):
+        """ Ask the ExternalPlayer for this turn's Action4 without waiting for the answer, if it can be asked that way.
+        Remote agents can be; the answer is then collected with receive_actions.
+        :param players: A list of all player objects in this game.
+        :return: Boolean indicating whether the request was sent; if not, ask with choose_actions instead
+        Note: This will raise a ValueError if the request couldn't be sent.
+        """
+        send = getattr(self.player_agent, "send_choose", None)
+        if send is None:
+            return False
+        send(*self.choose_arguments(players))
+        return True
+
+    def receive_actions(self, deadline):
+        """ Collect the answer to a request sent with send_choose, without checking it against this Player
+        :param deadline: a Deadline the answer must arrive by
+        :return: a new Action4, or None if the player's response was malformed or didn't arrive in time
+        """
         try:
-            actions = Action4.deserialize(self.player_agent.choose(before, after))
-            actions.verify(self)
-            return actions
+            return Action4.deserialize(self.player_agent.receive_choice(deadline))
         except ValueError:
             return None
 
-    def feed_next(self, watering_hole, players, index):
+    def game_over(self, scores):
+        """ Tell the ExternalPlayer the game is over, if it can be told
+        :param scores: a List of (Integer, Integer, String) of score, player id and handshake, as Dealer.get_scores
+        gives
+        """
+        announce = getattr(self.player_agent, "game_over", None)
+        if announce is not None:
+            announce(self.player_id, scores)
+
+    def feed_next(self, watering_hole, players, index, attack_index=None):
         """
         :param watering_hole: an Integer representing the food tokens in the Watering Hole
         :param players: other Players in the game, starting with the next one.
         :param index: where this player is located in the list. (TODO: Remove this necessity)
+        :param attack_index: an AttackIndex that is up to date with the given players, or None
         :return: a FeedingIntention, or None in the case of an invalid feeding
         """
-        feeding = self.automatically_choose_species_to_feed(players)
+        feeding = self.automatically_choose_species_to_feed(players, attack_index)
         if feeding:
             assert (feeding.is_valid(self, players, watering_hole))  # Should never fail, but if it does, we want to know before ship
             return feeding
@@ -332,15 +470,18 @@ class InternalPlayer(Player):
                 debug_traceback(e.__traceback__)
                 return None
 
-    def automatically_choose_species_to_feed(self, players):
+    def automatically_choose_species_to_feed(self, players, attack_index=None):
         """ If there's only one possibility, produce an intent that can be automatically carried out by the dealer.
         :param players: A list of all other players
+        :param attack_index: an AttackIndex that is up to date with the given players, or None to compute targets
         :return: An FeedingIntent or None, where None represents the situation where there are multiple options.
         """
         options = self.get_fat_or_hungry_species()
         fat, hungry_carnivores, hungry_veg = options["fat"], options["carn"], options["veg"]
 
-        carnivore_targets = [(player.get_attackable_species(candidate), player, candidate) for player in players for candidate in hungry_carnivores]
+        attack_index = attack_index or AttackIndex()
+        carnivore_targets = [(attack_index.attackable_species(player, candidate), player, candidate)
+                             for player in players for candidate in hungry_carnivores]
         if len(carnivore_targets) == 1 and len(carnivore_targets[0][0]) == 1 and not hungry_veg and not fat:
             attackable_species, player, candidate = carnivore_targets[0]
             return FeedCarnivore(self.species.index(carnivore_targets[0][2]),
@@ -361,7 +502,8 @@ class InternalPlayer(Player):
         for s in self.species:
             self.bag += s.food
             s.food = 0
-        debug("Score is " + str(self.bag) + " for player " + self.handshake, verbose=True)
+        if TRACER.level >= VERBOSE:
+            TRACER.emit(VERBOSE, "score", player_id=self.player_id, bag=self.bag, handshake=self.handshake)
 
     def starve_creatures(self, kill_species):
         """ Remove creatures with no food and move cards to this player's hand as appropriate.
@@ -422,10 +564,11 @@ class ExternalPlayer(Player):
         :param watering_hole: number of food tokens in the watering hole
         :return: FeedingIntention
         """
+        attack_index = AttackIndex()
         return (self.feed_fat_tissue(watering_hole) or
                 self.feed_vegetarian() or
-                self.feed_carnivore(players) or
-                self.feed_on_own())
+                self.feed_carnivore(players, attack_index) or
+                self.feed_on_own(attack_index))
 
     def feed_fat_tissue(self, watering_hole):
         """ Returns an intent to store the specified number of food tokens on the largest species with the "fat tissue"
@@ -453,7 +596,7 @@ class ExternalPlayer(Player):
             eater = self.order_species(vegetarians)[0]
             return FeedVegetarian(self.species.index(eater))
 
-    def feed_carnivore(self, players):
+    def feed_carnivore(self, players, attack_index=None):
         """ Finds the largest carnivore that can attack any of the given
          player's species and chooses the largest species to attack. Returns
          an intent to attack with the largest carnivore the largest species
@@ -463,13 +606,15 @@ class ExternalPlayer(Player):
          returns None.
 
         :param players: a List of the other players in the game
+        :param attack_index: an AttackIndex to look up targets in, or None to compute them
         :return: a FeedingIntent to attack or None
         """
         carnivores = self.get_fat_or_hungry_species()["carn"]
+        attack_index = attack_index or AttackIndex()
 
         eater_candidates = self.order_species(carnivores)
         for candidate in eater_candidates:
-            attackable_species = [player.get_attackable_species(candidate) for player in players]
+            attackable_species = [attack_index.attackable_species(player, candidate) for player in players]
             if any(attackable_species):
                 largest_attackable = []
                 for player, player_attackable_species in zip(players, attackable_species):
@@ -485,12 +630,13 @@ class ExternalPlayer(Player):
                 defender, player = sorted(largest_attackable, key=defender_player_key)[0]
                 return FeedCarnivore(self.species.index(candidate),players.index(player),player.species.index(defender))
 
-    def feed_on_own(self):
+    def feed_on_own(self, attack_index=None):
         """ Checks if the player can feed on one of their species. If so
          an intent not to feed will be returned as the Player doesn't want
          to attack their own species.
 
+        :param attack_index: an AttackIndex to look up targets in, or None to compute them
         :return: FeedingIntent or None
         """
-        can_attack_own = self.feed_carnivore([self])
+        can_attack_own = self.feed_carnivore([self], attack_index)
         return FeedNone() if can_attack_own else None
\ No newline at end of file
@@ -4,61 +4,81 @@ from .player import ExternalPlayer
 from .timeout import *
 from .debug import debug
 from .json_socket import JSONSocket
+from . import compact, delta, session
 
 class ProxyDealer:
     """ Implements a finite state machine of the messages acceptable by the Player, and sends responses from
         an ExternalPlayer"""
-    def __init__(self, coder, player=None, handshake="Hello"):
+    def __init__(self, coder, player=None, handshake="Hello", compact_frames=False, delta_states=False,
+                 keep_session=False):
         """ Creates a ProxyDealer, and sends an initial handshake to it.
         :param coder: a JSONSocket connected to a server
         :param player: Optionally, a class to use as a player agent. If none is found,
         :param handshake: a String to send as a handshake to the Server
+        :param compact_frames: Boolean indicating whether to ask the Server for compact frames rather than JSON
+        :param delta_states: Boolean indicating whether to ask the Server for feeding states as patches
+        :param keep_session: Boolean indicating whether to ask the Server to keep the connection open between games
         """
         self.player = player or ExternalPlayer(0)
         self.coder = coder
-        self.coder.encode(handshake)
+        self.compact = compact_frames
+        # Our copy of the last feeding state, if they're sent as patches
+        self.states = delta.StateReceiver() if delta_states else None
+        # The GAME_OVER message of each game played to the end
+        self.results = []
+        options = (session.OPT_IN if keep_session else "") + (delta.OPT_IN if delta_states else "") + \
+            (compact.OPT_IN if compact_frames else "")
+        self.coder.encode(handshake + options)
         try:
             self.__player_id__ = int(handshake)
         except:
             self.__player_id__ = 1
 
     def begin(self):
-        """ the main loop of the Dealer. Wait for, process, and respond to messages from the client
-        Note: This function is crash-only; it will not return.
+        """ the main loop of the Dealer. Wait for, process, and respond to messages from the client, game after game,
+        until the connection is closed or the dealer breaks the protocol.
+        :return: Integer number of games played to the end
         """
         try:
             self.wait_for_ok()
-            self.update_for_start()
             while True:
-                self.wait_for_choice_request()
-                self.wait_for_feed_species_and_restart()
+                if self.update_for_start():
+                    self.wait_for_choice_request()
+                    while self.wait_for_feed_species_and_restart():
+                        self.wait_for_choice_request()
         except JSONSocket.ClosedSocketError:
-            self.coder.shutdown()
             debug("The port has shut down", player_id=self.__player_id__)
-            exit(1)
+        except ValueError:
+            pass
+        self.coder.shutdown()
+        return len(self.results)
 
 
     def wait_for_ok(self):
-        """ Verify the handshake from the dealer. If it isn't 'ok', quit the application.
+        """ Verify the handshake from the dealer. Switch to compact frames if they were asked for.
+        Note: This will raise a ValueError if the answer isn't 'ok'
         """
         result = self.coder.decode_without_timeout()
         if not result == "ok":
             debug("We've received something other than an 'ok' in the handshake.", player_id=self.__player_id__)
-            self.coder.shutdown()
-            exit(1)
-
+            raise ValueError()
+        self.coder.compact = self.compact
 
     def update_for_start(self):
         """ Represents the state of the DFA for the dealer where it must send a start-round message,
-        translates that to the player agent.
+        translates that to the player agent. A game may also end before its first round.
+        :return: Boolean indicating whether a round started, rather than the game ending
         """
         try:
             result = self.coder.decode_without_timeout()
+            if session.is_game_over(result):
+                self.end_game(result)
+                return False
             self.player.start(result)
+            return True
         except ValueError:
             debug("Updating for the start of the round has failed", player_id=self.__player_id__)
-            self.coder.shutdown()
-            exit(1)
+            raise
 
     def wait_for_choice_request(self):
         """ Represents the state of the DFA for the dealer where it must receive a 'choose-feeding-intent' message,
@@ -70,22 +90,41 @@ class ProxyDealer:
             self.coder.encode(response)
         except ValueError:
             debug("Choosing cards has failed", player_id=self.__player_id__)
-            self.coder.shutdown()
-            exit(1)
+            raise
 
     def wait_for_feed_species_and_restart(self):
         """ Represents the state of the DFA for the dealer where it may receive a feeding message, but it may also
-            receive a new-round message, and translates that to the plaer agent.
+            receive a new-round message, and translates that to the plaer agent. Feeding states sent as patches are
+            applied to our copy first, and if one doesn't follow on from it, we ask for the state in full. The game
+            may also end here, after its last round.
+        :return: Boolean indicating whether a new round started, rather than the game ending
         """
         try:
             while True:
                 request = self.coder.decode_without_timeout()
+                if session.is_game_over(request):
+                    self.end_game(request)
+                    return False
                 if len(request) == 4:
                     self.player.start(request)
-                    return
-                else:
-                    self.coder.encode(self.player.feed_species(request))
+                    return True
+                if self.states is not None:
+                    request = self.states.receive(request)
+                    if request is None:
+                        self.coder.encode(delta.RESYNC)
+                        continue
+                self.coder.encode(self.player.feed_species(request))
         except ValueError:
             debug("Feeding has failed", player_id=self.__player_id__)
-            self.coder.shutdown()
-            exit(1)
\ No newline at end of file
+            raise
+
+    def end_game(self, message):
+        """ Forget the game that's over, and pass its result on to the player agent if it wants it
+        :param message: a GAME_OVER message
+        """
+        self.results.append(message)
+        if self.states is not None:
+            self.states = delta.StateReceiver()
+        announce = getattr(self.player, "game_over", None)
+        if announce is not None:
+            announce(message[1], message[2])
@@ -1,3 +1,7 @@
+from .delta import StateSender, RESYNC
+from . import session
+
+
 class ProxyPlayer:
     """A Player that follows the interface for an External Player, but connects with an agent across a JSONSocket"""
 
@@ -6,6 +10,8 @@ class ProxyPlayer:
         :param jsock:
         """
         self.jsock = jsock
+        # The record of feeding states sent, if the remote player asked for them as patches
+        self.states = StateSender() if jsock.delta else None
 
     def start(self, msg):
         """ Given a JSON message representing a message to start the game, send it to the remote player
@@ -13,6 +19,19 @@ class ProxyPlayer:
         """
         self.jsock.encode(msg)
 
+    def game_over(self, player_id, scores):
+        """ Tell the remote player the game is over, if it asked to stay connected for the next one
+        :param player_id: Integer id of the player in the game that ended
+        :param scores: a List of (Integer, Integer, String) of score, player id and handshake
+        """
+        if not self.jsock.session:
+            return
+        try:
+            self.jsock.encode(session.game_over(player_id, scores))
+        except OSError:
+            # A lost connection is found out when the next game is started
+            pass
+
     def choose(self, before, after):
         """ Ask the remote player to choose the actions to take based on state and the players before and after
         :param before: a list of Player as JSON
@@ -20,20 +39,44 @@ class ProxyPlayer:
         :return: a Action4 as JSON
         Note: This message will raise a ValueError if the agent doesn't conform to the protocol.
         """
+        self.send_choose(before, after)
+        return self.receive_choice()
+
+    def send_choose(self, before, after):
+        """ Ask the remote player to choose its actions, without waiting for it to answer
+        :param before: a list of Player as JSON
+        :param after: a list of Player as JSON
+        Note: This message will raise a ValueError if the agent doesn't conform to the protocol.
+        """
+        try:
+            self.jsock.encode([before, after])
+        except ConnectionResetError:
+            raise ValueError()
+
+    def receive_choice(self, deadline=None):
+        """ Wait for the remote player to answer a request sent with send_choose
+        :param deadline: a Deadline the answer must arrive by, or None to wait the JSONSocket's default time
+        :return: a Action4 as JSON
+        Note: This message will raise a ValueError if the agent doesn't conform to the protocol.
+        """
         try:
-            json_response = self.jsock.send_and_get_response([before, after])
-            return json_response
+            return self.jsock.get_response(deadline)
         except ConnectionResetError:
             raise ValueError()
 
     def feed_species(self, state):
-        """ Ask the remote player to feed the species
+        """ Ask the remote player to feed the species. A remote player that asked for patches is sent the state as one,
+        or in full if it asks to resync.
         :param state: A python-encoded JSON State
         :return: a python-encoded FeedingIntent
         Note: This message will raise a ValueError if the agent doesn't conform to the protocol.
         """
         try:
-            maybe_raw_json_response = self.jsock.send_and_get_response(state)
+            if self.states is None:
+                return self.jsock.send_and_get_response(state)
+            maybe_raw_json_response = self.jsock.send_and_get_response(self.states.update(state))
+            if maybe_raw_json_response == RESYNC:
+                maybe_raw_json_response = self.jsock.send_and_get_response(self.states.full(state))
             return maybe_raw_json_response
         except ConnectionResetError:
             raise ValueError()
@@ -0,0 +1,98 @@
+"""
+
+Keeps track of whose turn it is when players take turns around the table.
+
+"""
+
+
+class SeatRing:
+    """
+    The players taking turns in one phase of the game, seated in a ring.
+
+    Each player is given a seat numbered by its position in the list of players when the ring is made, and keeps
+    that number for the life of the ring. A player can leave the ring (it's done for this phase) or be ejected (it's
+    out of the game altogether). Advancing and leaving are O(1); ejecting is O(players), but only happens when a
+    player breaks the rules.
+    """
+
+    def __init__(self, players, first=0):
+        """
+        :param players: the List of Players in the game, in seat order
+        :param first: the Integer seat whose turn it is first
+        """
+        self.players = list(players)
+        count = len(self.players)
+        self.next = [(seat + 1) % count for seat in range(count)]
+        self.prev = [(seat - 1) % count for seat in range(count)]
+        self.size = count
+        self.current = first if count else None
+        self.in_game = [True] * count
+        # the Integer number of seats before each seat whose players are still in the game
+        self.ranks = list(range(count))
+        # Maps a seat to the List of Players after it in the ring; dropped whenever someone leaves
+        self._following = {}
+
+    def __len__(self):
+        return self.size
+
+    def current_player(self):
+        """
+        :return: the Player whose turn it is
+        """
+        return self.players[self.current]
+
+    def rank(self, seat):
+        """ Where the player at the given seat is in the list of players still in the game
+        :param seat: an Integer seat whose player is still in the game
+        :return: Integer
+        """
+        return self.ranks[seat]
+
+    def in_game_through(self, seat):
+        """
+        :param seat: an Integer seat
+        :return: the Integer number of players still in the game at this seat or before it
+        """
+        return self.ranks[seat] + self.in_game[seat]
+
+    def following(self, seat):
+        """ The players after the given seat, in turn order, that haven't left the ring.
+        The List returned is shared between calls and must not be modified.
+        :param seat: an Integer seat in the ring
+        :return: a List of Players
+        """
+        following = self._following.get(seat)
+        if following is None:
+            following = []
+            other = self.next[seat]
+            for _ in range(self.size - 1):
+                following.append(self.players[other])
+                other = self.next[other]
+            self._following[seat] = following
+        return following
+
+    def advance(self):
+        """ Pass the turn to the next seat in the ring
+        """
+        self.current = self.next[self.current]
+
+    def leave(self, seat):
+        """ Take the given seat out of the ring. If it was that seat's turn, the turn passes on.
+        :param seat: an Integer seat in the ring
+        """
+        before, after = self.prev[seat], self.next[seat]
+        self.next[before] = after
+        self.prev[after] = before
+        self.size -= 1
+        self._following = {}
+        if self.current == seat:
+            self.current = after if self.size else None
+
+    def eject(self, seat):
+        """ Take the given seat out of the ring and out of the game.
+        :param seat: an Integer seat in the ring
+        """
+        self.leave(seat)
+        self.in_game[seat] = False
+        for later in range(seat + 1, len(self.players)):
+            self.ranks[later] -= 1
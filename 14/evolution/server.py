@@ -1,22 +1,54 @@
+import asyncio
 import socket
 from .dealer import MAX_PLAYERS, MIN_PLAYERS
 from .json_socket import JSONSocket
+from . import compact, delta, session
 from .timeout import *
 from .validate import *
 from .debug import debug
 
+# Milliseconds a client has to send its handshake once it has connected
+HANDSHAKE_MILLISECONDS = 5000
+# Milliseconds, once the minimum number of players have signed up, that more may sign up for
+SIGN_UP_WINDOW_MILLISECONDS = 5000
+
+
+# The opt-ins a client may end its handshake with
+OPTIONS = (compact.OPT_IN, delta.OPT_IN, session.OPT_IN)
+
+
+def read_options(info):
+    """ Split the opt-ins off the end of a client's handshake string. A client may end its handshake with any of
+    OPTIONS, in any order. They're read back from the end as far as the first suffix that isn't one of them, which is
+    kept as part of the handshake on purpose, so that a name such as "c++" or "bob+jr" isn't mistaken for an opt-in.
+    :param info: the String a client sent as its handshake
+    :return: (String handshake without the opt-ins, Boolean for compact frames, Boolean for feeding states as patches,
+    Boolean for staying connected between games)
+    """
+    chosen = set()
+    while True:
+        option = next((option for option in OPTIONS if info.endswith(option)), None)
+        if option is None:
+            break
+        chosen.add(option)
+        info = info[:-len(option)]
+    return info, compact.OPT_IN in chosen, delta.OPT_IN in chosen, session.OPT_IN in chosen
+
+
 class Server:
     """
     A Server holds a socket, allows players to connect, and conducts a handshake with them.
     """
-    def __init__(self, host, port):
+    def __init__(self, host, port, exporter=None):
         """ Create a Server
         :param host: a String representing a hostname for a socket
         :param port: an Integer representing a port number.
+        :param exporter: an Exporter to count this server's connections and failed handshakes in, or None
         Note: If the port is already in use, this function will exit(1)
         """
         # The listener socket for this server— a socket.Socket object
         self.sock = self.initialize_socket(host, port)
+        self.exporter = exporter
         # A list of (JSONSocket, String) representing the socket for a player and their handshake message
         self.connected_players = []
 
@@ -25,52 +57,81 @@ class Server:
         :return: A list of (JSONSocket, String) representing the socket for a player and their handshake message
         """
         while len(self.connected_players) < MIN_PLAYERS:
-            try:
-                self.check_for_new_players()
-            except TimedOutError:
-                pass
+            self.check_for_new_players(Deadline())
         self.add_to_max()
         return self.connected_players
 
-    @timeout(5)
-    def add_to_max(self):
-        """ Add more players to the server until 8 have connected or the timer runs out. It
+    def add_to_max(self, milliseconds=SIGN_UP_WINDOW_MILLISECONDS):
+        """ Add more players to the server until 8 have connected or the timer runs out.
+        :param milliseconds: Number of milliseconds that more players may connect for
         """
+        deadline = Deadline(milliseconds)
         while len(self.connected_players) < MAX_PLAYERS:
             try:
-                self.check_for_new_players()
-            except:
+                self.check_for_new_players(deadline)
+            except (TimedOutError, OSError):
                 break
 
-    def check_for_new_players(self):
+    def check_for_new_players(self, deadline):
         """ Check whether there are new players waiting to connect,
         adds players the the list of connected players.
+        :param deadline: a Deadline that a new player must connect by
+        Note: this will throw a TimedOutError if no player connects by the deadline
         """
-        x = self.blocking_call_to_socket_to_get_players()
+        x = self.blocking_call_to_socket_to_get_players(deadline)
         if x:
             clientsocket, addr = x
             self.add_new_player(clientsocket)
 
-    @timeout(5)
-    def blocking_call_to_socket_to_get_players(self):
-        """ Calls accept on the socket to get new players. It's necessary to break this out to make it impossible for
-        the timeout to interrupt after we've had the handshake with the player.
+    def blocking_call_to_socket_to_get_players(self, deadline):
+        """ Calls accept on the socket to get new players. The deadline only bounds waiting for a connection, so it
+        can't interrupt the handshake with a player once they have connected.
+        :param deadline: a Deadline that a new player must connect by
         :return: a Socket.socket client socket.
         Note: this will throw a TimedOutError if there's no player to get
         """
+        deadline.wait_readable(self.sock)
         return self.sock.accept()
 
     def add_new_player(self, sock):
-        """ Create a JSONSocket for this socket, conduct a handshake, and add it to the list of players for this player
+        """ Create a JSONSocket for this socket, conduct a handshake, and add it to the list of players for this player.
+        A player that doesn't send its handshake within HANDSHAKE_MILLISECONDS is disconnected. A player may opt in to
+        options at the end of its handshake, as read_options reads them, which is kept without them: one that asked
+        for compact frames is sent them after the "ok".
         :param sock: a Socket.socket client socket
         """
-        player = JSONSocket(sock)
-        info = player.decode()
+        player = self.connect(sock)
+        try:
+            info = player.decode(Deadline(HANDSHAKE_MILLISECONDS))
+        except (TimedOutError, ValueError, OSError):
+            debug("Server: A client didn't finish its handshake")
+            self.reject(player)
+            return
         if is_string(info):
+            info, compact_frames, player.delta, player.session = read_options(info)
             player.encode("ok")
+            player.compact = compact_frames
             self.connected_players.append((player, info))
         else:
-            player.shutdown()
+            self.reject(player)
+
+    def connect(self, sock):
+        """ Wrap a client that has just connected, counting it in this server's Exporter if it has one
+        :param sock: a Socket.socket client socket
+        :return: a JSONSocket
+        """
+        player = JSONSocket(sock)
+        if self.exporter is not None:
+            self.exporter.opened(player)
+        return player
+
+    def reject(self, player):
+        """ Disconnect a client whose handshake failed, counting the failure in this server's Exporter if it has one
+        :param player: the client's JSONSocket
+        """
+        if self.exporter is not None:
+            self.exporter.handshake_failed()
+        player.shutdown()
 
     def initialize_socket(self, host, port):
         """ Create a socket for listening for requests
@@ -90,3 +151,133 @@ class Server:
             exit(1)
         sock.listen(MAX_PLAYERS)
         return sock
+
+
+class AsyncServer(Server):
+    """
+    A Server that signs players up on an asyncio event loop: it accepts connections and conducts handshakes with all
+    of them at once, so a slow client only holds up itself. Once the minimum number of players have signed up, more
+    may sign up until a timer on the loop closes the window or the maximum have.
+    """
+    def __init__(self, host, port, window=SIGN_UP_WINDOW_MILLISECONDS, handshake_timeout=HANDSHAKE_MILLISECONDS,
+                 exporter=None):
+        """ Create an AsyncServer
+        :param host: a String representing a hostname for a socket
+        :param port: an Integer representing a port number.
+        :param window: Number of milliseconds that sign-up stays open once the minimum number of players have signed up
+        :param handshake_timeout: Number of milliseconds a client has to send its handshake after connecting
+        :param exporter: an Exporter to count this server's connections and failed handshakes in, or None
+        Note: If the port is already in use, this function will exit(1)
+        """
+        super().__init__(host, port, exporter)
+        self.window = window
+        self.handshake_timeout = handshake_timeout
+
+    def add_players(self):
+        """ Sign players up until at least the minimum have, and then until the window closes or the maximum have
+        :return: A list of (JSONSocket, String) representing the socket for a player and their handshake message. The
+        sockets are blocking, ready to be used as they would be from a Server.
+        """
+        return asyncio.run(self.sign_up())
+
+    async def sign_up(self):
+        """ Accept connections and conduct handshakes concurrently until sign-up closes. Handshakes that haven't
+        finished by then are abandoned and their connections closed.
+        :return: A list of (JSONSocket, String) representing the socket for a player and their handshake message
+        """
+        loop = asyncio.get_running_loop()
+        closed = asyncio.Event()
+        window = None
+        handshakes = set()
+
+        def signed_up(player, info):
+            """ Add a player whose handshake has finished, unless sign-up has closed
+            :return: Boolean indicating whether the player was added
+            """
+            nonlocal window
+            if closed.is_set():
+                return False
+            self.connected_players.append((player, info))
+            if len(self.connected_players) >= MAX_PLAYERS:
+                closed.set()
+            elif len(self.connected_players) >= MIN_PLAYERS and window is None:
+                window = loop.call_later(self.window / 1000, closed.set)
+            return True
+
+        self.sock.setblocking(False)
+        acceptor = loop.create_task(self.accept(signed_up, handshakes))
+        try:
+            await closed.wait()
+        finally:
+            if window is not None:
+                window.cancel()
+            acceptor.cancel()
+            for handshake in handshakes:
+                handshake.cancel()
+            await asyncio.gather(acceptor, *handshakes, return_exceptions=True)
+            self.sock.setblocking(True)
+        return self.connected_players
+
+    async def accept(self, signed_up, handshakes):
+        """ Accept connections on the non-blocking listener socket until cancelled, starting a handshake with each
+        :param signed_up: a function of a JSONSocket and its String handshake, as for handshake
+        :param handshakes: a Set of the handshake Tasks that haven't finished, which this adds to
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            client, _ = await loop.sock_accept(self.sock)
+            handshake = loop.create_task(self.handshake(client, signed_up))
+            handshakes.add(handshake)
+            handshake.add_done_callback(handshakes.discard)
+
+    async def handshake(self, sock, signed_up):
+        """ Receive a handshake from a client, and answer it with "ok" if the client is signed up. A client's opt-ins
+        are read as in add_new_player.
+        :param sock: a Socket.socket client socket
+        :param signed_up: a function of a JSONSocket and its String handshake, which signs the player up and returns
+        whether it did
+        """
+        player = self.connect(sock)
+        deadline = Deadline(self.handshake_timeout)
+        sock.setblocking(False)
+        try:
+            info = await asyncio.wait_for(self.receive(player), deadline.remaining())
+        except asyncio.CancelledError:
+            player.shutdown()
+            raise
+        except (asyncio.TimeoutError, ValueError, OSError):
+            debug("Server: A client didn't finish its handshake")
+            self.reject(player)
+            return
+        sock.setblocking(True)
+        if not is_string(info):
+            self.reject(player)
+            return
+        info, compact_frames, player.delta, player.session = read_options(info)
+        if signed_up(player, info):
+            player.encode("ok")
+            player.compact = compact_frames
+        else:
+            player.shutdown()
+
+    @staticmethod
+    async def receive(player):
+        """ Read a single JSON message from a non-blocking JSONSocket without blocking the event loop. Anything
+        after the message stays in the JSONSocket's buffer.
+        :param player: a JSONSocket
+        :return: a python-encoded JSON message
+        Note: This method may raise a ClosedSocketError
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                decoded = player.parse_buffer()
+                player.messages_received += 1
+                return decoded
+            except player.IncompleteBufferException:
+                pass
+            data = await loop.sock_recv(player.sock, player.CHUNK_SIZE)
+            if not data:
+                raise player.ClosedSocketError
+            player.bytes_received += len(data)
+            player.buffer += data
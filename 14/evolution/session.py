@@ -0,0 +1,44 @@
+"""
+
+Sessions that keep a client's connection open from one game to the next, for clients that opt in at the handshake.
+At the end of each game a session's player is sent [GAME_OVER, player id, scores] rather than having its connection
+closed. The player resets whatever it kept about that game and waits; the next game it's seated at starts with a
+start message, as the first one did.
+
+"""
+from .validate import is_list, is_natural
+
+# Ends the handshake string of a client that wants to stay connected between games
+OPT_IN = "+session"
+# [GAME_OVER, Integer player id in the game that ended, List of [score, player id, handshake] in sorted order]
+GAME_OVER = "game-over"
+
+
+def game_over(player_id, scores):
+    """
+    :param player_id: Integer id of the player the message is for
+    :param scores: a List of (Integer, Integer, String) of score, player id and handshake, as Dealer.get_scores gives
+    :return: the message to send
+    """
+    return [GAME_OVER, player_id, [list(score) for score in scores]]
+
+
+def is_game_over(message):
+    """
+    :param message: a python-encoded JSON value from the dealer
+    :return: Boolean indicating whether it's a GAME_OVER message
+    Note: This will raise a ValueError if it's a malformed GAME_OVER message
+    """
+    if not (is_list(message) and message[:1] == [GAME_OVER]):
+        return False
+    if not (len(message) == 3 and is_natural(message[1]) and is_list(message[2])):
+        raise ValueError("Malformed game over message")
+    return True
+
+
+def staying(players):
+    """ The connections to keep open once a game is over
+    :param players: the InternalPlayers still in the game, with ProxyPlayers as their agents
+    :return: a List of (JSONSocket, String) of the connection and handshake of each that asked to stay connected
+    """
+    return [(player.player_agent.jsock, player.handshake) for player in players if player.player_agent.jsock.session]
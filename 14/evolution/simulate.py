@@ -0,0 +1,177 @@
+"""
+
+Runs many headless games of Evolution in parallel, for evaluating strategies in bulk.
+
+"""
+import multiprocessing
+import random
+import time
+
+from .dealer import Dealer, MIN_PLAYERS, MAX_PLAYERS
+from .metrics import Metrics
+from .player import ExternalPlayer
+from .traitcard import TraitCard
+
+DEFAULT_PLAYER_COUNT = 5
+DEFAULT_HANDSHAKE = "hi"
+# Number of games handed to a worker at once; large enough to amortize the pipe, small enough to stream results
+DEFAULT_CHUNK_SIZE = 8
+
+
+class GameResult:
+    """ Represents the outcome of a single simulated game """
+
+    def __init__(self, seed, scores, rounds, wall_time, metrics=None):
+        """
+        :param seed: the Integer seed used to shuffle the deck for this game
+        :param scores: a List(Integer, Integer, String) as produced by Dealer.get_scores
+        :param rounds: the Integer number of rounds that were played
+        :param wall_time: Float number of seconds the game took
+        :param metrics: the Metrics the game's Dealer recorded, if it was given one
+        """
+        self.seed = seed
+        self.scores = scores
+        self.rounds = rounds
+        self.wall_time = wall_time
+        self.metrics = metrics
+
+    def serialize(self):
+        """
+        :return: a python-encoded JSON Object representing this result
+        """
+        data = {"seed": self.seed, "scores": [list(s) for s in self.scores],
+                "rounds": self.rounds, "time": self.wall_time}
+        if self.metrics is not None:
+            data["metrics"] = self.metrics.serialize()
+        return data
+
+
+class BatchSummary:
+    """ Aggregates GameResults as they arrive """
+
+    def __init__(self):
+        self.games = 0
+        self.rounds = 0
+        self.game_time = 0.0
+        self.wall_time = 0.0
+        # Maps a player id to [total score, wins]
+        self.by_player = {}
+        # The Metrics of every game that kept them, merged, or None if none did
+        self.metrics = None
+
+    def add(self, result):
+        """ Fold a single GameResult into this summary
+        :param result: a GameResult
+        """
+        self.games += 1
+        self.rounds += result.rounds
+        self.game_time += result.wall_time
+        if result.metrics is not None:
+            if self.metrics is None:
+                self.metrics = Metrics()
+            self.metrics.merge(result.metrics)
+        for place, (score, player_id, _) in enumerate(result.scores):
+            totals = self.by_player.setdefault(player_id, [0, 0])
+            totals[0] += score
+            totals[1] += (place == 0)
+
+    def games_per_second(self):
+        """
+        :return: Float throughput of the batch, measured against wall-clock time
+        """
+        return self.games / self.wall_time if self.wall_time else 0.0
+
+    def serialize(self):
+        """
+        :return: a python-encoded JSON Object representing this summary
+        """
+        data = {"games": self.games,
+                "rounds": self.rounds,
+                "wall_time": self.wall_time,
+                "cpu_game_time": self.game_time,
+                "games_per_second": self.games_per_second(),
+                "players": {str(pid): {"mean_score": total / self.games, "wins": wins}
+                            for pid, (total, wins) in sorted(self.by_player.items())}}
+        if self.metrics is not None:
+            data["metrics"] = self.metrics.serialize()
+        return data
+
+
+def shuffled_deck(seed):
+    """ Produce a deck shuffled deterministically by the given seed
+    :param seed: an Integer
+    :return: a List of TraitCard
+    """
+    deck = TraitCard.new_deck()
+    random.Random(seed).shuffle(deck)
+    return deck
+
+
+def play_one(seed, player_count=DEFAULT_PLAYER_COUNT, player_class=ExternalPlayer, with_metrics=False):
+    """ Play a complete game with in-process players
+    :param seed: an Integer used to shuffle the deck
+    :param player_count: an Integer between MIN_PLAYERS and MAX_PLAYERS
+    :param player_class: a class implementing the ExternalPlayer interface, constructed with a player id
+    :param with_metrics: Boolean indicating whether the Dealer should keep Metrics of the game
+    :return: a GameResult
+    """
+    start = time.perf_counter()
+    dealer = Dealer(deck=shuffled_deck(seed), metrics=Metrics() if with_metrics else None)
+    dealer.play_game([(player_class(i), DEFAULT_HANDSHAKE) for i in range(player_count)])
+    return GameResult(seed, dealer.get_scores(), dealer.rounds, time.perf_counter() - start, dealer.metrics)
+
+
+def _play_job(job):
+    """ Worker entry point. Module-level so that it can be pickled by reference; each worker process imports this
+    module once and then plays every game sent to it.
+    :param job: a Tuple of (seed, player_count, player_class, with_metrics)
+    :return: a GameResult
+    """
+    return play_one(*job)
+
+
+def run_games(games, player_count=DEFAULT_PLAYER_COUNT, processes=None, first_seed=0,
+              player_class=ExternalPlayer, chunk_size=DEFAULT_CHUNK_SIZE, with_metrics=False):
+    """ Play games across a process pool, yielding each GameResult as soon as it finishes.
+    Results are yielded in completion order, not seed order.
+    :param games: Natural number of games to play
+    :param player_count: an Integer between MIN_PLAYERS and MAX_PLAYERS
+    :param processes: Integer number of worker processes; None uses every core, and 1 plays in this process
+    :param first_seed: the Integer seed of the first game; game i is seeded with first_seed + i
+    :param player_class: a picklable class implementing the ExternalPlayer interface
+    :param chunk_size: Integer number of games sent to a worker at once
+    :param with_metrics: Boolean indicating whether each game should keep Metrics
+    :return: a generator of GameResult
+    """
+    if not MIN_PLAYERS <= player_count <= MAX_PLAYERS:
+        raise ValueError("A game needs between " + str(MIN_PLAYERS) + " and " + str(MAX_PLAYERS) + " players")
+    jobs = ((seed, player_count, player_class, with_metrics) for seed in range(first_seed, first_seed + games))
+    if processes == 1:
+        for job in jobs:
+            yield _play_job(job)
+        return
+    with multiprocessing.Pool(processes) as pool:
+        for result in pool.imap_unordered(_play_job, jobs, chunksize=chunk_size):
+            yield result
+
+
+def simulate(games, player_count=DEFAULT_PLAYER_COUNT, processes=None, first_seed=0,
+             player_class=ExternalPlayer, on_result=None, with_metrics=False):
+    """ Play a batch of games and aggregate the results
+    :param games: Natural number of games to play
+    :param player_count: an Integer between MIN_PLAYERS and MAX_PLAYERS
+    :param processes: Integer number of worker processes, or None to use every core
+    :param first_seed: the Integer seed of the first game
+    :param player_class: a picklable class implementing the ExternalPlayer interface
+    :param on_result: optionally, a function called with each GameResult as it arrives
+    :param with_metrics: Boolean indicating whether each game should keep Metrics, merged into the summary's
+    :return: a BatchSummary
+    """
+    summary = BatchSummary()
+    start = time.perf_counter()
+    for result in run_games(games, player_count, processes, first_seed, player_class, with_metrics=with_metrics):
+        summary.add(result)
+        if on_result:
+            on_result(result)
+    summary.wall_time = time.perf_counter() - start
+    return summary
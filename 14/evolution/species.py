@@ -3,10 +3,11 @@
 Represents a Species in the Evolution game.
 
 """
-from .trait import Trait, HARD_SHELL_THRESHOLD
+from .trait import Trait, HARD_SHELL_THRESHOLD, trait_mask
 from .validate import *
-from .debug import debug
-import inspect
+from .debug import TRACER, VERBOSE
+from .versioned import versioned_attribute
+import sys
 
 SPECIES_DEFAULT_FOOD = 0
 SPECIES_DEFAULT_BODY = 0
@@ -22,6 +23,14 @@ MAX_TRAITS = 3
 
 
 class Species:
+    """
+    A species board. Every change to a Species's food, body, population, traits or fat food increments its
+    version, and serialize reuses its last result until the version changes.
+    """
+    food = versioned_attribute("food")
+    body = versioned_attribute("body")
+    fat_food = versioned_attribute("fat_food")
+
     def __init__(self,
                  food=SPECIES_DEFAULT_FOOD,
                  body=SPECIES_DEFAULT_BODY,
@@ -36,6 +45,9 @@ class Species:
         :param fat_food: food tokens stored on fat tissue traits, must be 0 if
                          the species doesn't have any fat tissue traits
         """
+        self.version = 0
+        self._serialized = None
+        self._serialized_version = None
         self.food = food
         self.body = body
         self._population = population
@@ -43,6 +55,22 @@ class Species:
         self.verify_traits()
         self.fat_food = fat_food or SPECIES_DEFAULT_FAT_FOOD
 
+    @property
+    def traits(self):
+        """ The ordered list of Traits on this species. Membership is checked against trait_mask, so the list
+        must be reassigned (or changed through replace_trait_at_index) rather than mutated in place.
+        """
+        return self._traits
+
+    @traits.setter
+    def traits(self, value):
+        """ Set the Traits of this species and recompute its mask
+        :param value: a List of Trait
+        """
+        self._traits = value
+        self.trait_mask = trait_mask(value)
+        self.version += 1
+
     @property
     def population(self):
         return self._population
@@ -52,13 +80,24 @@ class Species:
         """ Set the population of this species, decreasing food if necessary
         :param value: Integer
         """
-        debug("setting population to " + str(value), verbose=True)
-        debug(inspect.stack()[1][3], verbose=True)
         value = min(value, SPECIES_MAX_POPULATION)
+        if TRACER.level >= VERBOSE:
+            TRACER.emit(VERBOSE, "population", old=self._population, new=value,
+                        caller=sys._getframe(1).f_code.co_name)
         # TODO :  Add killing the creature to here... somehow.
         self._population = value
+        self.version += 1
         self.food = min(self.food, self._population)
 
+    def fork(self):
+        """ Make a copy of this Species that can be changed without affecting it. Nothing is re-validated.
+        :return: a Species
+        """
+        clone = self.__class__.__new__(self.__class__)
+        clone.__dict__.update(self.__dict__)
+        clone._traits = list(self._traits)
+        return clone
+
     def replace_trait_at_index(self, idx, trait):
         """ Replace the trait at the given index, and verify that this poses no issues.
         (The responsibility for doing so actually lies outside this method...)
@@ -66,7 +105,9 @@ class Species:
         :param idx: Integer position of the trait to replace
         :param trait: Trait
         """
-        self.traits[idx] = trait
+        self._traits[idx] = trait
+        self.trait_mask = trait_mask(self._traits)
+        self.version += 1
         self.verify_traits()
 
     def verify_traits(self):
@@ -74,8 +115,9 @@ class Species:
         """
         if not self.has_trait(Trait.FAT_TISSUE):
             self.fat_food = 0
-        if not all([(not(any(self.traits.count(x) > 1 for x in self.traits))),
-                   len(self.traits) <= MAX_TRAITS]):
+        # A duplicate Trait shares its bit with another, so the mask has fewer bits set than there are Traits
+        if not all([bin(self.trait_mask).count("1") == len(self._traits),
+                   len(self._traits) <= MAX_TRAITS]):
             raise ValueError()
 
     @classmethod
@@ -124,8 +166,10 @@ class Species:
 
     def serialize(self):
         """ Generates a data representation of Species
-        :return: data representation of the Species
+        :return: data representation of the Species. It is shared with other callers and must not be modified.
         """
+        if self._serialized_version == self.version:
+            return self._serialized
         data = [
             [FOOD_NAME, self.food],
             [BODY_NAME, self.body],
@@ -136,6 +180,8 @@ class Species:
         if self.has_trait(Trait.FAT_TISSUE) and self.fat_food:
             data.append([FAT_FOOD_NAME, self.fat_food])
 
+        self._serialized = data
+        self._serialized_version = self.version
         return data
 
     def has_trait(self, trait):
@@ -143,7 +189,7 @@ class Species:
         :param trait: Trait to check the presence of
         :return: true if this Species has the given Trait, else false
         """
-        return trait in self.traits
+        return bool(self.trait_mask & trait.bit)
 
     @property
     def attacking_body(self):
@@ -189,4 +235,4 @@ class Species:
         """ Get the number of traits on this species.
         :return: Integer
         """
-        return len(self.traits)
\ No newline at end of file
+        return len(self._traits)
\ No newline at end of file
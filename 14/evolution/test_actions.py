@@ -1,13 +1,12 @@
 from .dealer import Dealer
 from unittest import TestCase, mock
 from .action import *
+from .action4 import *
 from .trait import *
+from .metrics import Metrics, EJECTIONS, INVALID_RESPONSES, rejected
 import json
 
-
-class UpActionTestCase(TestCase):
-    def setUp(self):
-        example_config = """[[[["id",2],
+EXAMPLE_CONFIG = """[[[["id",2],
   ["species",[[["food",4],
                ["body",4],
                ["population",4],
@@ -32,7 +31,11 @@ class UpActionTestCase(TestCase):
   ["cards",[[-3, "burrowing"]]]]],
 6,
 []]"""
-        self.dealer = Dealer.deserialize(json.loads(example_config))
+
+
+class UpActionTestCase(TestCase):
+    def setUp(self):
+        self.dealer = Dealer.deserialize(json.loads(EXAMPLE_CONFIG))
 
     def test_pop_up(self):
         p = self.dealer.players[0]
@@ -91,3 +94,63 @@ class UpActionTestCase(TestCase):
         self.assertEqual(s.body, 4)
         self.assertEqual(s.food, 4)
         self.assertEqual(len(s.traits), 1)
+
+
+class Action4VerifyTestCase(TestCase):
+    def setUp(self):
+        self.dealer = Dealer.deserialize(json.loads(EXAMPLE_CONFIG))
+        # Player with one species (one trait) and two cards
+        self.player = self.dealer.players[0]
+
+    def test_valid(self):
+        actions = Action4(0, [PopulationUpAction(0, 1)], [], [], [])
+        self.assertIsNone(actions.check(self.player))
+        self.assertTrue(actions.verify(self.player))
+
+    def test_duplicate_card(self):
+        actions = Action4(0, [PopulationUpAction(0, 0)], [], [], [])
+        self.assertEqual(actions.check(self.player), Rejection.DUPLICATE_CARD)
+        self.assertFalse(actions.verify(self.player))
+
+    def test_card_out_of_range(self):
+        # One past the last card used to be accepted
+        actions = Action4(0, [PopulationUpAction(0, 2)], [], [], [])
+        self.assertEqual(actions.check(self.player), Rejection.CARD_OUT_OF_RANGE)
+
+    def test_board_out_of_range(self):
+        # The player has two cards but only one species
+        actions = Action4(0, [], [BodyUpAction(1, 1)], [], [])
+        self.assertEqual(actions.check(self.player), Rejection.BOARD_OUT_OF_RANGE)
+        actions = Action4(0, [], [BodyUpAction(-1, 1)], [], [])
+        self.assertEqual(actions.check(self.player), Rejection.BOARD_OUT_OF_RANGE)
+
+    def test_new_board_in_range(self):
+        actions = Action4(0, [], [], [NewBoardAction(1, [])], [])
+        self.assertIsNone(actions.check(self.player))
+
+    def test_trait_out_of_range(self):
+        actions = Action4(0, [], [], [], [TraitReplaceAction(0, 1, 1)])
+        self.assertEqual(actions.check(self.player), Rejection.TRAIT_OUT_OF_RANGE)
+
+    def test_verify_many(self):
+        good = Action4(0, [PopulationUpAction(0, 1)], [], [], [])
+        bad = Action4(0, [PopulationUpAction(0, 0)], [], [], [])
+        players = self.dealer.players[:3]
+        self.assertEqual(verify_many([good, None, bad], [self.player, players[1], self.player]),
+                         [None, Rejection.MALFORMED, Rejection.DUPLICATE_CARD])
+
+    def test_dealer_drops_rejected_players(self):
+        choices = [Action4(0, [], [], [], []), Action4(0, [PopulationUpAction(0, 0)], [], [], []), None]
+        for player, choice in zip(self.dealer.players, choices):
+            player.send_choose = mock.Mock(return_value=False)
+            player.choose_actions = mock.Mock(return_value=choice)
+        ids = [p.player_id for p in self.dealer.players]
+        self.dealer.metrics = metrics = Metrics()
+        accepted = self.dealer.step_two_and_three()
+        self.assertEqual(accepted, choices[:1])
+        self.assertEqual([p.player_id for p in self.dealer.players], ids[:1])
+        self.assertEqual(metrics.counters[rejected(Rejection.DUPLICATE_CARD)], 1)
+        self.assertEqual(metrics.counters[rejected(Rejection.MALFORMED)], 1)
+        self.assertEqual(metrics.counters["rejected_duplicate_card"], 1)
+        self.assertEqual(metrics.counters[INVALID_RESPONSES], 2)
+        self.assertEqual(metrics.counters[EJECTIONS], 2)
@@ -0,0 +1,67 @@
+from unittest import TestCase
+
+from .attack_index import AttackIndex
+from .dealer import Dealer
+from .player import Player
+from .species import Species
+from .trait import Trait
+
+
+class AttackIndexTestCase(TestCase):
+
+    def setUp(self):
+        self.attacker = Species(food=0, population=3, body=1, traits=[Trait.CARNIVORE])
+        self.burrower = Species(food=0, population=1, traits=[Trait.BURROWING])
+        self.plain = Species(food=0, population=2)
+        self.warner = Species(food=0, population=2, traits=[Trait.WARNING_CALL])
+        self.hidden = Species(food=0, population=2)
+        self.attack_player = Player(1, species=[self.attacker])
+        self.defend_player = Player(2, species=[self.burrower, self.plain, self.warner, self.hidden])
+        self.index = AttackIndex()
+
+    def test_matches_get_attackable_species(self):
+        self.assertEqual(self.index.attackable_species(self.defend_player, self.attacker),
+                         self.defend_player.get_attackable_species(self.attacker))
+        self.assertEqual(self.index.attackable_species(self.defend_player, self.attacker),
+                         [self.burrower, self.warner])
+
+    def test_species_changed(self):
+        self.index.attackable_species(self.defend_player, self.attacker)
+        self.burrower.food = 1
+        self.index.species_changed(self.defend_player, self.burrower)
+        self.assertEqual(self.index.attackable_species(self.defend_player, self.attacker), [self.warner])
+
+    def test_neighbor_changed(self):
+        self.index.attackable_species(self.defend_player, self.attacker)
+        self.warner.traits = []
+        self.index.species_changed(self.defend_player, self.warner)
+        self.assertEqual(self.index.attackable_species(self.defend_player, self.attacker),
+                         [self.burrower, self.plain, self.warner, self.hidden])
+
+    def test_attacker_changed(self):
+        self.index.attackable_species(self.defend_player, self.attacker)
+        self.attacker.traits = [Trait.CARNIVORE, Trait.AMBUSH]
+        self.index.species_changed(self.attack_player, self.attacker)
+        self.assertEqual(self.index.attackable_species(self.defend_player, self.attacker),
+                         [self.burrower, self.plain, self.warner, self.hidden])
+
+    def test_species_removed(self):
+        self.index.attackable_species(self.defend_player, self.attacker)
+        self.defend_player.species.pop(2)
+        self.index.species_removed(self.defend_player, self.warner, 2)
+        self.assertEqual(self.index.attackable_species(self.defend_player, self.attacker),
+                         [self.burrower, self.plain, self.hidden])
+
+    def test_player_removed(self):
+        self.index.attackable_species(self.defend_player, self.attacker)
+        self.index.player_removed(self.attack_player)
+        self.assertEqual(self.index.targets, {})
+
+    def test_dealer_keeps_index_up_to_date(self):
+        dealer = Dealer([self.attack_player, self.defend_player], 10)
+        dealer.attack_index.attackable_species(self.defend_player, self.attacker)
+        dealer.feed_creature(self.defend_player, 0)
+        self.assertEqual(dealer.attack_index.attackable_species(self.defend_player, self.attacker), [self.warner])
+        dealer.kill_creature(self.defend_player, 2)
+        self.assertEqual(dealer.attack_index.attackable_species(self.defend_player, self.attacker),
+                         [self.plain, self.hidden])
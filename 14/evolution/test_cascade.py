@@ -0,0 +1,108 @@
+import random
+from unittest import TestCase
+
+from .cascade import FeedingCascade
+from .dealer import Dealer
+from .player import Player
+from .species import Species
+from .trait import Trait
+
+CASCADE_TRAITS = [Trait.COOPERATION, Trait.FORAGING, Trait.SCAVENGER, Trait.CARNIVORE]
+
+
+def recursive_feed_creature(dealer, player, species_index, scavenge=False):
+    """ The recursive implementation Dealer.feed_creature used to have, to compare the cascade against """
+    species = player.species[species_index]
+    if not (species.is_hungry() and dealer.watering_hole):
+        return
+    feed_amount = min(1 + species.has_trait(Trait.FORAGING), dealer.watering_hole, species.population - species.food)
+    species.food += feed_amount
+    dealer.watering_hole -= feed_amount
+    for feeding in range(feed_amount):
+        if species.has_trait(Trait.COOPERATION):
+            right = player.get_neighbors(species)[1]
+            if right:
+                recursive_feed_creature(dealer, player, species_index + 1)
+    if scavenge:
+        idx = dealer.players.index(player)
+        for i in range(len(dealer.players)):
+            player = dealer.players[(idx + i) % len(dealer.players)]
+            for s in player.species:
+                if s.has_trait(Trait.SCAVENGER):
+                    recursive_feed_creature(dealer, player, player.species.index(s))
+
+
+def random_dealer(rng):
+    players = []
+    for player_id in range(rng.randint(3, 6)):
+        species = []
+        for _ in range(rng.randint(1, 6)):
+            population = rng.randint(1, 7)
+            species.append(Species(food=rng.randint(0, population), population=population,
+                                   traits=rng.sample(CASCADE_TRAITS, rng.randint(0, 3))))
+        players.append(Player(player_id, species=species))
+    return Dealer(players, rng.randint(0, 30))
+
+
+class FeedingCascadeTestCase(TestCase):
+
+    def setUp(self):
+        self.scavenger = Species(traits=[Trait.SCAVENGER])
+        self.cooperator = Species(traits=[Trait.COOPERATION, Trait.SCAVENGER])
+        self.last_cooperator = Species(traits=[Trait.COOPERATION])
+        self.player1 = Player(1, species=[self.cooperator, self.scavenger, self.last_cooperator])
+        self.player2 = Player(2, species=[Species(), self.scavenger])
+        self.players = [self.player1, self.player2]
+        self.cascade = FeedingCascade()
+
+    def test_cooperates(self):
+        self.assertEqual([self.cascade.cooperates(self.players, self.player1, i) for i in range(3)],
+                         [True, False, False])
+        self.assertFalse(self.cascade.cooperates(self.players, Player(3, species=[Species()]), 0))
+
+    def test_scavengers_from(self):
+        self.assertEqual(self.cascade.scavengers_from(self.players, self.player1),
+                         [(self.player1, 0), (self.player1, 1), (self.player2, 1)])
+        self.assertEqual(self.cascade.scavengers_from(self.players, self.player2),
+                         [(self.player2, 1), (self.player1, 0), (self.player1, 1)])
+
+    def test_reset(self):
+        self.cascade.scavengers_from(self.players, self.player1)
+        self.player2.species[0].traits = [Trait.SCAVENGER]
+        self.cascade.reset()
+        self.assertEqual(self.cascade.scavengers_from(self.players, self.player2),
+                         [(self.player2, 0), (self.player2, 1), (self.player1, 0), (self.player1, 1)])
+
+    def test_changes_in_place_are_noticed(self):
+        self.cascade.scavengers_from(self.players, self.player1)
+        self.player2.species.pop()
+        self.assertEqual(self.cascade.scavengers_from(self.players, self.player2),
+                         [(self.player1, 0), (self.player1, 1)])
+        self.assertTrue(self.cascade.cooperates(self.players, self.player1, 0))
+        self.player1.species.insert(1, Species())
+        self.assertEqual([self.cascade.cooperates(self.players, self.player1, i) for i in range(4)],
+                         [True, False, False, False])
+        player3 = Player(3, species=[Species(traits=[Trait.SCAVENGER])])
+        self.players[1] = player3
+        self.assertEqual(self.cascade.scavengers_from(self.players, player3),
+                         [(player3, 0), (self.player1, 0), (self.player1, 2)])
+
+    def test_matches_recursive_feeding(self):
+        rng = random.Random(7)
+        for _ in range(300):
+            seed = rng.random()
+            expected, actual = random_dealer(random.Random(seed)), random_dealer(random.Random(seed))
+            player_index = rng.randrange(len(expected.players))
+            species_index = rng.randrange(len(expected.players[player_index].species))
+            scavenge = rng.random() < 0.5
+            recursive_feed_creature(expected, expected.players[player_index], species_index, scavenge)
+            actual.feed_creature(actual.players[player_index], species_index, scavenge)
+            self.assertEqual(actual.serialize(), expected.serialize())
+
+    def test_long_chain(self):
+        chain = [Species(population=7, traits=[Trait.COOPERATION, Trait.FORAGING]) for _ in range(2000)]
+        player = Player(1, species=chain)
+        dealer = Dealer([player], 2000 * 7)
+        # deeper than the default recursion limit
+        dealer.feed_creature(player, 0)
+        self.assertEqual([chain[0].food, chain[1].food, chain[-1].food], [2, 4, 7])
@@ -0,0 +1,104 @@
+import socket
+from unittest import TestCase
+
+from .compact import frame, unframe, OPT_IN, LENGTH, SPECIES, FAT_SPECIES, TRAIT, SHORT_LIST
+from .json_socket import JSONSocket
+from .server import Server, read_options
+from .species import Species
+from .test_support import RecordingPlayer, play_seeded_game
+from .trait import Trait
+
+
+class CompactTestCase(TestCase):
+
+    def payload(self, value):
+        return frame(value)[LENGTH.size:]
+
+    def test_game_messages_round_trip(self):
+        messages = []
+        for seed in range(3):
+            play_seeded_game(seed, [RecordingPlayer(i, messages) for i in range(1, 6)])
+        self.assertGreater(len(messages), 100)
+        for message in messages:
+            encoded = frame(message)
+            self.assertEqual(unframe(bytearray(encoded)), (message, len(encoded)))
+
+    def test_species_are_positional(self):
+        species = Species(population=3, body=4, food=1, traits=[Trait.FAT_TISSUE, Trait.HORNS], fat_food=2)
+        self.assertEqual(self.payload(species.serialize()),
+                         bytes([FAT_SPECIES, 1, 4, 3, 2, 5, 10, 2]))
+        self.assertEqual(self.payload(Species().serialize()), bytes([SPECIES, 0, 0, 1, 0]))
+        self.assertEqual(self.payload("carnivore"), bytes([TRAIT, 0]))
+
+    def test_lookalikes_round_trip(self):
+        values = [[["body", 1], ["food", 2], ["population", 3], ["traits", []]],
+                  [["food", 1], ["body", 2], ["population", 3], ["traits", ["wings"]]],
+                  [["food", -1], ["body", 2], ["population", 3], ["traits", []]],
+                  [["food", True], ["body", 2], ["population", 3], ["traits", []]],
+                  [["food", 1], ["body", 2], ["population", 3], ["traits", []], ["fat-food", 1], ["x", 1]],
+                  ["ok", "", "héllo", None, True, False, 0, 63, 64, -1, -300, 2 ** 40, list(range(100))]]
+        for value in values:
+            encoded = frame(value)
+            self.assertEqual(unframe(bytearray(encoded)), (value, len(encoded)))
+        self.assertNotEqual(self.payload(True), self.payload(1))
+
+    def test_incomplete_and_malformed_frames(self):
+        encoded = frame([1, [2, 3]])
+        for end in range(len(encoded)):
+            self.assertIsNone(unframe(bytearray(encoded[:end])))
+        for payload in [bytes([0xff]), bytes([SHORT_LIST + 2, 0x40]), bytes([TRAIT, 99]), bytes([0x40, 0x40])]:
+            with self.assertRaises(ValueError):
+                unframe(bytearray(LENGTH.pack(len(payload)) + payload))
+        with self.assertRaises(ValueError):
+            frame(1.5)
+
+    def test_read_handshake(self):
+        self.assertEqual(read_options("alice" + OPT_IN), ("alice", True, False, False))
+        self.assertEqual(read_options("alice"), ("alice", False, False, False))
+
+
+class CompactSocketTestCase(TestCase):
+
+    def setUp(self):
+        self.ours, self.theirs = socket.socketpair()
+        self.ours.settimeout(5)
+        self.theirs.settimeout(5)
+
+    def tearDown(self):
+        self.ours.close()
+        self.theirs.close()
+
+    def test_frames_over_a_socket(self):
+        sender, receiver = JSONSocket(self.theirs), JSONSocket(self.ours)
+        sender.compact = receiver.compact = True
+        for message in [[1, 2], "ok", Species(population=2).serialize()]:
+            sender.encode(message)
+        self.assertEqual(receiver.decode_without_timeout(), [1, 2])
+        self.assertEqual(receiver.decode_without_timeout(), "ok")
+        self.assertEqual(receiver.decode_without_timeout(), Species(population=2).serialize())
+
+    def test_extra_data_after_a_frame(self):
+        asker = JSONSocket(self.ours)
+        asker.compact = True
+        self.theirs.sendall(frame(1) + frame(2))
+        with self.assertRaises(ValueError):
+            asker.send_and_get_response("feed?")
+
+    def test_server_negotiates_at_the_handshake(self):
+        server = Server("localhost", 0)
+        try:
+            for handshake, compact in [("plain", False), ("tiny" + OPT_IN, True)]:
+                ours, theirs = socket.socketpair()
+                client = JSONSocket(theirs)
+                client.encode(handshake)
+                server.add_new_player(ours)
+                player, info = server.connected_players[-1]
+                self.assertEqual((info, player.compact), (handshake.replace(OPT_IN, ""), compact))
+                self.assertEqual(client.decode(), "ok")
+                client.compact = compact
+                player.encode(["state", 1])
+                self.assertEqual(client.decode(), ["state", 1])
+                player.shutdown()
+                client.shutdown()
+        finally:
+            server.sock.close()
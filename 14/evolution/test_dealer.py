@@ -1,11 +1,21 @@
 from unittest import TestCase, mock
 from .dealer import Dealer
+from .json_socket import JSONSocket
+from .proxy_player import ProxyPlayer
+from .seat_ring import SeatRing
 from .player import Player, InternalPlayer, ExternalPlayer
 from .species import Species
 from .trait import Trait
 from .traitcard import TraitCard
+from .feeding_intent import FeedVegetarian, FeedCarnivore
+from .action4 import Action4, Rejection
+from .action import PopulationUpAction, NewBoardAction
+from .metrics import Metrics, rejected
 import os
 import json
+import socket
+import threading
+import time
 
 BIG_SIZE = 4
 LITTLE_SIZE = 2
@@ -97,7 +107,7 @@ class DealerTestCase(TestCase):
         self.assertEqual(self.dealer1.deck, dealer2.deck)
 
     def test_feed_one(self):
-        self.ndealer.feed_one(self.ndealer.players)
+        self.ndealer.feed_one(SeatRing(self.ndealer.players))
         # self.assertEqual(self.species_small_veg.food, 1)
         self.assertEqual(self.ndealer.watering_hole, 9)
 
@@ -111,7 +121,7 @@ class DealerTestCase(TestCase):
         #self.assertEqual(self.dealer1.watering_hole, 5)
 
     def test_feed_one_v2(self):
-        self.ndealer2.feed_one(self.ndealer2.players)
+        self.ndealer2.feed_one(SeatRing(self.ndealer2.players))
         self.assertEqual(self.i_scav_att_player.species[0].food, 5)
 
     def test_fat_feed(self):
@@ -122,3 +132,172 @@ class DealerTestCase(TestCase):
         self.assertEqual(self.dealer1.watering_hole, 10-BIG_SIZE)
         self.assertEqual(fat_species.fat_food, BIG_SIZE)
 
+    def test_feeding_ejects_player(self):
+        def two_hungry():
+            return [Species(food=0, population=2), Species(food=0, population=2)]
+        agents = [mock.Mock(), mock.Mock(), mock.Mock()]
+        agents[0].feed_species.return_value = 0
+        agents[1].feed_species.return_value = "not a feeding"
+        agents[2].feed_species.return_value = 1
+        players = [InternalPlayer(i, agent) for i, agent in enumerate(agents)]
+        for p in players:
+            p.species = two_hungry()
+        dealer = Dealer(list(players), 3)
+        dealer.starting_player = 1
+        dealer.feeding()
+        self.assertEqual(dealer.players, [players[0], players[2]])
+        self.assertEqual(dealer.watering_hole, 0)
+        self.assertEqual(players[2].bag, 2)
+        self.assertEqual(players[0].bag, 1)
+        self.assertEqual(dealer.starting_player, 1)
+
+    def test_fork_feeding(self):
+        before = json.loads(json.dumps(self.dealer3.serialize()))
+        fork = self.dealer3.fork()
+        intent = FeedCarnivore(0, 0, 1)
+        fork.enact_feeding(0, intent)
+
+        expected = Dealer.deserialize(before)
+        intent.enact(expected.players[0], expected.players[1:], expected)
+        self.assertEqual(fork.serialize(), expected.serialize())
+        self.assertEqual(self.dealer3.serialize(), before)
+        self.assertNotEqual(fork.serialize(), before)
+
+    def test_fork_copies_only_what_changes(self):
+        fork = self.dealer3.fork()
+        fork.enact_feeding(2, FeedVegetarian(1))
+        self.assertIs(fork.players[0], self.scavengingAttackerPlayer)
+        self.assertIs(fork.players[1], self.defendPlayer)
+        self.assertIsNot(fork.players[2], self.cooperatingPlayer)
+        self.assertIs(fork.players[2].species[0], self.species_cooperating_scavenger)
+        self.assertIsNot(fork.players[2].species[1], self.species_hungry_forrager)
+        self.assertEqual(fork.players[2].species[1].food, 3)
+        self.assertEqual(self.species_hungry_forrager.food, 1)
+        self.assertEqual(fork.watering_hole, 8)
+        self.assertEqual(self.dealer3.watering_hole, 10)
+
+        # A second fork of the fork shares the copies with it
+        second = fork.fork()
+        second.enact_feeding(2, FeedVegetarian(1))
+        self.assertEqual(fork.players[2].species[1].food, 3)
+        self.assertEqual(second.players[2].species[1].food, 4)
+
+    def test_fork_actions(self):
+        player = Player(1, species=[Species(), Species()], cards=[TraitCard(1, Trait.HORNS),
+                                                                  TraitCard(2, Trait.CARNIVORE),
+                                                                  TraitCard(3, Trait.AMBUSH)])
+        dealer = Dealer([player, self.defendPlayer, self.fatPlayer], 0, [TraitCard(-3, Trait.LONG_NECK)])
+        before = json.loads(json.dumps(dealer.serialize()))
+        fork = dealer.fork()
+        food_card = fork.enact_actions(0, Action4(0, [PopulationUpAction(1, 1)], [], [NewBoardAction(2, [])], []))
+        self.assertEqual(food_card, player.cards[0])
+        forked = fork.players[0]
+        self.assertEqual([s.population for s in forked.species], [1, 2, 1])
+        self.assertIs(forked.species[0], player.species[0])
+        self.assertEqual(forked.cards, [])
+        self.assertEqual(dealer.serialize(), before)
+        self.assertEqual(fork.deck, dealer.deck)
+        fork.deck.draw()
+        self.assertEqual(len(dealer.deck), 1)
+
+
+CHOICE = Action4(0, [PopulationUpAction(0, 1)], [], [], [])
+
+
+class RemotePlayer(threading.Thread):
+    """ The far end of a ProxyPlayer: waits the given delay after each request, then answers it """
+
+    def __init__(self, sock, delay, answer):
+        """
+        :param sock: a Socket.socket connected to a ProxyPlayer's JSONSocket
+        :param delay: Float seconds to wait before answering
+        :param answer: python-encoded JSON to answer with
+        """
+        super().__init__(daemon=True)
+        self.coder = JSONSocket(sock)
+        self.delay = delay
+        self.answer = answer
+        self.requests = []
+
+    def run(self):
+        try:
+            while True:
+                self.requests.append(self.coder.decode_without_timeout())
+                time.sleep(self.delay)
+                self.coder.encode(self.answer)
+        except (ValueError, OSError):
+            pass
+
+
+class ChooseFanOutTestCase(TestCase):
+
+    def setUp(self):
+        self.sockets = []
+        self.remotes = []
+
+    def tearDown(self):
+        for sock in self.sockets:
+            sock.close()
+
+    def remote(self, player_id, delay, answer=CHOICE.serialize()):
+        """ Make an InternalPlayer whose agent is a RemotePlayer across a socketpair
+        :return: an InternalPlayer with one Species and two cards
+        """
+        ours, theirs = socket.socketpair()
+        self.sockets += [ours, theirs]
+        remote = RemotePlayer(theirs, delay, answer)
+        remote.start()
+        self.remotes.append(remote)
+        player = InternalPlayer(player_id, ProxyPlayer(JSONSocket(ours)))
+        player.species = [Species(traits=[Trait.CARNIVORE])]
+        player.cards = [TraitCard(1, Trait.HORNS), TraitCard(2, Trait.FAT_TISSUE)]
+        return player
+
+    def local(self, player_id):
+        """ Make an InternalPlayer whose agent plays the silly strategy in this process
+        :return: an InternalPlayer with one Species and four cards, which its agent has been told about
+        """
+        player = InternalPlayer(player_id, ExternalPlayer(player_id))
+        player.species = [Species()]
+        cards = [TraitCard(3, Trait.AMBUSH), TraitCard(1, Trait.FORAGING), TraitCard(2, Trait.HORNS),
+                 TraitCard(0, Trait.CARNIVORE)]
+        player.start(None, cards, 0)
+        return player
+
+    def test_latency_is_the_slowest_players(self):
+        delay = 0.3
+        dealer = Dealer([self.remote(i, delay) for i in range(1, 5)])
+        start = time.perf_counter()
+        accepted = dealer.step_two_and_three()
+        elapsed = time.perf_counter() - start
+        self.assertEqual([a.serialize() for a in accepted], [CHOICE.serialize()] * 4)
+        self.assertLess(elapsed, 2 * delay)
+        # Each player is told about the others in seat order
+        self.assertEqual([len(remote.requests[0][0]) for remote in self.remotes], [0, 1, 2, 3])
+
+    def test_local_players_keep_their_seats(self):
+        players = [self.local(1), self.remote(2, 0.1), self.local(3)]
+        dealer = Dealer(players)
+        accepted = dealer.step_two_and_three()
+        self.assertEqual(len(accepted), 3)
+        self.assertEqual(accepted[1].serialize(), CHOICE.serialize())
+        self.assertEqual([p.player_id for p in dealer.players], [1, 2, 3])
+
+    def test_late_and_invalid_players_are_dropped(self):
+        players = [self.remote(1, 0.0), self.remote(2, 2.0), self.remote(3, 0.0, "nope"), self.remote(4, 0.1)]
+        dealer = Dealer(players, metrics=Metrics())
+        start = time.perf_counter()
+        with mock.patch("evolution.dealer.CHOOSE_MILLISECONDS", 400):
+            accepted = dealer.step_two_and_three()
+        # One shared deadline, rather than one for each player
+        self.assertLess(time.perf_counter() - start, 0.4 + 0.3)
+        self.assertEqual(len(accepted), 2)
+        self.assertEqual([p.player_id for p in dealer.players], [1, 4])
+        self.assertEqual(dealer.metrics.counters[rejected(Rejection.MALFORMED)], 2)
+
+    def test_failed_send_is_dropped(self):
+        players = [self.remote(1, 0.0), self.remote(2, 0.0), self.remote(3, 0.0)]
+        players[1].player_agent.send_choose = mock.Mock(side_effect=ValueError)
+        dealer = Dealer(players)
+        dealer.step_two_and_three()
+        self.assertEqual([p.player_id for p in dealer.players], [1, 3])
@@ -0,0 +1,93 @@
+import io
+import json
+import threading
+from unittest import TestCase
+
+from . import debug as debug_module
+from .debug import TRACER, OFF, DEBUG, VERBOSE, debug, configure, print_sink, JSONLinesSink
+from .dealer import Dealer
+from .player import Player
+from .species import Species
+
+
+class TracingTestCase(TestCase):
+
+    def setUp(self):
+        self.events = []
+        configure(level=VERBOSE, sink=self.events.append)
+        TRACER.phase = TRACER.player_id = None
+
+    def tearDown(self):
+        configure(level=OFF, sink=print_sink, player_ids=None)
+        TRACER.phase = TRACER.player_id = None
+
+    def test_star_import(self):
+        names = {}
+        exec("from %s import *" % debug_module.__name__, names)
+        self.assertEqual(sorted(name for name in names if name != "__builtins__"), sorted(debug_module.__all__))
+        self.assertIn("debug_traceback", names)
+        self.assertNotIn("json", names)
+
+    def test_off(self):
+        configure(level=OFF)
+        called = []
+        debug(lambda: called.append(1))
+        Species().population = 3
+        self.assertEqual(self.events, [])
+        self.assertEqual(called, [])
+
+    def test_levels(self):
+        configure(level=DEBUG)
+        debug("shown")
+        debug("hidden", verbose=True)
+        debug(lambda: "lazy")
+        self.assertEqual([str(e) for e in self.events], ["shown", "lazy"])
+
+    def test_player_filter(self):
+        configure(player_ids={2})
+        debug("from one", player_id=1)
+        debug("from two", player_id=2)
+        debug("from nobody")
+        self.assertEqual([str(e) for e in self.events], ["from two", "from nobody"])
+
+    def test_configure_keeps_what_isnt_passed(self):
+        configure(player_ids={2})
+        configure(level=DEBUG)
+        debug("from one", player_id=1)
+        debug("from two", player_id=2)
+        configure(player_ids=None)
+        debug("from one again", player_id=1)
+        self.assertEqual([str(e) for e in self.events], ["from two", "from one again"])
+
+    def test_population_event(self):
+        species = Species(population=1)
+        TRACER.phase, TRACER.player_id = "autofeed", 4
+        species.population = 9
+        event = self.events[0].serialize()
+        self.assertEqual(event, {"event": "population", "phase": "autofeed", "player": 4,
+                                 "old": 1, "new": 7, "caller": "test_population_event"})
+
+    def test_dealer_events(self):
+        player = Player(3, species=[Species(food=0, population=2)])
+        Dealer([player], 5).feed_creature(player, 0)
+        self.assertEqual(self.events[0].serialize(), {"event": "feed", "player": 3, "species": 0, "old": 0, "new": 1})
+
+    def test_json_lines_sink(self):
+        stream = io.StringIO()
+        configure(sink=JSONLinesSink(stream))
+        TRACER.phase = "feeding"
+        TRACER.emit(VERBOSE, "feed", player_id=1, species=0)
+        self.assertEqual(json.loads(stream.getvalue()), {"event": "feed", "phase": "feeding", "player": 1, "species": 0})
+
+    def test_context_is_kept_for_each_thread(self):
+        TRACER.phase, TRACER.player_id = "feeding", 1
+
+        def other_table():
+            TRACER.phase, TRACER.player_id = "deal", 2
+            TRACER.emit(VERBOSE, "elsewhere")
+        thread = threading.Thread(target=other_table)
+        thread.start()
+        thread.join()
+        TRACER.emit(VERBOSE, "here")
+        self.assertEqual([(event.name, event.phase, event.player_id) for event in self.events],
+                         [("elsewhere", "deal", 2), ("here", "feeding", 1)])
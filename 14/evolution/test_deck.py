@@ -0,0 +1,56 @@
+from unittest import TestCase
+
+from .deck import Deck, CARDS
+from .trait import Trait
+from .traitcard import TraitCard
+
+
+class DeckTestCase(TestCase):
+
+    def setUp(self):
+        self.cards = [TraitCard(-3, Trait.LONG_NECK), TraitCard(8, Trait.CARNIVORE), TraitCard(0, Trait.AMBUSH)]
+        self.deck = Deck(self.cards)
+
+    def test_new(self):
+        self.assertEqual(list(Deck.new()), TraitCard.new_deck())
+        self.assertEqual(len(Deck.new()), 122)
+
+    def test_flyweights(self):
+        drawn = self.deck.draw()
+        self.assertEqual(drawn, self.cards[0])
+        self.assertIs(drawn, Deck(self.cards[:1]).draw())
+        self.assertIs(Deck.decode(Deck.encode(self.cards[1])), CARDS[Deck.encode(self.cards[1])])
+
+    def test_draw_and_deal(self):
+        self.assertEqual(self.deck.draw(), self.cards[0])
+        self.assertEqual(len(self.deck), 2)
+        self.assertEqual(self.deck.deal(5), self.cards[1:])
+        self.assertFalse(self.deck)
+        self.assertEqual(self.deck.deal(2), [])
+        with self.assertRaises(IndexError):
+            self.deck.draw()
+
+    def test_equality(self):
+        self.assertEqual(self.deck, self.cards)
+        self.assertEqual(Deck(), [])
+        self.deck.draw()
+        self.assertEqual(self.deck, Deck(self.cards[1:]))
+
+    def test_compared_to_other_types(self):
+        self.assertNotEqual(self.deck, None)
+        self.assertNotEqual(self.deck, 3)
+        self.assertFalse(self.deck == "deck")
+        with self.assertRaises(TypeError):
+            hash(self.deck)
+
+    def test_de_serialize(self):
+        serialized = [c.serialize() for c in self.cards]
+        self.assertEqual(self.deck.serialize(), serialized)
+        self.assertEqual(Deck.deserialize(serialized), self.deck)
+        self.deck.deal(2)
+        self.assertEqual(self.deck.serialize(), serialized[2:])
+
+    def test_deserialize_invalid(self):
+        for data in ["cards", [[9, "ambush"]], [[1, "wings"]], [[1]], [["1", "ambush"]], [[True, "ambush"]]]:
+            with self.assertRaises(ValueError):
+                Deck.deserialize(data)
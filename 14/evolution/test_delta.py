@@ -0,0 +1,115 @@
+import socket
+import threading
+from unittest import TestCase
+
+from .delta import StateSender, StateReceiver, diff_list, patch_list, OPT_IN, FULL, PATCH, RESYNC
+from .json_socket import JSONSocket
+from .lobby import Lobby
+from .player import ExternalPlayer
+from .proxy_dealer import ProxyDealer
+from .proxy_player import ProxyPlayer
+from .server import read_options
+from .test_support import FeedingRecorder, play_seeded_game
+
+
+def feeding_states(seeds, player_count=8):
+    """ Silly players are only asked to feed when the choice isn't automatic, so a game has a few feeding states
+    :param seeds: Integer number of seeded games to play
+    :return: a List of the feeding states sent to every player, game after game
+    """
+    states = []
+    for seed in range(seeds):
+        players = [FeedingRecorder(i) for i in range(1, player_count + 1)]
+        play_seeded_game(seed, players)
+        states.extend(state for player in players for state in player.states)
+    return states
+
+
+class DeltaTestCase(TestCase):
+
+    def test_states_survive_patching(self):
+        sender, receiver = StateSender(), StateReceiver()
+        for state in feeding_states(6):
+            message = sender.update(state)
+            self.assertEqual(receiver.receive(message), state)
+        self.assertEqual(message[0], PATCH)
+        self.assertGreater(sender.sequence, 10)
+
+    def test_list_patches(self):
+        old = [["a"], ["b"], ["c"]]
+        for new in [[["a"], ["x"], ["c"]], [["a"]], [["a"], ["b"], ["c"], ["d"], ["e"]], [], old]:
+            self.assertEqual(patch_list(old, diff_list(old, new)), new)
+        self.assertEqual(diff_list(old, list(old)), [3, []])
+        with self.assertRaises(ValueError):
+            patch_list(old, [5, [[3, ["d"]]]])
+        with self.assertRaises(ValueError):
+            patch_list(old, [2, [[2, ["d"]]]])
+
+    def test_out_of_sequence_patch_asks_to_resync(self):
+        states = feeding_states(1)
+        sender, receiver = StateSender(), StateReceiver()
+        receiver.receive(sender.update(states[0]))
+        sender.update(states[1])
+        self.assertIsNone(receiver.receive(sender.update(states[2])))
+        self.assertIsNone(StateReceiver().receive(sender.update(states[2])))
+        self.assertEqual(receiver.receive(sender.full(states[2])), states[2])
+
+    def test_malformed_messages(self):
+        receiver = StateReceiver()
+        for message in [None, [FULL], [FULL, -1, []], [FULL, 1, [1, 2]], ["other", 1, []], [PATCH, 1, 2]]:
+            with self.assertRaises(ValueError):
+                receiver.receive(message)
+
+    def test_read_handshake(self):
+        self.assertEqual(read_options("bob" + OPT_IN), ("bob", False, True, False))
+        self.assertEqual(read_options("bob"), ("bob", False, False, False))
+
+
+class DeltaConnectionTestCase(TestCase):
+
+    def test_proxy_player_resyncs(self):
+        ours, theirs = socket.socketpair()
+        jsock = JSONSocket(ours)
+        jsock.delta = True
+        proxy = ProxyPlayer(jsock)
+        states = feeding_states(1)
+        remote = JSONSocket(theirs)
+        received = []
+
+        def answer():
+            # Take the first state, then pretend to have lost the second
+            received.append(remote.decode())
+            remote.encode(False)
+            received.append(remote.decode())
+            remote.encode(RESYNC)
+            received.append(remote.decode())
+            remote.encode(False)
+        thread = threading.Thread(target=answer)
+        thread.start()
+        self.assertEqual(proxy.feed_species(states[0]), False)
+        self.assertEqual(proxy.feed_species(states[1]), False)
+        thread.join()
+        self.assertEqual([message[:2] for message in received], [[FULL, 1], [PATCH, 2], [FULL, 3]])
+        self.assertEqual(received[2][2], states[1])
+        ours.close()
+        theirs.close()
+
+    def test_lobby_games_with_patches(self):
+        lobby = Lobby("localhost", 0, seating_window=10000)
+        port = lobby.sock.getsockname()[1]
+        options = [(False, False), (False, True), (True, False), (True, True)] * 2
+
+        def play(compact_frames, delta_states):
+            coder = JSONSocket.from_host_and_port("localhost", port)
+            ProxyDealer(coder, ExternalPlayer(1), "player", compact_frames, delta_states).begin()
+        clients = [threading.Thread(target=play, args=option, daemon=True) for option in options]
+        for client in clients:
+            client.start()
+        table, = lobby.serve(1)
+        lobby.sock.close()
+        for client in clients:
+            client.join(5)
+        # Every player answered every request, so none was dropped
+        self.assertIsNone(table.error)
+        self.assertEqual(len(table.scores), len(options))
+        self.assertEqual({score[2] for score in table.scores}, {"player"})
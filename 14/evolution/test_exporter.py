@@ -0,0 +1,115 @@
+import socket
+import urllib.error
+import urllib.request
+from unittest import TestCase
+
+from .dealer import MIN_PLAYERS
+from .exporter import Exporter
+from .json_socket import JSONSocket
+from .lobby import Lobby
+from .metrics import PHASES, GAMES
+from .server import Server
+from .test_lobby import PlayingClient
+from .timeout import Deadline, TimedOutError
+
+
+def samples(text):
+    """
+    :param text: a String of metrics in the Prometheus text format
+    :return: a Dictionary of each sample's Float value by its name and labels
+    """
+    values = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            values[name] = float(value)
+    return values
+
+
+class ExporterTestCase(TestCase):
+
+    def test_traffic(self):
+        exporter = Exporter()
+        ours, theirs = socket.socketpair()
+        player, client = JSONSocket(ours), JSONSocket(theirs)
+        exporter.opened(player)
+        client.encode("hi")
+        self.assertEqual(player.decode(), "hi")
+        player.encode([1, 2])
+        with self.assertRaises(TimedOutError):
+            player.decode(Deadline(10))
+        values = samples(exporter.render())
+        self.assertEqual(values["evolution_connections"], 1)
+        self.assertEqual((values["evolution_messages_received_total"], values["evolution_messages_sent_total"]), (1, 1))
+        self.assertEqual(values["evolution_bytes_received_total"], len(b'"hi"\n'))
+        self.assertEqual(values["evolution_bytes_sent_total"], len(b'[1, 2]\n'))
+        self.assertEqual(values["evolution_decode_timeouts_total"], 1)
+        # A closed connection's traffic is still counted
+        player.shutdown()
+        client.shutdown()
+        values = samples(exporter.render())
+        self.assertEqual((values["evolution_connections"], values["evolution_messages_sent_total"]), (0, 1))
+        # Scraping changes nothing, so scrapers don't disturb each other
+        self.assertEqual(exporter.render(), exporter.render())
+
+    def test_handshake_failures(self):
+        exporter = Exporter()
+        server = Server("localhost", 0, exporter=exporter)
+        try:
+            for handshake in ["fine", 42]:
+                ours, theirs = socket.socketpair()
+                JSONSocket(theirs).encode(handshake)
+                server.add_new_player(ours)
+                theirs.close()
+            values = samples(exporter.render())
+        finally:
+            for player, _ in server.connected_players:
+                player.shutdown()
+            server.sock.close()
+        self.assertEqual(values["evolution_handshake_failures_total"], 1)
+        self.assertEqual(values["evolution_connections"], 1)
+
+    def test_games_in_progress_are_read_live(self):
+        exporter = Exporter()
+        metrics = exporter.game_started()
+        metrics.add_time(PHASES[0], 0.5)
+        values = samples(exporter.render())
+        self.assertEqual(values["evolution_games"], 1)
+        self.assertEqual(values['evolution_phase_seconds_sum{phase="%s"}' % PHASES[0]], 0.5)
+        metrics.add_time(PHASES[0], 0.25)
+        self.assertTrue(metrics.lock.acquire(blocking=False))
+        metrics.lock.release()
+        exporter.game_finished(metrics)
+        values = samples(exporter.render())
+        self.assertEqual(values["evolution_games"], 0)
+        self.assertEqual(values['evolution_phase_seconds_count{phase="%s"}' % PHASES[0]], 2)
+
+    def test_serves_a_lobby(self):
+        exporter = Exporter().start()
+        lobby = Lobby("localhost", 0, seating_window=200, exporter=exporter)
+        try:
+            port = lobby.sock.getsockname()[1]
+            clients = [PlayingClient(port, str(i)) for i in range(MIN_PLAYERS)]
+            for client in clients:
+                client.start()
+            finished = lobby.serve(1)
+            for client in clients:
+                client.join(5)
+            url = "http://localhost:%d" % exporter.port
+            with urllib.request.urlopen(url + "/metrics", timeout=5) as response:
+                self.assertTrue(response.headers["Content-Type"].startswith("text/plain"))
+                values = samples(response.read().decode("utf-8"))
+            with self.assertRaises(urllib.error.HTTPError):
+                urllib.request.urlopen(url + "/", timeout=5)
+        finally:
+            exporter.close()
+            lobby.sock.close()
+        self.assertIsNone(finished[0].error)
+        self.assertEqual(values["evolution_games"], 0)
+        self.assertEqual(values["evolution_dealer_%s_total" % GAMES], 1)
+        self.assertGreater(values["evolution_messages_received_total"], MIN_PLAYERS)
+        rounds = values['evolution_phase_seconds_count{phase="%s"}' % PHASES[0]]
+        self.assertGreater(rounds, 0)
+        responses = values['evolution_response_seconds_bucket{le="+Inf"}']
+        self.assertEqual(responses, values["evolution_response_seconds_count"])
+        self.assertGreaterEqual(responses, MIN_PLAYERS * rounds)
@@ -0,0 +1,139 @@
+import io
+import pickle
+import zlib
+from unittest import TestCase
+
+from .journal import Journal, Replayer, HEADER, DEFAULT_BATCH_EVENTS
+from .player import ExternalPlayer
+from .test_support import FanOutPlayer, FailingPlayer, play_seeded_game
+
+
+def journaled_game(seed, agents, snapshot_interval=1, stream=None, batch_events=DEFAULT_BATCH_EVENTS):
+    """
+    :param agents: a List of agents for the players
+    :return: (the Dealer once the game is over, its Journal)
+    """
+    journal = Journal(stream, seed, snapshot_interval, batch_events)
+    return play_seeded_game(seed, agents, journal=journal), journal
+
+
+class SentRecorder(ExternalPlayer):
+    """ An ExternalPlayer that keeps every message it's sent """
+
+    def __init__(self, player_id):
+        super().__init__(player_id)
+        self.sent = []
+
+    def start(self, msg):
+        self.sent.append(msg)
+        super().start(msg)
+
+    def choose(self, before, after):
+        self.sent.append([before, after])
+        return super().choose(before, after)
+
+    def feed_species(self, state):
+        self.sent.append(state)
+        return super().feed_species(state)
+
+
+def batch(payload):
+    """
+    :param payload: bytes of a pickle
+    :return: bytes of it as a batch of a journal, after its header
+    """
+    return HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+class JournalTestCase(TestCase):
+
+    def assertReplays(self, dealer, events):
+        """ Assert that seeking to the end of the events gives the Dealer as the game ended, and that seeking to every
+        event from the first snapshot on replays without diverging
+        """
+        replayer = Replayer(events)
+        for event_number in range(replayer.snapshots[0], len(events)):
+            replayer.seek(event_number)
+        self.assertEqual(replayer.seek(len(events) - 1).serialize(), dealer.serialize())
+
+    def test_replay_reproduces_the_game(self):
+        for seed in range(3):
+            dealer, journal = journaled_game(seed, [ExternalPlayer(i) for i in range(4)])
+            self.assertEqual(journal.events[0][:2], [Journal.BEGIN, seed])
+            self.assertEqual(journal.events[-1][0], Journal.GAME_OVER)
+            self.assertReplays(dealer, journal.events)
+
+    def test_sent_messages_are_made_again(self):
+        agents = [SentRecorder(i) for i in range(1, 5)]
+        _, journal = journaled_game(2, agents)
+        replayer = Replayer(journal.events)
+        sends = [(number, event[1]) for number, event in enumerate(journal.events) if event[0] == Journal.SEND]
+        self.assertEqual(len(sends), sum(len(agent.sent) for agent in agents))
+        remade = {agent.player_id: [] for agent in agents}
+        for number, player_id in sends:
+            remade[player_id].append(replayer.sent(number))
+        self.assertEqual(remade, {agent.player_id: agent.sent for agent in agents})
+        with self.assertRaises(ValueError):
+            replayer.sent(replayer.snapshots[0])
+
+    def test_seek_stops_at_the_event(self):
+        dealer, journal = journaled_game(1, [ExternalPlayer(i) for i in range(3)])
+        replayer = Replayer(journal.events)
+        # The start of the second round, and the snapshot of the Dealer taken there
+        event_number = replayer.snapshots[1]
+        replayed = replayer.seek(event_number)
+        self.assertEqual(replayed.journal.position, event_number + 1)
+        self.assertEqual(replayed.rounds, 1)
+        self.assertEqual([player.serialize_species() for player in replayed.players],
+                         [species for _, species, _, _ in journal.events[event_number][2][3]])
+
+    def test_snapshot_interval(self):
+        dealer, journal = journaled_game(1, [ExternalPlayer(i) for i in range(3)], snapshot_interval=2)
+        rounds = [event for event in journal.events if event[0] == Journal.ROUND]
+        self.assertGreater(len(rounds), 2)
+        self.assertEqual([event[2] is not None for event in rounds], [i > 0 and i % 2 == 0 for i in range(len(rounds))])
+        self.assertReplays(dealer, journal.events)
+
+    def test_fan_out_and_failing_agents(self):
+        dealer, journal = journaled_game(2, [FanOutPlayer(1), FailingPlayer(2), ExternalPlayer(3), FanOutPlayer(4)])
+        self.assertEqual([fan_out for _, _, fan_out in journal.events[0][3]], [True, False, False, True])
+        self.assertIn([Journal.ERROR, 2, repr(ValueError("No choice"))], journal.events)
+        self.assertIn([Journal.CHOOSE, [2]], journal.events)
+        self.assertReplays(dealer, journal.events)
+
+    def test_divergence_is_reported(self):
+        _, journal = journaled_game(1, [ExternalPlayer(i) for i in range(3)])
+        events = [list(event) for event in journal.events]
+        index = next(i for i, event in enumerate(events) if event[0] == Journal.APPLY_ACTIONS)
+        events[index][1] += 1
+        with self.assertRaises(ValueError):
+            Replayer(events).seek(index)
+        with self.assertRaises(ValueError):
+            Replayer(events[1:])
+
+    def test_load(self):
+        stream = io.BytesIO()
+        # A batch for every round
+        dealer, journal = journaled_game(1, [ExternalPlayer(i) for i in range(3)], stream=stream, batch_events=1)
+        _, in_memory = journaled_game(1, [ExternalPlayer(i) for i in range(3)])
+        # Written events aren't kept
+        self.assertEqual((journal.events, journal.written), ([], len(in_memory.events)))
+        data = stream.getvalue()
+        events = Journal.load(io.BytesIO(data))
+        self.assertEqual(events, in_memory.events)
+        self.assertReplays(dealer, events)
+        # A journal cut off partway through a flush keeps the batches before it
+        partial = Journal.load(io.BytesIO(data[:-10]))
+        self.assertTrue(0 < len(partial) < len(events))
+        self.assertEqual(partial, events[:len(partial)])
+        # but one that's corrupt before its end is refused
+        corrupt = bytearray(data)
+        corrupt[HEADER.size + 20] ^= 0xFF
+        with self.assertRaises(ValueError):
+            Journal.load(io.BytesIO(bytes(corrupt)))
+
+    def test_load_refuses_objects(self):
+        with self.assertRaises(ValueError):
+            Journal.load(io.BytesIO(batch(pickle.dumps([[Journal.BEGIN, ExternalPlayer(1)]]))))
+        with self.assertRaises(ValueError):
+            Journal.load(io.BytesIO(batch(pickle.dumps({"not": "events"}))))
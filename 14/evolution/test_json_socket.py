@@ -0,0 +1,77 @@
+import json
+import socket
+import threading
+from unittest import TestCase
+
+from .json_socket import JSONSocket
+
+
+class JSONSocketTestCase(TestCase):
+
+    def setUp(self):
+        self.ours, self.theirs = socket.socketpair()
+        self.ours.settimeout(5)
+        self.coder = JSONSocket(self.ours)
+
+    def tearDown(self):
+        self.ours.close()
+        self.theirs.close()
+
+    def send(self, data):
+        self.theirs.sendall(data)
+
+    def test_messages_in_one_chunk(self):
+        self.send(b'"ok"\n[1, [2, 3]]\n{"a": null}\n')
+        self.assertEqual(self.coder.decode_without_timeout(), "ok")
+        self.assertEqual(self.coder.decode_without_timeout(), [1, [2, 3]])
+        self.assertEqual(self.coder.decode_without_timeout(), {"a": None})
+        self.assertEqual(self.coder.buffer, b"")
+
+    def test_message_split_across_chunks(self):
+        message = ["species", 1, 2, "é"] * 500
+        data = (json.dumps(message) + "\n").encode(JSONSocket.ENCODING)
+
+        def trickle():
+            for start in range(0, len(data), 1001):
+                self.send(data[start:start + 1001])
+        writer = threading.Thread(target=trickle)
+        writer.start()
+        self.assertEqual(self.coder.decode_without_timeout(), message)
+        writer.join()
+
+    def test_leftovers_stay_for_the_next_message(self):
+        self.send(b'1\n[2')
+        self.assertEqual(self.coder.decode_without_timeout(), 1)
+        self.assertEqual(self.coder.buffer, b"[2")
+        self.send(b']\n')
+        self.assertEqual(self.coder.decode_without_timeout(), [2])
+
+    def test_peer_without_newlines(self):
+        self.send(b'[1] "two"   {"three": 3}')
+        self.assertEqual(self.coder.decode_without_timeout(), [1])
+        self.assertEqual(self.coder.decode_without_timeout(), "two")
+        self.assertEqual(self.coder.decode_without_timeout(), {"three": 3})
+
+    def test_message_over_several_lines(self):
+        self.send(b'[1,\n 2,\n')
+        with self.assertRaises(JSONSocket.IncompleteBufferException):
+            self.coder.buffer += self.ours.recv(JSONSocket.CHUNK_SIZE)
+            self.coder.parse_buffer()
+        self.send(b' 3]\n"next"\n')
+        self.assertEqual(self.coder.decode_without_timeout(), [1, 2, 3])
+        self.assertEqual(self.coder.decode_without_timeout(), "next")
+
+    def test_closed_socket(self):
+        self.send(b'"last"\n')
+        self.theirs.close()
+        self.assertEqual(self.coder.decode_without_timeout(), "last")
+        with self.assertRaises(JSONSocket.ClosedSocketError):
+            self.coder.decode_without_timeout()
+
+    def test_send_and_get_response(self):
+        self.send(b'"ok"\n')
+        self.assertEqual(self.coder.send_and_get_response("hi"), "ok")
+        self.assertEqual(self.theirs.recv(64), b'"hi"\n')
+        self.send(b'"ok" "extra"\n')
+        with self.assertRaises(ValueError):
+            self.coder.send_and_get_response("hi")
@@ -0,0 +1,139 @@
+import threading
+import time
+from unittest import TestCase
+
+from .dealer import MAX_PLAYERS, MIN_PLAYERS
+from .json_socket import JSONSocket
+from .lobby import Lobby, Table
+from .player import ExternalPlayer
+from .proxy_dealer import ProxyDealer
+
+
+class PlayingClient(threading.Thread):
+    """ Signs up with a lobby and plays with the silly strategy until its connection is closed """
+
+    def __init__(self, port, handshake):
+        """
+        :param port: Integer port of the lobby
+        :param handshake: String to sign up with
+        """
+        super().__init__(daemon=True)
+        self.port = port
+        self.handshake = handshake
+
+    def run(self):
+        coder = JSONSocket.from_host_and_port("localhost", self.port)
+        # Returns once the table closes the connection
+        ProxyDealer(coder, ExternalPlayer(1), self.handshake).begin()
+
+
+class LobbyTestCase(TestCase):
+
+    def make_lobby(self, **kwargs):
+        self.lobby = Lobby("localhost", 0, **kwargs)
+        self.port = self.lobby.sock.getsockname()[1]
+
+    def tearDown(self):
+        self.lobby.sock.close()
+
+    def play(self, clients, tables, delay=0.0):
+        """ Start the clients, delay seconds apart, and run the lobby until the given number of tables finish
+        :return: the List of finished Tables
+        """
+        clients = [PlayingClient(self.port, str(i)) for i in range(clients)]
+
+        def start():
+            for client in clients:
+                client.start()
+                time.sleep(delay)
+        threading.Thread(target=start, daemon=True).start()
+        finished = self.lobby.serve(tables)
+        for client in clients:
+            client.join(5)
+        return finished
+
+    def test_plays_tables_at_once(self):
+        seen = []
+        self.make_lobby(max_tables=4, seating_window=10000, on_table=seen.append)
+        finished = self.play(2 * MAX_PLAYERS, 2)
+        self.assertEqual(seen, finished)
+        self.assertEqual(sorted(table.table_id for table in finished), [1, 2])
+        for table in finished:
+            self.assertEqual(table.state, Table.FINISHED)
+            self.assertIsNone(table.error)
+            self.assertEqual(len(table.players), MAX_PLAYERS)
+            self.assertEqual(len(table.scores), MAX_PLAYERS)
+        handshakes = sorted(score[2] for table in finished for score in table.scores)
+        self.assertEqual(handshakes, sorted(str(i) for i in range(2 * MAX_PLAYERS)))
+        self.assertFalse(self.lobby.tables)
+        stats = self.lobby.stats()
+        self.assertEqual(stats["tables"], 2)
+        self.assertEqual(stats["messages"], self.lobby.responses.count)
+        self.assertEqual(stats["messages"], sum(table.metrics.responses().count for table in finished))
+        self.assertGreater(stats["messages"], 0)
+        self.assertLessEqual(stats["latency_p50_ms"], stats["latency_p99_ms"])
+
+    def test_window_seats_a_smaller_table(self):
+        self.make_lobby(seating_window=300)
+        start = time.perf_counter()
+        finished = self.play(MIN_PLAYERS, 1)
+        self.assertEqual(len(finished[0].players), MIN_PLAYERS)
+        self.assertGreaterEqual(time.perf_counter() - start, 0.3)
+
+    def test_failing_callback_doesnt_stall_the_lobby(self):
+        def fail(table):
+            raise ZeroDivisionError
+        self.make_lobby(seating_window=0, on_table=fail)
+        finished = self.play(2 * MIN_PLAYERS, 2, delay=0.01)
+        self.assertEqual(len(finished), 2)
+
+    def test_max_tables_bounds_tables_playing(self):
+        self.make_lobby(max_tables=1, seating_window=0)
+        finished = self.play(2 * MIN_PLAYERS, 2, delay=0.01)
+        self.assertEqual(self.lobby.peak_tables, 1)
+        self.assertEqual(sum(len(table.players) for table in finished), 2 * MIN_PLAYERS)
+
+    def test_stop_disconnects_the_queue(self):
+        self.make_lobby(seating_window=10000)
+        clients = [PlayingClient(self.port, "waiting") for _ in range(2)]
+        for client in clients:
+            client.start()
+        threading.Timer(0.5, self.lobby.stop).start()
+        self.assertEqual(self.lobby.serve(), [])
+        for client in clients:
+            client.join(5)
+            self.assertFalse(client.is_alive())
+        self.assertFalse(self.lobby.queue)
+
+
+class SeatingTestCase(TestCase):
+
+    def setUp(self):
+        self.lobby = Lobby("localhost", 0, max_tables=2, seating_window=1000)
+
+    def tearDown(self):
+        self.lobby.sock.close()
+
+    def join(self, count, at):
+        for i in range(count):
+            self.lobby.queue.append((None, str(i), at))
+
+    def test_full_tables_are_seated_at_once(self):
+        self.join(MAX_PLAYERS + MIN_PLAYERS, 10.0)
+        seated = self.lobby.seat_tables(10.0)
+        self.assertEqual([len(table.players) for table in seated], [MAX_PLAYERS])
+        self.assertEqual(self.lobby.until_seating(10.0), 1.0)
+        seated = self.lobby.seat_tables(11.0)
+        self.assertEqual([len(table.players) for table in seated], [MIN_PLAYERS])
+        self.assertEqual(self.lobby.peak_tables, 2)
+
+    def test_too_few_players_wait(self):
+        self.join(MIN_PLAYERS - 1, 0.0)
+        self.assertEqual(self.lobby.seat_tables(100.0), [])
+        self.assertIsNone(self.lobby.until_seating(100.0))
+
+    def test_no_more_than_max_tables(self):
+        self.join(3 * MAX_PLAYERS, 0.0)
+        self.assertEqual(len(self.lobby.seat_tables(0.0)), 2)
+        self.assertEqual(len(self.lobby.queue), MAX_PLAYERS)
+        self.assertIsNone(self.lobby.until_seating(0.0))
@@ -0,0 +1,123 @@
+from unittest import TestCase, skipUnless
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .dealer import Dealer
+from .deck import Deck
+from .player import Player, InternalPlayer, ExternalPlayer
+from .simulate import shuffled_deck
+from .test_support import play_seeded_game
+from .species import Species
+from .traitcard import TraitCard
+from .trait import Trait
+
+if numpy is not None:
+    from .lockstep import LockstepGames, SillyPolicy, attackable, simulate_lockstep
+    from .action4 import Rejection
+
+
+def play_dealer(seed, player_count):
+    """
+    :return: a Dealer that has played the seeded game to the end
+    """
+    return play_seeded_game(seed, [ExternalPlayer(i) for i in range(player_count)])
+
+
+def board_dealer():
+    """
+    :return: a Dealer between rounds whose boards make for attacks, Scavengers, Cooperation, Fat Tissue, Horns,
+    Long Necks and Fertile species
+    """
+    species = [
+        [Species(population=3, body=2, traits=[Trait.CARNIVORE, Trait.FORAGING]),
+         Species(population=2, traits=[Trait.COOPERATION, Trait.LONG_NECK]),
+         Species(population=4, traits=[Trait.COOPERATION]),
+         Species(population=3, traits=[Trait.SCAVENGER])],
+        [Species(population=2, body=3, traits=[Trait.HORNS]),
+         Species(population=1, body=4, traits=[Trait.FAT_TISSUE], fat_food=1),
+         Species(population=5, traits=[Trait.SCAVENGER, Trait.FERTILE])],
+        [Species(population=4, body=1, traits=[Trait.CARNIVORE, Trait.PACK_HUNTING])],
+    ]
+    deck = shuffled_deck(7)
+    players = []
+    for seat, boards in enumerate(species):
+        player = InternalPlayer(seat + 1, ExternalPlayer(seat + 1))
+        player.species = boards
+        player.cards = deck[seat * 4:seat * 4 + 4]
+        players.append(player)
+    dealer = Dealer(players, 30, deck[12:])
+    dealer.starting_player = 1
+    return dealer
+
+
+@skipUnless(numpy, "the lockstep engine needs NumPy")
+class LockstepTestCase(TestCase):
+
+    def assertSameGame(self, dealer, batch, game):
+        self.assertEqual(batch.dealer(game).serialize(), dealer.serialize())
+        self.assertEqual(batch.scores(game), dealer.get_scores())
+        self.assertEqual(batch.rounds[game], dealer.rounds)
+        self.assertEqual(batch.starting_player[game], dealer.starting_player)
+
+    def test_matches_dealer(self):
+        for player_count in [3, 8]:
+            batch = LockstepGames.seeded(list(range(6)), player_count)
+            batch.play()
+            self.assertTrue(batch.over.all())
+            for seed in range(6):
+                self.assertSameGame(play_dealer(seed, player_count), batch, seed)
+
+    def test_round_matches_dealer(self):
+        dealer = board_dealer()
+        batch = LockstepGames.from_dealers([dealer, board_dealer()])
+        self.assertSameGame(dealer, batch, 0)
+        dealer.step_one()
+        dealer.step_four(dealer.step_two_and_three())
+        dealer.rounds += 1
+        batch.play_round()
+        for game in range(2):
+            self.assertSameGame(dealer, batch, game)
+
+    def test_attackable(self):
+        boards = board_dealer()
+        batch = LockstepGames.from_dealers([boards])
+        # Every player's species against every player's, including its own
+        everyone = batch.boards[0][None].repeat(3, axis=0)
+        targets = attackable(batch.boards[0], everyone, batch.species_count[0][None].repeat(3, axis=0))
+        for seat, player in enumerate(boards.players):
+            for a, attacker in enumerate(player.species):
+                for defending, other in enumerate(boards.players):
+                    for d in range(len(other.species)):
+                        self.assertEqual(targets[seat, a, defending, d], other.is_species_attackable(d, attacker))
+
+    def test_rejected_choices(self):
+        class OutOfRange(SillyPolicy):
+            def choose(self, engine, games, seats):
+                choices = super().choose(engine, games, seats)
+                choices.food[seats == 1] = 99
+                return choices
+        batch = LockstepGames.seeded([0, 1], 3, OutOfRange())
+        batch.play_round()
+        self.assertEqual(batch.in_game.tolist(), [[True, False, True]] * 2)
+        self.assertEqual(batch.rejections, {Rejection.CARD_OUT_OF_RANGE: 2})
+        self.assertEqual([player.player_id for player in batch.dealer(0).players], [1, 3])
+
+    def test_kill_deals_in_front(self):
+        dealer = Dealer([Player(1, [Species(), Species(population=2)], cards=[TraitCard(0, Trait.HORNS)])] +
+                        [Player(i) for i in range(2, 4)], 0, Deck.new())
+        batch = LockstepGames.from_dealers([dealer])
+        batch._kill(numpy.array([0]), numpy.array([0]), numpy.array([0]))
+        dealer.kill_creature(dealer.players[0], 0)
+        self.assertEqual(batch.dealer(0).serialize(), dealer.serialize())
+
+    def test_simulate_lockstep(self):
+        seen = []
+        summary = simulate_lockstep(3, 4, first_seed=5, on_result=seen.append)
+        self.assertEqual([r.seed for r in seen], [5, 6, 7])
+        self.assertEqual([s[:2] for s in seen[1].scores], [s[:2] for s in play_dealer(6, 4).get_scores()])
+        self.assertEqual(summary.games, 3)
+        with self.assertRaises(ValueError):
+            simulate_lockstep(1, 2)
@@ -0,0 +1,90 @@
+from unittest import TestCase
+
+from .mcts import MCTSPlayer, RootBandit, legal_feedings, projected_score, root_from_state
+from .feeding_intent import FeedNone
+from .player import Player
+from .species import Species
+from .trait import Trait
+
+BUDGET = 0.05
+
+
+class MCTSTestCase(TestCase):
+
+    def setUp(self):
+        self.me = Player(1, species=[Species(food=0, population=2, body=3, traits=[Trait.CARNIVORE]),
+                                     Species(food=0, population=1, body=2, traits=[Trait.FAT_TISSUE]),
+                                     Species(food=1, population=1)], bag=2)
+        self.victim = Player(2, species=[Species(food=0, population=2), Species(food=1, population=1,
+                                                                                traits=[Trait.CLIMBING])])
+        self.other = Player(3, species=[Species(food=0, population=3, traits=[Trait.CARNIVORE])])
+        self.state = self.me.produce_state(4, [self.victim, self.other])
+
+    def test_legal_feedings(self):
+        feedings = [f.serialize() for f in legal_feedings(self.me, [self.victim, self.other], 4)]
+        self.assertEqual(feedings, [[0, 0, 0], [0, 1, 0], [1, 2], 1])
+        self.assertEqual(legal_feedings(self.me, [self.victim, self.other], 0), [])
+
+    def test_projected_score(self):
+        # bag, plus the fed species: one food to the bag, one population and no traits
+        self.assertEqual(projected_score(self.me), 2 + 2)
+
+    def test_root_from_state(self):
+        root, moves = root_from_state(self.state)
+        self.assertEqual([p.serialize_species() for p in root.players],
+                         [p.serialize_species() for p in [self.me, self.victim, self.other]])
+        self.assertEqual(root.watering_hole, 4)
+        self.assertIsInstance(moves[0], FeedNone)
+        self.assertEqual(len(moves), 5)
+
+    def test_search_leaves_root_alone(self):
+        root, moves = root_from_state(self.state)
+        before = root.serialize()
+        bandit = RootBandit(root, moves, seed=1)
+        rollouts = bandit.search(0)
+        self.assertEqual(rollouts, 1)
+        for _ in range(len(moves) * 3):
+            bandit.search(0)
+        self.assertEqual(sum(bandit.visits), len(moves) * 3 + 1)
+        self.assertTrue(all(bandit.visits))
+        self.assertTrue(all(0 <= r <= v for r, v in zip(bandit.rewards, bandit.visits)))
+        self.assertEqual(root.serialize(), before)
+
+    def test_feed_species(self):
+        player = MCTSPlayer(1, time_budget=BUDGET, processes=1, seed=1)
+        choice = player.feed_species(self.state)
+        self.assertIn(choice, [m.serialize() for m in root_from_state(self.state)[1]])
+        self.assertGreater(player.rollouts, 0)
+        self.assertGreater(player.rollouts_per_second(), 0)
+
+    def test_feed_species_in_pool(self):
+        player = MCTSPlayer(1, time_budget=BUDGET, processes=2, seed=1)
+        try:
+            choice = player.feed_species(self.state)
+            self.assertIn(choice, [m.serialize() for m in root_from_state(self.state)[1]])
+            self.assertGreater(player.rollouts, 1)
+        finally:
+            player.close()
+
+    def test_late_pool_is_replaced_at_start(self):
+        player = MCTSPlayer(1, time_budget=BUDGET, processes=2, seed=1)
+        try:
+            pool = player.pool
+            self.assertIsNotNone(pool)
+            player.pool_late = True
+            # Searched in this process, leaving the pool be
+            player.feed_species(self.state)
+            self.assertGreater(player.rollouts, 0)
+            self.assertIs(player.pool, pool)
+            player.start(self.me.produce_state(4))
+            self.assertIsNotNone(player.pool)
+            self.assertIsNot(player.pool, pool)
+            self.assertFalse(player.pool_late)
+        finally:
+            player.close()
+
+    def test_only_choice(self):
+        player = MCTSPlayer(1, time_budget=BUDGET, processes=1)
+        state = Player(1, species=[Species(food=1, population=1)]).produce_state(3, [self.victim])
+        self.assertEqual(player.feed_species(state), False)
+        self.assertEqual(player.rollouts, 0)
@@ -0,0 +1,118 @@
+import socket
+from unittest import TestCase
+
+from .dealer import Dealer
+from .json_socket import JSONSocket
+from .action4 import Rejection
+from .metrics import (Histogram, Metrics, PHASES, GAMES, ROUNDS, FEED_TURNS, ATTACKS, KILLS, EJECTIONS,
+                      INVALID_RESPONSES, CARDS_DEALT, RESPONSE_SECONDS, rejected)
+from .player import ExternalPlayer, InternalPlayer
+from .proxy_player import ProxyPlayer
+from .seat_ring import SeatRing
+from .session import staying
+from .simulate import shuffled_deck, simulate
+from .species import Species
+from .trait import Trait
+from .test_support import FanOutPlayer, FailingPlayer, play_seeded_game
+
+
+def measured_game(seed, agents):
+    """
+    :return: (the Dealer once the game is over, its Metrics)
+    """
+    metrics = Metrics()
+    return play_seeded_game(seed, agents, metrics=metrics), metrics
+
+
+class MetricsTestCase(TestCase):
+
+    def test_histogram(self):
+        histogram = Histogram((1, 2, 5))
+        for value in [0.5, 1, 1.5, 3, 10]:
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [2, 1, 1, 1])
+        self.assertEqual((histogram.count, histogram.total), (5, 16))
+        # Interpolated within the bucket as though its values were spread evenly
+        self.assertEqual([histogram.quantile(fraction) for fraction in [0.2, 0.4, 0.5, 1]], [0.5, 1, 1.5, float("inf")])
+        self.assertEqual(histogram.quantile(0), 0)
+        other = Histogram((1, 2, 5))
+        other.observe(2)
+        histogram.merge(other)
+        self.assertEqual(histogram.counts, [2, 2, 1, 1])
+        self.assertIsNone(Histogram().quantile(0.5))
+        self.assertEqual(histogram.serialize()["buckets"], [[1, 2], [2, 2], [5, 1], [None, 1]])
+
+    def test_registry(self):
+        metrics = Metrics()
+        self.assertEqual(metrics.timed("step", lambda a, b: a + b, 1, 2), 3)
+        metrics.add_time("step", 0.5)
+        metrics.count("things")
+        metrics.count("things", 2)
+        metrics.histogram("latency", "1").observe(0.01)
+        other = Metrics()
+        other.add_time("step", 1.0)
+        other.count("things")
+        other.histogram("latency", "1").observe(0.02)
+        other.histogram(RESPONSE_SECONDS, "2").observe(0.5)
+        metrics.merge(other)
+        data = metrics.serialize()
+        self.assertEqual(data["timers"]["step"]["count"], 3)
+        self.assertGreaterEqual(data["timers"]["step"]["seconds"], 1.5)
+        self.assertEqual(data["counters"], {"things": 4})
+        self.assertEqual(data["histograms"]["latency"]["1"]["count"], 2)
+        self.assertEqual(data["waiting_seconds"], 0.5)
+
+    def test_game(self):
+        dealer, metrics = measured_game(1, [ExternalPlayer(i) for i in range(5)])
+        unmeasured = play_seeded_game(1, [ExternalPlayer(i) for i in range(5)])
+        self.assertEqual(dealer.get_scores(), unmeasured.get_scores())
+        self.assertEqual(metrics.counters[GAMES], 1)
+        self.assertEqual(metrics.counters[ROUNDS], dealer.rounds)
+        self.assertEqual(sorted(metrics.timers), sorted(PHASES))
+        self.assertTrue(all(times == dealer.rounds for _, times in metrics.timers.values()))
+        self.assertEqual(metrics.counters[CARDS_DEALT], len(shuffled_deck(1)) - len(dealer.deck))
+        self.assertGreater(metrics.counters[KILLS], 0)
+        responses = metrics.histograms[RESPONSE_SECONDS]
+        self.assertEqual(sorted(responses), ["1", "2", "3", "4", "5"])
+        # Every player is asked to choose once a round, at least
+        self.assertTrue(all(histogram.count >= dealer.rounds for histogram in responses.values()))
+        self.assertEqual(metrics.waiting(), sum(histogram.total for histogram in responses.values()))
+
+    def test_ejections(self):
+        dealer, metrics = measured_game(2, [FanOutPlayer(1), FailingPlayer(2), ExternalPlayer(3), FanOutPlayer(4)])
+        self.assertEqual(metrics.counters[EJECTIONS], 1)
+        # The failed choice is rejected as malformed
+        self.assertEqual(metrics.counters[rejected(Rejection.MALFORMED)], 1)
+        self.assertEqual(metrics.counters[INVALID_RESPONSES], 1)
+        self.assertEqual(metrics.histograms[RESPONSE_SECONDS]["2"].count, 1)
+        self.assertGreater(metrics.histograms[RESPONSE_SECONDS]["1"].count, 1)
+
+    def test_attack(self):
+        attacker = InternalPlayer(1, ExternalPlayer(1))
+        attacker.species = [Species(food=0, population=2, body=1, traits=[Trait.CARNIVORE])]
+        defender = InternalPlayer(2, ExternalPlayer(2))
+        defender.species = [Species(food=2, population=2, body=1)]
+        metrics = Metrics()
+        dealer = Dealer([attacker, defender], 5, [], metrics=metrics)
+        dealer.feed_one(SeatRing(dealer.players))
+        self.assertEqual((metrics.counters[FEED_TURNS], metrics.counters[ATTACKS]), (1, 1))
+        self.assertEqual(defender.species[0].population, 1)
+
+    def test_simulate_merges_metrics(self):
+        summary = simulate(3, 3, processes=1, with_metrics=True)
+        self.assertEqual(summary.metrics.counters[GAMES], 3)
+        self.assertEqual(summary.serialize()["metrics"]["counters"]["games"], 3)
+        self.assertNotIn("metrics", simulate(1, 3, processes=1).serialize())
+
+    def test_timed_agent_keeps_the_connection(self):
+        ours, theirs = socket.socketpair()
+        jsock = JSONSocket(ours)
+        jsock.session = True
+        metrics = Metrics()
+        player = InternalPlayer(1, metrics.agent(ProxyPlayer(jsock), 1), handshake="bob")
+        self.assertEqual(staying([player]), [(jsock, "bob")])
+        metrics.histogram(RESPONSE_SECONDS, "2").observe(0.5)
+        metrics.histogram(RESPONSE_SECONDS, "1").observe(0.01)
+        self.assertEqual((metrics.responses().count, metrics.responses().total), (2, 0.51))
+        ours.close()
+        theirs.close()
@@ -73,6 +73,56 @@ class PlayerTestCase(TestCase):
             self.assertEqual(player.cards[0].food_value, 1)
             self.assertEqual(player.cards[0].trait, Trait.LONG_NECK)
 
+    def test_serialize_cache(self):
+        player = Player(1, species=[self.species_veg_0, self.species_fat_0], bag=2,
+                        cards=[TraitCard(1, Trait.HORNS)])
+        serialized = player.serialize()
+        species = player.serialize_species()
+        self.assertIs(player.serialize(), serialized)
+        self.assertIs(player.serialize_species(), species)
+
+        # Changing a species invalidates the player's cached forms too
+        self.species_veg_0.food = 1
+        self.assertIsNot(player.serialize_species(), species)
+        self.assertEqual(player.serialize()[1][1][0][0], ["food", 1])
+
+        for change in [lambda: player.species.append(Species()),
+                       lambda: player.species.pop(0),
+                       lambda: player.cards.insert(0, TraitCard(2, Trait.CARNIVORE)),
+                       lambda: player.cards.__setitem__(slice(0, 0), [TraitCard(0, Trait.AMBUSH)]),
+                       lambda: setattr(player, "bag", 5),
+                       lambda: setattr(player, "species", [])]:
+            version = player.version
+            before = player.serialize()
+            change()
+            self.assertGreater(player.version, version)
+            self.assertIsNot(player.serialize(), before)
+        self.assertEqual(player.serialize(), Player.deserialize(player.serialize()).serialize())
+
+    def test_fork(self):
+        player = Player(1, species=[self.species_veg_0, self.species_fat_0], bag=2, cards=[TraitCard(1, Trait.HORNS)])
+        clone = player.fork()
+        self.assertEqual(clone.serialize(), player.serialize())
+        self.assertIs(clone.species[0], self.species_veg_0)
+        clone.cards.pop()
+        clone.bag = 3
+        own = clone.own_species(1)
+        self.assertIsNot(own, self.species_fat_0)
+        self.assertIs(clone.own_species(1), own)
+        own.food = 1
+        self.assertEqual(self.species_fat_0.food, 0)
+        self.assertEqual(len(player.cards), 1)
+        self.assertEqual(player.bag, 2)
+        # The original copies a shared species too, rather than changing the clone's
+        self.assertIsNot(player.own_species(0), clone.species[0])
+
+    def test_cooperation_chain(self):
+        cooperate = Species(traits=[Trait.COOPERATION])
+        player = Player(1, species=[cooperate, Species(traits=[Trait.COOPERATION]), Species(), cooperate.fork()])
+        self.assertEqual(list(player.cooperation_chain(0)), [0, 1, 2])
+        self.assertEqual(list(player.cooperation_chain(2)), [2])
+        self.assertEqual(list(player.cooperation_chain(3)), [3])
+
     def test_order_species(self):
 
         player = Player(1)
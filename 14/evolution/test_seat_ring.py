@@ -0,0 +1,89 @@
+from unittest import TestCase
+
+from .seat_ring import SeatRing
+
+
+class SeatRingTestCase(TestCase):
+
+    def setUp(self):
+        self.players = ["a", "b", "c", "d"]
+        self.ring = SeatRing(self.players, first=1)
+
+    def test_advance(self):
+        self.assertEqual(self.ring.current_player(), "b")
+        self.assertEqual(self.ring.following(1), ["c", "d", "a"])
+        self.ring.advance()
+        self.ring.advance()
+        self.ring.advance()
+        self.assertEqual(self.ring.current_player(), "a")
+        self.assertEqual(self.ring.following(0), ["b", "c", "d"])
+
+    def test_leave(self):
+        self.ring.leave(1)
+        self.assertEqual(len(self.ring), 3)
+        self.assertEqual(self.ring.current_player(), "c")
+        self.assertEqual(self.ring.following(2), ["d", "a"])
+        # leaving the ring doesn't leave the game
+        self.assertEqual(self.ring.rank(2), 2)
+        self.assertEqual(self.ring.in_game_through(3), 4)
+
+    def test_eject(self):
+        self.ring.eject(1)
+        self.assertEqual(self.ring.current_player(), "c")
+        self.assertEqual([self.ring.rank(seat) for seat in [0, 2, 3]], [0, 1, 2])
+        self.assertEqual(self.ring.in_game_through(1), 1)
+        self.assertEqual(self.ring.in_game_through(2), 2)
+
+    def test_empty(self):
+        self.assertFalse(SeatRing([]))
+        self.ring.leave(0)
+        self.ring.leave(2)
+        self.ring.leave(3)
+        self.ring.leave(1)
+        self.assertFalse(self.ring)
+        self.assertIsNone(self.ring.current)
+
+    def test_draft(self):
+        # A rotation other than feeding: players draft two cards each from a pile in turn, starting with "b", and "c"
+        # breaks the rules on its first pick
+        ring = SeatRing(["a", "b", "c"], first=1)
+        pile = list(range(10))
+        hands = {player: [] for player in ring.players}
+        while ring:
+            seat = ring.current
+            player = ring.current_player()
+            if player == "c":
+                ring.eject(seat)
+                continue
+            hands[player].append(pile.pop(0))
+            if len(hands[player]) == 2:
+                ring.leave(seat)
+            else:
+                ring.advance()
+        self.assertEqual(hands, {"a": [1, 3], "b": [0, 2], "c": []})
+        self.assertEqual(ring.in_game, [True, True, False])
+        self.assertEqual(ring.in_game_through(2), 2)
+
+    def test_matches_list_rotation(self):
+        # Replays the list surgery the Dealer used to do, against the ring, for one sequence of turns
+        players = list("abcdefgh")
+        ordered = players[3:] + players[:3]
+        ring = SeatRing(players, first=3)
+        in_game = list(players)
+        for action in "aaleaalaeaaal":
+            if not ordered:
+                break
+            seat = ring.current
+            self.assertEqual(ring.current_player(), ordered[0])
+            self.assertEqual(ring.following(seat), ordered[1:])
+            self.assertEqual(ring.rank(seat), in_game.index(ordered[0]))
+            if action == "a":
+                ordered.append(ordered.pop(0))
+                ring.advance()
+            elif action == "l":
+                ordered.pop(0)
+                ring.leave(seat)
+            elif action == "e":
+                in_game.remove(ordered.pop(0))
+                ring.eject(seat)
+        self.assertEqual(len(ring), len(ordered))
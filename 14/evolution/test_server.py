@@ -0,0 +1,94 @@
+import json
+import socket
+import threading
+import time
+from unittest import TestCase
+
+from .dealer import MAX_PLAYERS, MIN_PLAYERS
+from .server import AsyncServer
+
+# Milliseconds
+WINDOW = 500
+HANDSHAKE = 2000
+
+
+class Client(threading.Thread):
+    """ Connects to a server, waits, and then sends a handshake and reads the reply """
+
+    def __init__(self, port, handshake, delay=0.0):
+        """
+        :param port: Integer port of the server
+        :param handshake: python-encoded JSON to send, or None to send nothing
+        :param delay: Float seconds to wait between connecting and sending
+        """
+        super().__init__(daemon=True)
+        self.port = port
+        self.handshake = handshake
+        self.delay = delay
+        self.reply = None
+
+    def run(self):
+        sock = socket.create_connection(("localhost", self.port))
+        sock.settimeout((HANDSHAKE + WINDOW) / 1000 + 2)
+        try:
+            time.sleep(self.delay)
+            if self.handshake is not None:
+                sock.sendall(json.dumps(self.handshake).encode() + b"\n")
+            self.reply = sock.recv(64)
+        except OSError:
+            pass
+        finally:
+            sock.close()
+
+
+class AsyncServerTestCase(TestCase):
+
+    def setUp(self):
+        self.server = AsyncServer("localhost", 0, window=WINDOW, handshake_timeout=HANDSHAKE)
+        self.port = self.server.sock.getsockname()[1]
+
+    def tearDown(self):
+        for player, _ in self.server.connected_players:
+            player.shutdown()
+        self.server.sock.close()
+
+    def sign_up(self, clients):
+        """ Start the clients and sign them up
+        :return: (List of (JSONSocket, String), Float seconds sign-up took)
+        """
+        for client in clients:
+            client.start()
+        start = time.perf_counter()
+        players = self.server.add_players()
+        elapsed = time.perf_counter() - start
+        for client in clients:
+            client.join()
+        return players, elapsed
+
+    def test_slow_clients_sign_up_concurrently(self):
+        delay = 0.4
+        clients = [Client(self.port, str(i), delay) for i in range(MAX_PLAYERS)]
+        players, elapsed = self.sign_up(clients)
+        self.assertEqual(sorted(info for _, info in players), [str(i) for i in range(MAX_PLAYERS)])
+        # One client's latency, rather than the sum of them
+        self.assertLess(elapsed, delay * 3)
+        self.assertTrue(all(client.reply == b'"ok"\n' for client in clients))
+
+    def test_window_bounds_sign_up(self):
+        clients = [Client(self.port, "fast") for _ in range(MIN_PLAYERS)]
+        silent = Client(self.port, None)
+        players, elapsed = self.sign_up(clients + [silent])
+        self.assertEqual(len(players), MIN_PLAYERS)
+        self.assertLess(elapsed, WINDOW / 1000 + 1.0)
+        # The silent client's connection is closed without a reply
+        self.assertEqual(silent.reply, b"")
+
+    def test_bad_handshake_is_dropped(self):
+        bad = Client(self.port, ["not", "a", "string"])
+        clients = [Client(self.port, "good", 0.1) for _ in range(MIN_PLAYERS)]
+        players, _ = self.sign_up([bad] + clients)
+        self.assertEqual([info for _, info in players], ["good"] * MIN_PLAYERS)
+        # Closed without a reply, possibly with a reset since its newline was never read
+        self.assertFalse(bad.reply)
+        # The connections handed over are blocking, as a Server's are
+        self.assertIsNone(players[0][0].sock.gettimeout())
@@ -0,0 +1,125 @@
+import socket
+import threading
+import time
+from unittest import TestCase
+
+from .dealer import MIN_PLAYERS
+from .json_socket import JSONSocket
+from .lobby import Lobby
+from .player import ExternalPlayer
+from .proxy_dealer import ProxyDealer
+from .server import read_options
+from .session import GAME_OVER, OPT_IN, game_over, is_game_over
+
+
+class ScoreKeeper(ExternalPlayer):
+    """ An ExternalPlayer that keeps the result of each game it's told is over """
+
+    def __init__(self, player_id):
+        super().__init__(player_id)
+        self.results = []
+
+    def game_over(self, player_id, scores):
+        self.results.append((player_id, scores))
+
+
+class SessionClient(threading.Thread):
+    """ Signs up with a lobby, keeping its session, and plays until its connection is closed """
+
+    def __init__(self, port, handshake):
+        super().__init__(daemon=True)
+        self.port = port
+        self.handshake = handshake
+        self.agent = ScoreKeeper(1)
+        self.games = None
+
+    def run(self):
+        coder = JSONSocket.from_host_and_port("localhost", self.port)
+        self.games = ProxyDealer(coder, self.agent, self.handshake, keep_session=True).begin()
+
+
+class SessionTestCase(TestCase):
+
+    def test_read_handshake(self):
+        self.assertEqual(read_options("bob" + OPT_IN), ("bob", False, False, True))
+        self.assertEqual(read_options("bob+session+delta+compact"), ("bob", True, True, True))
+
+    def test_options_in_any_order(self):
+        self.assertEqual(read_options("name+compact+delta"), ("name", True, True, False))
+        self.assertEqual(read_options("name+compact+session+delta"), ("name", True, True, True))
+        self.assertEqual(read_options("name+delta+delta"), ("name", False, True, False))
+        # A suffix that isn't an opt-in ends them, and stays in the handshake
+        self.assertEqual(read_options("c++"), ("c++", False, False, False))
+        self.assertEqual(read_options("bob+jr+compact"), ("bob+jr", True, False, False))
+        self.assertEqual(read_options("bob+compact+jr"), ("bob+compact+jr", False, False, False))
+
+    def test_game_over_messages(self):
+        message = game_over(2, [(5, 2, "bob"), (1, 1, "amy")])
+        self.assertEqual(message, [GAME_OVER, 2, [[5, 2, "bob"], [1, 1, "amy"]]])
+        self.assertTrue(is_game_over(message))
+        self.assertFalse(is_game_over([1, [], [], []]))
+        self.assertFalse(is_game_over("ok"))
+        for malformed in [[GAME_OVER], [GAME_OVER, -1, []], [GAME_OVER, 1, "scores"]]:
+            with self.assertRaises(ValueError):
+                is_game_over(malformed)
+
+    def test_proxy_dealer_returns_after_the_connection_closes(self):
+        ours, theirs = socket.socketpair()
+        agent = ScoreKeeper(1)
+        server = JSONSocket(theirs)
+
+        def serve():
+            server.decode()
+            server.encode("ok")
+            # A game can end before its first round, if the deck is too small for one
+            server.encode(game_over(1, [(0, 1, "1")]))
+            theirs.close()
+        thread = threading.Thread(target=serve)
+        thread.start()
+        games = ProxyDealer(JSONSocket(ours), agent, "1", keep_session=True).begin()
+        thread.join()
+        self.assertEqual(games, 1)
+        self.assertEqual(agent.results, [(1, [[0, 1, "1"]])])
+
+
+class LobbySessionTestCase(TestCase):
+
+    def setUp(self):
+        self.lobby = Lobby("localhost", 0, seating_window=1000)
+        self.port = self.lobby.sock.getsockname()[1]
+
+    def tearDown(self):
+        self.lobby.sock.close()
+
+    def test_sessions_play_game_after_game(self):
+        clients = [SessionClient(self.port, str(i)) for i in range(MIN_PLAYERS + 1)]
+        for client in clients:
+            client.start()
+        tables = self.lobby.serve(3)
+        for client in clients:
+            client.join(5)
+        self.assertEqual([table.error for table in tables], [None] * 3)
+        # The same connections were seated at each table
+        self.assertEqual([len(table.players) for table in tables], [len(clients)] * 3)
+        self.assertEqual(tables[0].players, tables[2].players)
+        # Each client was told about every game, and returned once the lobby closed its connection
+        self.assertEqual([client.games for client in clients], [3] * len(clients))
+        self.assertEqual([len(client.agent.results) for client in clients], [3] * len(clients))
+        self.assertEqual(clients[0].agent.results[0][1], [list(score) for score in tables[0].scores])
+
+    def test_queued_player_that_leaves_is_dropped(self):
+        leaving = socket.create_connection(("localhost", self.port))
+        leaving.sendall(b'"gone' + OPT_IN.encode() + b'"\n')
+
+        def start_others():
+            leaving.recv(16)
+            leaving.close()
+            time.sleep(0.2)
+            for client in clients:
+                client.start()
+        clients = [SessionClient(self.port, str(i)) for i in range(MIN_PLAYERS)]
+        threading.Thread(target=start_others, daemon=True).start()
+        table, = self.lobby.serve(1)
+        for client in clients:
+            client.join(5)
+        self.assertEqual(sorted(info for _, info in table.players), [str(i) for i in range(MIN_PLAYERS)])
@@ -0,0 +1,38 @@
+from unittest import TestCase
+
+from .simulate import play_one, run_games, simulate, shuffled_deck
+from .traitcard import TraitCard
+
+
+class SimulateTestCase(TestCase):
+
+    def test_shuffled_deck(self):
+        self.assertEqual(shuffled_deck(1), shuffled_deck(1))
+        self.assertNotEqual(shuffled_deck(1), shuffled_deck(2))
+        self.assertEqual(sorted(shuffled_deck(1)), TraitCard.new_deck())
+
+    def test_play_one_is_deterministic(self):
+        first, second = play_one(3, 4), play_one(3, 4)
+        self.assertEqual(first.scores, second.scores)
+        self.assertEqual(first.rounds, second.rounds)
+        self.assertEqual(len(first.scores), 4)
+        self.assertGreater(first.rounds, 0)
+
+    def test_pool_matches_serial(self):
+        serial = sorted((r.seed, r.scores) for r in run_games(4, 3, processes=1))
+        pooled = sorted((r.seed, r.scores) for r in run_games(4, 3, processes=2, chunk_size=1))
+        self.assertEqual(serial, pooled)
+        self.assertEqual([seed for seed, _ in serial], [0, 1, 2, 3])
+
+    def test_bad_player_count(self):
+        with self.assertRaises(ValueError):
+            list(run_games(1, 2, processes=1))
+
+    def test_summary(self):
+        seen = []
+        summary = simulate(3, 3, processes=1, first_seed=10, on_result=seen.append)
+        self.assertEqual(summary.games, 3)
+        self.assertEqual(sorted(r.seed for r in seen), [10, 11, 12])
+        self.assertEqual(summary.rounds, sum(r.rounds for r in seen))
+        self.assertEqual(sum(wins for _, wins in summary.by_player.values()), 3)
+        self.assertEqual(summary.serialize()["games"], 3)
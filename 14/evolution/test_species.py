@@ -49,6 +49,45 @@ class SpeciesTestCase(TestCase):
         self.assertGreater(species.population, 0)
         self.assertEqual(species.body + species.population, species.attacking_body)
 
+    def test_has_trait(self):
+        species = Species(traits=[Trait.CARNIVORE, Trait.FAT_TISSUE])
+        self.assertTrue(species.has_trait(Trait.CARNIVORE))
+        self.assertTrue(species.has_trait(Trait("fat-tissue")))
+        self.assertFalse(species.has_trait(Trait.AMBUSH))
+        species.replace_trait_at_index(0, Trait.AMBUSH)
+        self.assertFalse(species.has_trait(Trait.CARNIVORE))
+        self.assertTrue(species.has_trait(Trait.AMBUSH))
+        self.assertEqual(species.traits, [Trait.AMBUSH, Trait.FAT_TISSUE])
+        species.traits = []
+        self.assertFalse(species.has_trait(Trait.AMBUSH))
+
+    def test_verify_traits(self):
+        with self.assertRaises(ValueError):
+            Species(traits=[Trait.CARNIVORE, Trait.CARNIVORE])
+        with self.assertRaises(ValueError):
+            Species(traits=[Trait.CARNIVORE, Trait.AMBUSH, Trait.HORNS, Trait.HERDING])
+        species = Species(traits=[Trait.CARNIVORE, Trait.AMBUSH])
+        with self.assertRaises(ValueError):
+            species.replace_trait_at_index(1, Trait.CARNIVORE)
+
+    def test_serialize_cache(self):
+        species = Species(food=1, body=2, population=3, traits=[Trait.FAT_TISSUE, Trait.AMBUSH], fat_food=1)
+        first = species.serialize()
+        self.assertIs(species.serialize(), first)
+        for change in [lambda: setattr(species, "food", 2),
+                       lambda: setattr(species, "body", 3),
+                       lambda: setattr(species, "population", 4),
+                       lambda: setattr(species, "fat_food", 2),
+                       lambda: species.replace_trait_at_index(1, Trait.CARNIVORE),
+                       lambda: setattr(species, "traits", [Trait.FAT_TISSUE, Trait.HORNS])]:
+            version = species.version
+            before = species.serialize()
+            change()
+            self.assertGreater(species.version, version)
+            self.assertIsNot(species.serialize(), before)
+        self.assertEqual(species.serialize(), [["food", 2], ["body", 3], ["population", 4],
+                                               ["traits", ["fat-tissue", "horns"]], ["fat-food", 2]])
+
     def test_is_hungry(self):
         species = Species(food=0, population=2)
         self.assertTrue(species.is_hungry())
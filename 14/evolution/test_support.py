@@ -0,0 +1,80 @@
+"""
+
+Agents and a seeded game shared by the tests. It holds no tests of its own.
+
+"""
+from .dealer import Dealer
+from .player import ExternalPlayer
+from .simulate import shuffled_deck
+
+
+def play_seeded_game(seed, agents, **dealer_kwargs):
+    """ Play a game to the end with a deck shuffled by a seed
+    :param seed: the Integer to shuffle the deck with
+    :param agents: a List of agents for the players, in seat order
+    :param dealer_kwargs: further arguments for the Dealer, e.g. journal or metrics
+    :return: the Dealer once the game is over
+    """
+    dealer = Dealer(deck=shuffled_deck(seed), **dealer_kwargs)
+    dealer.play_game([(agent, "") for agent in agents])
+    return dealer
+
+
+class FanOutPlayer(ExternalPlayer):
+    """ An ExternalPlayer that's asked to choose by send_choose and receive_choice, as remote players are """
+
+    def __init__(self, player_id):
+        super().__init__(player_id)
+        self.asked = None
+
+    def send_choose(self, before, after):
+        self.asked = (before, after)
+
+    def receive_choice(self, deadline=None):
+        return self.choose(*self.asked)
+
+
+class FailingPlayer(ExternalPlayer):
+    """ An ExternalPlayer that fails when it's first asked to choose """
+
+    def choose(self, before, after):
+        raise ValueError("No choice")
+
+
+class RecordingPlayer(ExternalPlayer):
+    """ An ExternalPlayer that keeps every message it's sent and every answer it gives """
+
+    def __init__(self, player_id, messages):
+        """
+        :param messages: a List that messages and answers are appended to
+        """
+        super().__init__(player_id)
+        self.messages = messages
+
+    def start(self, msg):
+        self.messages.append(msg)
+        super().start(msg)
+
+    def choose(self, before, after):
+        self.messages.append([before, after])
+        answer = super().choose(before, after)
+        self.messages.append(answer)
+        return answer
+
+    def feed_species(self, state):
+        self.messages.append(state)
+        answer = super().feed_species(state)
+        self.messages.append(answer)
+        return answer
+
+
+class FeedingRecorder(ExternalPlayer):
+    """ An ExternalPlayer that keeps every feeding state it's sent """
+
+    def __init__(self, player_id):
+        super().__init__(player_id)
+        self.states = []
+
+    def feed_species(self, state):
+        self.states.append(state)
+        return super().feed_species(state)
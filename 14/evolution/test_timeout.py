@@ -0,0 +1,115 @@
+import socket
+import threading
+import time
+from unittest import TestCase
+
+from .dealer import MIN_PLAYERS
+from .json_socket import JSONSocket
+from .server import Server
+from .test_server import Client
+from .timeout import Deadline, TimedOutError
+
+# Slack allowed on top of a deadline, in seconds
+SLACK = 0.25
+
+
+class DeadlineTestCase(TestCase):
+
+    def setUp(self):
+        self.ours, self.theirs = socket.socketpair()
+
+    def tearDown(self):
+        self.ours.close()
+        self.theirs.close()
+
+    def assertTimesOut(self, milliseconds, call):
+        """ Check that the call raises a TimedOutError no sooner than the given milliseconds, and not much later
+        """
+        start = time.perf_counter()
+        with self.assertRaises(TimedOutError):
+            call()
+        elapsed = time.perf_counter() - start
+        self.assertGreaterEqual(elapsed, milliseconds / 1000 - 0.005)
+        self.assertLess(elapsed, milliseconds / 1000 + SLACK)
+
+    def test_remaining(self):
+        self.assertIsNone(Deadline().remaining())
+        self.assertFalse(Deadline().expired())
+        deadline = Deadline(50)
+        self.assertGreater(deadline.remaining(), 0.03)
+        time.sleep(0.06)
+        self.assertEqual(deadline.remaining(), 0.0)
+        self.assertTrue(deadline.expired())
+
+    def test_wait_readable(self):
+        self.assertTimesOut(80, lambda: Deadline(80).wait_readable(self.ours))
+        self.theirs.sendall(b"x")
+        Deadline(0).wait_readable(self.ours)
+
+    def test_decode_times_out_under_a_millisecond_deadline(self):
+        coder = JSONSocket(self.ours)
+        self.assertTimesOut(120, lambda: coder.decode(Deadline(120)))
+
+    def test_deadline_covers_a_trickling_message(self):
+        coder = JSONSocket(self.ours)
+
+        def trickle():
+            for byte in b'["slow", "message"]':
+                time.sleep(0.02)
+                self.theirs.sendall(bytes([byte]))
+        writer = threading.Thread(target=trickle, daemon=True)
+        writer.start()
+        self.assertTimesOut(100, lambda: coder.decode(Deadline(100)))
+        writer.join()
+
+    def test_send_and_get_response_in_threads(self):
+        pairs = [socket.socketpair() for _ in range(4)]
+        errors = []
+
+        def ask(sock):
+            try:
+                JSONSocket(sock).send_and_get_response("hi", Deadline(150))
+            except ValueError as e:
+                errors.append(e)
+        threads = [threading.Thread(target=ask, args=(ours,)) for ours, _ in pairs]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # Each thread times out on its own deadline, so they run out together
+        self.assertLess(time.perf_counter() - start, 0.15 + SLACK)
+        self.assertEqual(len(errors), 4)
+        for ours, theirs in pairs:
+            ours.close()
+            theirs.close()
+
+
+class ServerDeadlineTestCase(TestCase):
+
+    def setUp(self):
+        self.server = Server("localhost", 0)
+        self.port = self.server.sock.getsockname()[1]
+
+    def tearDown(self):
+        for player, _ in self.server.connected_players:
+            player.shutdown()
+        self.server.sock.close()
+
+    def test_accept_times_out(self):
+        start = time.perf_counter()
+        with self.assertRaises(TimedOutError):
+            self.server.blocking_call_to_socket_to_get_players(Deadline(100))
+        self.assertLess(time.perf_counter() - start, 0.1 + SLACK)
+
+    def test_add_to_max_stops_at_its_deadline(self):
+        clients = [Client(self.port, "player") for _ in range(MIN_PLAYERS)]
+        for client in clients:
+            client.start()
+        start = time.perf_counter()
+        self.server.add_to_max(300)
+        self.assertLess(time.perf_counter() - start, 0.3 + SLACK)
+        self.assertEqual(len(self.server.connected_players), MIN_PLAYERS)
+        for client in clients:
+            client.join()
+        self.assertTrue(all(client.reply == b'"ok"\n' for client in clients))
@@ -0,0 +1,116 @@
+import threading
+import time
+from collections import Counter
+from unittest import TestCase
+
+from .feeding_intent import FeedNone
+from .json_socket import JSONSocket
+from .lobby import Lobby
+from .player import ExternalPlayer
+from .proxy_dealer import ProxyDealer
+from .tournament import Tournament, DEFAULT_RATING, outcomes, table_sizes
+
+
+class FastingPlayer(ExternalPlayer):
+    """ An ExternalPlayer that never feeds its species when it's asked to """
+
+    def feed_species(self, state):
+        return FeedNone().serialize()
+
+
+def roster(silly, fasting):
+    entrants = {"silly " + str(i): ExternalPlayer for i in range(silly)}
+    entrants.update({"fasting " + str(i): FastingPlayer for i in range(fasting)})
+    return entrants
+
+
+class TournamentTestCase(TestCase):
+
+    def test_table_sizes(self):
+        self.assertEqual(table_sizes(3), [3])
+        self.assertEqual(table_sizes(8), [8])
+        self.assertEqual(table_sizes(9), [5, 4])
+        self.assertEqual(table_sizes(17), [6, 6, 5])
+        self.assertEqual(table_sizes(6, 3), [3, 3])
+        # Four can't be split into tables of three, so one sits out, as does one of seven
+        self.assertEqual(table_sizes(4, 3), [3])
+        self.assertEqual(table_sizes(7, 3), [3, 3])
+
+    def test_schedule_is_balanced(self):
+        tournament = Tournament(roster(6, 5), table_size=4)
+        tables = tournament.schedule(12)
+        self.assertEqual([seed for seed, _ in tables], list(range(len(tables))))
+        self.assertTrue(all(3 <= len(names) <= 4 and len(set(names)) == len(names) for _, names in tables))
+        self.assertEqual(set(Counter(name for _, names in tables for name in names).values()), {12})
+        self.assertEqual(len(set(tuple(names) for _, names in tables)), len(tables))
+        # Entrants that sat out are seated first next round
+        tournament = Tournament(roster(4, 0), table_size=3)
+        counts = Counter(name for _, names in tournament.schedule(4) for name in names)
+        self.assertEqual(set(counts.values()), {3})
+
+    def test_outcomes(self):
+        result = outcomes(["a", "b", "c", "d"], [(5, 2, "b"), (2, 1, "a"), (2, 3, "c")])
+        self.assertEqual(result[1], ("b", [("a", 1.0), ("c", 1.0), ("d", 1.0)]))
+        self.assertEqual(result[0], ("a", [("b", 0.0), ("c", 0.5), ("d", 1.0)]))
+        self.assertEqual(result[3], ("d", [("a", 0.0), ("b", 0.0), ("c", 0.0)]))
+
+    def test_record(self):
+        tournament = Tournament()
+        tournament.record(["a", "b", "c"], [(5, 1, "a"), (3, 2, "b"), (1, 3, "c")])
+        a, b, c = (tournament.ratings[name] for name in "abc")
+        self.assertGreater(a.rating, DEFAULT_RATING)
+        self.assertEqual(b.rating, DEFAULT_RATING)
+        self.assertLess(c.rating, DEFAULT_RATING)
+        self.assertAlmostEqual(a.rating + b.rating + c.rating, 3 * DEFAULT_RATING)
+        self.assertEqual((a.wins, b.wins, a.share(), b.share()), (1, 0, 1.0, 0.5))
+        self.assertIsNone(a.share_interval())
+        self.assertEqual([rating.name for rating in tournament.standings()], ["a", "b", "c"])
+
+    def test_record_with_repeated_names(self):
+        tournament = Tournament()
+        tournament.record(["Hello"] * 3, [(5, 1, "Hello"), (3, 2, "Hello"), (1, 3, "Hello")])
+        self.assertEqual(tournament.ratings["Hello"].games, 3)
+        self.assertAlmostEqual(tournament.ratings["Hello"].rating, DEFAULT_RATING)
+        tournament.record(["a", "a", "b"], [(5, 1, "a"), (3, 2, "a"), (1, 3, "b")])
+        self.assertAlmostEqual(tournament.ratings["a"].rating + tournament.ratings["b"].rating, 2 * DEFAULT_RATING)
+        self.assertLess(tournament.ratings["b"].rating, DEFAULT_RATING)
+
+    def test_ratings_rank_the_stronger_player(self):
+        tournament = Tournament(roster(3, 3), table_size=6)
+        seen = []
+        self.assertEqual(tournament.play(12, processes=1, on_result=seen.append), 12)
+        self.assertEqual([result.seed for result in seen], list(range(12)))
+        standings = [rating.name for rating in tournament.standings()]
+        self.assertEqual(sorted(name.split()[0] for name in standings[:3]), ["silly"] * 3)
+        low, high = tournament.ratings[standings[0]].share_interval()
+        self.assertTrue(0 <= low <= tournament.ratings[standings[0]].share() <= high <= 1)
+        summary = tournament.serialize()
+        self.assertEqual(summary["games"], 12)
+        self.assertGreater(summary["games_per_second"], 0)
+
+    def test_pool_matches_serial(self):
+        serial, pooled = Tournament(roster(3, 2), 4), Tournament(roster(3, 2), 4)
+        serial.play(4, processes=1)
+        pooled.play(4, processes=2, chunk_size=1)
+        self.assertEqual([rating.serialize() for rating in serial.standings()],
+                         [rating.serialize() for rating in pooled.standings()])
+
+    def test_remote_players_are_rated_by_handshake(self):
+        tournament = Tournament()
+        lobby = Lobby("localhost", 0, seating_window=1000, on_table=tournament.on_table)
+        port = lobby.sock.getsockname()[1]
+        server = threading.Thread(target=lobby.serve, args=(1,), daemon=True)
+        server.start()
+
+        def client(name):
+            ProxyDealer(JSONSocket.from_host_and_port("localhost", port), ExternalPlayer(1), name).begin()
+
+        clients = [threading.Thread(target=client, args=(name,), daemon=True) for name in ["amy", "bob", "cat", "cat"]]
+        for thread in clients:
+            thread.start()
+            time.sleep(0.05)
+        server.join(10)
+        self.assertFalse(server.is_alive())
+        self.assertEqual(tournament.games, 1)
+        self.assertEqual(sorted(tournament.ratings), ["amy", "bob", "cat"])
+        self.assertEqual(tournament.ratings["cat"].games, 2)
@@ -1,6 +1,6 @@
 from unittest import TestCase, mock
 
-from .trait import Trait
+from .trait import Trait, trait_mask
 from .traitcard import TraitCard
 
 
@@ -15,4 +15,11 @@ class TraitTestCase(TestCase):
         self.assertEqual((TraitCard(-1, Trait.CARNIVORE) < TraitCard(0, Trait.AMBUSH)), False)
         self.assertEqual((TraitCard(-1, Trait.CARNIVORE) < TraitCard(0, Trait.CARNIVORE)), True)
         self.assertEqual((TraitCard(-1, Trait.AMBUSH) < TraitCard(0, Trait.CARNIVORE)), True)
-        self.assertEqual((TraitCard(-1, Trait.AMBUSH) < TraitCard(-1, Trait.SCAVENGER)), True)
\ No newline at end of file
+        self.assertEqual((TraitCard(-1, Trait.AMBUSH) < TraitCard(-1, Trait.SCAVENGER)), True)
+
+    def test_trait_bits(self):
+        bits = [t.bit for t in Trait]
+        self.assertEqual(len(set(bits)), len(bits))
+        self.assertTrue(all(bin(b).count("1") == 1 for b in bits))
+        self.assertEqual(trait_mask([Trait.CARNIVORE, Trait.AMBUSH]), Trait.CARNIVORE.bit | Trait.AMBUSH.bit)
+        self.assertEqual(trait_mask([]), 0)
@@ -0,0 +1,61 @@
+from unittest import TestCase
+
+from .versioned import VersionedList, versioned_attribute, versioned_list_attribute
+
+
+class Owner:
+    value = versioned_attribute("value")
+    items = versioned_list_attribute("items")
+
+    def __init__(self):
+        self.version = 0
+        self.value = None
+        self.items = []
+
+
+class VersionedTestCase(TestCase):
+
+    def test_attribute(self):
+        owner = Owner()
+        version = owner.version
+        owner.value = 3
+        self.assertEqual(owner.value, 3)
+        self.assertEqual(owner.version, version + 1)
+
+    def test_list_is_wrapped(self):
+        owner = Owner()
+        items = [1, 2]
+        owner.items = items
+        self.assertIsInstance(owner.items, VersionedList)
+        self.assertIs(owner.items.owner, owner)
+        self.assertEqual(owner.items, [1, 2])
+        # The list is copied, so changes to the original aren't seen
+        items.append(3)
+        self.assertEqual(owner.items, [1, 2])
+
+    def test_list_changes(self):
+        owner = Owner()
+        owner.items = [3, 1, 2]
+        changes = [lambda items: items.append(4),
+                   lambda items: items.extend([5]),
+                   lambda items: items.insert(0, 6),
+                   lambda items: items.pop(),
+                   lambda items: items.remove(6),
+                   lambda items: items.__setitem__(0, 7),
+                   lambda items: items.__setitem__(slice(0, 0), [8, 9]),
+                   lambda items: items.__delitem__(0),
+                   lambda items: items.__iadd__([1]),
+                   lambda items: items.__imul__(2),
+                   lambda items: items.sort(),
+                   lambda items: items.reverse(),
+                   lambda items: items.clear()]
+        for change in changes:
+            version = owner.version
+            change(owner.items)
+            self.assertEqual(owner.version, version + 1)
+        self.assertEqual(owner.items, [])
+
+    def test_unowned_list(self):
+        items = VersionedList([1])
+        items.append(2)
+        self.assertEqual(items, [1, 2])
@@ -1,34 +1,52 @@
-# This decorator is courtesy of this Stack Overflow post:
-# http://stackoverflow.com/questions/2281850/timeout-function-if-it-takes-too-long-to-finish
+"""
 
-from functools import wraps
-import errno
-import os
-import signal
+Deadlines for blocking socket calls. A Deadline is set some milliseconds from when it's made, and each blocking call
+made under it waits with selectors for no longer than the time that's left. Unlike an alarm signal, this works from
+any thread or event loop, has sub-second resolution, and any number of deadlines may be running at once.
+
+"""
+import selectors
+import time
 
 
 class TimedOutError(Exception):
     pass
 
-def timeout(seconds=10, error_message=os.strerror(errno.ETIME)):
-    """ A timeout decorator— spawns a unix thread, and uses it to remind the system to kill the encapsulated function
-    if it's not done by the amount of time that is specified
-    :param seconds: Integer number of seconds to wait
-    :param error_message: a String to use as an error.
-    NOTE: This should be used with a decorator, @timeout(n, message). The arguments are the same.
-    NOTE: Because the exceptions are the same, it is not reccomended to nest these timeouts— they will trigger eachother
+
+class Deadline:
     """
-    def decorator(func):
-        def _handle_timeout(signum, frame):
-            raise TimedOutError(error_message)
-
-        def wrapper(*args, **kwargs):
-            signal.signal(signal.SIGALRM, _handle_timeout)
-            signal.alarm(seconds)
-            try:
-                result = func(*args, **kwargs)
-            finally:
-                signal.alarm(0)
-            return result
-        return wraps(func)(wrapper)
-    return decorator
+    A point in time that blocking socket calls must finish by. A Deadline made with no milliseconds never expires, and
+    calls made under it block for as long as they need to.
+    """
+
+    def __init__(self, milliseconds=None):
+        """
+        :param milliseconds: Number of milliseconds from now until the deadline, or None for no deadline
+        """
+        self.expires = None if milliseconds is None else time.monotonic() + milliseconds / 1000
+
+    def remaining(self):
+        """
+        :return: Float seconds left until the deadline, at least 0, or None if there's no deadline
+        """
+        if self.expires is None:
+            return None
+        return max(0.0, self.expires - time.monotonic())
+
+    def expired(self):
+        """
+        :return: Boolean indicating whether the deadline has passed
+        """
+        return self.expires is not None and time.monotonic() >= self.expires
+
+    def wait_readable(self, sock):
+        """ Wait until the socket can be read from, or accepted on, without blocking
+        :param sock: a Socket.socket
+        Note: this will throw a TimedOutError if the deadline passes first
+        """
+        if self.expires is None:
+            return
+        with selectors.DefaultSelector() as selector:
+            selector.register(sock, selectors.EVENT_READ)
+            if not selector.select(self.remaining()):
+                raise TimedOutError("The deadline passed")
@@ -0,0 +1,257 @@
+"""
+
+Ranks player implementations by playing them against each other. A Tournament seats a roster of in-process players
+at tables of 3 to 8 in balanced rounds, plays the games across a process pool, and keeps multiplayer Elo ratings up to
+date as results arrive. The same ratings can be kept for remote players from the tables a Lobby finishes.
+
+"""
+import math
+import multiprocessing
+import random
+import time
+
+from .dealer import Dealer, MIN_PLAYERS, MAX_PLAYERS
+from .simulate import GameResult, shuffled_deck, DEFAULT_CHUNK_SIZE
+
+DEFAULT_RATING = 1500.0
+# The most a rating moves in one game, split between the opponents at the table
+K_FACTOR = 32.0
+# Rating difference at which the better player is expected to beat the other ten times in eleven
+ELO_SCALE = 400.0
+# Standard normal quantile of a two-sided 95% confidence interval
+Z_95 = 1.96
+
+
+def table_sizes(count, table_size=MAX_PLAYERS):
+    """ Split the players of a round into tables as even as possible
+    :param count: Integer number of players, at least MIN_PLAYERS
+    :param table_size: Integer most players at a table, between MIN_PLAYERS and MAX_PLAYERS
+    :return: a List of Integer table sizes, largest first. They add up to count unless some players must sit out the
+    round, which only happens when the players can't be split into tables of MIN_PLAYERS to table_size.
+    """
+    tables = -(-count // table_size)
+    while tables * MIN_PLAYERS > count:
+        tables -= 1
+    seated = min(count, tables * table_size)
+    base, extra = divmod(seated, tables)
+    return [base + 1] * extra + [base] * (tables - extra)
+
+
+def outcomes(names, scores):
+    """ Turn the result of a game into a share of the points against each opponent. Players are told apart by their
+    seat, as given by their player id, so two seated under the same name are still opponents.
+    :param names: a List of the String names seated at the table, in seat order
+    :param scores: a List(Integer, Integer, String) as produced by Dealer.get_scores, for players given ids from 1 in
+    seat order. Players missing from it were removed from the game, and place below every player that wasn't.
+    :return: a List, in seat order, of (String name, List of (String opponent, Float 1 for a win, 0.5 for a tie, 0 for
+    a loss)) with an entry for each other seat
+    """
+    points = [-1] * len(names)
+    for score, player_id, _ in scores:
+        points[player_id - 1] = score
+    return [(name, [(other, 1.0 if points[seat] > points[opponent] else 0.5 if points[seat] == points[opponent]
+                     else 0.0)
+                    for opponent, other in enumerate(names) if opponent != seat])
+            for seat, name in enumerate(names)]
+
+
+class Rating:
+    """ One entrant's Elo rating, and the share of opponents it has beaten across its games """
+
+    def __init__(self, name):
+        self.name = name
+        self.rating = DEFAULT_RATING
+        self.games = 0
+        self.wins = 0
+        # Sum and sum of squares of the share of opponents beaten in each game
+        self.share_total = 0.0
+        self.share_squares = 0.0
+
+    def add_game(self, share, won):
+        """
+        :param share: Float fraction of the opponents at the table beaten, counting ties as half
+        :param won: Boolean indicating whether no opponent scored more
+        """
+        self.games += 1
+        self.wins += won
+        self.share_total += share
+        self.share_squares += share * share
+
+    def share(self):
+        """
+        :return: Float mean share of opponents beaten per game, or None before any games
+        """
+        return self.share_total / self.games if self.games else None
+
+    def share_interval(self):
+        """
+        :return: (Float, Float) 95% confidence interval of the mean share, by the normal approximation, or None
+        before two games
+        """
+        if self.games < 2:
+            return None
+        mean = self.share()
+        variance = max(0.0, (self.share_squares - self.games * mean * mean) / (self.games - 1))
+        half_width = Z_95 * math.sqrt(variance / self.games)
+        return max(0.0, mean - half_width), min(1.0, mean + half_width)
+
+    def serialize(self):
+        """
+        :return: a python-encoded JSON Object representing this rating
+        """
+        interval = self.share_interval()
+        return {"name": self.name, "rating": self.rating, "games": self.games, "wins": self.wins,
+                "share": self.share(), "share_95": list(interval) if interval else None}
+
+
+class Tournament:
+    """
+    Seats the entrants of a roster in rounds: each round every entrant is seated once, at tables of MIN_PLAYERS to
+    table_size, in a seeded shuffle, with entrants that have sat out more rounds seated first. Each game is dealt a
+    deck shuffled by its own seed, so a tournament plays the same games whatever the number of processes, and results
+    are rated in the order the games were scheduled, so it ends with the same ratings too.
+    """
+
+    def __init__(self, roster=None, table_size=MAX_PLAYERS, first_seed=0):
+        """
+        :param roster: a Dictionary mapping each String name to a picklable class implementing the ExternalPlayer
+        interface, constructed with a player id, or None for a tournament of remote players only
+        :param table_size: Integer most players at a table, between MIN_PLAYERS and MAX_PLAYERS
+        :param first_seed: the Integer seed of the first game; later games count up from it
+        """
+        self.roster = roster or {}
+        if self.roster and len(self.roster) < MIN_PLAYERS:
+            raise ValueError("A tournament needs at least " + str(MIN_PLAYERS) + " entrants")
+        if not MIN_PLAYERS <= table_size <= MAX_PLAYERS:
+            raise ValueError("A table seats between " + str(MIN_PLAYERS) + " and " + str(MAX_PLAYERS) + " players")
+        self.table_size = table_size
+        self.next_seed = first_seed
+        # Maps each name to the Integer number of games it's been seated for
+        self.seated = {name: 0 for name in self.roster}
+        self.ratings = {}
+        self.games = 0
+        self.start = time.perf_counter()
+
+    def schedule(self, rounds):
+        """ Seat the roster for some rounds
+        :param rounds: Natural number of rounds
+        :return: a List of (Integer seed, List of String names in seat order), one for each game
+        """
+        tables = []
+        for _ in range(rounds):
+            names = sorted(self.roster)
+            random.Random(self.next_seed).shuffle(names)
+            names.sort(key=lambda name: self.seated[name])
+            for size in table_sizes(len(names), self.table_size):
+                seating, names = names[:size], names[size:]
+                for name in seating:
+                    self.seated[name] += 1
+                tables.append((self.next_seed, seating))
+                self.next_seed += 1
+        return tables
+
+    def rating(self, name):
+        """
+        :param name: String name of an entrant
+        :return: its Rating, made if it hasn't played yet
+        """
+        if name not in self.ratings:
+            self.ratings[name] = Rating(name)
+        return self.ratings[name]
+
+    def record(self, names, scores):
+        """ Update the ratings of everyone seated at a game with its result. Every player's rating moves against each
+        opponent as a two-player Elo game would, by K_FACTOR shared between the opponents, and all at once, using the
+        ratings from before the game. A name seated more than once, as remote players that sent the same handshake
+        are, is rated for each of its seats, against the others too, which leaves the sum of the ratings unchanged.
+        :param names: a List of the String names seated at the table, in seat order
+        :param scores: a List(Integer, Integer, String) as produced by Dealer.get_scores, for players given ids from 1
+        in seat order
+        """
+        results = outcomes(names, scores)
+        k = K_FACTOR / (len(names) - 1)
+        before = {name: self.rating(name).rating for name in names}
+        for name, against in results:
+            change = sum(k * (points - 1 / (1 + 10 ** ((before[other] - before[name]) / ELO_SCALE)))
+                         for other, points in against)
+            rating = self.rating(name)
+            rating.rating += change
+            rating.add_game(sum(points for _, points in against) / len(against),
+                            all(points > 0 for _, points in against))
+        self.games += 1
+
+    def on_table(self, table):
+        """ Record the game of a table a Lobby has finished, with players named by their handshakes. Pass this as a
+        Lobby's on_table to rate remote players.
+        :param table: a lobby.Table
+        """
+        if table.scores is not None:
+            self.record([info for _, info in table.players], table.scores)
+
+    def play(self, rounds, processes=None, on_result=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """ Play some rounds of the roster across a process pool, rating each game as it's played
+        :param rounds: Natural number of rounds
+        :param processes: Integer number of worker processes; None uses every core, and 1 plays in this process
+        :param on_result: optionally, a function called with each GameResult once it has been rated
+        :param chunk_size: Integer number of games sent to a worker at once
+        :return: the Integer number of games played
+        """
+        tables = self.schedule(rounds)
+        jobs = [(seed, [(name, self.roster[name]) for name in names]) for seed, names in tables]
+        seating = dict(tables)
+        # Results that arrived before a game scheduled ahead of them, by seed
+        waiting = {}
+        next_seeds = iter([seed for seed, _ in tables])
+        next_seed = next(next_seeds, None)
+
+        def rate(result):
+            nonlocal next_seed
+            waiting[result.seed] = result
+            while next_seed in waiting:
+                ready = waiting.pop(next_seed)
+                self.record(seating[ready.seed], ready.scores)
+                if on_result:
+                    on_result(ready)
+                next_seed = next(next_seeds, None)
+
+        if processes == 1:
+            for job in jobs:
+                rate(play_table(job))
+        else:
+            with multiprocessing.Pool(processes) as pool:
+                for result in pool.imap_unordered(play_table, jobs, chunksize=chunk_size):
+                    rate(result)
+        return len(jobs)
+
+    def games_per_second(self):
+        """
+        :return: Float games rated per second since the Tournament was made
+        """
+        elapsed = time.perf_counter() - self.start
+        return self.games / elapsed if elapsed else 0.0
+
+    def standings(self):
+        """
+        :return: a List of Ratings, highest rating first
+        """
+        return sorted(self.ratings.values(), key=lambda rating: (-rating.rating, rating.name))
+
+    def serialize(self):
+        """
+        :return: a python-encoded JSON Object of the games played, the rate they were played at, and the standings
+        """
+        return {"games": self.games, "wall_time": time.perf_counter() - self.start,
+                "games_per_second": self.games_per_second(),
+                "standings": [rating.serialize() for rating in self.standings()]}
+
+
+def play_table(job):
+    """ Play one game of a tournament. Module-level so that it can be pickled by reference for a worker process.
+    :param job: a Tuple of (Integer seed, List of (String name, player class) in seat order)
+    :return: a GameResult, whose scores have the players' names as their handshakes
+    """
+    seed, seating = job
+    start = time.perf_counter()
+    dealer = Dealer(deck=shuffled_deck(seed))
+    dealer.play_game([(player_class(i), name) for i, (name, player_class) in enumerate(seating)])
+    return GameResult(seed, dealer.get_scores(), dealer.rounds, time.perf_counter() - start)
@@ -43,3 +43,18 @@ trait_mapping = {trait.upper().replace("-", "_"): trait for trait in traits}
 
 # Our Enum class, created using the functional Enum API, represents a Trait.
 Trait = Enum(type=TraitSerialization, value="Trait", names=trait_mapping)
+
+# Each Trait gets its own bit, so that a set of Traits can be stored as an Integer mask.
+for position, member in enumerate(Trait):
+    member.bit = 1 << position
+
+
+def trait_mask(traits):
+    """ Produce the bitmask representing the given Traits
+    :param traits: an iterable of Trait
+    :return: Integer with the bit of every given Trait set
+    """
+    mask = 0
+    for trait in traits:
+        mask |= trait.bit
+    return mask
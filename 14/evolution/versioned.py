@@ -0,0 +1,105 @@
+"""
+
+Attributes and lists that count their own modifications, so that whoever caches something computed from them knows
+when to redo it.
+
+"""
+from operator import attrgetter
+
+
+def versioned_attribute(name, doc=None):
+    """ A property whose setter increments the owner's Integer version attribute
+    :param name: String name of the property; the value is stored under the name prefixed with an underscore
+    :param doc: String documenting the property, or None
+    :return: a property
+    """
+    storage = "_" + name
+
+    def set_value(self, value):
+        self.__dict__[storage] = value
+        self.version += 1
+    # attrgetter keeps reads as cheap as a plain attribute lookup
+    return property(attrgetter(storage), set_value, doc=doc)
+
+
+def versioned_list_attribute(name, doc=None):
+    """ Like versioned_attribute, but the value is kept as a VersionedList belonging to the owner, so that changing
+    the list in place also increments the owner's version.
+    :param name: String name of the property; the value is stored under the name prefixed with an underscore
+    :param doc: String documenting the property, or None
+    :return: a property
+    """
+    storage = "_" + name
+
+    def set_value(self, value):
+        items = VersionedList(value)
+        items.owner = self
+        self.__dict__[storage] = items
+        self.version += 1
+    return property(attrgetter(storage), set_value, doc=doc)
+
+
+class VersionedList(list):
+    """
+    A list belonging to an owner with an Integer version attribute. Every in-place modification of the list
+    increments the owner's version. It is created like a list, and its owner is assigned afterwards.
+    """
+    # an object with an Integer version attribute, or None
+    owner = None
+
+    def _changed(self):
+        """ Count a modification against the owner
+        """
+        if self.owner is not None:
+            self.owner.version += 1
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._changed()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._changed()
+
+    def __iadd__(self, other):
+        super().__iadd__(other)
+        self._changed()
+        return self
+
+    def __imul__(self, n):
+        super().__imul__(n)
+        self._changed()
+        return self
+
+    def append(self, item):
+        super().append(item)
+        self._changed()
+
+    def extend(self, items):
+        super().extend(items)
+        self._changed()
+
+    def insert(self, index, item):
+        super().insert(index, item)
+        self._changed()
+
+    def pop(self, index=-1):
+        item = super().pop(index)
+        self._changed()
+        return item
+
+    def remove(self, item):
+        super().remove(item)
+        self._changed()
+
+    def clear(self):
+        super().clear()
+        self._changed()
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self._changed()
+
+    def reverse(self):
+        super().reverse()
+        self._changed()
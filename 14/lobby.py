@@ -0,0 +1,42 @@
+import argparse
+import json
+import sys
+
+from evolution.exporter import Exporter
+from evolution.lobby import Lobby, DEFAULT_MAX_TABLES, SEATING_WINDOW_MILLISECONDS
+
+# Call with a port to host games on; see --help for the remaining options.
+
+
+def main(argv):
+    """ Host games for as long as clients keep coming, printing each table's result as a JSON line to stdout
+    :param argv: a List of String command line arguments
+    """
+    parser = argparse.ArgumentParser(description="Host many games of Evolution at once on one port")
+    parser.add_argument("port", type=int)
+    parser.add_argument("-t", "--max-tables", type=int, default=DEFAULT_MAX_TABLES,
+                        help="tables that may play at once")
+    parser.add_argument("-w", "--window", type=int, default=SEATING_WINDOW_MILLISECONDS,
+                        help="milliseconds to wait for a full table before seating a smaller one")
+    parser.add_argument("-n", "--tables", type=int, default=None, help="stop after this many tables have finished")
+    parser.add_argument("-m", "--metrics-port", type=int, default=None,
+                        help="serve live metrics in the Prometheus text format at localhost:PORT/metrics")
+    args = parser.parse_args(argv)
+
+    def print_table(table):
+        sys.stdout.write(json.dumps(table.serialize()) + "\n")
+        sys.stdout.flush()
+
+    exporter = Exporter("localhost", args.metrics_port).start() if args.metrics_port is not None else None
+    lobby = Lobby("localhost", args.port, args.max_tables, args.window, on_table=print_table, exporter=exporter)
+    try:
+        lobby.serve(args.tables)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if exporter is not None:
+            exporter.close()
+    sys.stderr.write(json.dumps(lobby.stats()) + "\n")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
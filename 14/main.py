@@ -2,9 +2,11 @@ import sys
 
 from evolution.dealer import Dealer, MIN_PLAYERS
 from evolution.player import ExternalPlayer
-from evolution.server import Server
+from evolution.server import AsyncServer
 from evolution.debug import debug
+from evolution.exporter import Exporter
 from evolution.proxy_player import ProxyPlayer
+from evolution.session import staying
 
 def generate_score_string(scores):
     """ Print out the scores for the end of the game
@@ -19,28 +21,48 @@ def generate_score_string(scores):
         result += out_string
     return result
 
-def main(port):
-    """ Carry out the game and print results to stdout
+def main(port, games=1, metrics_port=None):
+    """ Carry out the games and print results to stdout. Players that asked to keep their session play each game in
+    turn over the same connection; the others play only the first.
     :param port: Integer representing the port to play on
+    :param games: Integer number of games to play, as long as enough players are left for one
+    :param metrics_port: Integer port to serve metrics on at localhost/metrics while the games are played, or None
     """
+    exporter = Exporter("localhost", metrics_port).start() if metrics_port is not None else None
     if port:
-        server = Server("localhost", port)
-        remote_players_and_messages = server.add_players()
-        proxies = [(ProxyPlayer(p[0]), p[1]) for p in remote_players_and_messages]
-    else:
-        proxies = [(ExternalPlayer(i), "hi") for i in range(5)]
+        server = AsyncServer("localhost", port, exporter=exporter)
+        players = server.add_players()
+    for game in range(games):
+        if port:
+            if len(players) < MIN_PLAYERS:
+                debug("Too few players are left for another game")
+                break
+            proxies = [(ProxyPlayer(sock), info) for sock, info in players]
+        else:
+            proxies = [(ExternalPlayer(i), "hi") for i in range(5)]
 
-    dealer = Dealer()
-    dealer.play_game(proxies)
+        metrics = exporter.game_started() if exporter is not None else None
+        dealer = Dealer(metrics=metrics)
+        dealer.play_game(proxies)
+        if metrics is not None:
+            exporter.game_finished(metrics)
 
-    scores = dealer.get_scores()
-    if not scores:
-        debug("Every player dropped and the game ended")
-    sys.stdout.write(generate_score_string(scores))
+        scores = dealer.get_scores()
+        if not scores:
+            debug("Every player dropped and the game ended")
+        sys.stdout.write(generate_score_string(scores))
+        if port:
+            kept = staying(dealer.players)
+            for sock, _ in players:
+                if not any(sock is kept_sock for kept_sock, _ in kept):
+                    sock.shutdown()
+            players = kept
+    if exporter is not None:
+        exporter.close()
 
 if __name__ == '__main__':
     try:
         port = int(sys.argv[1])
     except IndexError:
         port = None
-    main(port)
\ No newline at end of file
+    main(port, int(sys.argv[2]) if len(sys.argv) > 2 else 1, int(sys.argv[3]) if len(sys.argv) > 3 else None)
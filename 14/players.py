@@ -3,9 +3,12 @@ import sys
 from evolution.player import *
 from evolution.proxy_dealer import ProxyDealer
 from evolution.json_socket import JSONSocket
+from evolution.mcts import MCTSPlayer
 from time import sleep
 
-#Call with a number for player id, and a number for a port.
+#Call with a number for player id, and a number for a port. Pass "mcts" after them to search for feedings,
+#"compact" to use compact frames rather than JSON, "delta" to be sent feeding states as patches, and "session" to stay
+#connected and play game after game until the server closes the connection.
 
 try:
     port = int(sys.argv[2])
@@ -20,8 +23,11 @@ except:
     greeting = "Hello"
 
 
+agent = MCTSPlayer(0) if "mcts" in sys.argv[3:] else None
+
 #Make sure they're in order if we're passing an order.
 sleep(index+1)
 jsock = JSONSocket.from_host_and_port("localhost", port)
-dealer = ProxyDealer(jsock, handshake=greeting)
+dealer = ProxyDealer(jsock, player=agent, handshake=greeting, compact_frames="compact" in sys.argv[3:],
+                     delta_states="delta" in sys.argv[3:], keep_session="session" in sys.argv[3:])
 dealer.begin()
@@ -0,0 +1,42 @@
+import argparse
+import json
+import sys
+
+from evolution.simulate import simulate, DEFAULT_PLAYER_COUNT
+
+# Call with a number of games to play; see --help for the remaining options.
+
+
+def main(argv):
+    """ Play a batch of headless games and print a JSON summary to stdout
+    :param argv: a List of String command line arguments
+    """
+    parser = argparse.ArgumentParser(description="Play many seeded games of Evolution in parallel")
+    parser.add_argument("games", type=int)
+    parser.add_argument("-p", "--players", type=int, default=DEFAULT_PLAYER_COUNT)
+    parser.add_argument("-j", "--processes", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="seed of the first game")
+    parser.add_argument("--results", action="store_true", help="print each game's result as a JSON line")
+    parser.add_argument("--metrics", action="store_true",
+                        help="time each phase and count what happens in every game, and add them to the summary")
+    parser.add_argument("--lockstep", action="store_true",
+                        help="play every game at once in this process with NumPy, rather than across a pool")
+    args = parser.parse_args(argv)
+
+    def print_result(result):
+        sys.stdout.write(json.dumps(result.serialize()) + "\n")
+
+    on_result = print_result if args.results else None
+    if args.lockstep:
+        # NumPy is only needed here, so it's only imported here
+        from evolution.lockstep import simulate_lockstep
+        summary = simulate_lockstep(args.games, args.players, args.seed, on_result=on_result)
+    else:
+        summary = simulate(args.games, args.players, args.processes, args.seed, on_result=on_result,
+                           with_metrics=args.metrics)
+    sys.stdout.write(json.dumps(summary.serialize()) + "\n")
+    sys.stderr.write("%d games in %.2fs: %.1f games/sec\n" % (summary.games, summary.wall_time,
+                                                              summary.games_per_second()))
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,79 @@
+import argparse
+import importlib
+import json
+import sys
+
+from evolution.dealer import MAX_PLAYERS
+from evolution.lobby import Lobby, DEFAULT_MAX_TABLES, SEATING_WINDOW_MILLISECONDS
+from evolution.tournament import Tournament
+
+# Call with entrants as name=module:Class, e.g. silly=evolution.player:ExternalPlayer, or with --port to rate remote
+# players by their handshakes; see --help for the remaining options.
+
+
+def load_entrant(spec):
+    """
+    :param spec: a String of name=module:Class
+    :return: (String name, class)
+    """
+    name, _, path = spec.partition("=")
+    module, _, class_name = path.partition(":")
+    if not (name and module and class_name):
+        raise argparse.ArgumentTypeError("entrants are given as name=module:Class, not " + spec)
+    return name, getattr(importlib.import_module(module), class_name)
+
+
+def progress(tournament):
+    """
+    :param tournament: a Tournament
+    :return: a String line of the games played, their rate, and the standings with 95% intervals of the share of
+    opponents beaten
+    """
+    entries = []
+    for rating in tournament.standings():
+        interval = rating.share_interval()
+        entries.append("%s %.0f (%.2f-%.2f)" % ((rating.name, rating.rating) + interval) if interval else
+                       "%s %.0f" % (rating.name, rating.rating))
+    return "%d games, %.1f games/sec: %s\n" % (tournament.games, tournament.games_per_second(), ", ".join(entries))
+
+
+def main(argv):
+    """ Play a tournament and print its standings as JSON to stdout, with progress on stderr as it runs
+    :param argv: a List of String command line arguments
+    """
+    parser = argparse.ArgumentParser(description="Rate Evolution players by playing them against each other")
+    parser.add_argument("entrants", nargs="*", type=load_entrant, help="name=module:Class for each entrant")
+    parser.add_argument("-r", "--rounds", type=int, default=100, help="rounds, in which every entrant plays once")
+    parser.add_argument("-t", "--table-size", type=int, default=MAX_PLAYERS, help="most players at a table")
+    parser.add_argument("-j", "--processes", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="seed of the first game")
+    parser.add_argument("-e", "--every", type=int, default=100, help="games between progress lines")
+    parser.add_argument("--port", type=int, default=None,
+                        help="host a lobby on this port and rate the remote players that play in it instead")
+    parser.add_argument("-n", "--tables", type=int, default=None, help="with --port, stop after this many tables")
+    args = parser.parse_args(argv)
+
+    tournament = Tournament(dict(args.entrants), args.table_size, args.seed)
+
+    def report(_):
+        if tournament.games % args.every == 0:
+            sys.stderr.write(progress(tournament))
+
+    if args.port is None:
+        tournament.play(args.rounds, args.processes, on_result=report)
+    else:
+        def on_table(table):
+            if table.scores is not None:
+                tournament.on_table(table)
+                report(table)
+
+        lobby = Lobby("localhost", args.port, DEFAULT_MAX_TABLES, SEATING_WINDOW_MILLISECONDS, on_table=on_table)
+        try:
+            lobby.serve(args.tables)
+        except KeyboardInterrupt:
+            pass
+    sys.stdout.write(json.dumps(tournament.serialize()) + "\n")
+    sys.stderr.write(progress(tournament))
+
+if __name__ == '__main__':
+    main(sys.argv[1:])